@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Servido con un servidor ASGI (p. ej. ``uvicorn LesEtoiles.asgi:application``)
+el canal de notificaciones /api/reservaHotel/notificaciones/stream/ usa un
+flujo asíncrono y las conexiones abiertas no ocupan un hilo cada una.
 """
 
 import os
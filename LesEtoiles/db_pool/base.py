@@ -0,0 +1,59 @@
+# ========================================
+# ARCHIVO: LesEtoiles/db_pool/base.py
+# Backend MySQL con pool de conexiones (ENGINE = 'LesEtoiles.db_pool')
+# ========================================
+"""
+Igual que django.db.backends.mysql, pero connect()/close() sacan y devuelven
+conexiones de un pool del proceso (ver pool.py). Opciones en
+DATABASES['default']['POOL']: TAMANO, MAX_CONEXIONES, VIDA_MAX,
+INTERVALO_PING, TIMEOUT_ESPERA.
+
+Django trae pool nativo solo para PostgreSQL; con MySQL (PyMySQL) se usa este.
+"""
+from django.db import OperationalError
+from django.db.backends.mysql import base as mysql_base
+
+from .pool import obtener_pool, ConexionAgotada
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+
+    def _pool(self, conn_params):
+        return obtener_pool(
+            self.alias,
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            self.settings_dict.get('POOL', {})
+        )
+
+    def get_new_connection(self, conn_params):
+        self._pool_conexiones = self._pool(conn_params)
+        try:
+            conexion, reutilizada = self._pool_conexiones.obtener()
+        except ConexionAgotada as e:
+            raise OperationalError(str(e)) from e
+        self._conexion_reutilizada = reutilizada
+        return conexion
+
+    def init_connection_state(self):
+        # La sesión de una conexión reutilizada ya quedó configurada al abrirla
+        if getattr(self, '_conexion_reutilizada', False):
+            return
+        super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self._pool_conexiones
+        # Cerrada dentro de un atomic(): Django conserva la referencia, así que no puede volver al pool
+        if self.in_atomic_block or (self.errors_occurred and not self.is_usable()):
+            pool.devolver(self.connection, descartar=True)
+            return
+        try:
+            # Deja la conexión sin transacción abierta y en autocommit, como recién creada
+            if not self.connection.get_autocommit():
+                self.connection.rollback()
+                self.connection.autocommit(True)
+        except Exception:
+            pool.devolver(self.connection, descartar=True)
+            return
+        pool.devolver(self.connection)
@@ -0,0 +1,226 @@
+# ========================================
+# ARCHIVO: LesEtoiles/db_pool/pool.py
+# Pool de conexiones MySQL compartido por los hilos del proceso
+# ========================================
+"""
+Cada hilo (request WSGI, workers de las colas, escritor de auditoría) sigue
+teniendo su propio DatabaseWrapper de Django y sigue llamando a
+connection.close(); con el backend LesEtoiles.db_pool ese close() devuelve la
+conexión física al pool en vez de cerrarla, y el siguiente connect() la reutiliza
+sin repetir el handshake TCP + TLS + autenticación con el MySQL remoto.
+
+Una conexión nunca la usan dos hilos a la vez: se saca del pool al conectar y
+vuelve al cerrar.
+"""
+import os
+import threading
+import time
+
+
+class ConexionAgotada(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+
+class _Entrada:
+    __slots__ = ('conexion', 'creada', 'devuelta')
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.creada = time.monotonic()
+        self.devuelta = self.creada
+
+
+class PoolConexiones:
+    """
+    Pool acotado:
+    - tamano: conexiones libres que se conservan
+    - max_conexiones: total abiertas (libres + en uso); al llegar al tope se espera
+    - vida_max: segundos de vida de una conexión antes de reemplazarla
+    - intervalo_ping: si estuvo libre más que esto, se hace ping antes de entregarla
+    - timeout_espera: segundos máximos esperando una conexión libre
+    """
+
+    def __init__(self, conectar, tamano=5, max_conexiones=10, vida_max=1800,
+                 intervalo_ping=30, timeout_espera=10):
+        self.conectar = conectar
+        self.tamano = tamano
+        self.max_conexiones = max(max_conexiones, tamano)
+        self.vida_max = vida_max
+        self.intervalo_ping = intervalo_ping
+        self.timeout_espera = timeout_espera
+
+        self._libres = []          # pila: la más reciente primero (más probable que siga viva)
+        self._en_uso = {}          # {id(conexion): _Entrada}
+        self._lock = threading.Lock()
+        self._disponible = threading.Condition(self._lock)
+        self._pid = os.getpid()
+
+        # 📊 Métricas
+        self.aciertos = 0          # entregas con conexión reutilizada
+        self.fallos = 0            # entregas que abrieron conexión nueva
+        self.esperas = 0           # entregas que tuvieron que esperar
+        self.tiempo_espera_total = 0.0
+        self.agotadas = 0          # esperas que terminaron en timeout
+        self.descartadas = 0       # cerradas por vencidas, sin ping o con error
+
+    # ==============================================
+    # 🔹 HELPERS
+    # ==============================================
+
+    def _revisar_fork(self):
+        """Tras un fork (gunicorn --preload) las conexiones heredadas no se comparten (requiere el lock)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._libres = []
+            self._en_uso = {}
+
+    def _total(self):
+        return len(self._libres) + len(self._en_uso)
+
+    @staticmethod
+    def _cerrar(conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def _sana(self, entrada, ahora):
+        if ahora - entrada.creada > self.vida_max:
+            return False
+        if ahora - entrada.devuelta > self.intervalo_ping:
+            try:
+                entrada.conexion.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    # ==============================================
+    # 🔹 SACAR / DEVOLVER
+    # ==============================================
+
+    def obtener(self):
+        """Conexión lista para usar (reutilizada o nueva). Retorna (conexion, reutilizada)"""
+        inicio = time.monotonic()
+        espero = False
+        with self._disponible:
+            self._revisar_fork()
+            while True:
+                # 1️⃣ Reutilizar una libre y sana
+                while self._libres:
+                    entrada = self._libres.pop()
+                    if self._sana(entrada, time.monotonic()):
+                        self._en_uso[id(entrada.conexion)] = entrada
+                        self.aciertos += 1
+                        self._registrar_espera(espero, inicio)
+                        return entrada.conexion, True
+                    self._cerrar(entrada.conexion)
+                    self.descartadas += 1
+
+                # 2️⃣ Abrir una nueva si hay cupo (se reserva el cupo y se conecta fuera del lock)
+                if self._total() < self.max_conexiones:
+                    reserva = _Entrada(None)
+                    self._en_uso[id(reserva)] = reserva
+                    break
+
+                # 3️⃣ Esperar a que otro hilo devuelva una
+                restante = self.timeout_espera - (time.monotonic() - inicio)
+                if restante <= 0:
+                    self.agotadas += 1
+                    raise ConexionAgotada(
+                        f"Pool de conexiones agotado ({self.max_conexiones} en uso) tras {self.timeout_espera}s"
+                    )
+                espero = True
+                self._disponible.wait(restante)
+
+        try:
+            conexion = self.conectar()
+        except Exception:
+            with self._disponible:
+                self._en_uso.pop(id(reserva), None)
+                self._disponible.notify()
+            raise
+
+        with self._disponible:
+            self._en_uso.pop(id(reserva), None)
+            entrada = _Entrada(conexion)
+            self._en_uso[id(conexion)] = entrada
+            self.fallos += 1
+            self._registrar_espera(espero, inicio)
+        return conexion, False
+
+    def _registrar_espera(self, espero, inicio):
+        if espero:
+            self.esperas += 1
+            self.tiempo_espera_total += time.monotonic() - inicio
+
+    def devolver(self, conexion, descartar=False):
+        """Devuelve la conexión al pool (o la cierra si sobra, venció o se pide descartarla)"""
+        with self._disponible:
+            entrada = self._en_uso.pop(id(conexion), None)
+            if entrada is None:
+                # No es de este pool (p. ej. abierta antes de un fork): solo cerrarla
+                descartar = True
+            elif not descartar:
+                ahora = time.monotonic()
+                descartar = len(self._libres) >= self.tamano or ahora - entrada.creada > self.vida_max
+                if not descartar:
+                    entrada.devuelta = ahora
+                    self._libres.append(entrada)
+            if descartar and entrada is not None:
+                self.descartadas += 1
+            self._disponible.notify()
+        if descartar:
+            self._cerrar(conexion)
+
+    def cerrar_todas(self):
+        with self._disponible:
+            libres, self._libres = self._libres, []
+        for entrada in libres:
+            self._cerrar(entrada.conexion)
+
+    def obtener_estadisticas(self):
+        with self._lock:
+            entregas = self.aciertos + self.fallos
+            return {
+                'libres': len(self._libres),
+                'en_uso': len(self._en_uso),
+                'tamano': self.tamano,
+                'max_conexiones': self.max_conexiones,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / entregas, 3) if entregas else None,
+                'esperas': self.esperas,
+                'espera_promedio_ms': round(self.tiempo_espera_total / self.esperas * 1000, 2) if self.esperas else 0,
+                'agotadas': self.agotadas,
+                'descartadas': self.descartadas,
+                'vida_max': self.vida_max,
+                'intervalo_ping': self.intervalo_ping,
+            }
+
+
+# Un pool por alias de base de datos (se crean al primer connect)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(alias, conectar, opciones):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = PoolConexiones(
+                conectar,
+                tamano=opciones.get('TAMANO', 5),
+                max_conexiones=opciones.get('MAX_CONEXIONES', 10),
+                vida_max=opciones.get('VIDA_MAX', 1800),
+                intervalo_ping=opciones.get('INTERVALO_PING', 30),
+                timeout_espera=opciones.get('TIMEOUT_ESPERA', 10),
+            )
+            _pools[alias] = pool
+        return pool
+
+
+def obtener_estadisticas_pools():
+    """{alias: estadísticas} de los pools creados en este proceso"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.obtener_estadisticas() for alias, pool in pools.items()}
@@ -0,0 +1,101 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .pool import ConexionAgotada, PoolConexiones
+
+
+class ConexionFalsa:
+    """Lo mínimo de una conexión PyMySQL que usa el pool"""
+
+    def __init__(self):
+        self.cerrada = False
+        self.viva = True
+
+    def ping(self, reconnect=False):
+        if not self.viva:
+            raise ConnectionError('MySQL server has gone away')
+
+    def close(self):
+        self.cerrada = True
+
+
+class PoolConexionesTest(SimpleTestCase):
+
+    def crear_pool(self, **opciones):
+        self.abiertas = []
+
+        def conectar():
+            conexion = ConexionFalsa()
+            self.abiertas.append(conexion)
+            return conexion
+        return PoolConexiones(conectar, **opciones)
+
+    def test_reutiliza_la_conexion_devuelta(self):
+        pool = self.crear_pool(tamano=1, max_conexiones=2)
+        conexion, reutilizada = pool.obtener()
+        self.assertFalse(reutilizada)
+        pool.devolver(conexion)
+        self.assertEqual(pool.obtener(), (conexion, True))
+
+        # Con una libre ya en la pila, la que sobra del tamaño se cierra al devolverla
+        otra, _ = pool.obtener()
+        pool.devolver(conexion)
+        pool.devolver(otra)
+        self.assertTrue(otra.cerrada)
+        estadisticas = pool.obtener_estadisticas()
+        self.assertEqual((estadisticas['libres'], estadisticas['en_uso']), (1, 0))
+        self.assertEqual((estadisticas['aciertos'], estadisticas['fallos'], estadisticas['descartadas']), (1, 2, 1))
+
+    def test_descarta_vencidas_y_sin_ping(self):
+        pool = self.crear_pool(vida_max=60, intervalo_ping=0)
+        conexion, _ = pool.obtener()
+        pool.devolver(conexion)
+        conexion.viva = False
+        nueva, reutilizada = pool.obtener()
+        self.assertFalse(reutilizada)
+        self.assertTrue(conexion.cerrada)
+
+        pool.devolver(nueva)
+        pool._libres[0].creada -= 61
+        self.assertIsNot(pool.obtener()[0], nueva)
+        self.assertTrue(nueva.cerrada)
+        self.assertEqual(pool.descartadas, 2)
+
+    def test_agotado_espera_y_timeout(self):
+        pool = self.crear_pool(tamano=1, max_conexiones=1, timeout_espera=0.05)
+        conexion, _ = pool.obtener()
+        with self.assertRaises(ConexionAgotada):
+            pool.obtener()
+        self.assertEqual(pool.agotadas, 1)
+
+        # Otro hilo la devuelve mientras esperamos
+        pool.timeout_espera = 5
+        threading.Timer(0.05, pool.devolver, args=(conexion,)).start()
+        self.assertEqual(pool.obtener(), (conexion, True))
+        self.assertEqual(pool.esperas, 1)
+        self.assertEqual(len(self.abiertas), 1)
+
+    def test_error_al_conectar_libera_el_cupo(self):
+        pool = PoolConexiones(mock.Mock(side_effect=OSError('sin red')), max_conexiones=1, timeout_espera=0)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                pool.obtener()
+        self.assertEqual(pool.obtener_estadisticas()['en_uso'], 0)
+
+    def test_fork_no_comparte_conexiones(self):
+        pool = self.crear_pool()
+        heredada, _ = pool.obtener()
+        libre, _ = pool.obtener()
+        pool.devolver(libre)
+
+        with mock.patch('LesEtoiles.db_pool.pool.os.getpid', return_value=pool._pid + 1):
+            conexion, reutilizada = pool.obtener()
+            self.assertFalse(reutilizada)
+            self.assertIsNot(conexion, libre)
+            # La que el padre tenía en uso no es de este pool: al devolverla solo se cierra
+            pool.devolver(heredada)
+        self.assertTrue(heredada.cerrada)
+        self.assertFalse(libre.cerrada)  # el socket sigue siendo del padre
+        self.assertEqual(pool.obtener_estadisticas()['en_uso'], 1)
@@ -0,0 +1,253 @@
+# ========================================
+# ARCHIVO: LesEtoiles/perfilador_sql.py
+# Perfilador de consultas SQL por request (middleware opcional) y presupuesto de consultas en tests
+# ========================================
+"""
+Con PERFILADOR_SQL=True el middleware envuelve cada request con
+connection.execute_wrapper() y registra, solo para el hilo del request:
+
+- cantidad de consultas y tiempo total en la BD
+- huellas de consultas repetidas (mismo SQL con otros parámetros = N+1)
+- el sitio del código del proyecto (archivo:línea) que disparó cada una
+
+Los totales salen en los headers X-SQL-Consultas, X-SQL-Tiempo-Ms y
+X-SQL-Duplicadas, y se acumulan en un reporte por endpoint con las últimas
+PERFILADOR_SQL_VENTANA requests (GET /api/reservas/perfilador-sql/).
+Las consultas de los workers de las colas (otros hilos) no se cuentan. En
+respuestas en streaming solo se cuentan las consultas previas al primer byte.
+
+En tests, PresupuestoSQLMixin.assertPresupuestoSQL(maximo) falla con el
+detalle de las consultas si un bloque supera el presupuesto.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+_ESTE_ARCHIVO = os.path.abspath(__file__)
+
+
+# ==============================================
+# 🔹 HUELLAS Y SITIOS DE LLAMADA
+# ==============================================
+
+_LISTA_IN = re.compile(r'IN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_ESPACIOS = re.compile(r'\s+')
+
+
+def huella_sql(sql):
+    """SQL normalizado: sin literales y con las listas IN colapsadas (misma consulta = misma huella)"""
+    sql = _LITERALES.sub('?', sql)
+    sql = _LISTA_IN.sub('IN (...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+def _sitio_llamada():
+    """Primer frame del código del proyecto (fuera de Django, DRF y este módulo) como 'ruta:línea'"""
+    base = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        archivo = os.path.abspath(frame.f_code.co_filename)
+        if archivo.startswith(base) and archivo != _ESTE_ARCHIVO and 'site-packages' not in archivo:
+            return f"{os.path.relpath(archivo, base)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return None
+
+
+# ==============================================
+# 🔹 PERFIL DE UN BLOQUE DE CÓDIGO
+# ==============================================
+
+class PerfilSQL:
+    """execute_wrapper que guarda (huella, sql, duración, sitio) de cada consulta"""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append({
+                'huella': huella_sql(sql),
+                'sql': sql,
+                'duracion_ms': (time.perf_counter() - inicio) * 1000,
+                'sitio': _sitio_llamada(),
+            })
+
+    @property
+    def total(self):
+        return len(self.consultas)
+
+    @property
+    def tiempo_ms(self):
+        return sum(consulta['duracion_ms'] for consulta in self.consultas)
+
+    def duplicadas(self):
+        """[{huella, veces, sitios}] de las consultas que se repiten, la más repetida primero"""
+        veces = Counter(consulta['huella'] for consulta in self.consultas)
+        sitios = {}
+        for consulta in self.consultas:
+            if veces[consulta['huella']] > 1 and consulta['sitio']:
+                sitios.setdefault(consulta['huella'], OrderedDict())[consulta['sitio']] = None
+        return [
+            {'huella': huella, 'veces': cantidad, 'sitios': list(sitios.get(huella, ()))}
+            for huella, cantidad in veces.most_common() if cantidad > 1
+        ]
+
+    def describir(self):
+        """Texto con cada consulta y su sitio (mensajes de los tests)"""
+        lineas = [f"{self.total} consultas, {self.tiempo_ms:.1f} ms"]
+        for i, consulta in enumerate(self.consultas, 1):
+            lineas.append(f"{i}. [{consulta['duracion_ms']:.1f} ms] {consulta['sitio'] or '?'}\n   {consulta['sql']}")
+        return '\n'.join(lineas)
+
+
+@contextmanager
+def perfilar_sql():
+    """Registra las consultas de este hilo en todas las conexiones configuradas"""
+    perfil = PerfilSQL()
+    with ExitStack() as pila:
+        for alias in settings.DATABASES:
+            pila.enter_context(connections[alias].execute_wrapper(perfil))
+        yield perfil
+
+
+# ==============================================
+# 🔹 REPORTE POR ENDPOINT
+# ==============================================
+
+class ReporteEndpoints:
+    """Últimas `ventana` requests de cada endpoint y sus consultas repetidas más frecuentes"""
+
+    MAX_HUELLAS = 20  # huellas repetidas guardadas por endpoint
+
+    def __init__(self, ventana):
+        self.ventana = ventana
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, endpoint, perfil):
+        duplicadas = perfil.duplicadas()
+        with self._lock:
+            datos = self._endpoints.get(endpoint)
+            if datos is None:
+                datos = self._endpoints[endpoint] = {
+                    'muestras': deque(maxlen=self.ventana),
+                    'duplicadas': OrderedDict(),
+                }
+            datos['muestras'].append((perfil.total, perfil.tiempo_ms))
+            for duplicada in duplicadas:
+                actual = datos['duplicadas'].pop(duplicada['huella'], None) or {'veces_max': 0, 'sitios': []}
+                actual['veces_max'] = max(actual['veces_max'], duplicada['veces'])
+                actual['sitios'] = list(OrderedDict.fromkeys(actual['sitios'] + duplicada['sitios']))[:5]
+                datos['duplicadas'][duplicada['huella']] = actual  # la más reciente al final
+            while len(datos['duplicadas']) > self.MAX_HUELLAS:
+                datos['duplicadas'].popitem(last=False)
+
+    def obtener(self):
+        """Endpoints ordenados por consultas promedio (los más costosos primero)"""
+        with self._lock:
+            copia = {
+                endpoint: (list(datos['muestras']), dict(datos['duplicadas']))
+                for endpoint, datos in self._endpoints.items()
+            }
+        reporte = []
+        for endpoint, (muestras, duplicadas) in copia.items():
+            consultas = sorted(total for total, _ in muestras)
+            reporte.append({
+                'endpoint': endpoint,
+                'muestras': len(muestras),
+                'consultas_promedio': round(sum(consultas) / len(consultas), 1),
+                'consultas_p95': consultas[min(len(consultas) - 1, int(0.95 * len(consultas)))],
+                'consultas_max': consultas[-1],
+                'tiempo_sql_promedio_ms': round(sum(tiempo for _, tiempo in muestras) / len(muestras), 1),
+                'duplicadas': [
+                    {'huella': huella, **datos}
+                    for huella, datos in sorted(duplicadas.items(), key=lambda item: -item[1]['veces_max'])
+                ],
+            })
+        return sorted(reporte, key=lambda fila: -fila['consultas_promedio'])
+
+    def reiniciar(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+reporte_sql = ReporteEndpoints(getattr(settings, 'PERFILADOR_SQL_VENTANA', 100))
+
+
+# ==============================================
+# 🔹 MIDDLEWARE
+# ==============================================
+
+class PerfiladorSQLMiddleware:
+    """Perfil SQL de cada request (solo con PERFILADOR_SQL=True)"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADOR_SQL', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.umbral = getattr(settings, 'PERFILADOR_SQL_UMBRAL', 0)
+
+    def __call__(self, request):
+        with perfilar_sql() as perfil:
+            response = self.get_response(request)
+
+        duplicadas = perfil.duplicadas()
+        response['X-SQL-Consultas'] = str(perfil.total)
+        response['X-SQL-Tiempo-Ms'] = f"{perfil.tiempo_ms:.1f}"
+        response['X-SQL-Duplicadas'] = str(sum(duplicada['veces'] - 1 for duplicada in duplicadas))
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        endpoint = f"{request.method} /{coincidencia.route}" if coincidencia else f"{request.method} {request.path}"
+        reporte_sql.registrar(endpoint, perfil)
+
+        if self.umbral and perfil.total > self.umbral:
+            logger.warning(
+                "🐢 %s: %s consultas (%.1f ms), repetidas: %s",
+                endpoint, perfil.total, perfil.tiempo_ms,
+                '; '.join(f"{d['veces']}x {', '.join(d['sitios']) or d['huella'][:80]}" for d in duplicadas[:3]) or 'ninguna'
+            )
+        return response
+
+
+# ==============================================
+# 🔹 PRESUPUESTO DE CONSULTAS EN TESTS
+# ==============================================
+
+class PresupuestoSQLMixin:
+    """
+    Para TestCase: falla si el bloque hace más de `maximo` consultas o repite
+    más de `duplicadas` veces una misma consulta (patrón N+1).
+
+        with self.assertPresupuestoSQL(2):
+            self.client.get('/api/reservaHotel/reservas/')
+    """
+
+    @contextmanager
+    def assertPresupuestoSQL(self, maximo, duplicadas=0):
+        with perfilar_sql() as perfil:
+            yield perfil
+        if perfil.total > maximo:
+            self.fail(f"Presupuesto de {maximo} consultas superado: {perfil.describir()}")
+        repetidas = sum(duplicada['veces'] - 1 for duplicada in perfil.duplicadas())
+        if repetidas > duplicadas:
+            detalle = '\n'.join(
+                f"{duplicada['veces']}x {duplicada['huella']}\n   desde {', '.join(duplicada['sitios']) or '?'}"
+                for duplicada in perfil.duplicadas()
+            )
+            self.fail(f"{repetidas} consultas repetidas (máximo {duplicadas}):\n{detalle}")
@@ -84,6 +84,7 @@ REST_FRAMEWORK = {
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'LesEtoiles.perfilador_sql.PerfiladorSQLMiddleware',  # Solo activo con PERFILADOR_SQL=True
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -136,9 +137,22 @@ DATABASES = {
         },
         'CONN_MAX_AGE': 0,  # ⚠️ CRÍTICO: Desactiva conexiones persistentes para threading
         'ATOMIC_REQUESTS': False,  # No usar transacciones automáticas
+
+        # 🔁 Pool de conexiones (solo con DB_POOL=True, ver LesEtoiles/db_pool/)
+        # Con CONN_MAX_AGE = 0 cada close() devuelve la conexión al pool en vez de cerrarla
+        'POOL': {
+            'TAMANO': int(os.getenv("DB_POOL_TAMANO", "5")),  # Conexiones libres que se conservan
+            'MAX_CONEXIONES': int(os.getenv("DB_POOL_MAX_CONEXIONES", "10")),  # Tope por proceso (libres + en uso)
+            'VIDA_MAX': int(os.getenv("DB_POOL_VIDA_MAX", "1800")),  # Segundos antes de reemplazar una conexión
+            'INTERVALO_PING': int(os.getenv("DB_POOL_INTERVALO_PING", "30")),  # Ping si estuvo libre más que esto (s)
+            'TIMEOUT_ESPERA': int(os.getenv("DB_POOL_TIMEOUT_ESPERA", "10")),  # Espera máxima por una conexión (s)
+        },
     }
 }
 
+if os.getenv("DB_POOL", "False") == "True":
+    DATABASES['default']['ENGINE'] = 'LesEtoiles.db_pool'
+
 CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
@@ -262,4 +276,98 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
-]
\ No newline at end of file
+]
+
+# ⏱️ COLA DE RESERVAS DE HOTEL
+# 'ADAPTATIVO': procesa al instante si nadie compite por la habitación
+# 'FIJO': espera siempre 2 segundos para acumular solicitudes
+RESERVAS_HOTEL_MODO_BATCHING = os.getenv("RESERVAS_HOTEL_MODO_BATCHING", "ADAPTATIVO")
+RESERVAS_HOTEL_BATCHING_MAX = float(os.getenv("RESERVAS_HOTEL_BATCHING_MAX", "2.0"))  # Límite de la ventana (s)
+RESERVAS_HOTEL_BATCHING_EXTENSION = float(os.getenv("RESERVAS_HOTEL_BATCHING_EXTENSION", "0.25"))  # Extensión por cada competidor (s)
+RESERVAS_HOTEL_WORKERS = int(os.getenv("RESERVAS_HOTEL_WORKERS", "4"))  # Workers en paralelo (una habitación = un worker)
+RESERVAS_HOTEL_PROFUNDIDAD_COLA = int(os.getenv("RESERVAS_HOTEL_PROFUNDIDAD_COLA", "100"))  # Máximo por worker (0 = sin límite)
+RESERVAS_HOTEL_GRUPO_MAX = int(os.getenv("RESERVAS_HOTEL_GRUPO_MAX", "50"))  # Habitaciones por reserva de grupo
+RESERVAS_HOTEL_REINTENTOS_HABITACION = int(os.getenv("RESERVAS_HOTEL_REINTENTOS_HABITACION", "2"))  # Otras habitaciones a probar si otro proceso ganó la elegida
+
+# 🤝 ARBITRAJE DE PRIORIDAD ENTRE PROCESOS (hotel y eventos)
+# 'MEMORIA': cada proceso arbitra solo sus solicitudes (un solo worker de gunicorn)
+# 'BD': solicitudes pendientes compartidas en la tabla solicitud_reserva_pendiente (varios workers)
+RESERVAS_ARBITRAJE = os.getenv("RESERVAS_ARBITRAJE", "MEMORIA")
+
+# 🎫 RESERVAS ASÍNCRONAS (ticket + consulta en /api/reservas/tickets/<ticket>/)
+RESERVAS_MODO_ASINCRONO = os.getenv("RESERVAS_MODO_ASINCRONO", "False") == "True"  # Por defecto solo con ?asincrono=1
+# 'MEMORIA': tickets en el proceso que los creó (un worker o sticky routing) / 'BD': tabla ticket_reserva (varios workers)
+RESERVAS_TICKETS_ALMACEN = os.getenv("RESERVAS_TICKETS_ALMACEN", RESERVAS_ARBITRAJE)  # Por defecto igual que el arbitraje
+RESERVAS_TICKETS_MAX = int(os.getenv("RESERVAS_TICKETS_MAX", "1000"))  # Tickets guardados en memoria
+RESERVAS_TICKETS_TTL = int(os.getenv("RESERVAS_TICKETS_TTL", "600"))  # Segundos antes de descartar un ticket
+
+# 🧾 AUDITORÍA EN LOTES
+# 'SINCRONO': INSERT inmediato / 'ASINCRONO': se acumulan en memoria y se escriben con bulk_create.
+# ASINCRONO solo en procesos de larga vida (gunicorn): en serverless (Vercel) el hilo y el atexit
+# pueden no llegar a correr antes de que se congele la instancia y las filas del buffer se pierden
+AUDITORIA_MODO = os.getenv("AUDITORIA_MODO", "SINCRONO")
+AUDITORIA_LOTE_MAX = int(os.getenv("AUDITORIA_LOTE_MAX", "100"))  # Filas que disparan la escritura
+AUDITORIA_INTERVALO_FLUSH = float(os.getenv("AUDITORIA_INTERVALO_FLUSH", "2.0"))  # Máximo de segundos en el buffer
+AUDITORIA_BUFFER_MAX = int(os.getenv("AUDITORIA_BUFFER_MAX", "10000"))  # Tope si la BD no responde
+
+# 🧾 COMPROBANTES DE PAGO (fuera de la tabla reservas_gen, ver apps/reservas_gen/comprobantes.py)
+COMPROBANTES_ROOT = os.getenv("COMPROBANTES_ROOT", os.path.join(BASE_DIR, 'comprobantes'))  # Carpeta privada, no servida como media
+# Clase de storage (p. ej. S3); vacío = COMPROBANTES_ROOT, solo con DEBUG: en producción (Vercel) el disco no persiste
+COMPROBANTES_STORAGE = os.getenv("COMPROBANTES_STORAGE", "")
+COMPROBANTES_TAMANO_MAX = int(os.getenv("COMPROBANTES_TAMANO_MAX", str(10 * 1024 * 1024)))  # Bytes
+
+# 📊 TABLEROS DEL DÍA (estadisticas-hoy de hotel y eventos, ver apps/reservas_gen/tableros.py)
+TABLEROS_CACHE_TTL = int(os.getenv("TABLEROS_CACHE_TTL", "30"))  # Segundos; cada escritura de reservas invalida antes
+
+# 🔔 NOTIFICACIONES EN VIVO (Server-Sent Events en /api/reservaHotel/notificaciones/stream/)
+NOTIFICACIONES_SSE_HEARTBEAT = int(os.getenv("NOTIFICACIONES_SSE_HEARTBEAT", "15"))  # Segundos entre comentarios keep-alive
+NOTIFICACIONES_SSE_DURACION_MAX = int(os.getenv("NOTIFICACIONES_SSE_DURACION_MAX", "3600"))  # El cliente reconecta con Last-Event-ID
+
+# 📚 CACHÉ DE CATÁLOGOS (tarifas, servicios adicionales, habitaciones; ver apps/reservas_gen/catalogos.py)
+CATALOGOS_CACHE_TTL = int(os.getenv("CATALOGOS_CACHE_TTL", "300"))  # Segundos; cada escritura del catálogo invalida antes
+
+# 📅 CALENDARIO DE OCUPACIÓN DE HABITACIONES (ver apps/reserva_hotel/calendario.py)
+CALENDARIO_CACHE_TTL = int(os.getenv("CALENDARIO_CACHE_TTL", "300"))  # Segundos por mes; cada escritura de reservas invalida antes
+CALENDARIO_DIAS_MAX = int(os.getenv("CALENDARIO_DIAS_MAX", "366"))  # Ventana máxima por request
+
+# 🔎 BÚSQUEDA DE HABITACIONES CON ALTERNATIVAS (ver apps/reserva_hotel/busqueda.py)
+BUSQUEDA_DIAS_DESPLAZAMIENTO = int(os.getenv("BUSQUEDA_DIAS_DESPLAZAMIENTO", "14"))  # Días que se puede correr el ingreso
+BUSQUEDA_TRAMOS_MAX = int(os.getenv("BUSQUEDA_TRAMOS_MAX", "3"))  # Habitaciones como máximo en una estadía dividida
+
+# 🕒 HORARIOS OCUPADOS DE SERVICIOS DE EVENTOS (ver apps/reservas_evento/disponibilidad.py)
+HORARIOS_OCUPADOS_DIAS = int(os.getenv("HORARIOS_OCUPADOS_DIAS", "31"))  # Ventana por defecto desde fecha_inicio
+HORARIOS_OCUPADOS_DIAS_MAX = int(os.getenv("HORARIOS_OCUPADOS_DIAS_MAX", "186"))  # Menor que MAX_FECHAS del índice
+
+# 🏷️ GET CONDICIONAL (ETag) en notificaciones y estadisticas-hoy, ver apps/reservas_gen/versiones.py
+RESERVAS_ETAG_VENTANA = int(os.getenv("RESERVAS_ETAG_VENTANA", "30"))  # Segundos: máximo retraso en ver escrituras de otros procesos
+
+# 📈 MÉTRICAS Y LOGS DE LAS COLAS (GET /api/metrics/ en formato Prometheus, ver apps/reservas_gen/metricas.py)
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "")  # Vacío = sin autenticación; si no, Authorization: Bearer <token>
+RESERVAS_LOG_NIVEL = os.getenv("RESERVAS_LOG_NIVEL", "INFO")  # DEBUG muestra cada solicitud (encolado, conflictos, creación)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'apps.reserva_hotel.queue_manager': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+        'apps.reservas_evento.queue_manager': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+        'apps.reserva_hotel.disponibilidad': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+        'apps.reservas_gen.arbitraje': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+        'apps.reservas_gen.tickets': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+        'apps.reservas_gen.views': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+        'apps.reserva_hotel.views': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+        'apps.reserva_hotel.notificaciones': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+        'apps.auditoria.escritor': {'handlers': ['consola'], 'level': RESERVAS_LOG_NIVEL, 'propagate': False},
+    },
+}
+
+# 🔬 PERFILADOR SQL POR REQUEST (headers X-SQL-* y GET /api/reservas/perfilador-sql/, ver LesEtoiles/perfilador_sql.py)
+PERFILADOR_SQL = os.getenv("PERFILADOR_SQL", "False") == "True"  # Agrega un execute_wrapper a cada request: solo para diagnóstico
+PERFILADOR_SQL_VENTANA = int(os.getenv("PERFILADOR_SQL_VENTANA", "100"))  # Requests recientes guardadas por endpoint
+PERFILADOR_SQL_UMBRAL = int(os.getenv("PERFILADOR_SQL_UMBRAL", "20"))  # Avisa en el log si un request supera estas consultas (0 = nunca)
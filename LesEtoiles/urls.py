@@ -33,6 +33,8 @@ urlpatterns = [
     path('api/', include('apps.reservas_evento.urls')),
     #auditoria
     path('api/', include('apps.auditoria.urls')),
+    # Reservas (común a hotel y eventos)
+    path('api/', include('apps.reservas_gen.urls')),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
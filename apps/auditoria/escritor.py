@@ -0,0 +1,204 @@
+# ========================================
+# ARCHIVO: apps/auditoria/escritor.py
+# Escritura de auditorías en lotes, fuera del camino crítico del request
+# ========================================
+"""
+Los helpers de auditoría (views.py / utils.py) llaman a registrar_auditoria().
+
+- AUDITORIA_MODO = 'SINCRONO' (por defecto): INSERT inmediato dentro del request,
+  como el create() original. Es el único modo seguro en serverless (Vercel), donde
+  la instancia se congela al terminar el request.
+- AUDITORIA_MODO = 'ASINCRONO' (gunicorn u otro proceso de larga vida): la fila
+  queda en un buffer en memoria y un hilo la escribe con bulk_create cuando el
+  buffer llega a AUDITORIA_LOTE_MAX filas o pasan AUDITORIA_INTERVALO_FLUSH
+  segundos; al apagar el proceso (atexit) se vacía lo pendiente.
+
+En ASINCRONO las filas se encolan con transaction.on_commit: si el request hace
+rollback la auditoría no se escribe, igual que con el create() original.
+
+Si el bulk_create del lote falla se reintenta fila por fila: las filas que la BD
+rechaza (datos inválidos) se descartan con un log, y solo vuelven al buffer las
+que fallan por conexión. Así una fila mala no bloquea al resto del lote.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import InterfaceError, OperationalError, connection, transaction
+
+from .models import Auditoria
+
+logger = logging.getLogger(__name__)
+
+
+class EscritorAuditoria:
+    """Buffer de auditorías con flush por tamaño o tiempo, singleton por proceso"""
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._inicializar()
+        return cls._instance
+
+    def _inicializar(self):
+        self.modo = str(getattr(settings, 'AUDITORIA_MODO', 'SINCRONO')).upper()
+        self.lote_max = getattr(settings, 'AUDITORIA_LOTE_MAX', 100)
+        self.intervalo_flush = getattr(settings, 'AUDITORIA_INTERVALO_FLUSH', 2.0)
+        # Tope del buffer: si la BD no responde se descartan las más antiguas
+        self.buffer_max = getattr(settings, 'AUDITORIA_BUFFER_MAX', 10000)
+
+        self.buffer = []
+        self._buffer_lock = threading.Lock()
+        self._hay_datos = threading.Condition(self._buffer_lock)
+        self._flush_lock = threading.Lock()  # un solo bulk_create a la vez
+        self._hilo = None
+        self._pid = None
+
+        self.escritas = 0
+        self.lotes = 0
+        self.errores = 0
+        self.descartadas = 0
+
+        atexit.register(self.flush)
+
+    # ==============================================
+    # 🔹 REGISTRO
+    # ==============================================
+
+    def registrar(self, auditorias):
+        """Recibe una lista de instancias Auditoria (sin guardar)"""
+        if not auditorias:
+            return
+        if self.modo == 'SINCRONO':
+            Auditoria.objects.bulk_create(auditorias)
+            return
+        transaction.on_commit(lambda: self._encolar(auditorias))
+
+    def _encolar(self, auditorias):
+        self._asegurar_hilo()
+        with self._hay_datos:
+            self.buffer.extend(auditorias)
+            exceso = len(self.buffer) - self.buffer_max
+            if exceso > 0:
+                del self.buffer[:exceso]
+                self.descartadas += exceso
+                logger.warning("⚠️ Buffer de auditoría lleno: %s registros descartados", exceso)
+            if len(self.buffer) >= self.lote_max:
+                self._hay_datos.notify()
+
+    def _asegurar_hilo(self):
+        """Arranca el hilo al primer registro (y de nuevo tras un fork de gunicorn)"""
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or self._pid != os.getpid() or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._procesar, name='auditoria-escritor', daemon=True)
+                self._hilo.start()
+                logger.info("🧾 Escritor de auditoría iniciado (lote=%s, intervalo=%ss)", self.lote_max, self.intervalo_flush)
+
+    # ==============================================
+    # 🔹 ESCRITURA
+    # ==============================================
+
+    def _procesar(self):
+        while True:
+            limite = time.time() + self.intervalo_flush
+            with self._hay_datos:
+                while len(self.buffer) < self.lote_max:
+                    restante = limite - time.time()
+                    if restante <= 0:
+                        break
+                    self._hay_datos.wait(restante)
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+    def flush(self):
+        """Escribe todo lo pendiente; retorna cuántas filas se guardaron"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                lote, self.buffer = self.buffer, []
+            if not lote:
+                return 0
+            try:
+                Auditoria.objects.bulk_create(lote, batch_size=self.lote_max)
+                escritas, pendientes = len(lote), []
+            except Exception as e:
+                logger.warning("❌ Error escribiendo %s auditorías en lote, reintento fila por fila: %s", len(lote), e)
+                with self._buffer_lock:
+                    self.errores += 1
+                escritas, pendientes = self._escribir_por_fila(lote)
+            with self._buffer_lock:
+                if pendientes:
+                    # Sin conexión: vuelven al buffer para el próximo ciclo
+                    self.buffer[:0] = pendientes
+                self.escritas += escritas
+                self.lotes += 1 if escritas else 0
+            return escritas
+
+    def _escribir_por_fila(self, lote):
+        """INSERT por fila; retorna (escritas, pendientes por error de conexión)"""
+        escritas = 0
+        for i, auditoria in enumerate(lote):
+            try:
+                with transaction.atomic():
+                    auditoria.save(force_insert=True)
+            except (OperationalError, InterfaceError) as e:
+                logger.warning("⏳ BD no disponible, %s auditorías vuelven al buffer: %s", len(lote) - i, e)
+                return escritas, lote[i:]
+            except Exception:
+                logger.exception("🗑️ Auditoría descartada (%s %s): %s", auditoria.accion, auditoria.tabla, auditoria.descripcion)
+                with self._buffer_lock:
+                    self.descartadas += 1
+            else:
+                escritas += 1
+        return escritas, []
+
+    def obtener_estadisticas(self):
+        with self._buffer_lock:
+            return {
+                'modo': self.modo,
+                'pendientes': len(self.buffer),
+                'escritas': self.escritas,
+                'lotes': self.lotes,
+                'errores': self.errores,
+                'descartadas': self.descartadas,
+                'lote_max': self.lote_max,
+                'intervalo_flush': self.intervalo_flush,
+            }
+
+
+# Instancia global del escritor de auditoría
+escritor_auditoria = EscritorAuditoria()
+
+
+def registrar_auditoria(usuario, accion, tabla, descripcion):
+    """Registra un evento de auditoría (se escribe en el próximo lote)"""
+    escritor_auditoria.registrar([
+        Auditoria(usuario=usuario, accion=accion, tabla=tabla, descripcion=descripcion)
+    ])
+
+
+def nombre_usuario_auditoria(user, por_defecto):
+    """
+    Nombre completo del Usuario asociado al auth_user, o `por_defecto`.
+    Usa la relación inversa user.usuario, que queda cacheada en el objeto
+    request.user: varias auditorías del mismo request hacen una sola consulta.
+    """
+    if not user.is_authenticated:
+        return por_defecto
+    try:
+        usuario = user.usuario
+    except ObjectDoesNotExist:
+        return por_defecto
+    return f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}"
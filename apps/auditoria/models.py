@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Auditoria(models.Model):
     ACCIONES = (
@@ -13,7 +14,8 @@ class Auditoria(models.Model):
     accion = models.CharField(max_length=20, choices=ACCIONES)
     tabla = models.CharField(max_length=50)
     descripcion = models.TextField()
-    fecha = models.DateTimeField(auto_now_add=True)
+    # Hora del evento (no la del INSERT: las auditorías se escriben en lotes)
+    fecha = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = "auditoria"
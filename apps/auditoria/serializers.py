@@ -3,6 +3,9 @@ from .models import Auditoria
 from django.utils import timezone
 import pytz
 
+# Zona horaria de la hora mostrada (GMT-4); se crea una sola vez
+ZONA_HORARIA_AUDITORIA = pytz.timezone("Etc/GMT+4")
+
 
 class AuditoriaSerializer(serializers.ModelSerializer):
     username = serializers.SerializerMethodField()
@@ -30,6 +33,7 @@ class AuditoriaSerializer(serializers.ModelSerializer):
         return None
 
     def get_usuario_nombre(self, obj):
+        # Requiere select_related('usuario__usuario') para no consultar por fila
         if obj.usuario and hasattr(obj.usuario, 'usuario'):
             usuario = obj.usuario.usuario
             return f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}".strip()
@@ -40,7 +44,6 @@ class AuditoriaSerializer(serializers.ModelSerializer):
 
     def get_hora(self, obj):
         if obj.fecha:
-            tz = pytz.timezone("Etc/GMT+4")  # GMT-4
-            fecha_local = obj.fecha.astimezone(tz)
+            fecha_local = obj.fecha.astimezone(ZONA_HORARIA_AUDITORIA)
             return fecha_local.time().strftime("%H:%M:%S")
         return None
\ No newline at end of file
@@ -1,3 +1,168 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.usuario.models import Usuario
+from LesEtoiles.perfilador_sql import PresupuestoSQLMixin
+
+from .escritor import EscritorAuditoria
+from .models import Auditoria
+
+
+class PresupuestoConsultasAuditoriaTest(PresupuestoSQLMixin, TestCase):
+    """El nombre del usuario de cada fila sale del select_related, no de una consulta por fila"""
+
+    @classmethod
+    def setUpTestData(cls):
+        ahora = timezone.now()
+        for i in range(4):
+            user = User.objects.create_user(f'auditor{i}', password='x')
+            Usuario.objects.create(
+                user=user, nombre=f'Auditor {i}', ci=i, telefono=1, email='a@a.com',
+                password='x', estado='A', rol='empleado'
+            )
+            for j in range(5):
+                Auditoria.objects.create(
+                    usuario=user, accion='REGISTRO', tabla='reserva_hotel',
+                    descripcion='prueba', fecha=ahora - timedelta(minutes=i * 10 + j)
+                )
+
+    def test_listar_auditorias(self):
+        with self.assertPresupuestoSQL(1):
+            respuesta = self.client.get('/api/auditoria/?limite=50')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(all(fila['usuario_nombre'] for fila in respuesta.json()['auditorias']))
+
+
+@mock.patch('apps.auditoria.views.AUDITORIA_TAMANO_BLOQUE_EXPORTACION', 3)
+class ExportacionAuditoriaTest(TestCase):
+    """Exportación NDJSON/CSV en streaming: todas las filas filtradas, en bloques de 3"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = []
+        for i in range(2):
+            user = User.objects.create_user(f'exportador{i}', password='x')
+            Usuario.objects.create(
+                user=user, nombre=f'Exportador {i}', ci=i, telefono=1, email='a@a.com',
+                password='x', estado='A', rol='empleado'
+            )
+            cls.usuarios.append(user)
+        # 4 filas por usuario, una por día del 1 al 4 de marzo (mediodía, sin bordes de zona horaria)
+        for dia in range(1, 5):
+            for user in cls.usuarios:
+                Auditoria.objects.create(
+                    usuario=user, accion='REGISTRO', tabla='reserva_hotel', descripcion=f'día {dia}, "con comillas"',
+                    fecha=datetime(2024, 3, dia, 16, tzinfo=dt_timezone.utc)
+                )
+
+    def exportar(self, formato, consulta=''):
+        respuesta = self.client.get(f'/api/auditoria/?formato={formato}{consulta}')
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content).decode('utf-8')
+
+    def test_ndjson(self):
+        respuesta, cuerpo = self.exportar('ndjson')
+        self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+        filas = [json.loads(linea) for linea in cuerpo.splitlines()]
+        self.assertTrue(cuerpo.endswith('\n'))
+        self.assertEqual(len(filas), 8)
+        self.assertEqual(len({fila['id'] for fila in filas}), 8)  # los bloques no se repiten
+        self.assertEqual([fila['fecha'] for fila in filas[:2]], ['2024-03-04', '2024-03-04'])
+        self.assertEqual(filas[0]['usuario_nombre'], 'Exportador 1')
+
+    def test_csv(self):
+        respuesta, cuerpo = self.exportar('csv')
+        self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="auditoria.csv"')
+        filas = list(csv.DictReader(io.StringIO(cuerpo)))
+        self.assertEqual(len(filas), 8)
+        self.assertEqual(filas[-1]['descripcion'], 'día 1, "con comillas"')
+        self.assertEqual(filas[-1]['username'], 'exportador0')
+
+    def test_filtros(self):
+        usuario = self.usuarios[0].pk
+        _, cuerpo = self.exportar('ndjson', f'&usuario={usuario}&fecha_desde=2024-03-02&fecha_hasta=2024-03-03')
+        filas = [json.loads(linea) for linea in cuerpo.splitlines()]
+        self.assertEqual([(fila['usuario'], fila['fecha']) for fila in filas],
+                         [(usuario, '2024-03-03'), (usuario, '2024-03-02')])
+        _, cuerpo = self.exportar('csv', '&tabla=otra')
+        self.assertEqual(len(cuerpo.splitlines()), 1)  # solo el encabezado
+
+        self.assertEqual(self.client.get('/api/auditoria/?formato=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/auditoria/?formato=csv&fecha_desde=2024/03/01').status_code, 400)
+
+
+class EscritorAuditoriaTest(TransactionTestCase):
+    """flush() escribe el buffer en lote y, si el lote falla, fila por fila"""
+
+    def setUp(self):
+        # Instancia propia: el hilo del singleton (si otro test lo arrancó en ASINCRONO) no toca este buffer
+        self.escritor = self.crear_escritor()
+        # Y solo se miran las filas de este test: ese hilo podría escribir las suyas en la misma tabla
+        self.marca = f'{self._testMethodName}:'
+
+    @staticmethod
+    def crear_escritor():
+        escritor = object.__new__(EscritorAuditoria)
+        escritor._inicializar()
+        return escritor
+
+    def auditorias(self, descripciones):
+        return [
+            Auditoria(accion='REGISTRO', tabla='reserva_hotel',
+                      descripcion=None if descripcion is None else self.marca + descripcion)
+            for descripcion in descripciones
+        ]
+
+    def escritas(self):
+        return sorted(
+            descripcion[len(self.marca):]
+            for descripcion in Auditoria.objects.filter(descripcion__startswith=self.marca).values_list('descripcion', flat=True)
+        )
+
+    @override_settings(AUDITORIA_MODO='SINCRONO')
+    def test_sincrono_escribe_en_el_request(self):
+        escritor = self.crear_escritor()
+        escritor.registrar(self.auditorias(['a']))
+        self.assertEqual(self.escritas(), ['a'])
+        self.assertEqual(escritor.obtener_estadisticas()['pendientes'], 0)
+
+    def encolar(self, auditorias):
+        with self.escritor._buffer_lock:
+            self.escritor.buffer.extend(auditorias)
+
+    def test_flush_en_lote(self):
+        self.encolar(self.auditorias(['a', 'b', 'c']))
+        self.assertEqual(self.escritor.flush(), 3)
+        self.assertEqual(self.escritor.flush(), 0)
+        self.assertEqual(self.escritas(), ['a', 'b', 'c'])
+        self.assertEqual(self.escritor.lotes, 1)
+
+    def test_fila_invalida_no_bloquea_el_lote(self):
+        # descripcion NULL viola el NOT NULL: el bulk_create completo falla
+        self.encolar(self.auditorias(['a', None, 'c']))
+        with self.assertLogs('apps.auditoria.escritor', 'WARNING'):
+            self.assertEqual(self.escritor.flush(), 2)
+        self.assertEqual(self.escritas(), ['a', 'c'])
+        self.assertEqual((self.escritor.errores, self.escritor.descartadas), (1, 1))
+        self.assertEqual(self.escritor.obtener_estadisticas()['pendientes'], 0)
+
+    def test_sin_conexion_reintenta(self):
+        self.encolar(self.auditorias(['a', 'b']))
+        caida = OperationalError('server has gone away')
+        with mock.patch.object(Auditoria.objects, 'bulk_create', side_effect=caida), \
+                mock.patch.object(Auditoria, 'save', side_effect=caida), \
+                self.assertLogs('apps.auditoria.escritor', 'WARNING'):
+            self.assertEqual(self.escritor.flush(), 0)
+        self.assertEqual(self.escritor.obtener_estadisticas()['pendientes'], 2)
+
+        # Próximo ciclo con la BD de vuelta
+        self.assertEqual(self.escritor.flush(), 2)
+        self.assertEqual(self.escritas(), ['a', 'b'])
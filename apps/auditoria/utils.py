@@ -1,18 +1,15 @@
 from apps.auditoria.models import Auditoria
-from apps.usuario.models import Usuario 
+from apps.auditoria.escritor import escritor_auditoria, registrar_auditoria, nombre_usuario_auditoria
 
 def registrar_login(request, user, usuario=None):
     """Crea un registro de auditoría para login."""
-    if usuario is None:
-        try:
-            usuario = Usuario.objects.get(user=user)
-        except Usuario.DoesNotExist:
-            usuario = None
-
-    nombre = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else ""
+    if usuario is not None:
+        nombre = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}"
+    else:
+        nombre = nombre_usuario_auditoria(user, "")
     descripcion = f"El usuario {user.username} ({nombre}) inició sesión en la aplicación."
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user,
         accion='INICIO DE SESIÓN',
         tabla='auth_user',
@@ -30,7 +27,7 @@ def registrar_creacion_usuario(request, user, usuario):
     """Crea un registro de auditoría para la creación de un usuario."""
     descripcion = f"El usuario {user.username} registró el usuario {usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}."
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user,
         accion='REGISTRO',
         tabla='usuario',
@@ -39,6 +36,7 @@ def registrar_creacion_usuario(request, user, usuario):
 
 def registrar_actualizacion_usuario(request, user, usuario, datos_viejos, datos_nuevos):
     """Crea un registro de auditoría para la actualización de un usuario, campo por campo."""
+    auditorias = []
     # Iterar sobre los datos nuevos para comparar con los viejos
     for campo, valor_nuevo in datos_nuevos.items():
         # Obtener el valor viejo para comparación
@@ -52,12 +50,15 @@ def registrar_actualizacion_usuario(request, user, usuario, datos_viejos, datos_
                 f"de '{valor_viejo}' a '{valor_nuevo}'."
             )
 
-            Auditoria.objects.create(
+            auditorias.append(Auditoria(
                 usuario=user,
                 accion='ACTUALIZACIÓN',
                 tabla='usuario',
                 descripcion=descripcion
-            )
+            ))
+
+    # Todos los campos en un solo lote
+    escritor_auditoria.registrar(auditorias)
 
 
 def registrar_estado_usuario(request, user, usuario):
@@ -65,7 +66,7 @@ def registrar_estado_usuario(request, user, usuario):
     estado = "habilitó" if usuario.activo else "deshabilitó"
     descripcion = f"El usuario {user.username} {estado} al usuario {usuario.nombre} {usuario.apellido_paterno or ''} {usuario.apellido_materno or ''}."
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user,
         accion='ACTUALIZACIÓN',
         tabla='usuarios',
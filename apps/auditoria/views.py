@@ -1,3 +1,12 @@
+import base64
+import csv
+import json
+from datetime import datetime as dt_datetime
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -5,23 +14,144 @@ from .models import Auditoria
 from .serializers import AuditoriaSerializer
 
 
+# 🔹 Paginación del listado
+AUDITORIA_LIMITE_DEFECTO = 100
+AUDITORIA_LIMITE_MAX = 500
+# 🔹 Filas por consulta al exportar (memoria acotada)
+AUDITORIA_TAMANO_BLOQUE_EXPORTACION = 500
+
+
+def _codificar_cursor(auditoria):
+    """Cursor opaco con la posición (fecha, id) de la última fila entregada"""
+    valor = f"{auditoria.fecha.isoformat()}|{auditoria.id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def _decodificar_cursor(cursor):
+    try:
+        fecha, id_auditoria = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        fecha = parse_datetime(fecha)
+        if fecha is None:
+            raise ValueError
+        return fecha, int(id_auditoria)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def _filtrar_auditorias(params):
+    """QuerySet ordenado por (fecha, id) descendente con los filtros del query string"""
+    auditorias = Auditoria.objects.select_related('usuario__usuario').order_by('-fecha', '-id')
+
+    if params.get('tabla'):
+        auditorias = auditorias.filter(tabla=params['tabla'])
+    if params.get('accion'):
+        auditorias = auditorias.filter(accion=params['accion'])
+    if params.get('usuario'):
+        try:
+            auditorias = auditorias.filter(usuario_id=int(params['usuario']))
+        except ValueError:
+            raise ValueError('usuario debe ser un ID numérico')
+    try:
+        if params.get('fecha_desde'):
+            auditorias = auditorias.filter(fecha__date__gte=dt_datetime.strptime(params['fecha_desde'], '%Y-%m-%d').date())
+        if params.get('fecha_hasta'):
+            auditorias = auditorias.filter(fecha__date__lte=dt_datetime.strptime(params['fecha_hasta'], '%Y-%m-%d').date())
+    except ValueError:
+        raise ValueError('Formato de fecha inválido. Use YYYY-MM-DD')
+    return auditorias
+
+
+def _despues_de(auditorias, fecha, id_auditoria):
+    """Filas posteriores a (fecha, id) en orden descendente"""
+    return auditorias.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=id_auditoria))
+
+
+def _recorrer_en_bloques(auditorias):
+    """Genera las auditorías por bloques con keyset: cada consulta es corta e independiente"""
+    bloque = list(auditorias[:AUDITORIA_TAMANO_BLOQUE_EXPORTACION])
+    while bloque:
+        yield bloque
+        if len(bloque) < AUDITORIA_TAMANO_BLOQUE_EXPORTACION:
+            break
+        ultima = bloque[-1]
+        bloque = list(_despues_de(auditorias, ultima.fecha, ultima.id)[:AUDITORIA_TAMANO_BLOQUE_EXPORTACION])
+
+
+class _Eco:
+    """Buffer de csv.writer que devuelve la línea en vez de guardarla"""
+    def write(self, valor):
+        return valor
+
+
+def _exportar_ndjson(auditorias):
+    for bloque in _recorrer_en_bloques(auditorias):
+        filas = AuditoriaSerializer(bloque, many=True).data
+        yield ''.join(json.dumps(fila, ensure_ascii=False, default=str) + '\n' for fila in filas)
+
+
+def _exportar_csv(auditorias):
+    columnas = AuditoriaSerializer.Meta.fields
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(columnas)
+    for bloque in _recorrer_en_bloques(auditorias):
+        filas = AuditoriaSerializer(bloque, many=True).data
+        yield ''.join(escritor.writerow([fila[c] for c in columnas]) for fila in filas)
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def listar_auditorias(request):
     """
-    Endpoint para listar auditorías.
-    Retorna todas las auditorías ordenadas por fecha descendente,
+    Endpoint para listar auditorías, ordenadas por fecha descendente e
     incluyendo el nombre del usuario si existe.
+    Ejemplo: GET /api/auditoria/?tabla=reserva_hotel&limite=100&cursor=<siguiente_cursor>
+
+    Query params (todos opcionales):
+    - tabla, accion: filtros exactos
+    - usuario: id del auth_user
+    - fecha_desde / fecha_hasta (YYYY-MM-DD)
+    - limite: filas por página (por defecto 100, máximo 500)
+    - cursor: valor de 'siguiente_cursor' de la página anterior
+    - formato: 'ndjson' o 'csv' exporta todas las filas filtradas en streaming
+      (ignora limite y cursor)
     """
-    auditorias = Auditoria.objects.select_related('usuario').all()
-    serializer = AuditoriaSerializer(auditorias, many=True)
-    return Response(serializer.data)
+    try:
+        limite = min(max(int(request.query_params.get('limite', AUDITORIA_LIMITE_DEFECTO)), 1), AUDITORIA_LIMITE_MAX)
+    except ValueError:
+        return Response({'error': 'limite debe ser un número entero'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        auditorias = _filtrar_auditorias(request.query_params)
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            auditorias = _despues_de(auditorias, *_decodificar_cursor(cursor))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    # 📤 Exportación en streaming
+    formato = request.query_params.get('formato')
+    if formato == 'ndjson':
+        return StreamingHttpResponse(_exportar_ndjson(auditorias), content_type='application/x-ndjson')
+    if formato == 'csv':
+        respuesta = StreamingHttpResponse(_exportar_csv(auditorias), content_type='text/csv; charset=utf-8')
+        respuesta['Content-Disposition'] = 'attachment; filename="auditoria.csv"'
+        return respuesta
+    if formato:
+        return Response({'error': "Formato no válido. Use 'ndjson' o 'csv'"}, status=status.HTTP_400_BAD_REQUEST)
 
-from apps.auditoria.models import Auditoria
-from apps.usuario.models import Usuario 
-from datetime import datetime
+    # 📄 Página JSON
+    pagina = list(auditorias[:limite + 1])
+    tiene_mas = len(pagina) > limite
+    pagina = pagina[:limite]
+    return Response({
+        'count': len(pagina),
+        'limite': limite,
+        'tiene_mas': tiene_mas,
+        'siguiente_cursor': _codificar_cursor(pagina[-1]) if tiene_mas else None,
+        'auditorias': AuditoriaSerializer(pagina, many=True).data
+    })
+
+
+from .escritor import registrar_auditoria, nombre_usuario_auditoria
 
 ###################################################################
 ############## AUDITORIA DE RESERVAS DE HOTEL ####################
@@ -29,12 +159,7 @@ from datetime import datetime
 
 def registrar_creacion_reserva_hotel(request, user, reserva, cliente):
     """Crea un registro de auditoría para la creación de una reserva de hotel."""
-    try:
-        usuario = Usuario.objects.get(user=user) if user.is_authenticated else None
-    except Usuario.DoesNotExist:
-        usuario = None
-
-    nombre_usuario = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else "Cliente"
+    nombre_usuario = nombre_usuario_auditoria(user, "Cliente")
     nombre_cliente = f"{cliente.nombre} {cliente.app_paterno} {cliente.app_materno or ''}".strip()
     
     descripcion = (
@@ -47,7 +172,7 @@ def registrar_creacion_reserva_hotel(request, user, reserva, cliente):
         f"{'Baño privado' if reserva.baño_priv == 'S' else 'Baño compartido'}."
     )
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user if user.is_authenticated else None,
         accion='REGISTRO',
         tabla='reserva_hotel',
@@ -57,12 +182,7 @@ def registrar_creacion_reserva_hotel(request, user, reserva, cliente):
 
 def registrar_actualizacion_reserva_hotel(request, user, reserva, campos_actualizados, cambios_detalle=None):
     """Crea un registro de auditoría para la actualización de una reserva de hotel."""
-    try:
-        usuario = Usuario.objects.get(user=user) if user.is_authenticated else None
-    except Usuario.DoesNotExist:
-        usuario = None
-
-    nombre_usuario = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else "Cliente"
+    nombre_usuario = nombre_usuario_auditoria(user, "Cliente")
     nombre_cliente = f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}"
     
     # Descripción base
@@ -116,7 +236,7 @@ def registrar_actualizacion_reserva_hotel(request, user, reserva, campos_actuali
         if 'cliente_creado' in cambios_detalle:
             descripcion += f" Cliente creado: {cambios_detalle['cliente_info']['nombre_completo']} (CI: {cambios_detalle['cliente_info']['ci']})."
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user if user.is_authenticated else None,
         accion='ACTUALIZACIÓN',
         tabla='reserva_hotel',
@@ -126,12 +246,7 @@ def registrar_actualizacion_reserva_hotel(request, user, reserva, campos_actuali
 
 def registrar_cancelacion_reserva_hotel(request, user, reserva, motivo=None):
     """Crea un registro de auditoría para la cancelación de una reserva de hotel."""
-    try:
-        usuario = Usuario.objects.get(user=user) if user.is_authenticated else None
-    except Usuario.DoesNotExist:
-        usuario = None
-
-    nombre_usuario = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else "Sistema"
+    nombre_usuario = nombre_usuario_auditoria(user, "Sistema")
     nombre_cliente = f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}"
     
     descripcion = (
@@ -144,7 +259,7 @@ def registrar_cancelacion_reserva_hotel(request, user, reserva, motivo=None):
     if motivo:
         descripcion += f" Motivo: {motivo}."
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user if user.is_authenticated else None,
         accion='CANCELACIÓN',
         tabla='reserva_hotel',
@@ -154,12 +269,7 @@ def registrar_cancelacion_reserva_hotel(request, user, reserva, motivo=None):
 
 def registrar_check_in_hotel(request, user, reserva):
     """Crea un registro de auditoría para el registro de ingreso de una reserva."""
-    try:
-        usuario = Usuario.objects.get(user=user) if user.is_authenticated else None
-    except Usuario.DoesNotExist:
-        usuario = None
-
-    nombre_usuario = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else "Sistema"
+    nombre_usuario = nombre_usuario_auditoria(user, "Sistema")
     nombre_cliente = f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}"
     
     descripcion = (
@@ -169,7 +279,7 @@ def registrar_check_in_hotel(request, user, reserva):
         f"Hora de ingreso: {reserva.check_in.strftime('%Y-%m-%d %H:%M:%S')}."
     )
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user if user.is_authenticated else None,
         accion='REGISTRO INGRESO',
         tabla='reserva_hotel',
@@ -179,12 +289,7 @@ def registrar_check_in_hotel(request, user, reserva):
 
 def registrar_check_out_hotel(request, user, reserva, duracion=None):
     """Crea un registro de auditoría para el registro de salida de una reserva."""
-    try:
-        usuario = Usuario.objects.get(user=user) if user.is_authenticated else None
-    except Usuario.DoesNotExist:
-        usuario = None
-
-    nombre_usuario = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else "Sistema"
+    nombre_usuario = nombre_usuario_auditoria(user, "Sistema")
     nombre_cliente = f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}"
     
     descripcion = (
@@ -197,7 +302,7 @@ def registrar_check_out_hotel(request, user, reserva, duracion=None):
     if duracion:
         descripcion += f" Duración de estadía: {duracion}."
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user if user.is_authenticated else None,
         accion='REGISTRO SALIDA',
         tabla='reserva_hotel',
@@ -207,12 +312,7 @@ def registrar_check_out_hotel(request, user, reserva, duracion=None):
 
 def registrar_cancelacion_check_in(request, user, reserva):
     """Crea un registro de auditoría para la cancelación de un ingreso."""
-    try:
-        usuario = Usuario.objects.get(user=user) if user.is_authenticated else None
-    except Usuario.DoesNotExist:
-        usuario = None
-
-    nombre_usuario = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else "Sistema"
+    nombre_usuario = nombre_usuario_auditoria(user, "Sistema")
     nombre_cliente = f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}"
     
     descripcion = (
@@ -221,7 +321,7 @@ def registrar_cancelacion_check_in(request, user, reserva):
         f"Habitación: #{reserva.habitacion.numero}."
     )
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user if user.is_authenticated else None,
         accion='CANCELACIÓN INGRESO',
         tabla='reserva_hotel',
@@ -231,12 +331,7 @@ def registrar_cancelacion_check_in(request, user, reserva):
 
 def registrar_subida_comprobante(request, user, reserva_gen_id, reserva=None):
     """Crea un registro de auditoría para la subida de comprobante de pago."""
-    try:
-        usuario = Usuario.objects.get(user=user) if user.is_authenticated else None
-    except Usuario.DoesNotExist:
-        usuario = None
-
-    nombre_usuario = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else "Sistema"
+    nombre_usuario = nombre_usuario_auditoria(user, "Sistema")
     
     descripcion = (
         f"El usuario {user.username} ({nombre_usuario}) subió un comprobante de pago "
@@ -247,7 +342,7 @@ def registrar_subida_comprobante(request, user, reserva_gen_id, reserva=None):
         nombre_cliente = f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}"
         descripcion += f" Cliente: {nombre_cliente}."
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user if user.is_authenticated else None,
         accion='SUBIDA COMPROBANTE',
         tabla='reservas_gen',
@@ -257,12 +352,7 @@ def registrar_subida_comprobante(request, user, reserva_gen_id, reserva=None):
 
 def registrar_consulta_reserva_hotel(request, user, reserva):
     """Crea un registro de auditoría para la consulta de detalles de una reserva."""
-    try:
-        usuario = Usuario.objects.get(user=user) if user.is_authenticated else None
-    except Usuario.DoesNotExist:
-        usuario = None
-
-    nombre_usuario = f"{usuario.nombre} {usuario.app_paterno or ''} {usuario.app_materno or ''}" if usuario else "Sistema"
+    nombre_usuario = nombre_usuario_auditoria(user, "Sistema")
     nombre_cliente = f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}"
     
     descripcion = (
@@ -270,7 +360,7 @@ def registrar_consulta_reserva_hotel(request, user, reserva):
         f"de la reserva #{reserva.id_reserva_hotel} del cliente {nombre_cliente}."
     )
     
-    Auditoria.objects.create(
+    registrar_auditoria(
         usuario=user if user.is_authenticated else None,
         accion='CONSULTA',
         tabla='reserva_hotel',
@@ -5,6 +5,7 @@ from rest_framework import status
 
 from .models import Habitacion
 from apps.tarifa_hotel.models import TarifaHotel
+from apps.reservas_gen.catalogos import cache_catalogos
 
 
 # -------------------------------
@@ -13,24 +14,8 @@ from apps.tarifa_hotel.models import TarifaHotel
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def lista_habitaciones(request):
-    habitaciones = Habitacion.objects.select_related('tarifa_hotel').all()
-    data = []
-    for h in habitaciones:
-        data.append({
-            'id_habitacion': h.id_habitacion,
-            'numero': h.numero,
-            'piso': h.piso,
-            'tipo': h.tipo,
-            'amoblado': h.amoblado,
-            'baño_priv': h.baño_priv,
-            'estado': h.estado,
-            'tarifa_hotel': {
-                'id_tarifa_hotel': h.tarifa_hotel.id_tarifa_hotel,
-                'nombre': h.tarifa_hotel.nombre,
-                'precio_persona': float(h.tarifa_hotel.precio_persona)
-            }
-        })
-    return Response(data, status=status.HTTP_200_OK)
+    # Respuesta armada en la caché de catálogos (se invalida al crear/actualizar habitaciones)
+    return Response(cache_catalogos.obtener('habitaciones'), status=status.HTTP_200_OK)
 
 
 # -------------------------------
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReservaHotelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reserva_hotel'
+
+    def ready(self):
+        # Registrar señales que mantienen el índice de disponibilidad
+        from . import signals  # noqa: F401
@@ -0,0 +1,187 @@
+# ========================================
+# ARCHIVO: apps/reserva_hotel/busqueda.py
+# Búsqueda de habitación con alternativas ordenadas cuando no hay coincidencia exacta
+# ========================================
+"""
+Una búsqueda pide al índice de disponibilidad (disponibilidad.py) los tramos
+libres de todas las habitaciones en una ventana alrededor de las fechas pedidas
+(una sola pasada, sin consultas a la BD) y con eso responde:
+
+1. La mejor habitación libre con las características pedidas: la más barata y,
+   a igual precio, la que deja el hueco más chico (menos fragmentación).
+2. Si no hay, alternativas en este orden:
+   - otro_tipo: mismas fechas, otra combinación amoblado / baño privado
+     (primero la que cambia menos características, luego la más barata)
+   - otras_fechas: mismas características y cantidad de noches, corriendo el
+     ingreso hasta BUSQUEDA_DIAS_DESPLAZAMIENTO días (la fecha más cercana primero)
+   - estadia_dividida: mismas fechas y características repartidas en varias
+     habitaciones (como máximo BUSQUEDA_TRAMOS_MAX, con la menor cantidad de cambios)
+
+Los precios salen de TarifaHotel a través de la caché de catálogos:
+total = precio_persona × cant_personas × noches.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+
+from .disponibilidad import indice_disponibilidad
+from apps.reservas_gen.catalogos import cache_catalogos
+
+
+def _opcion(habitacion, fecha_ini, fecha_fin, cant_personas):
+    """Habitación + fechas + precio de la estadía"""
+    noches = (fecha_fin - fecha_ini).days
+    precio_persona = habitacion['tarifa_hotel']['precio_persona']
+    return {
+        'id_habitacion': habitacion['id_habitacion'],
+        'numero': habitacion['numero'],
+        'piso': habitacion['piso'],
+        'tipo': habitacion['tipo'],
+        'amoblado': habitacion['amoblado'],
+        'baño_priv': habitacion['baño_priv'],
+        'tarifa': habitacion['tarifa_hotel']['nombre'],
+        'precio_persona': precio_persona,
+        'fecha_ini': str(fecha_ini),
+        'fecha_fin': str(fecha_fin),
+        'noches': noches,
+        'total': round(precio_persona * cant_personas * noches, 2)
+    }
+
+
+def _hueco_que_contiene(libres, fecha_ini, fecha_fin):
+    """Tramo libre que cubre [fecha_ini, fecha_fin), o None"""
+    for ini, fin in libres:
+        if ini <= fecha_ini and fecha_fin <= fin:
+            return ini, fin
+    return None
+
+
+def _mejor_libre(ids, huecos, habitaciones, fecha_ini, fecha_fin, cant_personas):
+    """La habitación libre más barata en [fecha_ini, fecha_fin); a igual precio, la de hueco más chico"""
+    mejor = None
+    for id_hab in ids:
+        hueco = _hueco_que_contiene(huecos[id_hab][2], fecha_ini, fecha_fin)
+        if hueco is None:
+            continue
+        clave = (habitaciones[id_hab]['tarifa_hotel']['precio_persona'], hueco[1] - hueco[0])
+        if mejor is None or clave < mejor[0]:
+            mejor = (clave, id_hab)
+    if mejor is None:
+        return None
+    return _opcion(habitaciones[mejor[1]], fecha_ini, fecha_fin, cant_personas)
+
+
+def _otras_fechas(ids, huecos, habitaciones, fecha_ini, noches, minimo, cant_personas, limite):
+    """Ingresos distintos más cercanos a fecha_ini con la misma cantidad de noches"""
+    # {fecha de ingreso: (precio, id_habitacion)}: la habitación más barata por fecha
+    por_fecha = {}
+    for id_hab in ids:
+        precio = habitaciones[id_hab]['tarifa_hotel']['precio_persona']
+        for ini, fin in huecos[id_hab][2]:
+            ultimo_ingreso = fin - timedelta(days=noches)
+            inicio = max(ini, minimo)
+            if ultimo_ingreso < inicio:
+                continue
+            # Dentro del hueco, el ingreso más cercano a fecha_ini y el siguiente/anterior posible
+            cercano = min(max(fecha_ini, inicio), ultimo_ingreso)
+            for ingreso in {cercano, cercano - timedelta(days=1), cercano + timedelta(days=1)}:
+                if ingreso != fecha_ini and inicio <= ingreso <= ultimo_ingreso:
+                    if ingreso not in por_fecha or (precio, id_hab) < por_fecha[ingreso]:
+                        por_fecha[ingreso] = (precio, id_hab)
+
+    # La fecha más cercana primero; a igual distancia, la posterior (no adelanta la llegada)
+    ingresos = sorted(por_fecha, key=lambda ingreso: (abs((ingreso - fecha_ini).days), ingreso < fecha_ini))
+    return [
+        {
+            'tipo_alternativa': 'otras_fechas',
+            'desplazamiento_dias': (ingreso - fecha_ini).days,
+            'habitacion': _opcion(
+                habitaciones[por_fecha[ingreso][1]], ingreso, ingreso + timedelta(days=noches), cant_personas
+            )
+        }
+        for ingreso in ingresos[:limite]
+    ]
+
+
+def _estadia_dividida(ids, huecos, habitaciones, fecha_ini, fecha_fin, cant_personas, tramos_max):
+    """
+    Cubre [fecha_ini, fecha_fin) con la menor cantidad de habitaciones: en cada
+    día elige la que sigue libre por más tiempo (greedy, óptimo en cambios).
+    """
+    tramos = []
+    dia = fecha_ini
+    while dia < fecha_fin:
+        mejor = None
+        for id_hab in ids:
+            hueco = _hueco_que_contiene(huecos[id_hab][2], dia, dia + timedelta(days=1))
+            if hueco is None:
+                continue
+            clave = (-min(hueco[1], fecha_fin).toordinal(), habitaciones[id_hab]['tarifa_hotel']['precio_persona'])
+            if mejor is None or clave < mejor[0]:
+                mejor = (clave, id_hab, min(hueco[1], fecha_fin))
+        if mejor is None or len(tramos) == tramos_max:
+            return None
+        tramos.append(_opcion(habitaciones[mejor[1]], dia, mejor[2], cant_personas))
+        dia = mejor[2]
+
+    if len(tramos) < 2:
+        return None
+    return {
+        'tipo_alternativa': 'estadia_dividida',
+        'cambios': len(tramos) - 1,
+        'total': round(sum(tramo['total'] for tramo in tramos), 2),
+        'tramos': tramos
+    }
+
+
+def buscar_habitacion(amoblado, baño_priv, fecha_ini, fecha_fin, cant_personas, hoy, limite=3):
+    """
+    {'disponible', 'habitacion', 'alternativas'} para la estadía pedida.
+    `hoy` acota las fechas alternativas (no se proponen ingresos en el pasado).
+    """
+    noches = (fecha_fin - fecha_ini).days
+    desplazamiento = timedelta(days=getattr(settings, 'BUSQUEDA_DIAS_DESPLAZAMIENTO', 14))
+    minimo = max(fecha_ini - desplazamiento, min(hoy, fecha_ini))
+
+    huecos = indice_disponibilidad.huecos_por_habitacion(minimo, fecha_fin + desplazamiento)
+    habitaciones = {
+        habitacion['id_habitacion']: habitacion
+        for habitacion in cache_catalogos.obtener('habitaciones')
+        if habitacion['id_habitacion'] in huecos
+    }
+    # {(amoblado, baño_priv): [ids]} de las habitaciones con tarifa conocida
+    por_tipo = {}
+    for id_hab, (amob, baño, _) in huecos.items():
+        if id_hab in habitaciones:
+            por_tipo.setdefault((amob, baño), []).append(id_hab)
+
+    pedidas = por_tipo.get((amoblado, baño_priv), [])
+    habitacion = _mejor_libre(pedidas, huecos, habitaciones, fecha_ini, fecha_fin, cant_personas)
+    if habitacion is not None:
+        return {'disponible': True, 'habitacion': habitacion, 'alternativas': []}
+
+    # 1️⃣ Mismas fechas, otro tipo de habitación
+    otros_tipos = []
+    for (amob, baño), ids in por_tipo.items():
+        if (amob, baño) == (amoblado, baño_priv):
+            continue
+        opcion = _mejor_libre(ids, huecos, habitaciones, fecha_ini, fecha_fin, cant_personas)
+        if opcion is not None:
+            diferencias = [
+                campo for campo, pedido, ofrecido in (('amoblado', amoblado, amob), ('baño_priv', baño_priv, baño))
+                if pedido != ofrecido
+            ]
+            otros_tipos.append({'tipo_alternativa': 'otro_tipo', 'diferencias': diferencias, 'habitacion': opcion})
+    otros_tipos.sort(key=lambda alternativa: (len(alternativa['diferencias']), alternativa['habitacion']['total']))
+
+    # 2️⃣ Mismo tipo, fechas cercanas  3️⃣ Mismo tipo, varias habitaciones
+    alternativas = otros_tipos[:limite]
+    alternativas += _otras_fechas(pedidas, huecos, habitaciones, fecha_ini, noches, minimo, cant_personas, limite)
+    dividida = _estadia_dividida(
+        pedidas, huecos, habitaciones, fecha_ini, fecha_fin, cant_personas,
+        getattr(settings, 'BUSQUEDA_TRAMOS_MAX', 3)
+    )
+    if dividida is not None:
+        alternativas.append(dividida)
+
+    return {'disponible': False, 'habitacion': None, 'alternativas': alternativas}
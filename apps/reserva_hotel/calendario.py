@@ -0,0 +1,138 @@
+# ========================================
+# ARCHIVO: apps/reserva_hotel/calendario.py
+# Calendario de ocupación habitación × día (bitsets por mes, cacheados)
+# ========================================
+"""
+La ocupación se calcula por mes con UNA consulta por rango sobre reserva_hotel
+(estados activos que se cruzan con los meses que faltan en caché) y cada mes
+se guarda como un entero por habitación: el bit d está encendido si la noche
+del día d+1 del mes está ocupada (fecha_ini <= día < fecha_fin, igual que el resto del sistema).
+Cada reserva se vuelca con una sola operación de bits por mes (una máscara de
+su rango de días), sin recorrer día por día.
+
+Los meses se cachean con la versión del dominio hotel (versiones.py): cualquier
+escritura de ReservaHotel la incrementa y el mes se recalcula en el siguiente
+pedido. Una ventana de N días combina los meses que toca desplazando sus bits.
+"""
+import calendar
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ReservaHotel
+from apps.reservas_gen.versiones import DOMINIO_HOTEL, version_dominio
+
+
+# Estados que ocupan la habitación (igual que el registro de reservas)
+ESTADOS_ACTIVOS = ('A', 'P')
+
+
+def _rango_mes(anio, mes):
+    inicio = date(anio, mes, 1)
+    return inicio, inicio + timedelta(days=calendar.monthrange(anio, mes)[1])
+
+
+def _meses(desde, hasta):
+    """(año, mes) de cada mes que se cruza con [desde, hasta)"""
+    anio, mes = desde.year, desde.month
+    while date(anio, mes, 1) < hasta:
+        yield anio, mes
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def _clave_mes(anio, mes, version):
+    return f"calendario:hotel:{anio:04d}-{mes:02d}:{version}"
+
+
+def _calcular_meses(meses):
+    """{(año, mes): {id_habitacion: bits}} de los meses pedidos con una sola consulta por rango"""
+    ocupacion = {anio_mes: {} for anio_mes in meses}
+    inicio = _rango_mes(*min(meses))[0]
+    fin = _rango_mes(*max(meses))[1]
+    for habitacion_id, fecha_ini, fecha_fin in ReservaHotel.objects.filter(
+        estado__in=ESTADOS_ACTIVOS,
+        fecha_ini__lt=fin,
+        fecha_fin__gt=inicio
+    ).values_list('habitacion_id', 'fecha_ini', 'fecha_fin'):
+        # Cada reserva se vuelca en los meses que toca con una máscara de su rango de días
+        for anio, mes in _meses(max(fecha_ini, inicio), min(fecha_fin, fin)):
+            bits_mes = ocupacion.get((anio, mes))
+            if bits_mes is None:
+                continue  # mes intermedio que ya estaba en caché
+            inicio_mes, fin_mes = _rango_mes(anio, mes)
+            desde = max((fecha_ini - inicio_mes).days, 0)
+            hasta = min((fecha_fin - inicio_mes).days, (fin_mes - inicio_mes).days)
+            bits_mes[habitacion_id] = bits_mes.get(habitacion_id, 0) | (((1 << (hasta - desde)) - 1) << desde)
+    return ocupacion
+
+
+def ocupacion_meses(desde, hasta):
+    """
+    {(año, mes): {id_habitacion: bits}} de los meses que se cruzan con [desde, hasta).
+    Los meses en caché no consultan la BD; los demás se calculan juntos.
+    """
+    version = version_dominio(DOMINIO_HOTEL)
+    claves = {anio_mes: _clave_mes(*anio_mes, version) for anio_mes in _meses(desde, hasta)}
+    en_cache = cache.get_many(list(claves.values()))
+    ocupacion = {anio_mes: en_cache.get(clave) for anio_mes, clave in claves.items()}
+
+    faltantes = [anio_mes for anio_mes, bits in ocupacion.items() if bits is None]
+    if faltantes:
+        calculados = _calcular_meses(faltantes)
+        cache.set_many(
+            {claves[anio_mes]: bits for anio_mes, bits in calculados.items()},
+            getattr(settings, 'CALENDARIO_CACHE_TTL', 300)
+        )
+        ocupacion.update(calculados)
+    return ocupacion
+
+
+def ocupacion_ventana(desde, dias):
+    """{id_habitacion: bits} de [desde, desde + dias): bit i = noche del día desde + i"""
+    mascara = (1 << dias) - 1
+    ocupacion = {}
+    for (anio, mes), bits_mes in ocupacion_meses(desde, desde + timedelta(days=dias)).items():
+        desplazamiento = (date(anio, mes, 1) - desde).days
+        for habitacion_id, bits in bits_mes.items():
+            bits = bits << desplazamiento if desplazamiento >= 0 else bits >> -desplazamiento
+            bits &= mascara
+            if bits:
+                ocupacion[habitacion_id] = ocupacion.get(habitacion_id, 0) | bits
+    return ocupacion
+
+
+# ==============================================
+# 🔹 FORMATOS DE SALIDA
+# ==============================================
+
+def bits_a_texto(bits, dias):
+    """'0110...' con un carácter por día ('1' = ocupada)"""
+    return format(bits, f'0{dias}b')[::-1] if dias else ''
+
+
+def bits_a_rangos(bits, desde):
+    """Rangos [fecha_ini, fecha_fin) ocupados (codificación por tramos)"""
+    rangos = []
+    dia = 0
+    while bits:
+        # Saltar los días libres (ceros bajos) y medir el tramo de unos
+        libres = (bits & -bits).bit_length() - 1
+        bits >>= libres
+        dia += libres
+        ocupados = (~bits & (bits + 1)).bit_length() - 1
+        rangos.append([str(desde + timedelta(days=dia)), str(desde + timedelta(days=dia + ocupados))])
+        bits >>= ocupados
+        dia += ocupados
+    return rangos
+
+
+def ocupadas_por_dia(ocupacion, dias):
+    """Cantidad de habitaciones ocupadas en cada día de la ventana"""
+    conteo = [0] * dias
+    for bits in ocupacion.values():
+        while bits:
+            bajo = bits & -bits
+            conteo[bajo.bit_length() - 1] += 1
+            bits ^= bajo
+    return conteo
@@ -0,0 +1,449 @@
+# ========================================
+# ARCHIVO: apps/reserva_hotel/disponibilidad.py
+# Índice en memoria de disponibilidad de habitaciones (intervalos ordenados)
+# ========================================
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+
+from .models import ReservaHotel
+from apps.habitacion.models import Habitacion
+
+logger = logging.getLogger(__name__)
+
+def _a_fecha(valor):
+    """Normaliza str/datetime/date a datetime.date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(str(valor), '%Y-%m-%d').date()
+
+
+class IntervalosHabitacion:
+    """
+    Intervalos [fecha_ini, fecha_fin) de una habitación, ordenados por fecha_ini.
+    Mantiene el máximo acumulado de fecha_fin para responder solapamientos con bisect.
+    """
+    __slots__ = ('inicios', 'intervalos', 'max_fin')
+
+    def __init__(self):
+        self.inicios = []      # [fecha_ini, ...] ordenadas
+        self.intervalos = []   # [(fecha_ini, fecha_fin, id_reserva), ...]
+        self.max_fin = []      # max_fin[i] = mayor fecha_fin en intervalos[0..i]
+
+    def agregar(self, id_reserva, fecha_ini, fecha_fin):
+        pos = bisect_right(self.inicios, fecha_ini)
+        self.inicios.insert(pos, fecha_ini)
+        self.intervalos.insert(pos, (fecha_ini, fecha_fin, id_reserva))
+        self._recalcular_desde(pos)
+
+    def quitar(self, id_reserva):
+        for pos, (_, _, id_actual) in enumerate(self.intervalos):
+            if id_actual == id_reserva:
+                del self.inicios[pos]
+                del self.intervalos[pos]
+                self._recalcular_desde(pos)
+                return True
+        return False
+
+    def _recalcular_desde(self, pos):
+        anterior = self.max_fin[pos - 1] if pos > 0 else None
+        del self.max_fin[pos:]
+        for _, fecha_fin, _ in self.intervalos[pos:]:
+            if anterior is None or fecha_fin > anterior:
+                anterior = fecha_fin
+            self.max_fin.append(anterior)
+
+    def tiene_conflicto(self, fecha_ini, fecha_fin, excluir_reserva_id=None):
+        """True si algún intervalo se solapa con [fecha_ini, fecha_fin)"""
+        # Solo pueden solaparse los intervalos que inician antes de fecha_fin
+        pos = bisect_left(self.inicios, fecha_fin)
+        if pos == 0 or self.max_fin[pos - 1] <= fecha_ini:
+            return False
+        if excluir_reserva_id is None:
+            return True
+        return any(
+            fin > fecha_ini and id_reserva != excluir_reserva_id
+            for _, fin, id_reserva in self.intervalos[:pos]
+        )
+
+    def huecos(self, desde, hasta):
+        """Tramos [ini, fin) libres dentro de [desde, hasta), en orden"""
+        # max_fin no decrece: los intervalos que terminan antes de `desde` se saltan con bisect
+        pos_ini = bisect_right(self.max_fin, desde)
+        pos_fin = bisect_left(self.inicios, hasta)
+        libres = []
+        cursor = desde
+        for fecha_ini, fecha_fin, _ in self.intervalos[pos_ini:pos_fin]:
+            if fecha_ini > cursor:
+                libres.append((cursor, fecha_ini))
+            if fecha_fin > cursor:
+                cursor = fecha_fin
+        if cursor < hasta:
+            libres.append((cursor, hasta))
+        return libres
+
+    def __len__(self):
+        return len(self.intervalos)
+
+
+class IndiceDisponibilidadHotel:
+    """
+    Índice de disponibilidad por habitación (singleton por proceso).
+    Se carga una vez desde la BD y se mantiene al día con señales de
+    ReservaHotel y Habitacion (ver signals.py). Las escrituras de otros
+    procesos solo se ven en la recarga periódica: elegir_habitacion_libre()
+    confirma en la BD cuando el índice no encuentra habitación, y la
+    verificación definitiva sigue siendo la de la cola dentro de la
+    transacción con select_for_update.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    # Estados que ocupan la habitación (igual que el registro de reservas)
+    ESTADOS_ACTIVOS = ('A', 'P')
+
+    # ⏱️ Recarga completa periódica para absorber escrituras de otros procesos (segundos)
+    TIEMPO_RECARGA = 300
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._inicializar()
+        return cls._instance
+
+    def _inicializar(self):
+        """Estructuras vacías; la carga desde BD es perezosa"""
+        self._datos_lock = threading.RLock()
+        self._carga_lock = threading.Lock()  # Una sola carga desde BD a la vez
+        self.habitaciones = {}         # {id_habitacion: (amoblado, baño_priv, estado)}
+        self.intervalos = {}           # {id_habitacion: IntervalosHabitacion}
+        self.reserva_habitacion = {}   # {id_reserva: id_habitacion}
+        self.cargado_en = None
+        self._cargando = False
+        self._operaciones_pendientes = []
+
+    # ==============================================
+    # 🔹 CARGA DESDE BASE DE DATOS
+    # ==============================================
+
+    def _leer_bd(self):
+        """Lee habitaciones y reservas activas (2 consultas)"""
+        habitaciones = {
+            id_hab: (amoblado, baño_priv, estado)
+            for id_hab, amoblado, baño_priv, estado in Habitacion.objects.order_by(
+                'id_habitacion'
+            ).values_list('id_habitacion', 'amoblado', 'baño_priv', 'estado')
+        }
+        reservas = list(ReservaHotel.objects.filter(
+            estado__in=self.ESTADOS_ACTIVOS
+        ).values_list('id_reserva_hotel', 'habitacion_id', 'fecha_ini', 'fecha_fin'))
+        return habitaciones, reservas
+
+    def cargar(self):
+        """Reconstruye el índice completo desde la BD"""
+        with self._carga_lock:
+            self._cargar()
+
+    def _cargar(self):
+        with self._datos_lock:
+            self._cargando = True
+            self._operaciones_pendientes = []
+
+        try:
+            habitaciones, reservas = self._leer_bd()
+        except Exception:
+            with self._datos_lock:
+                self._cargando = False
+            raise
+
+        intervalos = {}
+        reserva_habitacion = {}
+        for id_reserva, id_hab, fecha_ini, fecha_fin in reservas:
+            intervalos.setdefault(id_hab, IntervalosHabitacion()).agregar(id_reserva, fecha_ini, fecha_fin)
+            reserva_habitacion[id_reserva] = id_hab
+
+        with self._datos_lock:
+            self.habitaciones = habitaciones
+            self.intervalos = intervalos
+            self.reserva_habitacion = reserva_habitacion
+            self.cargado_en = time.time()
+            self._cargando = False
+            # Re-aplicar cambios que llegaron mientras se leía la BD
+            pendientes, self._operaciones_pendientes = self._operaciones_pendientes, []
+            for operacion, args in pendientes:
+                operacion(*args)
+
+        logger.debug("🗂️ Índice de disponibilidad cargado: %s habitaciones, %s reservas activas", len(habitaciones), len(reservas))
+
+    def _vencido(self):
+        return self.cargado_en is None or time.time() - self.cargado_en > self.TIEMPO_RECARGA
+
+    def _asegurar_cargado(self):
+        if self._vencido():
+            with self._carga_lock:
+                if self._vencido():  # Otro thread pudo cargarlo mientras esperábamos
+                    self._cargar()
+
+    def invalidar(self):
+        """Fuerza una recarga completa en la próxima consulta (la BD contradijo al índice)"""
+        with self._datos_lock:
+            self.cargado_en = None
+
+    # ==============================================
+    # 🔹 MANTENIMIENTO INCREMENTAL (desde señales)
+    # ==============================================
+
+    def _registrar_operacion(self, operacion, *args):
+        """Aplica una operación; si hay carga en curso la re-aplica al terminar"""
+        with self._datos_lock:
+            if self.cargado_en is None and not self._cargando:
+                return  # Aún no cargado: la primera carga traerá el dato
+            if self._cargando:
+                self._operaciones_pendientes.append((operacion, args))
+            operacion(*args)
+
+    def aplicar_reserva(self, id_reserva, habitacion_id, fecha_ini, fecha_fin, estado):
+        """Inserta/actualiza/quita una reserva según su estado actual"""
+        self._registrar_operacion(
+            self._aplicar_reserva, id_reserva, habitacion_id,
+            _a_fecha(fecha_ini), _a_fecha(fecha_fin), estado
+        )
+
+    def _aplicar_reserva(self, id_reserva, habitacion_id, fecha_ini, fecha_fin, estado):
+        self._quitar_reserva(id_reserva)
+        if estado in self.ESTADOS_ACTIVOS:
+            self.intervalos.setdefault(habitacion_id, IntervalosHabitacion()).agregar(id_reserva, fecha_ini, fecha_fin)
+            self.reserva_habitacion[id_reserva] = habitacion_id
+
+    def quitar_reserva(self, id_reserva):
+        self._registrar_operacion(self._quitar_reserva, id_reserva)
+
+    def _quitar_reserva(self, id_reserva):
+        id_hab = self.reserva_habitacion.pop(id_reserva, None)
+        if id_hab is not None and id_hab in self.intervalos:
+            self.intervalos[id_hab].quitar(id_reserva)
+            if not self.intervalos[id_hab]:
+                del self.intervalos[id_hab]
+
+    def aplicar_habitacion(self, id_habitacion, amoblado, baño_priv, estado):
+        self._registrar_operacion(self._aplicar_habitacion, id_habitacion, amoblado, baño_priv, estado)
+
+    def _aplicar_habitacion(self, id_habitacion, amoblado, baño_priv, estado):
+        self.habitaciones[id_habitacion] = (amoblado, baño_priv, estado)
+
+    def quitar_habitacion(self, id_habitacion):
+        self._registrar_operacion(self._quitar_habitacion, id_habitacion)
+
+    def _quitar_habitacion(self, id_habitacion):
+        self.habitaciones.pop(id_habitacion, None)
+        intervalos = self.intervalos.pop(id_habitacion, None)
+        if intervalos:
+            for _, _, id_reserva in intervalos.intervalos:
+                self.reserva_habitacion.pop(id_reserva, None)
+
+    # ==============================================
+    # 🔹 CONSULTAS
+    # ==============================================
+
+    def habitaciones_candidatas(self, amoblado, baño_priv):
+        """IDs de habitaciones con esas características que no están en mantenimiento"""
+        self._asegurar_cargado()
+        with self._datos_lock:
+            return [
+                id_hab for id_hab, (amob, baño, estado) in sorted(self.habitaciones.items())
+                if amob == amoblado and baño == baño_priv and estado != 'MANTENIMIENTO'
+            ]
+
+    def hay_habitaciones(self, amoblado, baño_priv):
+        return bool(self.habitaciones_candidatas(amoblado, baño_priv))
+
+    def esta_libre(self, habitacion_id, fecha_ini, fecha_fin, excluir_reserva_id=None):
+        """True si la habitación no tiene reservas activas en [fecha_ini, fecha_fin)"""
+        self._asegurar_cargado()
+        fecha_ini, fecha_fin = _a_fecha(fecha_ini), _a_fecha(fecha_fin)
+        with self._datos_lock:
+            intervalos = self.intervalos.get(habitacion_id)
+            return intervalos is None or not intervalos.tiene_conflicto(fecha_ini, fecha_fin, excluir_reserva_id)
+
+    def buscar_habitacion_libre(self, amoblado, baño_priv, fecha_ini, fecha_fin,
+                                excluir_reserva_id=None, excluir_habitaciones=()):
+        """
+        Retorna el id de la primera habitación libre que cumple amoblado/baño_priv,
+        o None si todas están ocupadas en ese período.
+        """
+        libres = self.buscar_habitaciones_libres(
+            amoblado, baño_priv, fecha_ini, fecha_fin, 1,
+            excluir_reserva_id=excluir_reserva_id, excluir_habitaciones=excluir_habitaciones
+        )
+        return libres[0] if libres else None
+
+    def buscar_habitaciones_libres(self, amoblado, baño_priv, fecha_ini, fecha_fin, cantidad,
+                                   excluir_reserva_id=None, excluir_habitaciones=()):
+        """
+        Hasta `cantidad` ids de habitaciones libres que cumplen amoblado/baño_priv,
+        en una sola pasada por el índice (reservas de grupo).
+        """
+        fecha_ini, fecha_fin = _a_fecha(fecha_ini), _a_fecha(fecha_fin)
+        candidatas = self.habitaciones_candidatas(amoblado, baño_priv)
+        libres = []
+        with self._datos_lock:
+            for id_hab in candidatas:
+                if len(libres) >= cantidad:
+                    break
+                if id_hab in excluir_habitaciones:
+                    continue
+                intervalos = self.intervalos.get(id_hab)
+                if intervalos is None or not intervalos.tiene_conflicto(fecha_ini, fecha_fin, excluir_reserva_id):
+                    libres.append(id_hab)
+        return libres
+
+    def huecos_por_habitacion(self, desde, hasta):
+        """
+        {id_habitacion: (amoblado, baño_priv, [(ini, fin) libres en [desde, hasta)])}
+        de las habitaciones que no están en mantenimiento, en una sola pasada por el índice.
+        """
+        self._asegurar_cargado()
+        desde, hasta = _a_fecha(desde), _a_fecha(hasta)
+        with self._datos_lock:
+            resultado = {}
+            for id_hab, (amoblado, baño_priv, estado) in sorted(self.habitaciones.items()):
+                if estado == 'MANTENIMIENTO':
+                    continue
+                intervalos = self.intervalos.get(id_hab)
+                libres = intervalos.huecos(desde, hasta) if intervalos is not None else [(desde, hasta)]
+                resultado[id_hab] = (amoblado, baño_priv, libres)
+            return resultado
+
+    # ==============================================
+    # 🔹 CONFIRMACIÓN EN BD (escrituras de otros procesos)
+    # ==============================================
+
+    def _reservas_solapadas(self, fecha_ini, fecha_fin, excluir_reserva_id=None):
+        reservas = ReservaHotel.objects.filter(
+            estado__in=self.ESTADOS_ACTIVOS,
+            fecha_ini__lt=_a_fecha(fecha_fin),
+            fecha_fin__gt=_a_fecha(fecha_ini)
+        )
+        if excluir_reserva_id is not None:
+            reservas = reservas.exclude(id_reserva_hotel=excluir_reserva_id)
+        return reservas
+
+    def esta_libre_bd(self, habitacion_id, fecha_ini, fecha_fin, excluir_reserva_id=None):
+        """Como esta_libre(), pero contra la BD (una consulta)"""
+        return not self._reservas_solapadas(
+            fecha_ini, fecha_fin, excluir_reserva_id
+        ).filter(habitacion_id=habitacion_id).exists()
+
+    def buscar_habitacion_libre_bd(self, amoblado, baño_priv, fecha_ini, fecha_fin,
+                                   excluir_reserva_id=None, excluir_habitaciones=()):
+        """Como buscar_habitacion_libre(), pero contra la BD (una consulta con subconsulta de solapamientos)"""
+        ocupadas = self._reservas_solapadas(fecha_ini, fecha_fin, excluir_reserva_id).values('habitacion_id')
+        return Habitacion.objects.filter(
+            amoblado=amoblado,
+            baño_priv=baño_priv
+        ).exclude(
+            estado='MANTENIMIENTO'
+        ).exclude(
+            id_habitacion__in=list(excluir_habitaciones)
+        ).exclude(
+            id_habitacion__in=ocupadas
+        ).order_by('id_habitacion').values_list('id_habitacion', flat=True).first()
+
+    def elegir_habitacion_libre(self, amoblado, baño_priv, fecha_ini, fecha_fin,
+                                excluir_reserva_id=None, excluir_habitaciones=(), confirmar=False):
+        """
+        Habitación libre para registrar/actualizar una reserva, o None.
+        El índice puede estar hasta TIEMPO_RECARGA atrasado respecto de otros
+        procesos: si no encuentra habitación decide la BD (pudo liberarse una), y
+        con confirmar=True también se valida en la BD la que eligió (para quien
+        guarda sin pasar por la cola). Si la BD lo contradice, se recarga.
+        """
+        habitacion_id = self.buscar_habitacion_libre(
+            amoblado, baño_priv, fecha_ini, fecha_fin,
+            excluir_reserva_id=excluir_reserva_id, excluir_habitaciones=excluir_habitaciones
+        )
+        if habitacion_id is not None and not (
+            confirmar and not self.esta_libre_bd(habitacion_id, fecha_ini, fecha_fin, excluir_reserva_id)
+        ):
+            return habitacion_id
+
+        en_bd = self.buscar_habitacion_libre_bd(
+            amoblado, baño_priv, fecha_ini, fecha_fin,
+            excluir_reserva_id=excluir_reserva_id, excluir_habitaciones=excluir_habitaciones
+        )
+        if en_bd != habitacion_id:
+            logger.info("🗂️ Índice de disponibilidad atrasado (índice: %s, BD: %s), se recarga", habitacion_id, en_bd)
+            self.invalidar()
+        return en_bd
+
+    # ==============================================
+    # 🔹 VERIFICACIÓN DE CONSISTENCIA
+    # ==============================================
+
+    def verificar_consistencia(self, reparar=False):
+        """
+        Compara el índice con la BD.
+        Si reparar=True y hay diferencias, recarga el índice completo.
+        """
+        self._asegurar_cargado()
+        habitaciones_bd, reservas_bd = self._leer_bd()
+
+        with self._datos_lock:
+            habitaciones_indice = dict(self.habitaciones)
+            reservas_indice = {
+                id_reserva: (id_hab, fecha_ini, fecha_fin)
+                for id_hab, intervalos in self.intervalos.items()
+                for fecha_ini, fecha_fin, id_reserva in intervalos.intervalos
+            }
+
+        reservas_bd = {
+            id_reserva: (id_hab, fecha_ini, fecha_fin)
+            for id_reserva, id_hab, fecha_ini, fecha_fin in reservas_bd
+        }
+
+        faltantes = sorted(set(reservas_bd) - set(reservas_indice))
+        sobrantes = sorted(set(reservas_indice) - set(reservas_bd))
+        distintas = sorted(
+            id_reserva for id_reserva in set(reservas_bd) & set(reservas_indice)
+            if reservas_bd[id_reserva] != reservas_indice[id_reserva]
+        )
+        habitaciones_distintas = sorted(
+            id_hab for id_hab in set(habitaciones_bd) | set(habitaciones_indice)
+            if habitaciones_bd.get(id_hab) != habitaciones_indice.get(id_hab)
+        )
+
+        consistente = not (faltantes or sobrantes or distintas or habitaciones_distintas)
+        if reparar and not consistente:
+            self.cargar()
+
+        return {
+            'consistente': consistente,
+            'reservas_bd': len(reservas_bd),
+            'reservas_indice': len(reservas_indice),
+            'reservas_faltantes': faltantes,
+            'reservas_sobrantes': sobrantes,
+            'reservas_distintas': distintas,
+            'habitaciones_distintas': habitaciones_distintas,
+            'reparado': reparar and not consistente
+        }
+
+    def obtener_estadisticas(self):
+        """Retorna estadísticas del índice"""
+        with self._datos_lock:
+            return {
+                'cargado': self.cargado_en is not None,
+                'segundos_desde_carga': round(time.time() - self.cargado_en, 1) if self.cargado_en else None,
+                'habitaciones': len(self.habitaciones),
+                'reservas_activas': len(self.reserva_habitacion),
+                'tiempo_recarga': self.TIEMPO_RECARGA
+            }
+
+
+# Instancia global del índice
+indice_disponibilidad = IndiceDisponibilidadHotel()
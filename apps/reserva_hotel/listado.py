@@ -0,0 +1,242 @@
+# ========================================
+# ARCHIVO: apps/reserva_hotel/listado.py
+# Proyección desnormalizada de las reservas de hotel para los listados (tabla reserva_hotel_listado)
+# ========================================
+"""
+Los listados de reservas (paginado, por estado, por cliente, pendientes de
+ingreso/salida, finalizadas, canceladas) armaban los mismos datos de cliente,
+habitación y reserva general con 3-5 JOINs por fila. ReservaHotelListado
+guarda esas columnas ya copiadas: cada listado es un recorrido por un índice
+de una sola tabla.
+
+- signals.py llama a sincronizar_listado() dentro de la misma transacción que
+  guarda la reserva, el cliente, la habitación o la reserva general, así la
+  proyección nunca queda adelantada ni atrasada respecto de la escritura.
+- fila_json guarda la fila completa del listado paginado ya codificada (mismo
+  JSON que produce DRF): sin ?fields= la página se arma concatenando fragmentos.
+- El estado de la habitación NO se copia: cambia con cada ingreso/salida y
+  reescribiría todo el historial de la habitación. fila_json guarda un valor de
+  relleno y las vistas lo reemplazan al leer con el estado del catálogo de
+  habitaciones (estados_habitaciones / completar_fila_json).
+- `manage.py reconstruir_listado_hotel` la regenera (p. ej. después de un
+  queryset.update() que no envía señales).
+"""
+import json
+
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from apps.reservas_gen.catalogos import cache_catalogos
+from .models import ReservaHotel, ReservaHotelListado
+
+
+def get_estado_display(estado):
+    """Convierte código de estado a texto legible"""
+    estados = {
+        'A': 'Activa',
+        'C': 'Cancelada',
+        'F': 'Finalizada'
+    }
+    return estados.get(estado, 'Desconocido')
+
+
+def _dias_estadia(fila):
+    if fila['fecha_ini'] and fila['fecha_fin']:
+        return max((fila['fecha_fin'] - fila['fecha_ini']).days, 0)
+    return 0
+
+
+# 🔹 Columnas de la proyección y su origen en ReservaHotel (para .values())
+ORIGEN_LISTADO = {
+    'id_reserva_hotel': 'id_reserva_hotel',
+    'cant_personas': 'cant_personas',
+    'amoblado': 'amoblado',
+    'baño_priv': 'baño_priv',
+    'fecha_ini': 'fecha_ini',
+    'fecha_fin': 'fecha_fin',
+    'estado': 'estado',
+    'check_in': 'check_in',
+    'check_out': 'check_out',
+    'datos_cliente_id': 'datos_cliente__id_datos_cliente',
+    'cliente_nombre': 'datos_cliente__nombre',
+    'cliente_app_paterno': 'datos_cliente__app_paterno',
+    'cliente_app_materno': 'datos_cliente__app_materno',
+    'cliente_telefono': 'datos_cliente__telefono',
+    'cliente_ci': 'datos_cliente__ci',
+    'cliente_email': 'datos_cliente__email',
+    'habitacion_id': 'habitacion__id_habitacion',
+    'habitacion_numero': 'habitacion__numero',
+    'habitacion_piso': 'habitacion__piso',
+    'habitacion_tipo': 'habitacion__tipo',
+    'habitacion_amoblado': 'habitacion__amoblado',
+    'habitacion_baño_priv': 'habitacion__baño_priv',
+    'reservas_gen_id': 'reservas_gen__id_reservas_gen',
+    'reservas_gen_tipo': 'reservas_gen__tipo',
+    'reservas_gen_tiene_pago': 'reservas_gen__tiene_pago',
+    # administrador/empleado: solo el id de la FK, sin JOIN a sus tablas
+    'administrador_id': 'reservas_gen__administrador',
+    'empleado_id': 'reservas_gen__empleado',
+}
+
+
+# 🔹 LISTADO PAGINADO: columnas de la proyección y armado de cada campo de la respuesta
+# Cada campo de ?fields= declara las columnas que necesita (se leen con .values(),
+# sin instanciar modelos ni consultas extra por fila) y cómo se arma su valor.
+# 'habitacion_estado' no es columna: lo agrega la vista desde estados_habitaciones()
+# (en fila_json va ESTADO_HABITACION_PENDIENTE).
+CAMPOS_LISTA_HOTEL = {
+    'id_reserva_hotel': (('id_reserva_hotel',), lambda f: f['id_reserva_hotel']),
+    'cant_personas': (('cant_personas',), lambda f: f['cant_personas']),
+    'amoblado': (('amoblado',), lambda f: f['amoblado']),
+    'baño_priv': (('baño_priv',), lambda f: f['baño_priv']),
+    'fecha_ini': (('fecha_ini',), lambda f: f['fecha_ini']),
+    'fecha_fin': (('fecha_fin',), lambda f: f['fecha_fin']),
+    'dias_estadia': (('fecha_ini', 'fecha_fin'), _dias_estadia),
+    'estado': (('estado',), lambda f: f['estado']),
+    'estado_display': (('estado',), lambda f: get_estado_display(f['estado'])),
+    'check_in': (('check_in',), lambda f: f['check_in']),
+    'check_out': (('check_out',), lambda f: f['check_out']),
+    'datos_cliente': (
+        ('datos_cliente_id', 'cliente_nombre', 'cliente_app_paterno',
+         'cliente_app_materno', 'cliente_telefono', 'cliente_ci', 'cliente_email'),
+        lambda f: {
+            'id_datos_cliente': f['datos_cliente_id'],
+            'nombre': f['cliente_nombre'],
+            'app_paterno': f['cliente_app_paterno'],
+            'app_materno': f['cliente_app_materno'] or '',
+            'telefono': f['cliente_telefono'],
+            'ci': f['cliente_ci'],
+            'email': f['cliente_email']
+        }
+    ),
+    'habitacion': (
+        ('habitacion_id', 'habitacion_numero', 'habitacion_piso', 'habitacion_tipo',
+         'habitacion_amoblado', 'habitacion_baño_priv'),
+        lambda f: {
+            'id_habitacion': f['habitacion_id'],
+            'numero': f['habitacion_numero'],
+            'piso': f['habitacion_piso'],
+            'tipo': f['habitacion_tipo'],
+            'amoblado': f['habitacion_amoblado'],
+            'baño_priv': f['habitacion_baño_priv'],
+            'estado': f.get('habitacion_estado')
+        }
+    ),
+    'reservas_gen': (
+        ('reservas_gen_id', 'reservas_gen_tipo', 'reservas_gen_tiene_pago',
+         'administrador_id', 'empleado_id'),
+        lambda f: {
+            'id_reservas_gen': f['reservas_gen_id'],
+            'tipo': f['reservas_gen_tipo'],
+            'tiene_pago': f['reservas_gen_tiene_pago'],
+            'administrador_id': f['administrador_id'],
+            'empleado_id': f['empleado_id']
+        }
+    ),
+    'fecha_creacion': (('reservas_gen_id',), lambda f: f['reservas_gen_id']),  # Como referencia temporal
+}
+
+
+def armar_fila_lista(fila, campos=CAMPOS_LISTA_HOTEL):
+    """Fila del listado paginado a partir de las columnas de la proyección"""
+    return {campo: CAMPOS_LISTA_HOTEL[campo][1](fila) for campo in campos}
+
+
+def codificar_fila(datos):
+    """Mismos bytes que escribiría el JSONRenderer de DRF para esta fila"""
+    return JSONRenderer().render(datos).decode('utf-8')
+
+
+# 🔹 ESTADO DE LA HABITACIÓN (se completa al leer)
+# fila_json lleva este relleno en habitacion.estado; codificado ("\u0000estado_habitacion\u0000")
+# se reemplaza sin depender del orden de las claves. Los formularios no envían caracteres NUL.
+ESTADO_HABITACION_PENDIENTE = '\x00estado_habitacion\x00'
+_ESTADO_PENDIENTE_JSON = codificar_fila(ESTADO_HABITACION_PENDIENTE)
+
+
+def estados_habitaciones():
+    """{id_habitacion: estado} actual, del catálogo en memoria (sin consulta si está vigente)"""
+    return {habitacion['id_habitacion']: habitacion['estado'] for habitacion in cache_catalogos.obtener('habitaciones')}
+
+
+def completar_fila_json(fila_json, estado_habitacion):
+    """Fragmento de fila_json con el estado actual de la habitación"""
+    if fila_json.count(_ESTADO_PENDIENTE_JSON) == 1:
+        return fila_json.replace(_ESTADO_PENDIENTE_JSON, codificar_fila(estado_habitacion))
+    # Sin relleno (fila de otro formato) o repetido dentro de un valor: se decodifica la fila
+    datos = json.loads(fila_json)
+    datos['habitacion']['estado'] = estado_habitacion
+    return codificar_fila(datos)
+
+
+# ==============================================
+# 🔹 SINCRONIZACIÓN
+# ==============================================
+
+def filas_listado(filas_origen):
+    """Filas de la proyección (sin guardar) para cada fila de ReservaHotel.values(*ORIGEN_LISTADO.values())"""
+    listado = []
+    for origen in filas_origen:
+        fila = {columna: origen[ruta] for columna, ruta in ORIGEN_LISTADO.items()}
+        completa = armar_fila_lista({**fila, 'habitacion_estado': ESTADO_HABITACION_PENDIENTE})
+        listado.append(ReservaHotelListado(**fila, fila_json=codificar_fila(completa)))
+    return listado
+
+
+def guardar_filas(filas):
+    """INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE de las filas de la proyección"""
+    if not filas:
+        return
+    columnas = [campo.name for campo in ReservaHotelListado._meta.concrete_fields if not campo.primary_key]
+    # MySQL no acepta indicar la columna del conflicto (usa la clave primaria)
+    unicas = ['id_reserva_hotel'] if connection.features.supports_update_conflicts_with_target else None
+    ReservaHotelListado.objects.bulk_create(filas, update_conflicts=True, update_fields=columnas, unique_fields=unicas)
+
+
+def sincronizar_listado(**filtros):
+    """
+    Reescribe en la proyección las reservas que cumplen `filtros` (sobre ReservaHotel):
+    una consulta con los JOINs y un upsert, sin importar cuántas filas sean.
+    """
+    origen = ReservaHotel.objects.filter(**filtros).values(*ORIGEN_LISTADO.values())
+    guardar_filas(filas_listado(origen))
+
+
+def sincronizar_si_cambio(columna, valor, actuales):
+    """
+    Reescribe las reservas con `columna` = valor solo si la proyección tiene otros
+    valores en `actuales` ({columna: valor nuevo}). Todas esas filas comparten los
+    mismos datos copiados, así que basta mirar una (p. ej. guardar un cliente sin
+    cambios no reescribe su historial).
+    """
+    fila = ReservaHotelListado.objects.filter(**{columna: valor}).values(*actuales)[:1]
+    fila = fila[0] if fila else None
+    if fila is not None and fila != actuales:
+        sincronizar_listado(**{columna: valor})
+
+
+def quitar_del_listado(id_reserva):
+    ReservaHotelListado.objects.filter(id_reserva_hotel=id_reserva).delete()
+
+
+def reconstruir_listado(lote=1000):
+    """Regenera la proyección completa por lotes de id; retorna (filas escritas, filas sobrantes borradas)"""
+    escritas = 0
+    ultimo_id = 0
+    while True:
+        origen = list(
+            ReservaHotel.objects.filter(id_reserva_hotel__gt=ultimo_id)
+            .order_by('id_reserva_hotel')
+            .values(*ORIGEN_LISTADO.values())[:lote]
+        )
+        if not origen:
+            break
+        guardar_filas(filas_listado(origen))
+        escritas += len(origen)
+        ultimo_id = origen[-1]['id_reserva_hotel']
+
+    # Filas de reservas borradas sin señal (SQL crudo o cascadas hechas por la BD)
+    sobrantes, _ = ReservaHotelListado.objects.exclude(
+        id_reserva_hotel__in=ReservaHotel.objects.values('id_reserva_hotel')
+    ).delete()
+    return escritas, sobrantes
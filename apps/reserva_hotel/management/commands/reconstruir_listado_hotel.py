@@ -0,0 +1,21 @@
+# ========================================
+# ARCHIVO: apps/reserva_hotel/management/commands/reconstruir_listado_hotel.py
+# Regenera la proyección reserva_hotel_listado desde las tablas de origen
+# ========================================
+from django.core.management.base import BaseCommand
+
+from apps.reserva_hotel.listado import reconstruir_listado
+
+
+class Command(BaseCommand):
+    help = 'Regenera la proyección de listados de reservas de hotel (después de escrituras sin señales)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Reservas a leer y escribir por consulta')
+
+    def handle(self, *args, **options):
+        escritas, sobrantes = reconstruir_listado(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Proyección regenerada: {escritas} reservas escritas, {sobrantes} filas sobrantes borradas"
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos_cliente', '0001_initial'),
+        ('habitacion', '0001_initial'),
+        ('reserva_hotel', '0001_initial'),
+        ('reservas_gen', '0004_tiene_pago'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservahotel',
+            index=models.Index(fields=['habitacion', 'estado', 'fecha_ini', 'fecha_fin'], name='rh_hab_estado_fechas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservahotel',
+            index=models.Index(fields=['estado', 'fecha_ini', 'check_in'], name='rh_estado_ini_checkin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservahotel',
+            index=models.Index(fields=['estado', 'check_in', 'check_out'], name='rh_estado_checkin_out_idx'),
+        ),
+    ]
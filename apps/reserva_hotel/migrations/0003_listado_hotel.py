@@ -0,0 +1,154 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:17
+
+from django.db import migrations, models
+from rest_framework.renderers import JSONRenderer
+
+
+# Copia congelada de listado.py al crear la proyección: la migración no depende del código vivo
+ORIGEN_LISTADO = {
+    'id_reserva_hotel': 'id_reserva_hotel',
+    'cant_personas': 'cant_personas',
+    'amoblado': 'amoblado',
+    'baño_priv': 'baño_priv',
+    'fecha_ini': 'fecha_ini',
+    'fecha_fin': 'fecha_fin',
+    'estado': 'estado',
+    'check_in': 'check_in',
+    'check_out': 'check_out',
+    'datos_cliente_id': 'datos_cliente__id_datos_cliente',
+    'cliente_nombre': 'datos_cliente__nombre',
+    'cliente_app_paterno': 'datos_cliente__app_paterno',
+    'cliente_app_materno': 'datos_cliente__app_materno',
+    'cliente_telefono': 'datos_cliente__telefono',
+    'cliente_ci': 'datos_cliente__ci',
+    'cliente_email': 'datos_cliente__email',
+    'habitacion_id': 'habitacion__id_habitacion',
+    'habitacion_numero': 'habitacion__numero',
+    'habitacion_piso': 'habitacion__piso',
+    'habitacion_tipo': 'habitacion__tipo',
+    'habitacion_amoblado': 'habitacion__amoblado',
+    'habitacion_baño_priv': 'habitacion__baño_priv',
+    'reservas_gen_id': 'reservas_gen__id_reservas_gen',
+    'reservas_gen_tipo': 'reservas_gen__tipo',
+    'reservas_gen_tiene_pago': 'reservas_gen__tiene_pago',
+    'administrador_id': 'reservas_gen__administrador',
+    'empleado_id': 'reservas_gen__empleado',
+}
+
+ESTADOS = {'A': 'Activa', 'C': 'Cancelada', 'F': 'Finalizada'}
+
+
+def fila_json(f):
+    """Fila del listado paginado codificada como DRF (el estado de la habitación va como relleno)"""
+    dias = max((f['fecha_fin'] - f['fecha_ini']).days, 0) if f['fecha_ini'] and f['fecha_fin'] else 0
+    return JSONRenderer().render({
+        'id_reserva_hotel': f['id_reserva_hotel'],
+        'cant_personas': f['cant_personas'],
+        'amoblado': f['amoblado'],
+        'baño_priv': f['baño_priv'],
+        'fecha_ini': f['fecha_ini'],
+        'fecha_fin': f['fecha_fin'],
+        'dias_estadia': dias,
+        'estado': f['estado'],
+        'estado_display': ESTADOS.get(f['estado'], 'Desconocido'),
+        'check_in': f['check_in'],
+        'check_out': f['check_out'],
+        'datos_cliente': {
+            'id_datos_cliente': f['datos_cliente_id'],
+            'nombre': f['cliente_nombre'],
+            'app_paterno': f['cliente_app_paterno'],
+            'app_materno': f['cliente_app_materno'] or '',
+            'telefono': f['cliente_telefono'],
+            'ci': f['cliente_ci'],
+            'email': f['cliente_email']
+        },
+        'habitacion': {
+            'id_habitacion': f['habitacion_id'],
+            'numero': f['habitacion_numero'],
+            'piso': f['habitacion_piso'],
+            'tipo': f['habitacion_tipo'],
+            'amoblado': f['habitacion_amoblado'],
+            'baño_priv': f['habitacion_baño_priv'],
+            'estado': '\x00estado_habitacion\x00'  # listado.ESTADO_HABITACION_PENDIENTE
+        },
+        'reservas_gen': {
+            'id_reservas_gen': f['reservas_gen_id'],
+            'tipo': f['reservas_gen_tipo'],
+            'tiene_pago': f['reservas_gen_tiene_pago'],
+            'administrador_id': f['administrador_id'],
+            'empleado_id': f['empleado_id']
+        },
+        'fecha_creacion': f['reservas_gen_id'],
+    }).decode('utf-8')
+
+
+def llenar_listado(apps, schema_editor):
+    """Proyección inicial de las reservas existentes, por lotes de id (la tabla recién creada está vacía)"""
+    ReservaHotel = apps.get_model('reserva_hotel', 'ReservaHotel')
+    ReservaHotelListado = apps.get_model('reserva_hotel', 'ReservaHotelListado')
+    ultimo_id = 0
+    while True:
+        origen = list(
+            ReservaHotel.objects.filter(id_reserva_hotel__gt=ultimo_id)
+            .order_by('id_reserva_hotel')
+            .values(*ORIGEN_LISTADO.values())[:1000]
+        )
+        if not origen:
+            break
+        filas = []
+        for o in origen:
+            fila = {columna: o[ruta] for columna, ruta in ORIGEN_LISTADO.items()}
+            filas.append(ReservaHotelListado(**fila, fila_json=fila_json(fila)))
+        ReservaHotelListado.objects.bulk_create(filas)
+        ultimo_id = origen[-1]['id_reserva_hotel']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos_cliente', '0001_initial'),
+        ('habitacion', '0001_initial'),
+        ('reserva_hotel', '0002_indices_consultas'),
+        ('reservas_gen', '0004_tiene_pago'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaHotelListado',
+            fields=[
+                ('id_reserva_hotel', models.IntegerField(primary_key=True, serialize=False)),
+                ('cant_personas', models.PositiveSmallIntegerField()),
+                ('amoblado', models.CharField(max_length=1)),
+                ('baño_priv', models.CharField(max_length=1)),
+                ('fecha_ini', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('estado', models.CharField(max_length=1)),
+                ('check_in', models.DateTimeField(blank=True, null=True)),
+                ('check_out', models.DateTimeField(blank=True, null=True)),
+                ('datos_cliente_id', models.IntegerField()),
+                ('cliente_nombre', models.CharField(max_length=15)),
+                ('cliente_app_paterno', models.CharField(blank=True, max_length=15, null=True)),
+                ('cliente_app_materno', models.CharField(blank=True, max_length=15, null=True)),
+                ('cliente_telefono', models.IntegerField()),
+                ('cliente_ci', models.BigIntegerField()),
+                ('cliente_email', models.CharField(max_length=50)),
+                ('habitacion_id', models.IntegerField()),
+                ('habitacion_numero', models.CharField(max_length=10)),
+                ('habitacion_piso', models.IntegerField()),
+                ('habitacion_tipo', models.CharField(max_length=30)),
+                ('habitacion_amoblado', models.CharField(max_length=1)),
+                ('habitacion_baño_priv', models.CharField(max_length=1)),
+                ('reservas_gen_id', models.IntegerField()),
+                ('reservas_gen_tipo', models.CharField(max_length=1)),
+                ('reservas_gen_tiene_pago', models.BooleanField(default=False)),
+                ('administrador_id', models.IntegerField()),
+                ('empleado_id', models.IntegerField()),
+                ('fila_json', models.TextField()),
+            ],
+            options={
+                'db_table': 'reserva_hotel_listado',
+                'indexes': [models.Index(fields=['estado', 'fecha_ini'], name='rhl_estado_ini_idx'), models.Index(fields=['estado', 'check_out', 'check_in'], name='rhl_estado_out_in_idx'), models.Index(fields=['datos_cliente_id', 'fecha_ini'], name='rhl_cliente_ini_idx'), models.Index(fields=['habitacion_id'], name='rhl_habitacion_idx'), models.Index(fields=['reservas_gen_id'], name='rhl_reservas_gen_idx')],
+            },
+        ),
+        migrations.RunPython(llenar_listado, migrations.RunPython.noop),
+    ]
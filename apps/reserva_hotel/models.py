@@ -1,5 +1,5 @@
 from django.db import models
-from apps.reservas_gen.models import ReservasGen
+from apps.reservas_gen.models import ReservasGen, ReservaConPagoDiferidoManager
 from apps.datos_cliente.models import DatosCliente
 from apps.habitacion.models import Habitacion
 
@@ -17,6 +17,79 @@ class ReservaHotel(models.Model):
     check_in = models.DateTimeField(null=True, blank=True)
     check_out = models.DateTimeField(null=True, blank=True)
 
+    objects = ReservaConPagoDiferidoManager()
+
+
+    class Meta:
+        db_table = 'reserva_hotel'
+        # Índices con la forma exacta de las consultas más frecuentes (ver tests.py)
+        indexes = [
+            # Solapamiento por habitación: habitacion = x AND estado IN (...) AND fecha_ini < y AND fecha_fin > z
+            models.Index(fields=['habitacion', 'estado', 'fecha_ini', 'fecha_fin'], name='rh_hab_estado_fechas_idx'),
+            # Ingresos pendientes / próximos: estado = 'A' AND fecha_ini ... AND check_in IS NULL
+            models.Index(fields=['estado', 'fecha_ini', 'check_in'], name='rh_estado_ini_checkin_idx'),
+            # Huéspedes y salidas pendientes: estado = 'A' AND check_in IS NOT NULL AND check_out IS NULL
+            models.Index(fields=['estado', 'check_in', 'check_out'], name='rh_estado_checkin_out_idx'),
+        ]
+
+class ReservaHotelListado(models.Model):
+    """
+    Proyección desnormalizada de ReservaHotel para los listados (ver listado.py):
+    una fila por reserva con los datos del cliente, la habitación y la reserva
+    general ya copiados, así cada listado lee una sola tabla sin JOINs.
+    Se actualiza en la misma transacción que la escritura que la cambia (signals.py).
+    """
+    id_reserva_hotel = models.IntegerField(primary_key=True)
+    cant_personas = models.PositiveSmallIntegerField()
+    amoblado = models.CharField(max_length=1)
+    baño_priv = models.CharField(max_length=1)
+    fecha_ini = models.DateField()
+    fecha_fin = models.DateField()
+    estado = models.CharField(max_length=1)
+    check_in = models.DateTimeField(null=True, blank=True)
+    check_out = models.DateTimeField(null=True, blank=True)
+
+    # Cliente
+    datos_cliente_id = models.IntegerField()
+    cliente_nombre = models.CharField(max_length=15)
+    cliente_app_paterno = models.CharField(max_length=15, null=True, blank=True)
+    cliente_app_materno = models.CharField(max_length=15, null=True, blank=True)
+    cliente_telefono = models.IntegerField()
+    cliente_ci = models.BigIntegerField()
+    cliente_email = models.CharField(max_length=50)
+
+    # Habitación
+    habitacion_id = models.IntegerField()
+    habitacion_numero = models.CharField(max_length=10)
+    habitacion_piso = models.IntegerField()
+    habitacion_tipo = models.CharField(max_length=30)
+    habitacion_amoblado = models.CharField(max_length=1)
+    habitacion_baño_priv = models.CharField(max_length=1)
+    # Sin el estado de la habitación: cambia con cada ingreso/salida y se lee del catálogo
+
+    # Reserva general (administrador/empleado: solo los ids)
+    reservas_gen_id = models.IntegerField()
+    reservas_gen_tipo = models.CharField(max_length=1)
+    reservas_gen_tiene_pago = models.BooleanField(default=False)
+    administrador_id = models.IntegerField()
+    empleado_id = models.IntegerField()
+
+    # Fila completa del listado paginado ya codificada en JSON (se concatena tal cual)
+    fila_json = models.TextField()
+
 
     class Meta:
-        db_table = 'reserva_hotel'
\ No newline at end of file
+        db_table = 'reserva_hotel_listado'
+        # Un índice por forma de consulta de los listados (ver views.py)
+        indexes = [
+            # Por estado / canceladas / pendientes de ingreso: estado = x ORDER BY fecha_ini
+            models.Index(fields=['estado', 'fecha_ini'], name='rhl_estado_ini_idx'),
+            # Pendientes de salida: estado = 'A' AND check_in IS NOT NULL AND check_out IS NULL ORDER BY check_in
+            models.Index(fields=['estado', 'check_out', 'check_in'], name='rhl_estado_out_in_idx'),
+            # Por cliente: datos_cliente_id = x ORDER BY fecha_ini
+            models.Index(fields=['datos_cliente_id', 'fecha_ini'], name='rhl_cliente_ini_idx'),
+            # Listado paginado filtrado por habitación (el id de la fila viene en el índice)
+            models.Index(fields=['habitacion_id'], name='rhl_habitacion_idx'),
+            # Reescritura al cambiar la reserva general (comprobante de pago)
+            models.Index(fields=['reservas_gen_id'], name='rhl_reservas_gen_idx'),
+        ]
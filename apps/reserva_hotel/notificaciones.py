@@ -0,0 +1,413 @@
+# ========================================
+# ARCHIVO: apps/reserva_hotel/notificaciones.py
+# Notificaciones de recepción: cálculo y canal de envío (Server-Sent Events)
+# ========================================
+"""
+GET /api/reservaHotel/notificaciones/ sigue disponible para clientes que hacen
+polling. Los que pueden mantener una conexión abierta usan
+GET /api/reservaHotel/notificaciones/stream/ (text/event-stream):
+
+- Al conectar reciben un evento `snapshot` con la misma forma que el endpoint
+  de polling (notificaciones, proximas_reservas, ...).
+- Después solo reciben eventos `cambios` con las diferencias: `nuevas`,
+  `actualizadas` y `resueltas` (PRE_INICIO, RETRASO, CHECK_OUT_PENDIENTE), y
+  `proximas_reservas` cuando esa lista cambió.
+- Cada evento lleva `id:`; al reconectar, el navegador (EventSource) envía
+  Last-Event-ID y se reenvían los cambios perdidos (o un snapshot si ya no
+  están en el historial).
+
+Un solo hilo por proceso recalcula la lista cuando una reserva cambia (señales),
+cuando cambia la fecha, o cada TIEMPO_RECARGA segundos para absorber escrituras
+de otros procesos; todos los clientes comparten ese cálculo.
+
+Bajo WSGI cada conexión ocupa un hilo del servidor. Con ASGI
+(LesEtoiles/asgi.py con uvicorn o daphne) el flujo es asíncrono y no ocupa hilos.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+import pytz
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import ReservaHotel
+
+logger = logging.getLogger(__name__)
+
+
+def ahora_bolivia():
+    return timezone.now().astimezone(pytz.timezone('America/La_Paz'))
+
+
+# ==============================================
+# 🔹 CÁLCULO DE NOTIFICACIONES
+# ==============================================
+
+def construir_notificaciones_hotel(ahora):
+    """
+    Retorna (notificaciones, proximas_reservas):
+    - Reservas que deben iniciar hoy y aún no tienen registro de ingreso
+    - Reservas que ya pasaron su fecha de inicio sin registro de ingreso
+    - Salidas pendientes o vencidas
+    """
+    fecha_hoy = ahora.date()
+    notificaciones = []
+
+    # ==========================================
+    # 1️⃣ NOTIFICACIONES PRE-INICIO (Reservas que inician hoy)
+    # ==========================================
+    reservas_hoy = ReservaHotel.objects.filter(
+        estado='A',
+        fecha_ini=fecha_hoy,
+        check_in__isnull=True
+    ).select_related('datos_cliente', 'habitacion')
+
+    for reserva in reservas_hoy:
+        cliente = reserva.datos_cliente
+
+        notificaciones.append({
+            'tipo': 'PRE_INICIO',
+            'prioridad': 'MEDIA',
+            'titulo': '⚠️ RESERVA DEBE INICIAR HOY',
+            'mensaje': f"La reserva de {cliente.nombre} debe iniciar hoy y aún no ha hecho ingreso",
+            'reserva_id': reserva.id_reserva_hotel,
+            'cliente_nombre': f"{cliente.nombre} {cliente.app_paterno}",
+            'cliente_telefono': str(cliente.telefono),
+            'cliente_email': cliente.email,
+            'habitacion': reserva.habitacion.numero,
+            'fecha_ini': str(reserva.fecha_ini),
+            'fecha_fin': str(reserva.fecha_fin),
+            'cant_personas': reserva.cant_personas,
+            'timestamp': ahora.isoformat()
+        })
+
+    # ==========================================
+    # 2️⃣ NOTIFICACIONES DE RETRASO (Ya pasó la fecha de inicio)
+    # ==========================================
+    reservas_con_retraso = ReservaHotel.objects.filter(
+        estado='A',
+        fecha_ini__lt=fecha_hoy,
+        fecha_fin__gte=fecha_hoy,
+        check_in__isnull=True
+    ).select_related('datos_cliente', 'habitacion')
+
+    for reserva in reservas_con_retraso:
+        cliente = reserva.datos_cliente
+
+        # Calcular días de retraso
+        dias_retraso = (fecha_hoy - reserva.fecha_ini).days
+
+        notificaciones.append({
+            'tipo': 'RETRASO',
+            'prioridad': 'ALTA',
+            'titulo': '🚨 CLIENTE NO HA REGISTRADO INGRESO',
+            'mensaje': f"La reserva debió iniciar hace {dias_retraso} día(s) y el cliente aún no ha hecho ingreso",
+            'reserva_id': reserva.id_reserva_hotel,
+            'cliente_nombre': f"{cliente.nombre} {cliente.app_paterno}",
+            'cliente_telefono': str(cliente.telefono),
+            'cliente_email': cliente.email,
+            'habitacion': reserva.habitacion.numero,
+            'fecha_ini': str(reserva.fecha_ini),
+            'fecha_fin': str(reserva.fecha_fin),
+            'cant_personas': reserva.cant_personas,
+            'dias_retraso': dias_retraso,
+            'timestamp': ahora.isoformat()
+        })
+
+    # ==========================================
+    # 3️⃣ RESERVAS PRÓXIMAS (próximos 7 días) - INFO
+    # ==========================================
+    fecha_limite = fecha_hoy + timedelta(days=7)
+
+    reservas_proximas = ReservaHotel.objects.filter(
+        estado='A',
+        fecha_ini__gt=fecha_hoy,
+        fecha_ini__lte=fecha_limite,
+        check_in__isnull=True
+    ).select_related('datos_cliente', 'habitacion').order_by('fecha_ini')[:10]
+
+    proximas_reservas = []
+    for reserva in reservas_proximas:
+        dias_restantes = (reserva.fecha_ini - fecha_hoy).days
+
+        proximas_reservas.append({
+            'id': reserva.id_reserva_hotel,
+            'cliente': f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}",
+            'habitacion': reserva.habitacion.numero,
+            'fecha_ini': str(reserva.fecha_ini),
+            'fecha_fin': str(reserva.fecha_fin),
+            'cant_personas': reserva.cant_personas,
+            'dias_restantes': dias_restantes
+        })
+
+    # ==========================================
+    # 4️⃣ SALIDAS PENDIENTES (deben salir hoy o ya pasó la fecha)
+    # ==========================================
+    reservas_checkout_pendiente = ReservaHotel.objects.filter(
+        estado='A',
+        fecha_fin__lte=fecha_hoy,
+        check_in__isnull=False,
+        check_out__isnull=True
+    ).select_related('datos_cliente', 'habitacion')
+
+    for reserva in reservas_checkout_pendiente:
+        cliente = reserva.datos_cliente
+        dias_excedidos = (fecha_hoy - reserva.fecha_fin).days
+
+        if dias_excedidos > 0:
+            prioridad = 'ALTA'
+            titulo = '🚨 SALIDA VENCIDA'
+            mensaje = f"La reserva venció hace {dias_excedidos} día(s) y el cliente no ha hecho salida"
+        else:
+            prioridad = 'MEDIA'
+            titulo = '⚠️ SALIDA PENDIENTE HOY'
+            mensaje = "La reserva debe finalizar hoy y el cliente aún no ha hecho salida"
+
+        notificaciones.append({
+            'tipo': 'CHECK_OUT_PENDIENTE',
+            'prioridad': prioridad,
+            'titulo': titulo,
+            'mensaje': mensaje,
+            'reserva_id': reserva.id_reserva_hotel,
+            'cliente_nombre': f"{cliente.nombre} {cliente.app_paterno}",
+            'cliente_telefono': str(cliente.telefono),
+            'cliente_email': cliente.email,
+            'habitacion': reserva.habitacion.numero,
+            'fecha_ini': str(reserva.fecha_ini),
+            'fecha_fin': str(reserva.fecha_fin),
+            'check_in': reserva.check_in.strftime('%Y-%m-%d %H:%M:%S'),
+            'cant_personas': reserva.cant_personas,
+            'dias_excedidos': dias_excedidos if dias_excedidos > 0 else 0,
+            'timestamp': ahora.isoformat()
+        })
+
+    return notificaciones, proximas_reservas
+
+
+def _sin_timestamp(notificacion):
+    """El timestamp cambia en cada cálculo: no cuenta como cambio de la notificación"""
+    return {clave: valor for clave, valor in notificacion.items() if clave != 'timestamp'}
+
+
+def _formato_sse(secuencia, evento, datos):
+    return f"id: {secuencia}\nevent: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+# ==============================================
+# 🔹 CANAL DE NOTIFICACIONES
+# ==============================================
+
+class CanalNotificacionesHotel:
+    """Estado actual de las notificaciones e historial de cambios, singleton por proceso"""
+    _instance = None
+    _lock = threading.Lock()
+
+    # ⏱️ Cada cuánto el hilo revisa si cambió la fecha (segundos)
+    INTERVALO_REVISION = 30
+
+    # ⏱️ Recálculo completo para absorber escrituras de otros procesos (segundos)
+    TIEMPO_RECARGA = 300
+
+    # 📜 Cambios guardados para clientes que reconectan con Last-Event-ID
+    MAX_HISTORIAL = 200
+
+    # ⏱️ Cada cuánto revisa el flujo asíncrono si hay cambios (segundos)
+    INTERVALO_ASINCRONO = 0.5
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._inicializar()
+        return cls._instance
+
+    def _inicializar(self):
+        self.heartbeat = getattr(settings, 'NOTIFICACIONES_SSE_HEARTBEAT', 15)
+        self.duracion_max = getattr(settings, 'NOTIFICACIONES_SSE_DURACION_MAX', 3600)
+
+        self._cambio = threading.Condition()    # avisa a los clientes WSGI
+        self._despertar = threading.Event()     # avisa al hilo de recálculo
+        self._calculo_lock = threading.Lock()   # un solo recálculo a la vez
+        self._hilo = None
+        self._pid = None
+
+        self.secuencia = 0
+        self.notificaciones = {}   # {(tipo, reserva_id): notificacion}
+        self.proximas_reservas = []
+        self.historial = deque(maxlen=self.MAX_HISTORIAL)  # [(secuencia, cambios), ...]
+        self.timestamp = None
+        self.fecha = None
+        self.calculado_en = 0
+        self.sucio = True
+        self.suscriptores = 0
+        self.recalculos = 0
+
+    # ==============================================
+    # 🔹 RECÁLCULO
+    # ==============================================
+
+    def marcar_cambio(self):
+        """Una reserva cambió (llamado desde señales al confirmar la transacción)"""
+        self.sucio = True
+        self._despertar.set()
+
+    def actualizar(self):
+        """Recalcula si hace falta y publica las diferencias"""
+        with self._calculo_lock:
+            ahora = ahora_bolivia()
+            if not self.sucio and ahora.date() == self.fecha \
+                    and time.time() - self.calculado_en <= self.TIEMPO_RECARGA:
+                return
+            # Se limpia antes de leer: un cambio durante el cálculo vuelve a marcarlo
+            self.sucio = False
+            lista, proximas = construir_notificaciones_hotel(ahora)
+            actuales = {(n['tipo'], n['reserva_id']): n for n in lista}
+
+            with self._cambio:
+                nuevas = [n for clave, n in actuales.items() if clave not in self.notificaciones]
+                actualizadas = [
+                    n for clave, n in actuales.items()
+                    if clave in self.notificaciones and _sin_timestamp(n) != _sin_timestamp(self.notificaciones[clave])
+                ]
+                resueltas = [
+                    {'tipo': tipo, 'reserva_id': reserva_id}
+                    for tipo, reserva_id in self.notificaciones if (tipo, reserva_id) not in actuales
+                ]
+                proximas_cambiaron = proximas != self.proximas_reservas
+
+                self.notificaciones = actuales
+                self.proximas_reservas = proximas
+                self.timestamp = ahora.isoformat()
+                self.fecha = ahora.date()
+                self.calculado_en = time.time()
+                self.recalculos += 1
+
+                if nuevas or actualizadas or resueltas or proximas_cambiaron:
+                    self.secuencia += 1
+                    cambios = {
+                        'nuevas': nuevas,
+                        'actualizadas': actualizadas,
+                        'resueltas': resueltas,
+                        'total_notificaciones': len(actuales),
+                        'timestamp_servidor': self.timestamp
+                    }
+                    if proximas_cambiaron:
+                        cambios['proximas_reservas'] = proximas
+                    self.historial.append((self.secuencia, cambios))
+                    self._cambio.notify_all()
+
+    def _asegurar_hilo(self):
+        """Arranca el hilo con el primer cliente (y de nuevo tras un fork de gunicorn)"""
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or self._pid != os.getpid() or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._procesar, name='notificaciones-hotel', daemon=True)
+                self._hilo.start()
+                logger.info("🔔 Canal de notificaciones de hotel iniciado")
+
+    def _procesar(self):
+        while True:
+            self._despertar.wait(self.INTERVALO_REVISION)
+            self._despertar.clear()
+            # Sin clientes conectados no se consulta la BD (el primero recalcula al conectar)
+            if not self.suscriptores:
+                continue
+            try:
+                self.actualizar()
+            except Exception:
+                logger.exception("❌ Error actualizando notificaciones de hotel")
+            finally:
+                connection.close()
+
+    # ==============================================
+    # 🔹 EVENTOS PARA LOS CLIENTES
+    # ==============================================
+
+    def _snapshot(self):
+        notificaciones = list(self.notificaciones.values())
+        return {
+            'notificaciones': notificaciones,
+            'total_notificaciones': len(notificaciones),
+            'proximas_reservas': self.proximas_reservas,
+            'timestamp_servidor': self.timestamp,
+            'hay_notificaciones': len(notificaciones) > 0
+        }
+
+    def _pendientes(self, ultimo):
+        """Eventos SSE a enviar a un cliente que ya recibió hasta `ultimo`"""
+        with self._cambio:
+            if ultimo == self.secuencia:
+                return []
+            if ultimo is not None and self.historial and self.historial[0][0] <= ultimo + 1 <= self.secuencia:
+                return [(secuencia, 'cambios', cambios) for secuencia, cambios in self.historial if secuencia > ultimo]
+            return [(self.secuencia, 'snapshot', self._snapshot())]
+
+    def _suscribir(self, delta):
+        with self._cambio:
+            self.suscriptores += delta
+
+    def flujo_sse(self, ultimo=None):
+        """Generador text/event-stream para WSGI (espera los cambios bloqueando el hilo)"""
+        self._asegurar_hilo()
+        self.actualizar()
+        self._suscribir(1)
+        try:
+            yield 'retry: 5000\n\n'
+            fin = time.time() + self.duracion_max
+            while time.time() < fin:
+                for secuencia, evento, datos in self._pendientes(ultimo):
+                    ultimo = secuencia
+                    yield _formato_sse(secuencia, evento, datos)
+                with self._cambio:
+                    hubo_cambio = self._cambio.wait_for(lambda: self.secuencia != ultimo, timeout=self.heartbeat)
+                if not hubo_cambio:
+                    yield ': ping\n\n'
+        finally:
+            self._suscribir(-1)
+
+    async def flujo_sse_asincrono(self, ultimo=None):
+        """Generador text/event-stream para ASGI (revisa la secuencia en memoria, sin hilos)"""
+        self._asegurar_hilo()
+        await sync_to_async(self.actualizar)()
+        self._suscribir(1)
+        try:
+            yield 'retry: 5000\n\n'
+            fin = time.time() + self.duracion_max
+            ultimo_envio = time.time()
+            while time.time() < fin:
+                for secuencia, evento, datos in self._pendientes(ultimo):
+                    ultimo = secuencia
+                    ultimo_envio = time.time()
+                    yield _formato_sse(secuencia, evento, datos)
+                if time.time() - ultimo_envio >= self.heartbeat:
+                    ultimo_envio = time.time()
+                    yield ': ping\n\n'
+                await asyncio.sleep(self.INTERVALO_ASINCRONO)
+        finally:
+            self._suscribir(-1)
+
+    def obtener_estadisticas(self):
+        with self._cambio:
+            return {
+                'suscriptores': self.suscriptores,
+                'secuencia': self.secuencia,
+                'notificaciones': len(self.notificaciones),
+                'recalculos': self.recalculos,
+                'historial': len(self.historial),
+                'fecha': str(self.fecha) if self.fecha else None,
+            }
+
+
+# Instancia global del canal de notificaciones de hotel
+canal_notificaciones_hotel = CanalNotificacionesHotel()
@@ -2,19 +2,32 @@
 # ARCHIVO: apps/reserva_hotel/queue_manager.py
 # Sistema de Teoría de Colas con BATCHING (espera competencia)
 # ========================================
+import logging
 import threading
 import queue
 import time
-from datetime import datetime
+import uuid
+from collections import deque
+from datetime import datetime, time as dt_time
+from django.conf import settings
 from django.db import transaction, connection
+from django.db.models.signals import post_save
 from django.db.utils import OperationalError
+from django.utils import timezone
 from .models import ReservaHotel
 from apps.habitacion.models import Habitacion
 from apps.reservas_gen.models import ReservasGen
+from apps.reservas_gen.arbitraje import obtener_backend_arbitraje
+from apps.reservas_gen.tickets import SolicitudConCallbacks
+from apps.reservas_gen.metricas import espera_cola, duracion_transaccion, registrar_indicador
 
-class ReservaRequest:
+logger = logging.getLogger(__name__)
+
+class ReservaRequest(SolicitudConCallbacks):
     """Clase que representa una solicitud de reserva en la cola"""
     
+    COLA_METRICAS = 'hotel'
+    
     def __init__(self, datos_reserva, datos_cliente, habitacion_id, empleado, administrador):
         self.datos_reserva = datos_reserva
         self.datos_cliente = datos_cliente
@@ -23,8 +36,11 @@ class ReservaRequest:
         self.administrador = administrador
         self.prioridad = self.calcular_prioridad()
         self.timestamp = datetime.now()
+        self.token = uuid.uuid4().hex  # Identifica la solicitud en el arbitraje compartido
+        self.tiempo_encolado = time.time()
+        self.espera_cola = None  # segundos entre encolado e inicio de procesamiento
         self.resultado = None
-        self.evento = threading.Event()
+        self._inicializar_callbacks()  # evento + callbacks de finalización (modo asíncrono)
         
         # Convertir fechas a objetos datetime.date para comparaciones
         self.fecha_ini_dt = datetime.strptime(self.datos_reserva['fecha_ini'], '%Y-%m-%d').date()
@@ -51,6 +67,21 @@ class ReservaRequest:
         return (self.fecha_ini_dt < otra_request.fecha_fin_dt and 
                 self.fecha_fin_dt > otra_request.fecha_ini_dt)
     
+    def tiene_conflicto(self, otra_request):
+        """Conflicto con otra solicitud de la misma habitación (interfaz común con eventos)"""
+        return self.habitacion_id == otra_request.habitacion_id and self.tiene_conflicto_fechas(otra_request)
+    
+    def datos_arbitraje(self):
+        """(tipo, recurso, inicio, fin, servicios) para el backend de arbitraje compartido"""
+        zona = timezone.get_current_timezone()
+        return (
+            'H',
+            self.habitacion_id,
+            timezone.make_aware(datetime.combine(self.fecha_ini_dt, dt_time.min), zona),
+            timezone.make_aware(datetime.combine(self.fecha_fin_dt, dt_time.min), zona),
+            None,
+        )
+    
     def __lt__(self, other):
         """Comparador: Mayor prioridad = se procesa primero"""
         if self.prioridad != other.prioridad:
@@ -67,7 +98,24 @@ class ColaReservasHotel:
     _lock = threading.Lock()
     
     # ⏱️ TIEMPO DE ESPERA para acumular solicitudes concurrentes (en segundos)
-    TIEMPO_BATCHING = 2.0  # Espera 2 segundos para acumular solicitudes
+    TIEMPO_BATCHING = 2.0  # Espera 2 segundos para acumular solicitudes (modo FIJO)
+    
+    # ⚙️ MODO DE BATCHING
+    # 'ADAPTATIVO': la ventana se cierra al instante si nadie compite por la habitación
+    #               y se extiende solo mientras sigan llegando solicitudes en conflicto
+    # 'FIJO': siempre espera TIEMPO_BATCHING (comportamiento original)
+    MODO_BATCHING = getattr(settings, 'RESERVAS_HOTEL_MODO_BATCHING', 'ADAPTATIVO')
+    TIEMPO_BATCHING_MAX = getattr(settings, 'RESERVAS_HOTEL_BATCHING_MAX', TIEMPO_BATCHING)
+    TIEMPO_BATCHING_EXTENSION = getattr(settings, 'RESERVAS_HOTEL_BATCHING_EXTENSION', 0.25)
+    
+    # 📊 Cantidad de esperas recientes guardadas para estadísticas
+    MAX_ESPERAS_REGISTRADAS = 200
+    
+    # 🧵 WORKERS: cada habitación se asigna siempre al mismo worker (habitacion_id % NUM_WORKERS),
+    # así la prioridad y los conflictos se resuelven dentro de la habitación y
+    # habitaciones distintas se procesan en paralelo
+    NUM_WORKERS = getattr(settings, 'RESERVAS_HOTEL_WORKERS', 4)
+    PROFUNDIDAD_COLA = getattr(settings, 'RESERVAS_HOTEL_PROFUNDIDAD_COLA', 100)  # 0 = sin límite
     
     def __new__(cls):
         if cls._instance is None:
@@ -78,13 +126,39 @@ class ColaReservasHotel:
         return cls._instance
     
     def _inicializar(self):
-        """Inicializa la cola y el worker thread"""
-        self.cola = queue.PriorityQueue()
+        """Inicializa una cola por worker y sus threads"""
+        self.num_workers = max(1, int(self.NUM_WORKERS))
+        self.colas = [queue.PriorityQueue(maxsize=self.PROFUNDIDAD_COLA) for _ in range(self.num_workers)]
         self.procesando = {}  # {habitacion_id: [lista de requests]}
+        # Avisa al worker cuando llega una nueva solicitud (comparte el lock de procesando)
+        self.llegadas = threading.Condition(self._lock)
+        self.esperas = deque(maxlen=self.MAX_ESPERAS_REGISTRADAS)
+        self.total_procesadas = 0
+        self.rechazadas_cola_llena = 0
+        # 🤝 Arbitraje entre procesos (MEMORIA por defecto = solo este proceso)
+        self.arbitraje = obtener_backend_arbitraje()
         self.worker_activo = True
-        self.worker_thread = threading.Thread(target=self._procesar_cola, daemon=True)
-        self.worker_thread.start()
-        print(f"🔄 Cola de reservas iniciada con batching de {self.TIEMPO_BATCHING}s")
+        self.worker_threads = []
+        for indice in range(self.num_workers):
+            worker = threading.Thread(
+                target=self._procesar_cola, args=(indice,),
+                name=f'cola-reservas-hotel-{indice}', daemon=True
+            )
+            worker.start()
+            self.worker_threads.append(worker)
+        # 📊 Pendientes por habitación, leído al exportar /api/metrics/
+        registrar_indicador(
+            'reservas_hotel_pendientes', 'Solicitudes de hotel pendientes por habitación',
+            ('habitacion',), self._pendientes_por_habitacion
+        )
+        if self.MODO_BATCHING == 'FIJO':
+            logger.info("🔄 Cola de reservas iniciada con %s workers y batching de %ss", self.num_workers, self.TIEMPO_BATCHING)
+        else:
+            logger.info("🔄 Cola de reservas iniciada con %s workers y batching adaptativo (máx %ss)", self.num_workers, self.TIEMPO_BATCHING_MAX)
+    
+    def _indice_worker(self, habitacion_id):
+        """Worker (y cola) responsable de una habitación"""
+        return int(habitacion_id) % self.num_workers
     
     def agregar_reserva(self, datos_reserva, datos_cliente, habitacion_id, empleado, administrador):
         """
@@ -95,16 +169,38 @@ class ColaReservasHotel:
         request = ReservaRequest(datos_reserva, datos_cliente, habitacion_id, empleado, administrador)
         
         # Agregar marca de tiempo de procesamiento (ahora + tiempo de batching)
-        request.tiempo_procesamiento = time.time() + self.TIEMPO_BATCHING
-        
-        self.cola.put(request)
+        # En modo ADAPTATIVO es solo el límite máximo de la ventana
+        if self.MODO_BATCHING == 'FIJO':
+            request.tiempo_procesamiento = request.tiempo_encolado + self.TIEMPO_BATCHING
+        else:
+            request.tiempo_procesamiento = request.tiempo_encolado + self.TIEMPO_BATCHING_MAX
         
-        with self._lock:
+        # Registrar antes de encolar para que el worker vea la solicitud como competidora
+        self.arbitraje.registrar(request)
+        with self.llegadas:
             if habitacion_id not in self.procesando:
                 self.procesando[habitacion_id] = []
             self.procesando[habitacion_id].append(request)
+            self.llegadas.notify_all()
         
-        print(f"📥 Solicitud agregada - Hab:{habitacion_id}, Prioridad:{request.prioridad}, Procesamiento en {self.TIEMPO_BATCHING}s")
+        indice = self._indice_worker(habitacion_id)
+        try:
+            self.colas[indice].put_nowait(request)
+        except queue.Full:
+            # 🚦 Cola del worker saturada: responder de inmediato en lugar de acumular esperas
+            with self._lock:
+                self.rechazadas_cola_llena += 1
+            request.resultado = {
+                'success': False,
+                'error': 'El sistema de reservas está saturado. Intente nuevamente en unos segundos.',
+                'codigo': 'COLA_LLENA'
+            }
+            self._limpiar_request(habitacion_id, request)
+            request.notificar()
+            logger.warning("🚦 Cola %s llena - Hab:%s rechazada", indice, habitacion_id)
+            return request
+        
+        logger.debug("📥 Solicitud agregada - Hab:%s, Prioridad:%s, Worker:%s, Modo:%s", habitacion_id, request.prioridad, indice, self.MODO_BATCHING)
         
         return request
     
@@ -117,39 +213,162 @@ class ColaReservasHotel:
         except OperationalError:
             connection.close()
     
-    def _procesar_cola(self):
-        """Worker thread que procesa las reservas de la cola CON BATCHING"""
+    def _procesar_cola(self, indice):
+        """Worker thread que procesa las reservas de SU cola CON BATCHING"""
+        cola = self.colas[indice]
         while self.worker_activo:
             try:
                 self._cerrar_conexion_vieja()
                 
                 # Obtener la reserva de mayor prioridad
-                request = self.cola.get(timeout=1)
+                request = cola.get(timeout=1)
                 
-                # ⏱️ ESPERAR hasta el tiempo de procesamiento (batching)
-                tiempo_actual = time.time()
-                if tiempo_actual < request.tiempo_procesamiento:
-                    tiempo_espera = request.tiempo_procesamiento - tiempo_actual
-                    print(f"⏳ Esperando {tiempo_espera:.2f}s para procesar solicitud con prioridad {request.prioridad}")
-                    time.sleep(tiempo_espera)
+                # Ya resuelta (rechazada por otra solicitud ganadora): no repetir el trabajo
+                if request.resultado is not None:
+                    self._limpiar_request(request.habitacion_id, request)
+                    cola.task_done()
+                    continue
+                
+                # ⏱️ ESPERAR la ventana de batching
+                if self.MODO_BATCHING == 'FIJO':
+                    tiempo_actual = time.time()
+                    if tiempo_actual < request.tiempo_procesamiento:
+                        tiempo_espera = request.tiempo_procesamiento - tiempo_actual
+                        logger.debug("⏳ Esperando %.2fs para procesar solicitud con prioridad %s", tiempo_espera, request.prioridad)
+                        time.sleep(tiempo_espera)
+                else:
+                    self._esperar_ventana_adaptativa([request])
+                
+                self._registrar_espera(request)
                 
                 # Procesar la reserva con análisis de conflictos
                 self._procesar_reserva_inteligente(request)
                 
-                self.cola.task_done()
+                cola.task_done()
                 
             except queue.Empty:
                 continue
             except Exception as e:
-                print(f"❌ Error procesando reserva: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Error procesando reserva: %s", e)
             finally:
                 try:
                     connection.close()
                 except:
                     pass
     
+    def _competidores_locales(self, request):
+        """Solicitudes pendientes de este proceso para la misma habitación con fechas solapadas (requiere el lock)"""
+        return [
+            req for req in self.procesando.get(request.habitacion_id, [])
+            if req is not request and req.resultado is None and request.tiene_conflicto(req)
+        ]
+    
+    def _obtener_competidores(self, request):
+        """Competidores locales + los de otros procesos si el arbitraje es compartido"""
+        with self._lock:
+            competidores = self._competidores_locales(request)
+        if self.arbitraje.compartido:
+            competidores += self.arbitraje.competidores(
+                request, excluir_tokens={req.token for req in competidores}
+            )
+        return competidores
+    
+    # ⏱️ Con arbitraje compartido las llegadas de otros procesos no despiertan al worker: se consultan cada intervalo
+    INTERVALO_SONDEO = 0.1
+    
+    def _contar_competidores(self, solicitudes):
+        return sum(len(self._obtener_competidores(request)) for request in solicitudes)
+    
+    def _esperar_ventana_adaptativa(self, solicitudes):
+        """
+        Ventana de batching adaptativa (una solicitud o todas las de un grupo):
+        - Sin competidores para las habitaciones → se procesa de inmediato
+        - Con competidores → espera TIEMPO_BATCHING_EXTENSION desde la última llegada
+          en conflicto, sin pasar de TIEMPO_BATCHING_MAX desde que se encoló
+        """
+        competidores = self._contar_competidores(solicitudes)
+        if competidores == 0:
+            return
+        
+        limite = min(request.tiempo_procesamiento for request in solicitudes)
+        cierre = min(limite, time.time() + self.TIEMPO_BATCHING_EXTENSION)
+        habitaciones = [request.habitacion_id for request in solicitudes]
+        logger.debug("⏳ %s solicitudes compiten por Hab:%s, abriendo ventana", competidores, habitaciones)
+        
+        while True:
+            restante = cierre - time.time()
+            if restante <= 0:
+                return
+            if self.arbitraje.compartido:
+                restante = min(restante, self.INTERVALO_SONDEO)
+            with self.llegadas:
+                self.llegadas.wait(restante)
+            
+            # Si llegó otra solicitud en conflicto, extender la ventana hasta el límite
+            nuevos = self._contar_competidores(solicitudes)
+            if nuevos > competidores:
+                cierre = min(limite, time.time() + self.TIEMPO_BATCHING_EXTENSION)
+            competidores = nuevos
+    
+    def _registrar_espera(self, request):
+        """Guarda el tiempo que la solicitud pasó en cola antes de procesarse"""
+        request.espera_cola = time.time() - request.tiempo_encolado
+        espera_cola.observar(request.espera_cola, cola='hotel')
+        with self._lock:
+            self.total_procesadas += 1
+            self.esperas.append({
+                'habitacion_id': request.habitacion_id,
+                'prioridad': request.prioridad,
+                'espera_ms': round(request.espera_cola * 1000, 1),
+                'encolada': datetime.fromtimestamp(request.tiempo_encolado).isoformat(timespec='milliseconds'),
+            })
+    
+    def _resumen_esperas(self):
+        """Resumen (ms) de las esperas recientes: promedio, p50, p95 y máximo (requiere el lock)"""
+        valores = sorted(e['espera_ms'] for e in self.esperas)
+        if not valores:
+            return {'muestras': 0, 'promedio_ms': None, 'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+        
+        def percentil(p):
+            return valores[min(len(valores) - 1, int(p * len(valores)))]
+        
+        return {
+            'muestras': len(valores),
+            'promedio_ms': round(sum(valores) / len(valores), 1),
+            'p50_ms': percentil(0.50),
+            'p95_ms': percentil(0.95),
+            'max_ms': valores[-1],
+        }
+    
+    def _es_mayor_prioridad(self, request, solicitudes_conflictivas):
+        """(True, None) si la solicitud gana a todas sus competidoras; si no (False, ganadora)"""
+        for req_conflictiva in solicitudes_conflictivas:
+            if getattr(req_conflictiva, 'aceptada', False):
+                # Otro proceso ya la está creando (o un grupo ya la creó): llegamos tarde
+                logger.debug("❌ Ya se aceptó una solicitud con prioridad %s", req_conflictiva.prioridad)
+                return False, req_conflictiva
+            if req_conflictiva.prioridad > request.prioridad:
+                logger.debug("❌ Encontrada mayor prioridad: %s > %s", req_conflictiva.prioridad, request.prioridad)
+                return False, req_conflictiva
+            elif req_conflictiva.prioridad == request.prioridad:
+                if req_conflictiva.timestamp < request.timestamp:
+                    logger.debug("⚖️ Misma prioridad, gana por timestamp (FIFO)")
+                    return False, req_conflictiva
+        return True, None
+    
+    def _resultado_rechazo_prioridad(self, request, solicitudes_conflictivas, solicitud_con_mayor_prioridad):
+        return {
+            'success': False,
+            'error': 'La habitacion no se encuentra disponible para las fechas solicitadas.',
+            'codigo': 'RECHAZADO_POR_PRIORIDAD',
+            'info_debug': {
+                'solicitudes_conflictivas': len(solicitudes_conflictivas),
+                'tu_prioridad': request.prioridad,
+                'prioridad_ganadora': solicitud_con_mayor_prioridad.prioridad if solicitud_con_mayor_prioridad else None,
+                'mensaje': f'Tu prioridad: {request.prioridad}. Otra solicitud tiene prioridad {solicitud_con_mayor_prioridad.prioridad if solicitud_con_mayor_prioridad else "N/A"}.'
+            }
+        }
+    
     def _procesar_reserva_inteligente(self, request):
         """
         Procesa solicitud verificando conflictos con solicitudes pendientes
@@ -161,55 +380,33 @@ class ColaReservasHotel:
             self._cerrar_conexion_vieja()
             
             # 1️⃣ Obtener TODAS las solicitudes pendientes con conflicto de fechas
-            solicitudes_conflictivas = []
-            with self._lock:
-                if habitacion_id in self.procesando:
-                    for req in self.procesando[habitacion_id]:
-                        if req != request and req.resultado is None:
-                            if request.tiene_conflicto_fechas(req):
-                                solicitudes_conflictivas.append(req)
+            # (incluye las de otros procesos si el arbitraje es compartido)
+            solicitudes_conflictivas = self._obtener_competidores(request)
             
-            print(f"🔍 Procesando solicitud Prioridad:{request.prioridad} - {len(solicitudes_conflictivas)} conflictos encontrados")
+            logger.debug("🔍 Procesando solicitud Prioridad:%s - %s conflictos encontrados", request.prioridad, len(solicitudes_conflictivas))
             
             # 2️⃣ Verificar si es la de MAYOR prioridad
-            es_mayor_prioridad = True
-            solicitud_con_mayor_prioridad = None
+            es_mayor_prioridad, solicitud_con_mayor_prioridad = self._es_mayor_prioridad(request, solicitudes_conflictivas)
             
-            for req_conflictiva in solicitudes_conflictivas:
-                if req_conflictiva.prioridad > request.prioridad:
-                    es_mayor_prioridad = False
-                    solicitud_con_mayor_prioridad = req_conflictiva
-                    print(f"❌ Encontrada mayor prioridad: {req_conflictiva.prioridad} > {request.prioridad}")
-                    break
-                elif req_conflictiva.prioridad == request.prioridad:
-                    if req_conflictiva.timestamp < request.timestamp:
-                        es_mayor_prioridad = False
-                        solicitud_con_mayor_prioridad = req_conflictiva
-                        print(f"⚖️ Misma prioridad, gana por timestamp (FIFO)")
-                        break
+            # Reclamar la victoria en el arbitraje compartido (otro proceso pudo habernos rechazado)
+            if es_mayor_prioridad and not self.arbitraje.aceptar(request):
+                es_mayor_prioridad = False
+                logger.debug("❌ Solicitud rechazada por un ganador de otro proceso")
             
             # 3️⃣ Si NO es la de mayor prioridad, rechazar
             if not es_mayor_prioridad:
-                request.resultado = {
-                    'success': False,
-                    'error': f'La habitacion no se encuentra disponible para las fechas solicitadas.',
-                    'codigo': 'RECHAZADO_POR_PRIORIDAD',
-                    'info_debug': {
-                        'solicitudes_conflictivas': len(solicitudes_conflictivas),
-                        'tu_prioridad': request.prioridad,
-                        'prioridad_ganadora': solicitud_con_mayor_prioridad.prioridad if solicitud_con_mayor_prioridad else None,
-                        'mensaje': f'Tu prioridad: {request.prioridad}. Otra solicitud tiene prioridad {solicitud_con_mayor_prioridad.prioridad if solicitud_con_mayor_prioridad else "N/A"}.'
-                    }
-                }
-                print(f"🚫 La habitacion no se encuentra disponible para las fechas solicitadas.")
-                request.evento.set()
+                request.resultado = self._resultado_rechazo_prioridad(
+                    request, solicitudes_conflictivas, solicitud_con_mayor_prioridad
+                )
+                logger.debug("🚫 Hab:%s rechazada por prioridad", habitacion_id)
+                request.notificar()
                 self._limpiar_request(habitacion_id, request)
                 return
             
             # 4️⃣ Si ES la de mayor prioridad, intentar procesar
-            print(f"✅ Solicitud tiene mayor prioridad, procesando...")
+            logger.debug("✅ Solicitud tiene mayor prioridad, procesando...")
             
-            with transaction.atomic():
+            with duracion_transaccion.medir(cola='hotel'), transaction.atomic():
                 habitacion = Habitacion.objects.select_for_update().get(pk=habitacion_id)
                 
                 fecha_ini = request.datos_reserva['fecha_ini']
@@ -230,7 +427,7 @@ class ColaReservasHotel:
                         'error': 'La habitación ya tiene una reserva confirmada para esas fechas',
                         'codigo': 'HABITACION_RESERVADA'
                     }
-                    print(f"⚠️ Conflicto con reserva existente en BD")
+                    logger.info("⚠️ Hab:%s: conflicto con reserva existente en BD", habitacion_id)
                 else:
                     # ✅ CREAR LA RESERVA
                     reservas_gen = ReservasGen.objects.create(
@@ -268,15 +465,16 @@ class ColaReservasHotel:
                         }
                     }
                     
-                    print(f"🎉 Reserva creada exitosamente - Prioridad: {request.prioridad}")
+                    logger.debug("🎉 Reserva creada exitosamente - Prioridad: %s", request.prioridad)
                     
-                    # 5️⃣ Rechazar solicitudes conflictivas
+                    # 5️⃣ Rechazar solicitudes conflictivas (locales y de otros procesos)
                     self._rechazar_solicitudes_conflictivas_especificas(
                         habitacion_id, 
                         request.fecha_ini_dt, 
                         request.fecha_fin_dt, 
                         request
                     )
+                    self.arbitraje.rechazar_competidores(request)
         
         except Exception as e:
             request.resultado = {
@@ -284,18 +482,194 @@ class ColaReservasHotel:
                 'error': f'Error al procesar la reserva: {str(e)}',
                 'codigo': 'ERROR_PROCESAMIENTO'
             }
-            print(f"💥 Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("💥 Error al procesar la reserva de Hab:%s: %s", habitacion_id, e)
         
         finally:
-            request.evento.set()
+            request.notificar()
             self._limpiar_request(habitacion_id, request)
             try:
                 connection.close()
             except:
                 pass
     
+    # ==============================================
+    # 🔹 RESERVAS DE GRUPO
+    # ==============================================
+    
+    def reservar_grupo(self, datos_reservas, datos_cliente, habitaciones_ids, empleado, administrador):
+        """
+        Reserva de grupo: una solicitud por habitación (datos_reservas[i] → habitaciones_ids[i]).
+        Las solicitudes se registran como competidoras igual que las individuales,
+        esperan UNA ventana de batching para todo el grupo, se arbitran con las mismas
+        reglas de prioridad y las ganadoras se crean con bulk_create en una sola transacción.
+        Corre en el thread del request (no ocupa los workers).
+        Returns:
+            list[ReservaRequest]: una por habitación, con su resultado
+        """
+        solicitudes = [
+            ReservaRequest(datos, datos_cliente, habitacion_id, empleado, administrador)
+            for datos, habitacion_id in zip(datos_reservas, habitaciones_ids)
+        ]
+        limite = self.TIEMPO_BATCHING if self.MODO_BATCHING == 'FIJO' else self.TIEMPO_BATCHING_MAX
+        for request in solicitudes:
+            request.tiempo_procesamiento = request.tiempo_encolado + limite
+            self.arbitraje.registrar(request)
+        with self.llegadas:
+            for request in solicitudes:
+                self.procesando.setdefault(request.habitacion_id, []).append(request)
+            self.llegadas.notify_all()
+        logger.debug("📥 Grupo de %s solicitudes agregado - Hab:%s", len(solicitudes), habitaciones_ids)
+        
+        try:
+            # ⏱️ Una sola ventana de batching para todo el grupo
+            if self.MODO_BATCHING == 'FIJO':
+                tiempo_espera = solicitudes[0].tiempo_procesamiento - time.time()
+                if tiempo_espera > 0:
+                    time.sleep(tiempo_espera)
+            else:
+                self._esperar_ventana_adaptativa(solicitudes)
+            
+            # 1️⃣ Arbitraje de prioridad por habitación (mismas reglas que las individuales)
+            ganadoras = []
+            for request in solicitudes:
+                self._registrar_espera(request)
+                if request.resultado is not None:
+                    continue  # Rechazada por una individual ganadora durante la ventana
+                competidores = self._obtener_competidores(request)
+                es_mayor_prioridad, ganadora = self._es_mayor_prioridad(request, competidores)
+                if es_mayor_prioridad and not self.arbitraje.aceptar(request):
+                    es_mayor_prioridad = False
+                if not es_mayor_prioridad:
+                    request.resultado = self._resultado_rechazo_prioridad(request, competidores, ganadora)
+                    continue
+                ganadoras.append((request, competidores))
+            
+            # 2️⃣ Crear todas las ganadoras en una transacción (marca `aceptada` solo las creadas)
+            if ganadoras:
+                self._crear_reservas_grupo(ganadoras, datos_cliente, empleado, administrador)
+        
+        except Exception as e:
+            logger.exception("💥 Error en reserva de grupo: %s", e)
+            for request in solicitudes:
+                if request.resultado is None or request.resultado.get('success'):
+                    request.resultado = {
+                        'success': False,
+                        'error': f'Error al procesar la reserva: {str(e)}',
+                        'codigo': 'ERROR_PROCESAMIENTO'
+                    }
+        
+        finally:
+            for request in solicitudes:
+                request.notificar()
+                self._limpiar_request(request.habitacion_id, request)
+        
+        return solicitudes
+    
+    def _crear_reservas_grupo(self, ganadoras, datos_cliente, empleado, administrador):
+        """bulk_create de ReservasGen + ReservaHotel para las solicitudes ganadoras de un grupo"""
+        ids = sorted({request.habitacion_id for request, _ in ganadoras})
+        
+        with duracion_transaccion.medir(cola='hotel'), transaction.atomic():
+            # Mismo orden de bloqueo que las individuales (por habitación) para no crear deadlocks
+            habitaciones = {
+                habitacion.id_habitacion: habitacion
+                for habitacion in Habitacion.objects.select_for_update().filter(pk__in=ids).order_by('pk')
+            }
+            
+            # Conflictos con reservas CONFIRMADAS en BD (una consulta para todo el grupo)
+            ocupadas = {
+                (habitacion_id, fecha_ini, fecha_fin)
+                for habitacion_id, fecha_ini, fecha_fin in ReservaHotel.objects.filter(
+                    habitacion_id__in=ids,
+                    estado__in=['A', 'ACTIVA', 'CONFIRMADA', 'P'],
+                    fecha_ini__lt=max(request.fecha_fin_dt for request, _ in ganadoras),
+                    fecha_fin__gt=min(request.fecha_ini_dt for request, _ in ganadoras)
+                ).values_list('habitacion_id', 'fecha_ini', 'fecha_fin')
+            }
+            
+            a_crear = []
+            for request, competidores in ganadoras:
+                conflicto = any(
+                    habitacion_id == request.habitacion_id and fecha_ini < request.fecha_fin_dt and fecha_fin > request.fecha_ini_dt
+                    for habitacion_id, fecha_ini, fecha_fin in ocupadas
+                )
+                if conflicto or request.habitacion_id not in habitaciones:
+                    request.resultado = {
+                        'success': False,
+                        'error': 'La habitación ya tiene una reserva confirmada para esas fechas',
+                        'codigo': 'HABITACION_RESERVADA'
+                    }
+                    continue
+                a_crear.append((request, competidores))
+            
+            if not a_crear:
+                return
+            
+            generales = self._crear_reservas_gen([
+                ReservasGen(tipo='H', pago=None, administrador=administrador, empleado=empleado)
+                for _ in a_crear
+            ])
+            reservas = [
+                ReservaHotel(
+                    cant_personas=request.datos_reserva['cant_personas'],
+                    amoblado=request.datos_reserva['amoblado'],
+                    baño_priv=request.datos_reserva['baño_priv'],
+                    fecha_ini=request.fecha_ini_dt,
+                    fecha_fin=request.fecha_fin_dt,
+                    estado=request.datos_reserva.get('estado', 'A'),
+                    reservas_gen=reservas_gen,
+                    datos_cliente=datos_cliente,
+                    habitacion=habitaciones[request.habitacion_id]
+                )
+                for (request, _), reservas_gen in zip(a_crear, generales)
+            ]
+            ReservaHotel.objects.bulk_create(reservas)
+            if reservas[0].pk is None:
+                # MySQL no devuelve los ids de un INSERT múltiple: se leen por reservas_gen
+                ids_reserva = dict(ReservaHotel.objects.filter(
+                    reservas_gen__in=generales
+                ).values_list('reservas_gen_id', 'id_reserva_hotel'))
+                for reserva in reservas:
+                    reserva.pk = ids_reserva[reserva.reservas_gen_id]
+            
+            # bulk_create no envía post_save: índice, versión y notificaciones se actualizan igual (ver signals.py)
+            for reserva in reservas:
+                post_save.send(sender=ReservaHotel, instance=reserva, created=True, update_fields=None, raw=False, using=reserva._state.db)
+            
+            for (request, competidores), reserva, reservas_gen in zip(a_crear, reservas, generales):
+                request.resultado = {
+                    'success': True,
+                    'reserva': reserva,
+                    'reserva_gen': reservas_gen,
+                    'habitacion': reserva.habitacion,
+                    'datos_cliente': datos_cliente,
+                    'info_competencia': {
+                        'solicitudes_rechazadas': len(competidores),
+                        'prioridad_ganadora': request.prioridad,
+                        'mensaje': f'✅ Reserva aceptada por mayor prioridad (valor: {request.prioridad})'
+                    }
+                }
+        
+        logger.debug("🎉 Reserva de grupo creada - %s habitaciones", len(a_crear))
+        
+        # 3️⃣ Rechazar solicitudes conflictivas (locales y de otros procesos)
+        for request, _ in a_crear:
+            # Ya confirmada: las individuales que lleguen ahora pierden contra esta.
+            # Antes del commit no se marca: si la creación falla, nadie perdió por ella
+            request.aceptada = True
+            self._rechazar_solicitudes_conflictivas_especificas(
+                request.habitacion_id, request.fecha_ini_dt, request.fecha_fin_dt, request
+            )
+            self.arbitraje.rechazar_competidores(request)
+    
+    def _crear_reservas_gen(self, generales):
+        """bulk_create de ReservasGen; sin ids devueltos por la BD (MySQL) se insertan una a una"""
+        if connection.features.can_return_rows_from_bulk_insert:
+            return ReservasGen.objects.bulk_create(generales)
+        for reservas_gen in generales:
+            reservas_gen.save()
+        return generales
+    
     def _rechazar_solicitudes_conflictivas_especificas(self, habitacion_id, fecha_ini, fecha_fin, request_aceptado):
         """Rechaza solicitudes con conflicto de fechas"""
         with self._lock:
@@ -305,7 +679,7 @@ class ColaReservasHotel:
                         if (req.fecha_ini_dt < fecha_fin and req.fecha_fin_dt > fecha_ini):
                             req.resultado = {
                                 'success': False,
-                                'error': f'La habitacion no se encuentra disponible para las fechas solicitadas.',
+                                'error': 'La habitacion no se encuentra disponible para las fechas solicitadas.',
                                 'codigo': 'RECHAZADO_POR_PRIORIDAD',
                                 'detalle': {
                                     'prioridad_ganadora': request_aceptado.prioridad,
@@ -313,32 +687,53 @@ class ColaReservasHotel:
                                     'diferencia_prioridad': request_aceptado.prioridad - req.prioridad
                                 }
                             }
-                            print(f"🚫La habitacion no se encuentra disponible para las fechas solicitadas.")
-                            req.evento.set()
+                            logger.debug("🚫 Hab:%s rechazada por prioridad %s", habitacion_id, request_aceptado.prioridad)
+                            req.notificar()
     
     def _limpiar_request(self, habitacion_id, request):
-        """Limpia un request de la lista de procesamiento"""
+        """Limpia un request de la lista de procesamiento (y del arbitraje compartido)"""
         with self._lock:
             if habitacion_id in self.procesando:
                 if request in self.procesando[habitacion_id]:
                     self.procesando[habitacion_id].remove(request)
                 if not self.procesando[habitacion_id]:
                     del self.procesando[habitacion_id]
+        try:
+            self.arbitraje.retirar(request)
+        except Exception as e:
+            logger.warning("⚠️ No se pudo retirar la solicitud del arbitraje: %s", e)
+    
+    def _pendientes_por_habitacion(self):
+        with self._lock:
+            return {(habitacion_id,): len(reqs) for habitacion_id, reqs in self.procesando.items()}
     
     def detener(self):
-        """Detiene el worker thread"""
+        """Detiene los worker threads"""
         self.worker_activo = False
-        if self.worker_thread.is_alive():
-            self.worker_thread.join(timeout=5)
+        for worker in self.worker_threads:
+            if worker.is_alive():
+                worker.join(timeout=5)
     
     def obtener_estadisticas(self):
         """Retorna estadísticas de la cola"""
         with self._lock:
             return {
-                'tamaño_cola': self.cola.qsize(),
+                'tamaño_cola': sum(cola.qsize() for cola in self.colas),
+                'workers': self.num_workers,
+                'profundidad_por_cola': self.PROFUNDIDAD_COLA,
+                'colas': [
+                    {'worker': i, 'tamaño': cola.qsize(), 'activo': self.worker_threads[i].is_alive()}
+                    for i, cola in enumerate(self.colas)
+                ],
+                'rechazadas_cola_llena': self.rechazadas_cola_llena,
                 'habitaciones_en_proceso': len(self.procesando),
                 'total_solicitudes_pendientes': sum(len(reqs) for reqs in self.procesando.values()),
-                'tiempo_batching': self.TIEMPO_BATCHING
+                'modo_batching': self.MODO_BATCHING,
+                'tiempo_batching': self.TIEMPO_BATCHING if self.MODO_BATCHING == 'FIJO' else self.TIEMPO_BATCHING_MAX,
+                'total_procesadas': self.total_procesadas,
+                'espera_cola': self._resumen_esperas(),
+                'arbitraje': self.arbitraje.nombre,
+                'ultimas_esperas': list(self.esperas)[-20:]
             }
 
 
@@ -0,0 +1,112 @@
+# ========================================
+# ARCHIVO: apps/reserva_hotel/signals.py
+# Mantiene al día el índice de disponibilidad, la versión del dominio, las notificaciones y la proyección de listados con cada escritura
+# ========================================
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ReservaHotel
+from .disponibilidad import indice_disponibilidad
+from .notificaciones import canal_notificaciones_hotel
+from .listado import sincronizar_listado, sincronizar_si_cambio, quitar_del_listado
+from apps.reservas_gen.models import ReservasGen
+from apps.reservas_gen.versiones import DOMINIO_HOTEL, incrementar_version
+from apps.datos_cliente.models import DatosCliente
+from apps.habitacion.models import Habitacion
+
+
+# 🔹 Reservas: creación, actualización, cancelación y salida pasan por save()
+@receiver(post_save, sender=ReservaHotel)
+def actualizar_indice_reserva(sender, instance, **kwargs):
+    datos = (
+        instance.id_reserva_hotel,
+        instance.habitacion_id,
+        instance.fecha_ini,
+        instance.fecha_fin,
+        instance.estado
+    )
+    # Solo se aplica si la transacción se confirma
+    transaction.on_commit(lambda: indice_disponibilidad.aplicar_reserva(*datos))
+
+
+@receiver(post_delete, sender=ReservaHotel)
+def quitar_reserva_indice(sender, instance, **kwargs):
+    id_reserva = instance.id_reserva_hotel
+    transaction.on_commit(lambda: indice_disponibilidad.quitar_reserva(id_reserva))
+
+
+# 🔹 Versión del dominio (tablero del día y ETag): creación, ingreso, salida y cancelación la incrementan
+@receiver(post_save, sender=ReservaHotel)
+@receiver(post_delete, sender=ReservaHotel)
+def incrementar_version_hotel(sender, instance, **kwargs):
+    transaction.on_commit(lambda: incrementar_version(DOMINIO_HOTEL))
+
+
+# 🔹 Canal de notificaciones (SSE): recalcula y envía las diferencias
+@receiver(post_save, sender=ReservaHotel)
+@receiver(post_delete, sender=ReservaHotel)
+def avisar_canal_notificaciones(sender, instance, **kwargs):
+    transaction.on_commit(canal_notificaciones_hotel.marcar_cambio)
+
+
+# 🔹 Habitaciones: características y estado (MANTENIMIENTO)
+@receiver(post_save, sender=Habitacion)
+def actualizar_indice_habitacion(sender, instance, **kwargs):
+    datos = (instance.id_habitacion, instance.amoblado, instance.baño_priv, instance.estado)
+    transaction.on_commit(lambda: indice_disponibilidad.aplicar_habitacion(*datos))
+
+
+@receiver(post_delete, sender=Habitacion)
+def quitar_habitacion_indice(sender, instance, **kwargs):
+    id_habitacion = instance.id_habitacion
+    transaction.on_commit(lambda: indice_disponibilidad.quitar_habitacion(id_habitacion))
+
+
+# 🔹 Proyección de listados (listado.py): se escribe en la MISMA transacción, no en on_commit
+@receiver(post_save, sender=ReservaHotel)
+def sincronizar_listado_reserva(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sincronizar_listado(pk=instance.pk)
+
+
+@receiver(post_delete, sender=ReservaHotel)
+def quitar_reserva_listado(sender, instance, **kwargs):
+    quitar_del_listado(instance.pk)
+
+
+# Un cliente, habitación o reserva general recién creados todavía no tienen reservas en la proyección
+@receiver(post_save, sender=DatosCliente)
+def sincronizar_listado_cliente(sender, instance, created, raw=False, **kwargs):
+    if not (created or raw):
+        sincronizar_si_cambio('datos_cliente_id', instance.pk, {
+            'cliente_nombre': instance.nombre,
+            'cliente_app_paterno': instance.app_paterno,
+            'cliente_app_materno': instance.app_materno,
+            'cliente_telefono': instance.telefono,
+            'cliente_ci': instance.ci,
+            'cliente_email': instance.email,
+        })
+
+
+@receiver(post_save, sender=Habitacion)
+def sincronizar_listado_habitacion(sender, instance, created, raw=False, **kwargs):
+    if not (created or raw):
+        sincronizar_si_cambio('habitacion_id', instance.pk, {
+            'habitacion_numero': instance.numero,
+            'habitacion_piso': instance.piso,
+            'habitacion_tipo': instance.tipo,
+            'habitacion_amoblado': instance.amoblado,
+            'habitacion_baño_priv': instance.baño_priv,
+        })
+
+
+@receiver(post_save, sender=ReservasGen)
+def sincronizar_listado_reserva_gen(sender, instance, created, raw=False, **kwargs):
+    # Solo las reservas generales de hotel (p. ej. al subir el comprobante cambia tiene_pago)
+    if not (created or raw) and instance.tipo == 'H':
+        sincronizar_si_cambio('reservas_gen_id', instance.pk, {
+            'reservas_gen_tiene_pago': instance.tiene_pago,
+            'administrador_id': instance.administrador_id,
+            'empleado_id': instance.empleado_id,
+        })
@@ -1,3 +1,855 @@
-from django.test import TestCase
+import json
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.administrador.models import Administrador
+from apps.datos_cliente.models import DatosCliente
+from apps.empleado.models import Empleado
+from apps.habitacion.models import Habitacion
+from apps.reservas_gen.catalogos import cache_catalogos
+from apps.reservas_gen.models import ReservasGen
+from apps.tarifa_hotel.models import TarifaHotel
+from apps.usuario.models import Usuario
+from LesEtoiles.perfilador_sql import PresupuestoSQLMixin
+
+from .disponibilidad import IntervalosHabitacion, indice_disponibilidad
+from .listado import CAMPOS_LISTA_HOTEL, ESTADO_HABITACION_PENDIENTE, codificar_fila, completar_fila_json
+from .models import ReservaHotel, ReservaHotelListado
+from .notificaciones import CanalNotificacionesHotel, ahora_bolivia
+from .queue_manager import ReservaRequest, gestor_cola
+
+
+def analizar_tablas(*tablas):
+    """Actualiza las estadísticas del optimizador para que elija índices con los datos sembrados"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f"ANALYZE TABLE {', '.join(tablas)}")
+            cursor.fetchall()
+        elif connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+
+
+class IndicesConsultasHotelTest(TestCase):
+    """
+    Regresión de planes de consulta: cada consulta frecuente de reserva_hotel
+    debe resolverse con su índice compuesto (ver Meta.indexes) y no con un
+    recorrido completo de la tabla.
+    """
+    HABITACIONES = 40
+    RESERVAS_POR_HABITACION = 60
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('indices', password='x')
+        usuario = Usuario.objects.create(
+            user=user, nombre='Test', ci=1, telefono=1, email='t@t.com',
+            password='x', estado='A', rol='administrador'
+        )
+        empleado = Empleado.objects.create(cod_empleado='E1', usuario=usuario)
+        administrador = Administrador.objects.create(cod_admi='A1', usuario=usuario)
+        tarifa = TarifaHotel.objects.create(
+            nombre='Simple', descripcion='d', amoblado='N', baño_priv='N', precio_persona=10
+        )
+        cliente = DatosCliente.objects.create(nombre='Cliente', telefono=1, ci=1, email='c@c.com')
+        habitaciones = Habitacion.objects.bulk_create([
+            Habitacion(numero=str(i), piso=1, tipo='Simple', amoblado='N', baño_priv='N', tarifa_hotel=tarifa)
+            for i in range(cls.HABITACIONES)
+        ])
+
+        total = cls.HABITACIONES * cls.RESERVAS_POR_HABITACION
+        ReservasGen.objects.bulk_create([
+            ReservasGen(tipo='H', administrador=administrador, empleado=empleado) for _ in range(total)
+        ])
+        generales = list(ReservasGen.objects.order_by('id_reservas_gen'))
+
+        # Historial: la mayoría finalizadas o canceladas, pocas activas (como en producción)
+        inicio = date(2024, 1, 1)
+        reservas = []
+        for h, habitacion in enumerate(habitaciones):
+            for r in range(cls.RESERVAS_POR_HABITACION):
+                fecha_ini = inicio + timedelta(days=r * 7 + h % 7)
+                estado = 'A' if r >= cls.RESERVAS_POR_HABITACION - 2 else ('C' if r % 5 == 0 else 'F')
+                check_in = None
+                check_out = None
+                if estado == 'F':
+                    check_in = datetime.combine(fecha_ini, datetime.min.time(), tzinfo=dt_timezone.utc)
+                    check_out = check_in + timedelta(days=3)
+                reservas.append(ReservaHotel(
+                    cant_personas=2, amoblado='N', baño_priv='N',
+                    fecha_ini=fecha_ini, fecha_fin=fecha_ini + timedelta(days=3),
+                    estado=estado, check_in=check_in, check_out=check_out,
+                    reservas_gen=generales[len(reservas)], datos_cliente=cliente, habitacion=habitacion
+                ))
+        ReservaHotel.objects.bulk_create(reservas, batch_size=500)
+        cls.habitacion = habitaciones[0]
+        cls.hoy = inicio + timedelta(days=(cls.RESERVAS_POR_HABITACION - 1) * 7)
+        analizar_tablas('reserva_hotel')
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan, f"La consulta no usa {indice}. Plan:\n{plan}")
+
+    def test_solapamiento_por_habitacion(self):
+        # queue_manager / actualizar_reserva_hotel / índice de disponibilidad
+        queryset = ReservaHotel.objects.filter(
+            habitacion=self.habitacion,
+            estado__in=['A', 'P'],
+            fecha_ini__lt=self.hoy + timedelta(days=5),
+            fecha_fin__gt=self.hoy
+        )
+        self.assertUsaIndice(queryset, 'rh_hab_estado_fechas_idx')
+
+    def test_ingresos_pendientes(self):
+        # obtener_notificaciones_hotel: reservas que inician hoy sin ingreso
+        queryset = ReservaHotel.objects.filter(estado='A', fecha_ini=self.hoy, check_in__isnull=True)
+        self.assertUsaIndice(queryset, 'rh_estado_ini_checkin_idx')
+
+    def test_proximas_reservas(self):
+        # obtener_notificaciones_hotel / estadisticas_hotel_hoy: próxima reserva a iniciar
+        queryset = ReservaHotel.objects.filter(
+            estado='A', fecha_ini__gt=self.hoy, fecha_ini__lte=self.hoy + timedelta(days=7), check_in__isnull=True
+        ).order_by('fecha_ini')
+        self.assertUsaIndice(queryset, 'rh_estado_ini_checkin_idx')
+
+    def test_huespedes_actuales(self):
+        # estadisticas_hotel_hoy: con ingreso y sin salida
+        queryset = ReservaHotel.objects.filter(estado='A', check_in__isnull=False, check_out__isnull=True)
+        self.assertUsaIndice(queryset, 'rh_estado_checkin_out_idx')
+
+
+class PresupuestoConsultasHotelTest(PresupuestoSQLMixin, TestCase):
+    """Cantidad de consultas por vista: una regresión N+1 hace fallar el test"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('presupuesto', password='x')
+        usuario = Usuario.objects.create(
+            user=user, nombre='Test', ci=1, telefono=1, email='t@t.com',
+            password='x', estado='A', rol='administrador'
+        )
+        empleado = Empleado.objects.create(cod_empleado='E1', usuario=usuario)
+        administrador = Administrador.objects.create(cod_admi='A1', usuario=usuario)
+        tarifa = TarifaHotel.objects.create(
+            nombre='Simple', descripcion='d', amoblado='N', baño_priv='N', precio_persona=10
+        )
+        for i in range(5):
+            habitacion = Habitacion.objects.create(
+                numero=str(i), piso=1, tipo='Simple', amoblado='N', baño_priv='N', tarifa_hotel=tarifa
+            )
+            cliente = DatosCliente.objects.create(nombre=f'Cliente {i}', telefono=1, ci=i, email='c@c.com')
+            ReservaHotel.objects.create(
+                cant_personas=2, amoblado='N', baño_priv='N',
+                fecha_ini=date(2024, 1, 1 + i), fecha_fin=date(2024, 1, 3 + i), estado='A',
+                reservas_gen=ReservasGen.objects.create(tipo='H', administrador=administrador, empleado=empleado),
+                datos_cliente=cliente, habitacion=habitacion
+            )
+
+    def test_lista_reservas_hotel(self):
+        # Todos los campos (cliente, habitación, tarifa, empleado...) salen de un solo values();
+        # el estado de la habitación, del catálogo (una consulta solo si está frío)
+        cache_catalogos.invalidar()
+        with self.assertPresupuestoSQL(2):
+            respuesta = self.client.get('/api/reservaHotel/reservas/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['count'], 5)
+        with self.assertPresupuestoSQL(1):
+            self.client.get('/api/reservaHotel/reservas/')
+
+    def test_listados_desde_proyeccion(self):
+        # Cada listado lee solo reserva_hotel_listado (por cliente además valida el cliente)
+        for url in ('/api/reservaHotel/reservas/estado/A/', '/api/reservaHotel/canceladas/',
+                    '/api/reservaHotel/finalizadas/', '/api/reservaHotel/pendientes-check-in/',
+                    '/api/reservaHotel/pendientes-check-out/'):
+            with self.assertPresupuestoSQL(1):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        cliente = DatosCliente.objects.get(ci=2)
+        with self.assertPresupuestoSQL(2):
+            respuesta = self.client.get(f'/api/reservaHotel/reservas/cliente/{cliente.pk}/')
+        self.assertEqual(respuesta.json()['reservas'][0]['fecha_ini'], '2024-01-03')
+
+        # Los fragmentos pre-codificados son exactamente la respuesta armada campo por campo
+        completa = self.client.get('/api/reservaHotel/reservas/?limite=3')
+        por_campos = self.client.get('/api/reservaHotel/reservas/?limite=3&fields=' + ','.join(CAMPOS_LISTA_HOTEL))
+        self.assertEqual(completa.content, por_campos.content)
+
+    def test_proyeccion_sigue_las_escrituras(self):
+        cliente = DatosCliente.objects.get(ci=4)
+        cliente.nombre = 'Renombrado'
+        cliente.save()
+        habitacion = Habitacion.objects.get(numero='4')
+        habitacion.numero = '404'
+        habitacion.save()
+        reserva = ReservaHotel.objects.get(datos_cliente=cliente)
+        reserva.estado = 'C'
+        reserva.save()
+
+        fila = self.client.get('/api/reservaHotel/reservas/?limite=1').json()['reservas'][0]
+        self.assertEqual(fila['datos_cliente']['nombre'], 'Renombrado')
+        self.assertEqual(fila['habitacion']['numero'], '404')
+        self.assertEqual(fila['estado'], 'C')
+
+        # Un ingreso cambia el estado de la habitación sin reescribir su historial en la proyección
+        fragmento = ReservaHotelListado.objects.get(pk=reserva.pk).fila_json
+        with self.captureOnCommitCallbacks(execute=True):
+            habitacion.estado = 'OCUPADA'
+            with self.assertPresupuestoSQL(2):  # UPDATE de la habitación + la fila de muestra de sincronizar_si_cambio
+                habitacion.save()
+        self.assertEqual(ReservaHotelListado.objects.get(pk=reserva.pk).fila_json, fragmento)
+        for url in ('/api/reservaHotel/reservas/?limite=1', '/api/reservaHotel/reservas/?limite=1&fields=habitacion'):
+            self.assertEqual(self.client.get(url).json()['reservas'][0]['habitacion']['estado'], 'OCUPADA')
+
+        reserva.delete()
+        self.assertEqual(self.client.get('/api/reservaHotel/reservas/').json()['count'], 4)
+
+    def test_habitaciones_disponibles_desde_catalogo(self):
+        cache_catalogos.invalidar()
+        self.client.get('/api/reservaHotel/habitaciones/disponibles/')
+        with self.assertPresupuestoSQL(0):
+            respuesta = self.client.get('/api/reservaHotel/habitaciones/disponibles/')
+        self.assertEqual(respuesta.json()['count'], 5)
+
+        # Guardar una habitación invalida el catálogo al confirmar la transacción
+        habitacion = Habitacion.objects.first()
+        habitacion.estado = 'MANTENIMIENTO'
+        with self.captureOnCommitCallbacks(execute=True):
+            habitacion.save()
+        self.assertEqual(self.client.get('/api/reservaHotel/habitaciones/disponibles/').json()['count'], 4)
+
+    def test_calendario_ocupacion(self):
+        cache.clear()
+        cache_catalogos.invalidar()
+        url = '/api/reservaHotel/calendario/?fecha_desde=2023-12-30&dias=10'
+        # Una sola consulta por rango para los dos meses (dic y ene) + el catálogo de habitaciones
+        with self.assertPresupuestoSQL(2):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['hasta'], '2024-01-09')
+        self.assertEqual(datos['habitaciones'][0]['ocupacion'], '0011000000')
+        self.assertEqual(datos['ocupadas_por_dia'], [0, 0, 1, 2, 2, 2, 2, 1, 0, 0])
+
+        with self.assertPresupuestoSQL(0):
+            respuesta = self.client.get(url + '&formato=rangos')
+        self.assertEqual(respuesta.json()['habitaciones'][1]['ocupacion'], [['2024-01-02', '2024-01-04']])
+
+    def test_busqueda_con_alternativas(self):
+        indice_disponibilidad.cargar()
+        cache_catalogos.obtener('habitaciones')
+        # Habitación i ocupada del 1+i al 3+i de enero: la 4 queda libre del 2 al 4 con el hueco más chico
+        with self.assertPresupuestoSQL(0):
+            respuesta = self.client.get('/api/reservaHotel/buscar/?fecha_ini=2024-01-02&fecha_fin=2024-01-04&cant_personas=2')
+        datos = respuesta.json()
+        self.assertTrue(datos['disponible'])
+        self.assertEqual(datos['habitacion']['numero'], '3')
+        self.assertEqual(datos['habitacion']['total'], 40)
+
+        # Del 1 al 7 ninguna está libre: fechas corridas o dos habitaciones (la que sigue libre más tiempo primero)
+        datos = self.client.get('/api/reservaHotel/buscar/?fecha_ini=2024-01-01&fecha_fin=2024-01-07&cant_personas=2').json()
+        self.assertFalse(datos['disponible'])
+        self.assertEqual(datos['alternativas'][0]['tipo_alternativa'], 'otras_fechas')
+        self.assertEqual(datos['alternativas'][0]['desplazamiento_dias'], 2)
+        dividida = datos['alternativas'][-1]
+        self.assertEqual(dividida['tipo_alternativa'], 'estadia_dividida')
+        self.assertEqual(
+            [(tramo['numero'], tramo['fecha_ini'], tramo['fecha_fin']) for tramo in dividida['tramos']],
+            [('4', '2024-01-01', '2024-01-05'), ('0', '2024-01-05', '2024-01-07')]
+        )
+        self.assertEqual(dividida['total'], 120)
+
+
+def crear_personal(nombre):
+    """Usuario + empleado + administrador (los usa el registro de reservas)"""
+    user = User.objects.create_user(nombre, password='x')
+    usuario = Usuario.objects.create(
+        user=user, nombre='Test', ci=1, telefono=1, email='t@t.com',
+        password='x', estado='A', rol='administrador'
+    )
+    return (
+        Empleado.objects.create(cod_empleado='E1', usuario=usuario),
+        Administrador.objects.create(cod_admi='A1', usuario=usuario)
+    )
+
+
+def crear_habitaciones(cantidad):
+    tarifa = TarifaHotel.objects.create(
+        nombre='Simple', descripcion='d', amoblado='N', baño_priv='N', precio_persona=10
+    )
+    return [
+        Habitacion.objects.create(numero=str(i), piso=1, tipo='Simple', amoblado='N', baño_priv='N', tarifa_hotel=tarifa)
+        for i in range(cantidad)
+    ]
+
+
+class IndiceDisponibilidadTest(PresupuestoSQLMixin, TestCase):
+    """Índice de intervalos: consultas, señales, recarga y confirmación en la BD"""
+
+    ENERO_1 = date(2024, 1, 1)
+    ENERO_3 = date(2024, 1, 3)
+
+    @classmethod
+    def setUpTestData(cls):
+        empleado, administrador = crear_personal('indice')
+        cls.habitaciones = crear_habitaciones(2)
+        cls.cliente = DatosCliente.objects.create(nombre='Cliente', telefono=1, ci=1, email='c@c.com')
+        cls.generales = [
+            ReservasGen.objects.create(tipo='H', administrador=administrador, empleado=empleado) for _ in range(3)
+        ]
+        # Las dos habitaciones ocupadas del 1 al 3 de enero
+        for habitacion, reservas_gen in zip(cls.habitaciones, cls.generales):
+            cls.crear_reserva(habitacion, reservas_gen)
+
+    @classmethod
+    def crear_reserva(cls, habitacion, reservas_gen, estado='A'):
+        return ReservaHotel.objects.create(
+            cant_personas=2, amoblado='N', baño_priv='N', fecha_ini=cls.ENERO_1, fecha_fin=cls.ENERO_3,
+            estado=estado, reservas_gen=reservas_gen, datos_cliente=cls.cliente, habitacion=habitacion
+        )
+
+    def setUp(self):
+        indice_disponibilidad.cargar()
+
+    def libre(self, **kwargs):
+        return indice_disponibilidad.buscar_habitacion_libre('N', 'N', self.ENERO_1, self.ENERO_3, **kwargs)
+
+    def test_intervalos_habitacion(self):
+        intervalos = IntervalosHabitacion()
+        intervalos.agregar(1, date(2024, 1, 10), date(2024, 1, 20))
+        intervalos.agregar(2, date(2024, 1, 1), date(2024, 1, 5))
+        self.assertTrue(intervalos.tiene_conflicto(date(2024, 1, 4), date(2024, 1, 6)))
+        # [ini, fin): la salida de una reserva es el ingreso de la siguiente
+        self.assertFalse(intervalos.tiene_conflicto(date(2024, 1, 5), date(2024, 1, 10)))
+        self.assertFalse(intervalos.tiene_conflicto(date(2024, 1, 12), date(2024, 1, 14), excluir_reserva_id=1))
+        self.assertEqual(
+            intervalos.huecos(date(2024, 1, 1), date(2024, 1, 31)),
+            [(date(2024, 1, 5), date(2024, 1, 10)), (date(2024, 1, 20), date(2024, 1, 31))]
+        )
+        self.assertTrue(intervalos.quitar(1))
+        self.assertFalse(intervalos.tiene_conflicto(date(2024, 1, 12), date(2024, 1, 14)))
+        self.assertEqual(len(intervalos), 1)
+
+    def test_senales_mantienen_el_indice(self):
+        reserva = ReservaHotel.objects.get(habitacion=self.habitaciones[1])
+        self.assertIsNone(self.libre())
+        self.assertEqual(self.libre(excluir_reserva_id=reserva.pk), self.habitaciones[1].pk)
+
+        # Cancelar libera la habitación al confirmar la transacción
+        reserva.estado = 'C'
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.save()
+        self.assertEqual(self.libre(), self.habitaciones[1].pk)
+
+        # En mantenimiento deja de ser candidata
+        habitacion = self.habitaciones[1]
+        habitacion.estado = 'MANTENIMIENTO'
+        with self.captureOnCommitCallbacks(execute=True):
+            habitacion.save()
+        self.assertIsNone(self.libre())
+        self.assertEqual(indice_disponibilidad.habitaciones_candidatas('N', 'N'), [self.habitaciones[0].pk])
+
+        # Borrar la reserva la quita del índice
+        reserva = ReservaHotel.objects.get(habitacion=self.habitaciones[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.delete()
+        self.assertEqual(self.libre(), self.habitaciones[0].pk)
+
+    def test_recarga_periodica(self):
+        # update() no envía señales (como una escritura de otro proceso)
+        ReservaHotel.objects.filter(habitacion=self.habitaciones[0]).update(estado='C')
+        self.assertIsNone(self.libre())
+        indice_disponibilidad.cargado_en -= indice_disponibilidad.TIEMPO_RECARGA + 1
+        self.assertEqual(self.libre(), self.habitaciones[0].pk)
+        self.assertTrue(indice_disponibilidad.verificar_consistencia()['consistente'])
+
+    def test_confirma_en_bd_lo_que_el_indice_no_vio(self):
+        # Otro proceso canceló: el índice no encuentra habitación, la BD sí (una consulta) y el índice se recarga
+        ReservaHotel.objects.filter(habitacion=self.habitaciones[0]).update(estado='C')
+        with self.assertPresupuestoSQL(1):
+            habitacion_id = indice_disponibilidad.elegir_habitacion_libre('N', 'N', self.ENERO_1, self.ENERO_3)
+        self.assertEqual(habitacion_id, self.habitaciones[0].pk)
+        self.assertIsNone(indice_disponibilidad.cargado_en)
+        self.assertEqual(self.libre(), self.habitaciones[0].pk)
+
+        # Otro proceso la volvió a ocupar: con confirmar=True la elegida se valida en la BD
+        ReservaHotel.objects.filter(habitacion=self.habitaciones[0]).update(estado='A')
+        with self.assertPresupuestoSQL(2):
+            habitacion_id = indice_disponibilidad.elegir_habitacion_libre(
+                'N', 'N', self.ENERO_1, self.ENERO_3, confirmar=True
+            )
+        self.assertIsNone(habitacion_id)
+        # Sin contradicción con la BD no hay consultas
+        indice_disponibilidad.cargar()
+        with self.assertPresupuestoSQL(0):
+            self.assertIsNone(self.libre())
+
+
+class RegistroReservaHotelTest(TransactionTestCase):
+    """Registro a través de la cola (los workers usan sus propias conexiones: sin transacción envolvente)"""
+
+    def setUp(self):
+        self.empleado, self.administrador = crear_personal('registro')
+        self.habitaciones = crear_habitaciones(2)
+        indice_disponibilidad.cargar()
+
+    def registrar(self, **extra):
+        datos = {
+            'nombre': 'Cliente', 'app_paterno': 'Uno', 'telefono': 1, 'ci': 1, 'email': 'c@c.com',
+            'cant_personas': 2, 'amoblado': 'N', 'baño_priv': 'N',
+            'fecha_ini': '2024-01-01', 'fecha_fin': '2024-01-03', **extra
+        }
+        return self.client.post('/api/reservaHotel/registrar/', datos, content_type='application/json')
+
+    def test_reintenta_si_otro_proceso_reservo_la_habitacion(self):
+        # Reserva de otro proceso: bulk_create no envía señales, el índice da la habitación 0 por libre
+        cliente = DatosCliente.objects.create(nombre='Otro', telefono=2, ci=2, email='o@o.com')
+        ReservaHotel.objects.bulk_create([ReservaHotel(
+            cant_personas=1, amoblado='N', baño_priv='N',
+            fecha_ini=date(2024, 1, 2), fecha_fin=date(2024, 1, 4), estado='A',
+            reservas_gen=ReservasGen.objects.create(tipo='H', administrador=self.administrador, empleado=self.empleado),
+            datos_cliente=cliente, habitacion=self.habitaciones[0]
+        )])
+        respuesta = self.registrar()
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        self.assertEqual(respuesta.json()['habitacion_id'], self.habitaciones[1].pk)
+
+        # El índice ya se recargó: sin habitaciones libres responde 404 con alternativas
+        respuesta = self.registrar(ci=3)
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertIn('alternativas', respuesta.json())
+
+
+class VentanaBatchingHotelTest(SimpleTestCase):
+    """Ventana adaptativa de la cola: solo espera si hay competidores por la habitación"""
+
+    HABITACION = 9001  # Fuera del rango de los otros tests: la cola es un singleton compartido
+
+    def solicitud(self, fecha_ini='2024-01-01', fecha_fin='2024-01-03', cant_personas=2, limite=0.3):
+        request = ReservaRequest(
+            {'cant_personas': cant_personas, 'amoblado': 'N', 'baño_priv': 'N',
+             'fecha_ini': fecha_ini, 'fecha_fin': fecha_fin},
+            None, self.HABITACION, None, None
+        )
+        request.tiempo_procesamiento = request.tiempo_encolado + limite
+        return request
+
+    def pendiente(self, request):
+        with gestor_cola.llegadas:
+            gestor_cola.procesando.setdefault(self.HABITACION, []).append(request)
+            gestor_cola.llegadas.notify_all()
+        self.addCleanup(gestor_cola._limpiar_request, self.HABITACION, request)
+
+    def medir_ventana(self, request):
+        inicio = time.monotonic()
+        gestor_cola._esperar_ventana_adaptativa([request])
+        return time.monotonic() - inicio
+
+    def test_sin_competidores_no_espera(self):
+        request = self.solicitud()
+        self.pendiente(request)
+        # Otra habitación o fechas sin solape no compiten
+        self.pendiente(self.solicitud(fecha_ini='2024-01-03', fecha_fin='2024-01-05'))
+        self.assertLess(self.medir_ventana(request), 0.05)
+
+    @mock.patch.object(gestor_cola, 'TIEMPO_BATCHING_EXTENSION', 0.1)
+    def test_competidor_abre_ventana_y_llegadas_la_extienden(self):
+        request = self.solicitud(limite=1.0)
+        self.pendiente(request)
+        self.pendiente(self.solicitud())
+        self.assertGreaterEqual(self.medir_ventana(request), 0.09)
+
+        # Un competidor nuevo a los 0.06s extiende el cierre a ~0.16s
+        request = self.solicitud(limite=1.0)
+        self.pendiente(request)
+        self.pendiente(self.solicitud())
+        llegada = threading.Timer(0.06, self.pendiente, [self.solicitud(fecha_ini='2023-12-31')])
+        llegada.start()
+        self.addCleanup(llegada.cancel)
+        espera = self.medir_ventana(request)
+        self.assertGreaterEqual(espera, 0.15)
+        self.assertLess(espera, 1.0)
+
+    @mock.patch.object(gestor_cola, 'TIEMPO_BATCHING_EXTENSION', 5.0)
+    def test_ventana_no_pasa_del_limite(self):
+        request = self.solicitud(limite=0.2)
+        self.pendiente(request)
+        self.pendiente(self.solicitud())
+        espera = self.medir_ventana(request)
+        self.assertGreaterEqual(espera, 0.15)
+        self.assertLess(espera, 1.0)
+
+    def test_prioridad(self):
+        # Estadía más larga gana; a igual prioridad, la primera en llegar
+        larga = self.solicitud(fecha_fin='2024-01-05')
+        corta = self.solicitud()
+        self.assertEqual(gestor_cola._es_mayor_prioridad(larga, [corta]), (True, None))
+        self.assertEqual(gestor_cola._es_mayor_prioridad(corta, [larga]), (False, larga))
+        tardia = self.solicitud()
+        tardia.timestamp = corta.timestamp + timedelta(seconds=1)
+        self.assertEqual(gestor_cola._es_mayor_prioridad(tardia, [corta]), (False, corta))
+
+
+class RepartoColaHotelTest(SimpleTestCase):
+    """Cada habitación va siempre al mismo worker; una cola saturada responde al instante"""
+
+    def test_habitacion_a_worker(self):
+        workers = gestor_cola.num_workers
+        self.assertEqual(
+            [gestor_cola._indice_worker(habitacion_id) for habitacion_id in range(2 * workers)],
+            list(range(workers)) * 2
+        )
+        self.assertEqual(gestor_cola._indice_worker('7'), 7 % workers)
+
+    def test_cola_llena_rechaza_sin_esperar(self):
+        habitacion_id = 9101
+        indice = gestor_cola._indice_worker(habitacion_id)
+        # El worker ya tomó la referencia a su cola: esta queda llena y nadie la consume
+        llena = queue.PriorityQueue(maxsize=1)
+        llena.put_nowait(object())
+        original = gestor_cola.colas[indice]
+        gestor_cola.colas[indice] = llena
+        self.addCleanup(gestor_cola.colas.__setitem__, indice, original)
+
+        rechazadas = gestor_cola.obtener_estadisticas()['rechazadas_cola_llena']
+        request = gestor_cola.agregar_reserva(
+            {'cant_personas': 2, 'amoblado': 'N', 'baño_priv': 'N',
+             'fecha_ini': '2024-01-01', 'fecha_fin': '2024-01-03'},
+            None, habitacion_id, None, None
+        )
+        self.assertTrue(request.evento.is_set())
+        self.assertEqual(request.resultado['codigo'], 'COLA_LLENA')
+        self.assertNotIn(habitacion_id, gestor_cola.procesando)
+        self.assertEqual(gestor_cola.obtener_estadisticas()['rechazadas_cola_llena'], rechazadas + 1)
+
+
+class ReservaGrupoHotelTest(TransactionTestCase):
+    """Reserva de grupo con aceptación parcial: solo las habitaciones creadas ganan a las competidoras"""
+
+    def setUp(self):
+        self.empleado, self.administrador = crear_personal('grupo')
+        self.habitaciones = crear_habitaciones(2)
+        self.cliente = DatosCliente.objects.create(nombre='Cliente', telefono=1, ci=1, email='c@c.com')
+        # Una ventana sin esperas: el arbitraje de prioridad no depende del tiempo
+        ventana = mock.patch.object(gestor_cola, '_esperar_ventana_adaptativa')
+        ventana.start()
+        self.addCleanup(ventana.stop)
+
+    def datos(self, cant_personas):
+        return {'cant_personas': cant_personas, 'amoblado': 'N', 'baño_priv': 'N',
+                'fecha_ini': '2024-01-01', 'fecha_fin': '2024-01-03'}
+
+    def competidora(self, habitacion):
+        """Individual pendiente en la cola con menor prioridad que el grupo"""
+        request = ReservaRequest(self.datos(1), self.cliente, habitacion.pk, self.empleado, self.administrador)
+        with gestor_cola.llegadas:
+            gestor_cola.procesando.setdefault(habitacion.pk, []).append(request)
+        self.addCleanup(gestor_cola._limpiar_request, habitacion.pk, request)
+        return request
+
+    def reservar_grupo(self):
+        return gestor_cola.reservar_grupo(
+            [self.datos(4), self.datos(4)], self.cliente, [h.pk for h in self.habitaciones],
+            self.empleado, self.administrador
+        )
+
+    def test_aceptacion_parcial(self):
+        # Otro proceso ya reservó la habitación 1 (bulk_create: sin señales)
+        ReservaHotel.objects.bulk_create([ReservaHotel(
+            cant_personas=1, amoblado='N', baño_priv='N', fecha_ini=date(2024, 1, 2), fecha_fin=date(2024, 1, 4),
+            estado='A', datos_cliente=self.cliente, habitacion=self.habitaciones[1],
+            reservas_gen=ReservasGen.objects.create(tipo='H', administrador=self.administrador, empleado=self.empleado)
+        )])
+        competidoras = [self.competidora(habitacion) for habitacion in self.habitaciones]
+
+        marcadas = []
+        crear = gestor_cola._crear_reservas_grupo
+
+        def crear_y_observar(ganadoras, *args):
+            # Mientras se crea, ninguna figura como aceptada frente a las individuales
+            marcadas.extend(getattr(request, 'aceptada', False) for request, _ in ganadoras)
+            return crear(ganadoras, *args)
+
+        with mock.patch.object(gestor_cola, '_crear_reservas_grupo', side_effect=crear_y_observar):
+            creada, rechazada = self.reservar_grupo()
+
+        self.assertEqual(marcadas, [False, False])
+        self.assertTrue(creada.resultado['success'])
+        self.assertTrue(creada.aceptada)
+        self.assertEqual(rechazada.resultado['codigo'], 'HABITACION_RESERVADA')
+        self.assertFalse(getattr(rechazada, 'aceptada', False))
+        self.assertEqual(ReservaHotel.objects.filter(habitacion=self.habitaciones[0]).count(), 1)
+
+        # Pierde solo la competidora de la habitación creada; la otra sigue en carrera
+        self.assertEqual(competidoras[0].resultado['codigo'], 'RECHAZADO_POR_PRIORIDAD')
+        self.assertIsNone(competidoras[1].resultado)
+
+    def test_error_al_crear_no_rechaza_competidoras(self):
+        competidora = self.competidora(self.habitaciones[0])
+        with mock.patch.object(ReservaHotel.objects, 'bulk_create', side_effect=RuntimeError('BD caída')), \
+                self.assertLogs('apps.reserva_hotel.queue_manager', 'ERROR'):
+            solicitudes = self.reservar_grupo()
+
+        self.assertEqual([r.resultado['codigo'] for r in solicitudes], ['ERROR_PROCESAMIENTO'] * 2)
+        self.assertFalse(any(getattr(r, 'aceptada', False) for r in solicitudes))
+        self.assertIsNone(competidora.resultado)
+        self.assertEqual(gestor_cola._obtener_competidores(competidora), [])
+        self.assertFalse(ReservasGen.objects.filter(tipo='H').exists())
+
+
+class ListaReservasHotelTest(TestCase):
+    """Listado de reservas: completo sin parámetros, por cursor con limite/cursor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        empleado, administrador = crear_personal('lista')
+        habitaciones = crear_habitaciones(2)
+        cliente = DatosCliente.objects.create(nombre='Cliente', telefono=1, ci=1, email='c@c.com')
+        cls.ids = [
+            ReservaHotel.objects.create(
+                cant_personas=2, amoblado='N', baño_priv='N',
+                fecha_ini=date(2024, 1, 1 + i), fecha_fin=date(2024, 1, 2 + i), estado='A' if i % 2 else 'C',
+                reservas_gen=ReservasGen.objects.create(tipo='H', administrador=administrador, empleado=empleado),
+                datos_cliente=cliente, habitacion=habitaciones[i % 2]
+            ).pk
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        # El listado llena el catálogo de habitaciones: sin commit no se invalida solo
+        self.addCleanup(cache_catalogos.invalidar)
+
+    def listar(self, consulta=''):
+        return self.client.get('/api/reservaHotel/reservas/' + consulta)
+
+    def test_sin_parametros_devuelve_todas(self):
+        datos = self.listar().json()
+        self.assertEqual(datos['count'], 7)
+        self.assertEqual([r['id_reserva_hotel'] for r in datos['reservas']], sorted(self.ids, reverse=True))
+        self.assertNotIn('siguiente_cursor', datos)
+        # Los filtros no paginan
+        self.assertEqual(self.listar('?estado=A').json()['count'], 3)
+
+    def test_recorrer_paginas_por_cursor(self):
+        vistos, consulta, paginas = [], '?limite=3', []
+        while consulta is not None:
+            datos = self.listar(consulta).json()
+            paginas.append((datos['count'], datos['tiene_mas']))
+            vistos += [r['id_reserva_hotel'] for r in datos['reservas']]
+            cursor = datos['siguiente_cursor']
+            consulta = f'?limite=3&cursor={cursor}' if cursor is not None else None
+        self.assertEqual(paginas, [(3, True), (3, True), (1, False)])
+        self.assertEqual(vistos, sorted(self.ids, reverse=True))  # sin huecos ni repetidas
+
+        # Solo cursor: páginas del tamaño por defecto
+        datos = self.listar(f'?cursor={self.ids[3]}').json()
+        self.assertEqual([r['id_reserva_hotel'] for r in datos['reservas']], self.ids[2::-1])
+        self.assertEqual((datos['limite'], datos['tiene_mas'], datos['siguiente_cursor']), (50, False, None))
+
+    def test_fields(self):
+        reserva = self.listar('?limite=1&fields=id_reserva_hotel,estado_display').json()['reservas'][0]
+        self.assertEqual(reserva, {'id_reserva_hotel': self.ids[-1], 'estado_display': 'Cancelada'})
+        respuesta = self.listar('?fields=id_reserva_hotel,password')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('password', respuesta.json()['error'])
+
+    def test_relleno_del_estado_de_habitacion(self):
+        # Cada fila lleva el relleno exactamente una vez: si el formato de fila_json cambia, falla aquí
+        relleno = codificar_fila(ESTADO_HABITACION_PENDIENTE)
+        filas = list(ReservaHotelListado.objects.values_list('fila_json', flat=True))
+        self.assertEqual([fila.count(relleno) for fila in filas], [1] * len(self.ids))
+
+        esperado = json.loads(filas[0])
+        esperado['habitacion']['estado'] = 'OCUPADA'
+        completa = completar_fila_json(filas[0], 'OCUPADA')
+        self.assertEqual(json.loads(completa), esperado)
+
+        # Sin relleno, o con el mismo texto en un dato del cliente: se decodifica la fila
+        self.assertEqual(completar_fila_json(filas[0].replace(relleno, 'null'), 'OCUPADA'), completa)
+        datos = json.loads(filas[0])
+        datos['datos_cliente']['nombre'] = ESTADO_HABITACION_PENDIENTE
+        datos = json.loads(completar_fila_json(codificar_fila(datos), 'OCUPADA'))
+        self.assertEqual((datos['datos_cliente']['nombre'], datos['habitacion']['estado']), (ESTADO_HABITACION_PENDIENTE, 'OCUPADA'))
+
+    def test_parametros_invalidos(self):
+        for consulta in ('?limite=diez', '?cursor=abc', '?limite=5&cursor=1.5', '?estado=X', '?fecha_desde=01-01-2024'):
+            with self.subTest(consulta=consulta):
+                self.assertEqual(self.listar(consulta).status_code, 400)
+
+
+class ReservasDeHoyMixin:
+    """Reservas con fechas relativas a hoy (La Paz) para tableros y notificaciones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.administrador = crear_personal('hoy')
+        cls.habitaciones = crear_habitaciones(3)
+        cls.cliente = DatosCliente.objects.create(nombre='Cliente', app_paterno='Hoy', telefono=1, ci=1, email='c@c.com')
+        cls.hoy = ahora_bolivia().date()
+
+    def reservar(self, habitacion, desde, hasta, **campos):
+        """Reserva activa de `desde` a `hasta` días contados desde hoy"""
+        return ReservaHotel.objects.create(
+            cant_personas=2, amoblado='N', baño_priv='N', estado='A',
+            fecha_ini=self.hoy + timedelta(days=desde), fecha_fin=self.hoy + timedelta(days=hasta),
+            reservas_gen=ReservasGen.objects.create(tipo='H', administrador=self.administrador, empleado=self.empleado),
+            datos_cliente=self.cliente, habitacion=self.habitaciones[habitacion], **campos
+        )
+
+
+class TableroHotelTest(ReservasDeHoyMixin, PresupuestoSQLMixin, TestCase):
+    """estadisticas-hoy: un solo aggregate, cacheado hasta que cambia la versión del dominio"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def tablero(self):
+        return self.client.get('/api/reservaHotel/estadisticas-hoy/').json()
+
+    def test_una_consulta_e_invalidacion_por_version(self):
+        inicia_hoy = self.reservar(0, 0, 2)
+        self.reservar(1, -2, 0, check_in=timezone.now())
+
+        with self.assertPresupuestoSQL(1):
+            datos = self.tablero()
+        conteos = ('reservas_inicio_hoy', 'reservas_activas', 'huespedes_actuales',
+                   'check_ins_pendientes', 'check_outs_hoy', 'check_outs_vencidos')
+        self.assertEqual([datos[c] for c in conteos], [1, 2, 1, 1, 1, 0])
+        self.assertEqual((datos['proxima_reserva']['id'], datos['proxima_reserva']['es_hoy']), (inicia_hoy.pk, True))
+
+        # Sin escrituras sale de la caché
+        with self.assertPresupuestoSQL(0):
+            self.assertEqual(self.tablero()['huespedes_actuales'], 1)
+
+        # El ingreso confirmado sube la versión del dominio: se recalcula
+        with self.captureOnCommitCallbacks(execute=True):
+            inicia_hoy.check_in = timezone.now()
+            inicia_hoy.save()
+        with self.assertPresupuestoSQL(1) as perfil:
+            datos = self.tablero()
+        self.assertEqual(perfil.total, 1)
+        self.assertEqual([datos[c] for c in conteos], [1, 2, 2, 0, 1, 0])
+        self.assertIsNone(datos['proxima_reserva'])
+
+
+# Ventana enorme: el ETag solo cambia con la versión del dominio durante el test
+@override_settings(RESERVAS_ETAG_VENTANA=10 ** 9)
+class EtagHotelTest(ReservasDeHoyMixin, PresupuestoSQLMixin, TestCase):
+    """GET condicional de los endpoints de polling (con_etag)"""
+
+    URL = '/api/reservaHotel/notificaciones/'
+
+    def test_304_hasta_que_hay_una_escritura(self):
+        reserva = self.reservar(0, 0, 2)
+        respuesta = self.client.get(self.URL)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Cache-Control'], 'no-cache')
+        etag = respuesta['ETag']
+
+        # Coincide (también dentro de una lista): 304 sin ejecutar la vista
+        for encabezado in (etag, f'"otro", {etag}'):
+            with self.subTest(encabezado=encabezado), self.assertPresupuestoSQL(0):
+                respuesta = self.client.get(self.URL, HTTP_IF_NONE_MATCH=encabezado)
+            self.assertEqual(respuesta.status_code, 304)
+            self.assertEqual(respuesta['ETag'], etag)
+            self.assertEqual(respuesta.content, b'')
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.check_in = timezone.now()
+            reserva.save()
+        respuesta = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+
+class CanalNotificacionesHotelTest(ReservasDeHoyMixin, TestCase):
+    """Canal SSE: snapshot al conectar, diferencias después y reanudación con Last-Event-ID"""
+
+    def setUp(self):
+        # Canal propio sin hilo: actualizar() se llama directamente
+        self.canal = object.__new__(CanalNotificacionesHotel)
+        self.canal._inicializar()
+        self.canal.heartbeat = 0.01
+        parche = mock.patch.object(self.canal, '_asegurar_hilo')
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def conectar(self, ultimo=None):
+        flujo = self.canal.flujo_sse(ultimo)
+        self.addCleanup(flujo.close)
+        self.assertEqual(next(flujo), 'retry: 5000\n\n')
+        return flujo
+
+    def leer(self, flujo):
+        """(id, evento, datos) del siguiente evento SSE"""
+        id_evento, evento, datos = next(flujo).rstrip('\n').split('\n')
+        return int(id_evento[len('id: '):]), evento[len('event: '):], json.loads(datos[len('data: '):])
+
+    def cambiar(self):
+        self.canal.marcar_cambio()
+        self.canal.actualizar()
+
+    def test_snapshot_y_diferencias(self):
+        inicia_hoy = self.reservar(0, 0, 2)
+        flujo = self.conectar()
+        secuencia, evento, datos = self.leer(flujo)
+        self.assertEqual((secuencia, evento), (1, 'snapshot'))
+        self.assertEqual([(n['tipo'], n['reserva_id']) for n in datos['notificaciones']], [('PRE_INICIO', inicia_hoy.pk)])
+
+        # El ingreso resuelve PRE_INICIO; una reserva de ayer sin ingreso es nueva (RETRASO)
+        inicia_hoy.check_in = timezone.now()
+        inicia_hoy.save()
+        atrasada = self.reservar(1, -1, 1)
+        self.cambiar()
+        secuencia, evento, datos = self.leer(flujo)
+        self.assertEqual((secuencia, evento), (2, 'cambios'))
+        self.assertEqual(datos['resueltas'], [{'tipo': 'PRE_INICIO', 'reserva_id': inicia_hoy.pk}])
+        self.assertEqual([(n['tipo'], n['reserva_id']) for n in datos['nuevas']], [('RETRASO', atrasada.pk)])
+        self.assertEqual((datos['actualizadas'], datos['total_notificaciones']), ([], 1))
+        self.assertNotIn('proximas_reservas', datos)
+
+        # Sin cambios: recalcular no publica nada y el flujo solo envía el heartbeat
+        self.cambiar()
+        self.assertEqual(next(flujo), ': ping\n\n')
+
+    def test_reanuda_con_last_event_id(self):
+        self.reservar(0, 0, 2)
+        self.canal.actualizar()
+        proxima = self.reservar(1, 3, 5)
+        self.cambiar()
+        self.reservar(2, -1, 1)
+        self.cambiar()
+        self.assertEqual(self.canal.secuencia, 3)
+
+        # Reenvía solo lo que el cliente no recibió
+        flujo = self.conectar(1)
+        secuencia, evento, datos = self.leer(flujo)
+        self.assertEqual((secuencia, evento), (2, 'cambios'))
+        self.assertEqual([r['id'] for r in datos['proximas_reservas']], [proxima.pk])
+        self.assertEqual(self.leer(flujo)[:2], (3, 'cambios'))
+
+        # Al día: solo heartbeat
+        self.assertEqual(next(self.conectar(3)), ': ping\n\n')
+
+        # Lo perdido ya no está en el historial: snapshot
+        self.canal.historial.popleft()
+        self.canal.historial.popleft()
+        secuencia, evento, datos = self.leer(self.conectar(1))
+        self.assertEqual((secuencia, evento, datos['total_notificaciones']), (3, 'snapshot', 2))
+
+    def test_vista_lee_last_event_id(self):
+        with mock.patch('apps.reserva_hotel.views.canal_notificaciones_hotel') as canal:
+            canal.flujo_sse.return_value = iter(['retry: 5000\n\n'])
+            respuesta = self.client.get('/api/reservaHotel/notificaciones/stream/', HTTP_LAST_EVENT_ID='7')
+            self.assertEqual(b''.join(respuesta.streaming_content), b'retry: 5000\n\n')
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        self.assertEqual(respuesta['Cache-Control'], 'no-cache')
+        canal.flujo_sse.assert_called_once_with(7)
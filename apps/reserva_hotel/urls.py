@@ -27,6 +27,9 @@ urlpatterns = [
     # 🔹 NUEVAS URLs
     # ==============================================
     
+    # 🔹 Reserva de grupo (varias habitaciones, un cliente)
+    path('reservaHotel/registrar-grupo/', views.registrar_reserva_hotel_grupo, name='registrar_reserva_hotel_grupo'),
+    
     # 🔹 GET endpoints
     path('reservaHotel/reservas/', lista_reservas_hotel, name='lista_reservas_hotel'),
     path('reservaHotel/reservas/<int:id_reserva>/', detalle_reserva_hotel, name='detalle_reserva_hotel'),
@@ -51,7 +54,16 @@ urlpatterns = [
     path('reservaHotel/canceladas/', views.reservas_canceladas, name='reservas_canceladas'),
     #🔹 NOTIFICACIONES DE HOTELES
     path('reservaHotel/notificaciones/', views.obtener_notificaciones_hotel, name='obtener_notificaciones_hotel'),
+    path('reservaHotel/notificaciones/stream/', views.stream_notificaciones_hotel, name='stream_notificaciones_hotel'),
     #🔹 Estadistica de hoteles de hoy
     path('reservaHotel/estadisticas-hoy/', views.estadisticas_hotel_hoy, name='estadisticas_hotel_hoy'),
+    #🔹 Verificación del índice de disponibilidad
+    path('reservaHotel/indice-disponibilidad/verificar/', views.verificar_indice_disponibilidad, name='verificar_indice_disponibilidad'),
+    #🔹 Estadísticas de la cola de reservas
+    path('reservaHotel/estadisticas-cola/', views.obtener_estadisticas_cola, name='estadisticas_cola_hotel'),
+    #🔹 Calendario de ocupación habitación × día
+    path('reservaHotel/calendario/', views.calendario_ocupacion_hotel, name='calendario_ocupacion_hotel'),
+    #🔹 Búsqueda de habitación con alternativas
+    path('reservaHotel/buscar/', views.buscar_habitacion_hotel, name='buscar_habitacion_hotel'),
 
 ]
\ No newline at end of file
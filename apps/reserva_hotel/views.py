@@ -1,50 +1,68 @@
-from django.utils.decorators import method_decorator
+import json
+import logging
+import time
+from datetime import datetime, date, timedelta
+
+import pytz
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
-
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework import status
-from django.shortcuts import get_object_or_404
-from django.db import transaction
-from datetime import datetime, date
-import re
 
-from .models import ReservaHotel
+from .models import ReservaHotel, ReservaHotelListado
 from .seliralizers import ReservaHotelSerializer
 from apps.datos_cliente.models import DatosCliente
 from apps.habitacion.models import Habitacion
-from apps.reservas_gen.models import ReservasGen
 from apps.administrador.models import Administrador
 from apps.empleado.models import Empleado
-from apps.tarifa_hotel.models import TarifaHotel
 from .queue_manager import gestor_cola
+from .listado import CAMPOS_LISTA_HOTEL, armar_fila_lista, completar_fila_json, estados_habitaciones, get_estado_display
+from .disponibilidad import indice_disponibilidad
+from .calendario import ocupacion_ventana, bits_a_texto, bits_a_rangos, ocupadas_por_dia
+from .busqueda import buscar_habitacion
+from .notificaciones import construir_notificaciones_hotel, canal_notificaciones_hotel
+from apps.reservas_gen.catalogos import cache_catalogos
+from apps.reservas_gen.tableros import obtener_tablero, primera_fila, extraer_primera_fila
+from apps.reservas_gen.versiones import DOMINIO_HOTEL, con_etag
+from apps.reservas_gen.tickets import almacen_tickets, solicita_modo_asincrono, respuesta_ticket
+from apps.reservas_gen.metricas import timeouts_solicitudes
+from apps.reservas_gen.views import respuesta_subida_comprobante
+from apps.auditoria.views import registrar_creacion_reserva_hotel, registrar_actualizacion_reserva_hotel, registrar_check_in_hotel, registrar_check_out_hotel, registrar_cancelacion_reserva_hotel, registrar_cancelacion_check_in
 
-from django.utils.decorators import method_decorator
-from django.views.decorators.csrf import csrf_exempt
+logger = logging.getLogger(__name__)
 
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
 
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.response import Response
-from rest_framework import status
-from django.shortcuts import get_object_or_404
-from django.db.models import Q
+def _obtener_o_crear_cliente(nombre, app_paterno, app_materno, telefono, ci, email):
+    """Cliente existente con exactamente esos datos, o uno nuevo"""
+    cliente_existente = DatosCliente.objects.filter(
+        nombre=nombre,
+        app_paterno=app_paterno,
+        app_materno=app_materno,
+        telefono=telefono,
+        ci=ci,
+        email=email
+    ).first()
+    
+    if cliente_existente:
+        return cliente_existente
+    return DatosCliente.objects.create(
+        nombre=nombre,
+        app_paterno=app_paterno,
+        app_materno=app_materno,
+        telefono=telefono,
+        ci=ci,
+        email=email
+    )
 
-from .models import ReservaHotel
-from .seliralizers import ReservaHotelSerializer
-from apps.datos_cliente.models import DatosCliente
-from apps.habitacion.models import Habitacion
-from apps.reservas_gen.models import ReservasGen
-from apps.administrador.models import Administrador
-from apps.empleado.models import Empleado
-from apps.tarifa_hotel.models import TarifaHotel
-from .queue_manager import gestor_cola
-from apps.auditoria.views import registrar_creacion_reserva_hotel, registrar_actualizacion_reserva_hotel, registrar_check_in_hotel, registrar_check_out_hotel, registrar_cancelacion_reserva_hotel, registrar_cancelacion_check_in
 
 # 🔹 Registrar una reserva de hotel
 @api_view(['POST'])
@@ -52,6 +70,10 @@ from apps.auditoria.views import registrar_creacion_reserva_hotel, registrar_act
 def registrar_reserva_hotel(request):
     """
     Registra una reserva usando el sistema de cola de prioridad
+    
+    Modo asíncrono (?asincrono=1 o header Prefer: respond-async): responde 202
+    con un ticket sin esperar a la cola; el resultado se consulta en
+    GET /api/reservas/tickets/<ticket>/
     """
     data = request.data
     
@@ -66,26 +88,7 @@ def registrar_reserva_hotel(request):
     if not (nombre and app_paterno and telefono and ci and email):
         return Response({'error': 'Faltan datos del cliente'}, status=400)
     
-    cliente_existente = DatosCliente.objects.filter(
-        nombre=nombre,
-        app_paterno=app_paterno,
-        app_materno=app_materno,
-        telefono=telefono,
-        ci=ci,
-        email=email
-    ).first()
-    
-    if cliente_existente:
-        datos_cliente = cliente_existente
-    else:
-        datos_cliente = DatosCliente.objects.create(
-            nombre=nombre,
-            app_paterno=app_paterno,
-            app_materno=app_materno,
-            telefono=telefono,
-            ci=ci,
-            email=email
-        )
+    datos_cliente = _obtener_o_crear_cliente(nombre, app_paterno, app_materno, telefono, ci, email)
     
     # --- 2️⃣ Validar datos de la reserva
     cant_personas = data.get('cant_personas')
@@ -100,7 +103,6 @@ def registrar_reserva_hotel(request):
     
     # Validar formato de fechas
     try:
-        from datetime import datetime
         fecha_ini_dt = datetime.strptime(fecha_ini, '%Y-%m-%d').date()
         fecha_fin_dt = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
         
@@ -112,43 +114,23 @@ def registrar_reserva_hotel(request):
         return Response({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}, status=400)
     
     # --- 3️⃣ Buscar habitación disponible SIN conflictos de fechas
-    # Primero, obtener todas las habitaciones con las características solicitadas
-    habitaciones_candidatas = Habitacion.objects.filter(
-        ~Q(estado='MANTENIMIENTO'),   # cualquier estado menos mantenimiento
-        amoblado=amoblado,
-        baño_priv=baño_priv,
+    # Índice en memoria (intervalos ordenados por habitación); si no encuentra ninguna, confirma en la BD
+    # Sin habitación: se devuelven las alternativas de buscar/ para no reintentar combinación por combinación
+    habitacion_id = indice_disponibilidad.elegir_habitacion_libre(
+        amoblado, baño_priv, fecha_ini_dt, fecha_fin_dt
     )
-
     
-    if not habitaciones_candidatas.exists():
+    if habitacion_id is None and not indice_disponibilidad.hay_habitaciones(amoblado, baño_priv):
         return Response({
-            'error': 'No hay habitaciones disponibles con esas características'
+            'error': 'No hay habitaciones disponibles con esas características',
+            'alternativas': _alternativas_registro(amoblado, baño_priv, fecha_ini_dt, fecha_fin_dt, cant_personas)
         }, status=404)
     
-    # Buscar una habitación sin conflictos de fechas
-    habitacion = None
-    for hab in habitaciones_candidatas:
-        # Verificar si hay reservas que se solapen con las fechas solicitadas
-        reservas_conflicto = ReservaHotel.objects.filter(
-            habitacion=hab,
-            estado__in=['A', 'P']  # Activas o Pendientes
-        ).filter(
-            # Condición de solapamiento de fechas:
-            # Una reserva se solapa si:
-            # - Su fecha_ini está entre nuestras fechas O
-            # - Su fecha_fin está entre nuestras fechas O
-            # - Nuestras fechas están completamente contenidas en la reserva existente
-            Q(fecha_ini__lt=fecha_fin_dt, fecha_fin__gt=fecha_ini_dt)
-        )
-        
-        if not reservas_conflicto.exists():
-            habitacion = hab
-            break
-    
-    if not habitacion:
+    if habitacion_id is None:
         return Response({
             'error': 'No hay habitaciones disponibles con esas características en las fechas seleccionadas',
-            'detalle': 'Todas las habitaciones que cumplen con los requisitos ya están reservadas en ese período'
+            'detalle': 'Todas las habitaciones que cumplen con los requisitos ya están reservadas en ese período',
+            'alternativas': _alternativas_registro(amoblado, baño_priv, fecha_ini_dt, fecha_fin_dt, cant_personas)
         }, status=404)
     
     # --- 4️⃣ Obtener empleado y administrador
@@ -170,46 +152,284 @@ def registrar_reserva_hotel(request):
         'estado': estado
     }
     
+    # --- 6️⃣ Modo asíncrono: devolver ticket sin bloquear el worker
+    if solicita_modo_asincrono(request):
+        ticket = almacen_tickets.crear('H')
+        usuario = request.user
+        _encolar_con_reintentos(
+            datos_reserva, datos_cliente, habitacion_id, empleado, administrador,
+            lambda req: almacen_tickets.completar(
+                ticket, *_respuesta_registro_hotel(request, usuario, req, datos_cliente)
+            )
+        )
+        return Response(respuesta_ticket(ticket, 'H'), status=status.HTTP_202_ACCEPTED)
+    
+    # --- 7️⃣ Esperar el resultado (timeout de 10 segundos en total, incluidos los reintentos)
+    limite = time.time() + 10
+    descartadas = []
+    while True:
+        request_reserva = gestor_cola.agregar_reserva(
+            datos_reserva=datos_reserva,
+            datos_cliente=datos_cliente,
+            habitacion_id=habitacion_id,
+            empleado=empleado,
+            administrador=administrador
+        )
+        procesado = request_reserva.evento.wait(timeout=max(limite - time.time(), 0))
+        
+        if not procesado:
+            timeouts_solicitudes.incrementar(cola='hotel')
+            return Response({
+                'error': 'Timeout procesando la reserva. Intente nuevamente.'
+            }, status=status.HTTP_408_REQUEST_TIMEOUT)
+        
+        habitacion_id = _siguiente_habitacion(request_reserva, descartadas)
+        if habitacion_id is None:
+            break
+    
+    # --- 8️⃣ Retornar el resultado
+    datos, status_code = _respuesta_registro_hotel(request, request.user, request_reserva, datos_cliente)
+    return Response(datos, status=status_code)
+
+
+def _siguiente_habitacion(request_reserva, descartadas):
+    """
+    Otra habitación libre si la cola respondió HABITACION_RESERVADA (otro proceso la
+    reservó y el índice de este todavía no lo sabía): recarga el índice y elige la
+    siguiente, hasta RESERVAS_HOTEL_REINTENTOS_HABITACION veces. None = resultado final.
+    """
+    if request_reserva.resultado.get('codigo') != 'HABITACION_RESERVADA':
+        return None
+    if len(descartadas) >= getattr(settings, 'RESERVAS_HOTEL_REINTENTOS_HABITACION', 2):
+        return None
+    descartadas.append(request_reserva.habitacion_id)
+    indice_disponibilidad.invalidar()
+    datos = request_reserva.datos_reserva
+    return indice_disponibilidad.elegir_habitacion_libre(
+        datos['amoblado'], datos['baño_priv'], request_reserva.fecha_ini_dt, request_reserva.fecha_fin_dt,
+        excluir_habitaciones=descartadas
+    )
+
+
+def _encolar_con_reintentos(datos_reserva, datos_cliente, habitacion_id, empleado, administrador,
+                            al_terminar, descartadas=None):
+    """Modo asíncrono: encola y, si la habitación ya estaba reservada, reintenta con otra antes de llamar a al_terminar"""
+    descartadas = [] if descartadas is None else descartadas
     request_reserva = gestor_cola.agregar_reserva(
         datos_reserva=datos_reserva,
         datos_cliente=datos_cliente,
-        habitacion_id=habitacion.id_habitacion,
+        habitacion_id=habitacion_id,
         empleado=empleado,
         administrador=administrador
     )
     
-    # --- 6️⃣ Esperar el resultado (timeout de 10 segundos)
-    procesado = request_reserva.evento.wait(timeout=10)
+    def continuar(req):
+        siguiente = _siguiente_habitacion(req, descartadas)
+        if siguiente is None:
+            al_terminar(req)
+        else:
+            _encolar_con_reintentos(
+                datos_reserva, datos_cliente, siguiente, empleado, administrador, al_terminar, descartadas
+            )
+    
+    request_reserva.agregar_callback(continuar)
+
+
+def _alternativas_registro(amoblado, baño_priv, fecha_ini, fecha_fin, cant_personas):
+    """Alternativas de busqueda.py para el 404 del registro (vacías si no se pueden calcular)"""
+    try:
+        hoy = timezone.now().astimezone(pytz.timezone('America/La_Paz')).date()
+        return buscar_habitacion(amoblado, baño_priv, fecha_ini, fecha_fin, int(cant_personas), hoy)['alternativas']
+    except (TypeError, ValueError) as e:
+        # cant_personas no numérico: el 404 sale igual, sin alternativas
+        logger.warning("⚠️ No se pudieron calcular alternativas: %s", e)
+        return []
+
+
+# 🔹 Reserva de grupo (agencias): varias habitaciones para un cliente y un rango de fechas
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def registrar_reserva_hotel_grupo(request):
+    """
+    Registra N habitaciones para un mismo cliente y fechas en una sola llamada.
+    
+    POST /api/reservaHotel/registrar-grupo/
+    {
+        "nombre", "app_paterno", "app_materno", "telefono", "ci", "email",
+        "fecha_ini": "YYYY-MM-DD", "fecha_fin": "YYYY-MM-DD",
+        "habitaciones": [{"cant_personas": 2, "amoblado": "S", "baño_priv": "N"}, ...]
+    }
+    
+    Las habitaciones se eligen con una pasada al índice de disponibilidad por tipo,
+    el grupo se arbitra en la cola con las mismas prioridades que las reservas
+    individuales y las ganadoras se crean con bulk_create en una transacción.
+    Retorna un resultado por habitación (201 todas, 207 algunas, 409 ninguna).
+    """
+    data = request.data
+    
+    # --- 1️⃣ Datos del cliente
+    nombre = data.get('nombre')
+    app_paterno = data.get('app_paterno')
+    app_materno = data.get('app_materno')
+    telefono = data.get('telefono')
+    ci = data.get('ci')
+    email = data.get('email')
+    
+    if not (nombre and app_paterno and telefono and ci and email):
+        return Response({'error': 'Faltan datos del cliente'}, status=400)
+    
+    # --- 2️⃣ Fechas y habitaciones pedidas
+    fecha_ini = data.get('fecha_ini')
+    fecha_fin = data.get('fecha_fin')
+    estado = data.get('estado', 'A')
+    items = data.get('habitaciones')
+    
+    if not (fecha_ini and fecha_fin and isinstance(items, list) and items):
+        return Response({'error': 'Faltan datos de la reserva (fecha_ini, fecha_fin, habitaciones)'}, status=400)
+    
+    grupo_max = getattr(settings, 'RESERVAS_HOTEL_GRUPO_MAX', 50)
+    if len(items) > grupo_max:
+        return Response({'error': f'Máximo {grupo_max} habitaciones por reserva de grupo'}, status=400)
+    
+    try:
+        fecha_ini_dt = datetime.strptime(fecha_ini, '%Y-%m-%d').date()
+        fecha_fin_dt = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return Response({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}, status=400)
+    
+    if fecha_fin_dt <= fecha_ini_dt:
+        return Response({'error': 'La fecha de fin debe ser posterior a la fecha de inicio'}, status=400)
     
-    if not procesado:
+    datos_reservas = []
+    for indice, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('cant_personas'):
+            return Response({'error': f'La habitación {indice} no indica cant_personas'}, status=400)
+        datos_reservas.append({
+            'cant_personas': item['cant_personas'],
+            'amoblado': str(item.get('amoblado', 'N')).upper(),
+            'baño_priv': str(item.get('baño_priv', 'N')).upper(),
+            'fecha_ini': fecha_ini,
+            'fecha_fin': fecha_fin,
+            'estado': estado
+        })
+    
+    # --- 3️⃣ Empleado y administrador
+    empleado = Empleado.objects.first()
+    administrador = Administrador.objects.first()
+    
+    if not empleado or not administrador:
         return Response({
-            'error': 'Timeout procesando la reserva. Intente nuevamente.'
-        }, status=status.HTTP_408_REQUEST_TIMEOUT)
+            'error': 'No existen registros de empleado o administrador'
+        }, status=400)
     
-    # --- 7️⃣ Retornar el resultado
+    datos_cliente = _obtener_o_crear_cliente(nombre, app_paterno, app_materno, telefono, ci, email)
+    
+    # --- 4️⃣ Elegir habitaciones: una pasada al índice por tipo (amoblado, baño_priv)
+    por_tipo = {}
+    for indice, datos in enumerate(datos_reservas):
+        por_tipo.setdefault((datos['amoblado'], datos['baño_priv']), []).append(indice)
+    
+    asignadas = {}  # {indice: habitacion_id}
+    for (amoblado, baño_priv), indices in por_tipo.items():
+        libres = indice_disponibilidad.buscar_habitaciones_libres(
+            amoblado, baño_priv, fecha_ini_dt, fecha_fin_dt, len(indices)
+        )
+        asignadas.update(zip(indices, libres))
+    
+    # --- 5️⃣ Arbitraje en la cola y creación en bloque
+    indices_asignados = sorted(asignadas)
+    solicitudes = gestor_cola.reservar_grupo(
+        datos_reservas=[datos_reservas[i] for i in indices_asignados],
+        datos_cliente=datos_cliente,
+        habitaciones_ids=[asignadas[i] for i in indices_asignados],
+        empleado=empleado,
+        administrador=administrador
+    ) if indices_asignados else []
+    solicitud_por_indice = dict(zip(indices_asignados, solicitudes))
+    
+    # --- 6️⃣ Resultado por habitación
+    resultados = []
+    for indice in range(len(datos_reservas)):
+        solicitud = solicitud_por_indice.get(indice)
+        if solicitud is None:
+            resultados.append({
+                'indice': indice,
+                'success': False,
+                'error': 'No hay habitaciones disponibles con esas características en las fechas seleccionadas',
+                'codigo': 'SIN_HABITACION'
+            })
+            continue
+        
+        resultado = solicitud.resultado
+        if resultado['success']:
+            registrar_creacion_reserva_hotel(request, request.user, resultado['reserva'], datos_cliente)
+            resultados.append({
+                'indice': indice,
+                'success': True,
+                'reserva': ReservaHotelSerializer(resultado['reserva']).data,
+                'habitacion_id': resultado['habitacion'].id_habitacion,
+                'reserva_gen_id': resultado['reserva_gen'].id_reservas_gen,
+                'prioridad_calculada': solicitud.prioridad
+            })
+        else:
+            resultados.append({
+                'indice': indice,
+                'success': False,
+                'error': resultado['error'],
+                'codigo': resultado['codigo']
+            })
+    
+    creadas = sum(1 for resultado in resultados if resultado['success'])
+    if creadas == len(resultados):
+        status_code = status.HTTP_201_CREATED
+    elif creadas:
+        status_code = status.HTTP_207_MULTI_STATUS
+    else:
+        status_code = status.HTTP_409_CONFLICT
+    
+    return Response({
+        'mensaje': f'{creadas} de {len(resultados)} habitaciones reservadas',
+        'cliente_id': datos_cliente.id_datos_cliente,
+        'total': len(resultados),
+        'creadas': creadas,
+        'rechazadas': len(resultados) - creadas,
+        'resultados': resultados
+    }, status=status_code)
+
+
+def _respuesta_registro_hotel(request, usuario, request_reserva, datos_cliente):
+    """
+    Arma (datos, status) a partir del resultado de la cola y audita la creación.
+    Lo usan el modo síncrono y el callback del modo asíncrono.
+    """
     resultado = request_reserva.resultado
     
     if resultado['success']:
-        registrar_creacion_reserva_hotel(request, request.user, resultado['reserva'], datos_cliente)
+        registrar_creacion_reserva_hotel(request, usuario, resultado['reserva'], datos_cliente)
         serializer = ReservaHotelSerializer(resultado['reserva'])
-        return Response({
+        return {
             'mensaje': 'Reserva creada correctamente',
             'reserva': serializer.data,
             'cliente_id': resultado['datos_cliente'].id_datos_cliente,
             'habitacion_id': resultado['habitacion'].id_habitacion,
             'reserva_gen_id': resultado['reserva_gen'].id_reservas_gen,
             'info_prioridad': {
-                'duracion_dias': (fecha_fin_dt - fecha_ini_dt).days,
-                'cant_personas': cant_personas,
+                'duracion_dias': (request_reserva.fecha_fin_dt - request_reserva.fecha_ini_dt).days,
+                'cant_personas': request_reserva.datos_reserva['cant_personas'],
                 'prioridad_calculada': request_reserva.prioridad
             }
-        }, status=status.HTTP_201_CREATED)
+        }, status.HTTP_201_CREATED
+    
+    if resultado['codigo'] == 'RECHAZADO_POR_PRIORIDAD':
+        status_code = status.HTTP_409_CONFLICT
+    elif resultado['codigo'] == 'COLA_LLENA':
+        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
     else:
-        status_code = status.HTTP_409_CONFLICT if resultado['codigo'] == 'RECHAZADO_POR_PRIORIDAD' else status.HTTP_400_BAD_REQUEST
-        return Response({
-            'error': resultado['error'],
-            'codigo': resultado['codigo']
-        }, status=status_code)
+        status_code = status.HTTP_400_BAD_REQUEST
+    return {
+        'error': resultado['error'],
+        'codigo': resultado['codigo']
+    }, status_code
 
 
 
@@ -219,27 +439,12 @@ def registrar_reserva_hotel(request):
 @csrf_exempt
 def subir_comprobante(request, id_reserva_gen):
     """
-    Permite subir un comprobante de pago (archivo binario) asociado a una reserva general.
+    Permite subir un comprobante de pago asociado a una reserva general.
     Espera un campo 'pago' en el formulario (multipart/form-data).
+    El archivo se guarda en el storage de comprobantes (ver apps/reservas_gen/comprobantes.py);
+    se descarga en GET /api/reservas/<id_reserva_gen>/comprobante/
     """
-    try:
-        reserva_gen = ReservasGen.objects.get(pk=id_reserva_gen)
-    except ReservasGen.DoesNotExist:
-        return Response({'error': 'Reserva general no encontrada'}, status=status.HTTP_404_NOT_FOUND)
-
-    # Verificamos si se envió el archivo
-    archivo_pago = request.FILES.get('pago')
-    if not archivo_pago:
-        return Response({'error': 'No se envió ningún archivo'}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Leemos el contenido binario del archivo
-    reserva_gen.pago = archivo_pago.read()
-    reserva_gen.save()
-
-    return Response({
-        'mensaje': 'Comprobante de pago subido correctamente',
-        'reserva_gen_id': reserva_gen.id_reservas_gen
-    }, status=status.HTTP_200_OK)
+    return respuesta_subida_comprobante(request, id_reserva_gen)
 
 
 #-- 🔹 Obtener tarifa de hotel según amoblado y baño privado
@@ -250,105 +455,149 @@ def obtener_tarifa_hotel(request):
     Retorna todas las tarifas del hotel.
     Ejemplo: GET /api/reservaHotel/tarifa/
     """
-    tarifas = TarifaHotel.objects.all().values(
-        'id_tarifa_hotel',
-        'nombre',
-        'descripcion',
-        'amoblado',
-        'baño_priv',
-        'precio_persona'
-    )
+    tarifas = cache_catalogos.obtener('tarifas')
 
     if not tarifas:
         return Response({'error': 'No existen tarifas registradas'}, status=status.HTTP_404_NOT_FOUND)
 
-    return Response(list(tarifas), status=status.HTTP_200_OK)
+    return Response(tarifas, status=status.HTTP_200_OK)
 
 # ==============================================
 # 🔹 NUEVAS FUNCIONES GET, PUT, DELETE
 # ==============================================
 
-# 🔹 OBTENER TODAS LAS RESERVAS (GET)
+# 🔹 LISTADO PAGINADO: los campos de ?fields= y su armado están en listado.py
+LISTA_HOTEL_LIMITE_DEFECTO = 50
+LISTA_HOTEL_LIMITE_MAX = 200
+
+
+def _leer_parametros_lista_hotel(params):
+    """
+    Valida los query params del listado.
+    Retorna (campos, filtros Q, limite, cursor) o lanza ValueError con el mensaje para el cliente.
+    """
+    # Proyección
+    campos = list(CAMPOS_LISTA_HOTEL)
+    if params.get('fields'):
+        campos = [c.strip() for c in params['fields'].split(',') if c.strip()]
+        invalidos = [c for c in campos if c not in CAMPOS_LISTA_HOTEL]
+        if invalidos:
+            raise ValueError(f"Campos no válidos: {', '.join(invalidos)}. Permitidos: {', '.join(CAMPOS_LISTA_HOTEL)}")
+
+    # Paginación: sin limite ni cursor se devuelven todas (contrato original del endpoint, limite = None)
+    paginada = bool(params.get('limite') or params.get('cursor'))
+    try:
+        limite = int(params.get('limite') or LISTA_HOTEL_LIMITE_DEFECTO)
+        cursor = int(params['cursor']) if params.get('cursor') else None
+    except ValueError:
+        raise ValueError('limite y cursor deben ser números enteros')
+    limite = min(max(limite, 1), LISTA_HOTEL_LIMITE_MAX) if paginada else None
+
+    # Filtros
+    filtros = Q()
+    if params.get('estado'):
+        estados = [e.strip().upper() for e in params['estado'].split(',') if e.strip()]
+        invalidos = [e for e in estados if e not in ('A', 'C', 'F')]
+        if invalidos:
+            raise ValueError("Estado no válido. Estados permitidos: ['A', 'C', 'F']")
+        filtros &= Q(estado__in=estados)
+    try:
+        if params.get('habitacion'):
+            filtros &= Q(habitacion_id=int(params['habitacion']))
+        if params.get('cliente'):
+            filtros &= Q(datos_cliente_id=int(params['cliente']))
+    except ValueError:
+        raise ValueError('habitacion y cliente deben ser IDs numéricos')
+    try:
+        # Reservas que se cruzan con el rango [fecha_desde, fecha_hasta]
+        if params.get('fecha_desde'):
+            filtros &= Q(fecha_fin__gte=datetime.strptime(params['fecha_desde'], '%Y-%m-%d').date())
+        if params.get('fecha_hasta'):
+            filtros &= Q(fecha_ini__lte=datetime.strptime(params['fecha_hasta'], '%Y-%m-%d').date())
+    except ValueError:
+        raise ValueError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+    return campos, filtros, limite, cursor
+
+
+# 🔹 OBTENER RESERVAS (GET) - paginado por cursor
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def lista_reservas_hotel(request):
     """
-    Retorna todas las reservas de hotel con información completa
-    Ejemplo: GET /api/reservaHotel/reservas/
+    Retorna las reservas de hotel, de la más reciente a la más antigua.
+    Ejemplo: GET /api/reservaHotel/reservas/?limite=50&cursor=120&estado=A&fields=id_reserva_hotel,fecha_ini,habitacion
+
+    Sin limite ni cursor responde como siempre: {count (total), reservas (todas)}.
+    Con cualquiera de los dos responde por páginas:
+    {count (de la página), limite, tiene_mas, siguiente_cursor, reservas}.
+
+    Query params (todos opcionales):
+    - limite: reservas por página (50 si solo se envía cursor, máximo 200)
+    - cursor: valor de 'siguiente_cursor' de la página anterior
+    - estado: A, C, F (se aceptan varios separados por coma)
+    - fecha_desde / fecha_hasta (YYYY-MM-DD): reservas que se cruzan con el rango
+    - habitacion: id de habitación
+    - cliente: id de datos_cliente
+    - fields: campos a devolver separados por coma (por defecto todos)
+
+    El cursor es el último id_reserva_hotel devuelto, así que cada página cuesta
+    lo mismo sin importar cuántas reservas tenga el historial. Se lee solo la
+    proyección reserva_hotel_listado (sin JOINs); sin ?fields= cada fila sale
+    de su fragmento JSON ya codificado.
     """
     try:
-        reservas = ReservaHotel.objects.select_related(
-            'datos_cliente',
-            'habitacion',
-            'reservas_gen'
-        ).all().order_by('-id_reserva_hotel')  # Ordenar por ID descendente
-        
-        data = []
-        for reserva in reservas:
-            # Datos del cliente
-            cliente_data = {
-                'id_datos_cliente': reserva.datos_cliente.id_datos_cliente,
-                'nombre': reserva.datos_cliente.nombre,
-                'app_paterno': reserva.datos_cliente.app_paterno,
-                'app_materno': reserva.datos_cliente.app_materno or '',
-                'telefono': reserva.datos_cliente.telefono,
-                'ci': reserva.datos_cliente.ci,
-                'email': reserva.datos_cliente.email
-            }
-            
-            # Datos de la habitación
-            habitacion_data = {
-                'id_habitacion': reserva.habitacion.id_habitacion,
-                'numero': reserva.habitacion.numero,
-                'piso': reserva.habitacion.piso,
-                'tipo': reserva.habitacion.tipo,
-                'amoblado': reserva.habitacion.amoblado,
-                'baño_priv': reserva.habitacion.baño_priv,
-                'estado': reserva.habitacion.estado
-            }
-            
-            # Datos de reserva general
-            reserva_gen_data = {
-                'id_reservas_gen': reserva.reservas_gen.id_reservas_gen,
-                'tipo': reserva.reservas_gen.tipo,
-                'tiene_pago': bool(reserva.reservas_gen.pago),
-                'administrador_id': reserva.reservas_gen.administrador.id_admi,  # ✅ CORRECTO - usa id_admi
-                'empleado_id': reserva.reservas_gen.empleado.id_empleado  # ✅ Esto depende de cómo se llame en Empleado
-            }
-            
-            # Calcular días de estadía
-            dias_estadia = 0
-            if reserva.fecha_ini and reserva.fecha_fin:
-                dias_estadia = (reserva.fecha_fin - reserva.fecha_ini).days
-                if dias_estadia < 0:
-                    dias_estadia = 0
-            
-            # Datos completos de la reserva
-            reserva_data = {
-                'id_reserva_hotel': reserva.id_reserva_hotel,
-                'cant_personas': reserva.cant_personas,
-                'amoblado': reserva.amoblado,
-                'baño_priv': reserva.baño_priv,
-                'fecha_ini': reserva.fecha_ini,
-                'fecha_fin': reserva.fecha_fin,
-                'dias_estadia': dias_estadia,
-                'estado': reserva.estado,
-                'estado_display': get_estado_display(reserva.estado),
-                'check_in': reserva.check_in,
-                'check_out': reserva.check_out,
-                'datos_cliente': cliente_data,
-                'habitacion': habitacion_data,
-                'reservas_gen': reserva_gen_data,
-                'fecha_creacion': reserva.reservas_gen.id_reservas_gen  # Como referencia temporal
+        campos, filtros, limite, cursor = _leer_parametros_lista_hotel(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        completa = not request.query_params.get('fields')
+        columnas = {'id_reserva_hotel'}
+        if completa:
+            columnas.update(('fila_json', 'habitacion_id'))
+        else:
+            for campo in campos:
+                columnas.update(CAMPOS_LISTA_HOTEL[campo][0])
+
+        reservas = ReservaHotelListado.objects.filter(filtros)
+        if cursor is not None:
+            reservas = reservas.filter(id_reserva_hotel__lt=cursor)
+        reservas = reservas.order_by('-id_reserva_hotel').values(*columnas)
+
+        if limite is None:
+            filas = list(reservas)
+            pagina = {'count': len(filas)}
+        else:
+            filas = list(reservas[:limite + 1])
+            tiene_mas = len(filas) > limite
+            filas = filas[:limite]
+            pagina = {
+                'count': len(filas),
+                'limite': limite,
+                'tiene_mas': tiene_mas,
+                'siguiente_cursor': filas[-1]['id_reserva_hotel'] if tiene_mas else None,
             }
-            
-            data.append(reserva_data)
-        
+
+        # El estado de la habitación no está en la proyección: sale del catálogo en memoria
+        estados = estados_habitaciones() if completa or 'habitacion' in campos else {}
+
+        if completa:
+            # Misma respuesta que armaría DRF, concatenando los fragmentos sin volver a codificar
+            cuerpo = json.dumps(pagina, separators=(',', ':'))[:-1]
+            cuerpo += ',"reservas":[' + ','.join(
+                completar_fila_json(fila['fila_json'], estados.get(fila['habitacion_id'])) for fila in filas
+            ) + ']}'
+            return HttpResponse(cuerpo.encode('utf-8'), content_type='application/json')
+
+        if 'habitacion' in campos:
+            for fila in filas:
+                fila['habitacion_estado'] = estados.get(fila['habitacion_id'])
         return Response({
-            'count': len(data),
-            'reservas': data
+            **pagina,
+            'reservas': [armar_fila_lista(fila, campos) for fila in filas]
         }, status=status.HTTP_200_OK)
-        
+
     except Exception as e:
         return Response({
             'error': f'Error al obtener las reservas: {str(e)}'
@@ -395,7 +644,7 @@ def detalle_reserva_hotel(request, id_reserva):
         reserva_gen_data = {
             'id_reservas_gen': reserva.reservas_gen.id_reservas_gen,
             'tipo': reserva.reservas_gen.tipo,
-            'tiene_pago': bool(reserva.reservas_gen.pago),
+            'tiene_pago': reserva.reservas_gen.tiene_pago,
             'administrador': reserva.reservas_gen.administrador.id_admi,
             'empleado_id': reserva.reservas_gen.empleado.id_empleado
         }
@@ -622,14 +871,20 @@ def actualizar_reserva_hotel(request, id_reserva):
                 
                 # --- BUSCAR HABITACIÓN SIN CONFLICTOS (IGUAL QUE EN REGISTRAR) ---
                 
-                # Obtener todas las habitaciones candidatas (NO en mantenimiento)
-                habitaciones_candidatas = Habitacion.objects.filter(
-                    ~Q(estado='MANTENIMIENTO'),
-                    amoblado=amoblado_actual,
-                    baño_priv=baño_priv_actual,
+                # Buscar una habitación sin conflictos de fechas (índice en memoria)
+                # Se guarda sin pasar por la cola: la elegida se confirma en la BD
+                # IMPORTANTE: Excluir la reserva actual de la búsqueda
+                habitacion_nueva = None
+                habitacion_nueva_id = indice_disponibilidad.elegir_habitacion_libre(
+                    amoblado_actual, baño_priv_actual, fecha_ini_dt, fecha_fin_dt,
+                    excluir_reserva_id=reserva.id_reserva_hotel,  # ✅ EXCLUIR RESERVA ACTUAL
+                    confirmar=True
                 )
+                if habitacion_nueva_id is not None:
+                    habitacion_nueva = Habitacion.objects.get(pk=habitacion_nueva_id)
                 
-                if not habitaciones_candidatas.exists():
+                # Habitaciones candidatas (NO en mantenimiento)
+                if not habitacion_nueva and not indice_disponibilidad.hay_habitaciones(amoblado_actual, baño_priv_actual):
                     return Response({
                         'error': 'No hay habitaciones disponibles con esas características',
                         'caracteristicas_solicitadas': {
@@ -638,25 +893,6 @@ def actualizar_reserva_hotel(request, id_reserva):
                         }
                     }, status=404)
                 
-                # Buscar una habitación sin conflictos de fechas
-                habitacion_nueva = None
-                for hab in habitaciones_candidatas:
-                    # Verificar si hay reservas que se solapen con las fechas solicitadas
-                    # IMPORTANTE: Excluir la reserva actual de la búsqueda
-                    reservas_conflicto = ReservaHotel.objects.filter(
-                        habitacion=hab,
-                        estado__in=['A', 'P']  # Activas o Pendientes
-                    ).exclude(
-                        id_reserva_hotel=reserva.id_reserva_hotel  # ✅ EXCLUIR RESERVA ACTUAL
-                    ).filter(
-                        # Condición de solapamiento de fechas
-                        Q(fecha_ini__lt=fecha_fin_dt, fecha_fin__gt=fecha_ini_dt)
-                    )
-                    
-                    if not reservas_conflicto.exists():
-                        habitacion_nueva = hab
-                        break
-                
                 if not habitacion_nueva:
                     return Response({
                         'error': 'No hay habitaciones disponibles con esas características en las fechas seleccionadas',
@@ -825,33 +1061,26 @@ def reservas_por_estado(request, estado):
                 'error': f'Estado no válido. Estados permitidos: {estados_validos}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        reservas = ReservaHotel.objects.select_related(
-            'datos_cliente',
-            'habitacion',
-            'reservas_gen'
-        ).filter(estado=estado).order_by('-fecha_ini')
+        # Una sola tabla (proyección), por el índice (estado, fecha_ini)
+        reservas = ReservaHotelListado.objects.filter(estado=estado).order_by('-fecha_ini').values(
+            'id_reserva_hotel', 'cant_personas', 'fecha_ini', 'fecha_fin', 'estado', 'amoblado', 'baño_priv',
+            'cliente_nombre', 'cliente_app_paterno', 'cliente_email', 'habitacion_numero'
+        )
         
         data = []
         for reserva in reservas:
-            # Calcular días de estadía
-            dias_estadia = 0
-            if reserva.fecha_ini and reserva.fecha_fin:
-                dias_estadia = (reserva.fecha_fin - reserva.fecha_ini).days
-                if dias_estadia < 0:
-                    dias_estadia = 0
-            
             reserva_data = {
-                'id_reserva_hotel': reserva.id_reserva_hotel,
-                'cant_personas': reserva.cant_personas,
-                'fecha_ini': reserva.fecha_ini,
-                'fecha_fin': reserva.fecha_fin,
-                'dias_estadia': dias_estadia,
-                'estado': reserva.estado,
-                'estado_display': get_estado_display(reserva.estado),
-                'cliente': f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}",
-                'cliente_email': reserva.datos_cliente.email,
-                'habitacion': reserva.habitacion.numero,
-                'tipo_habitacion': f"{'Amoblado' if reserva.amoblado == 'S' else 'Básico'} + {'Baño privado' if reserva.baño_priv == 'S' else 'Baño compartido'}"
+                'id_reserva_hotel': reserva['id_reserva_hotel'],
+                'cant_personas': reserva['cant_personas'],
+                'fecha_ini': reserva['fecha_ini'],
+                'fecha_fin': reserva['fecha_fin'],
+                'dias_estadia': max((reserva['fecha_fin'] - reserva['fecha_ini']).days, 0),
+                'estado': reserva['estado'],
+                'estado_display': get_estado_display(reserva['estado']),
+                'cliente': f"{reserva['cliente_nombre']} {reserva['cliente_app_paterno']}",
+                'cliente_email': reserva['cliente_email'],
+                'habitacion': reserva['habitacion_numero'],
+                'tipo_habitacion': f"{'Amoblado' if reserva['amoblado'] == 'S' else 'Básico'} + {'Baño privado' if reserva['baño_priv'] == 'S' else 'Baño compartido'}"
             }
             data.append(reserva_data)
         
@@ -878,36 +1107,30 @@ def reservas_por_cliente(request, cliente_id):
     try:
         cliente = get_object_or_404(DatosCliente, pk=cliente_id)
         
-        reservas = ReservaHotel.objects.select_related(
-            'habitacion',
-            'reservas_gen'
-        ).filter(datos_cliente=cliente).order_by('-fecha_ini')
+        # Una sola tabla (proyección), por el índice (datos_cliente_id, fecha_ini)
+        reservas = ReservaHotelListado.objects.filter(datos_cliente_id=cliente.pk).order_by('-fecha_ini').values(
+            'id_reserva_hotel', 'cant_personas', 'fecha_ini', 'fecha_fin', 'estado', 'amoblado', 'baño_priv',
+            'habitacion_numero', 'habitacion_piso', 'habitacion_tipo', 'check_in', 'check_out'
+        )
         
         data = []
         for reserva in reservas:
-            # Calcular días de estadía
-            dias_estadia = 0
-            if reserva.fecha_ini and reserva.fecha_fin:
-                dias_estadia = (reserva.fecha_fin - reserva.fecha_ini).days
-                if dias_estadia < 0:
-                    dias_estadia = 0
-            
             reserva_data = {
-                'id_reserva_hotel': reserva.id_reserva_hotel,
-                'cant_personas': reserva.cant_personas,
-                'fecha_ini': reserva.fecha_ini,
-                'fecha_fin': reserva.fecha_fin,
-                'dias_estadia': dias_estadia,
-                'estado': reserva.estado,
-                'estado_display': get_estado_display(reserva.estado),
+                'id_reserva_hotel': reserva['id_reserva_hotel'],
+                'cant_personas': reserva['cant_personas'],
+                'fecha_ini': reserva['fecha_ini'],
+                'fecha_fin': reserva['fecha_fin'],
+                'dias_estadia': max((reserva['fecha_fin'] - reserva['fecha_ini']).days, 0),
+                'estado': reserva['estado'],
+                'estado_display': get_estado_display(reserva['estado']),
                 'habitacion': {
-                    'numero': reserva.habitacion.numero,
-                    'piso': reserva.habitacion.piso,
-                    'tipo': reserva.habitacion.tipo
+                    'numero': reserva['habitacion_numero'],
+                    'piso': reserva['habitacion_piso'],
+                    'tipo': reserva['habitacion_tipo']
                 },
-                'tipo_reserva': f"{'Amoblado' if reserva.amoblado == 'S' else 'Básico'} + {'Baño privado' if reserva.baño_priv == 'S' else 'Baño compartido'}",
-                'check_in': reserva.check_in,
-                'check_out': reserva.check_out
+                'tipo_reserva': f"{'Amoblado' if reserva['amoblado'] == 'S' else 'Básico'} + {'Baño privado' if reserva['baño_priv'] == 'S' else 'Baño compartido'}",
+                'check_in': reserva['check_in'],
+                'check_out': reserva['check_out']
             }
             data.append(reserva_data)
         
@@ -941,30 +1164,8 @@ def habitaciones_disponibles(request):
     Ejemplo: GET /api/reservaHotel/habitaciones/disponibles/
     """
     try:
-        habitaciones = Habitacion.objects.filter(estado='DISPONIBLE').select_related('tarifa_hotel')
-        
-        data = []
-        for h in habitaciones:
-            data.append({
-                'id_habitacion': h.id_habitacion,
-                'numero': h.numero,
-                'piso': h.piso,
-                'tipo': h.tipo,
-                'amoblado': h.amoblado,
-                'baño_priv': h.baño_priv,
-                'estado': h.estado,
-                'tarifa_hotel': {
-                    'id_tarifa_hotel': h.tarifa_hotel.id_tarifa_hotel,
-                    'nombre': h.tarifa_hotel.nombre,
-                    'descripcion': h.tarifa_hotel.descripcion,
-                    'precio_persona': float(h.tarifa_hotel.precio_persona)
-                }
-            })
-        
-        return Response({
-            'count': len(data),
-            'habitaciones': data
-        }, status=status.HTTP_200_OK)
+        # Respuesta armada en la caché de catálogos (se invalida al guardar habitaciones o tarifas)
+        return Response(cache_catalogos.obtener('habitaciones_disponibles'), status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({
@@ -975,15 +1176,6 @@ def habitaciones_disponibles(request):
 # 🔹 FUNCIONES AUXILIARES
 # ==============================================
 
-def get_estado_display(estado):
-    """Convierte código de estado a texto legible"""
-    estados = {
-        'A': 'Activa',
-        'C': 'Cancelada', 
-        'F': 'Finalizada'
-    }
-    return estados.get(estado, 'Desconocido')
-
 # 🔹 REALIZAR INGRESO (POST)
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -1000,7 +1192,7 @@ def realizar_check_in(request, id_reserva):
                 'datos_cliente'
             ), pk=id_reserva)
 
-            print(f"🔍 Iniciando ingreso para reserva {id_reserva}")  # Debug
+            logger.debug("Iniciando ingreso para reserva %s", id_reserva)
             
             # --- VALIDACIONES ---
             
@@ -1035,13 +1227,6 @@ def realizar_check_in(request, id_reserva):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # --- REGISTRAR INGRESO ---
-            from django.utils import timezone
-            import pytz
-
-            # En realizar_ingreso:
-            tz_bolivia = pytz.timezone('America/La_Paz')
-            hora_bolivia = timezone.now().astimezone(tz_bolivia)
-
             # Esto guardará la hora en UTC, pero basada en la hora actual de Bolivia
             reserva.check_in = datetime.now() - timezone.timedelta(hours=timezone.now().utcoffset().total_seconds() / 3600) + timezone.timedelta(hours= -4)
             reserva.save()
@@ -1114,7 +1299,6 @@ def realizar_check_out(request, id_reserva):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # --- REGISTRAR SALIDA ---
-            from django.utils import timezone
             reserva.check_out = timezone.now()
             # Cambiar estado de la reserva a Finalizada
             reserva.estado = 'F'
@@ -1204,6 +1388,25 @@ def cancelar_check_in(request, id_reserva):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# 🔹 Columnas de la proyección (listado.py) comunes a ingresos, salidas, finalizadas y canceladas
+COLUMNAS_RESUMEN_HOTEL = (
+    'id_reserva_hotel', 'cliente_nombre', 'cliente_app_paterno', 'cliente_telefono',
+    'habitacion_numero', 'fecha_ini', 'fecha_fin', 'cant_personas'
+)
+
+
+def _resumen_reserva(reserva):
+    return {
+        'id_reserva_hotel': reserva['id_reserva_hotel'],
+        'cliente': f"{reserva['cliente_nombre']} {reserva['cliente_app_paterno']}",
+        'cliente_telefono': reserva['cliente_telefono'],
+        'habitacion': reserva['habitacion_numero'],
+        'fecha_ini': reserva['fecha_ini'],
+        'fecha_fin': reserva['fecha_fin'],
+        'cant_personas': reserva['cant_personas'],
+    }
+
+
 # 🔹 OBTENER RESERVAS PENDIENTES DE INGRESO (GET)
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -1215,27 +1418,18 @@ def reservas_pendientes_check_in(request):
     try:
         fecha_hoy = date.today()
         
-        reservas = ReservaHotel.objects.select_related(
-            'datos_cliente',
-            'habitacion'
-        ).filter(
+        reservas = ReservaHotelListado.objects.filter(
             estado='A',
             check_in__isnull=True,
             fecha_ini__lte=fecha_hoy,
             fecha_fin__gte=fecha_hoy
-        ).order_by('fecha_ini')
+        ).order_by('fecha_ini').values(*COLUMNAS_RESUMEN_HOTEL)
         
         data = []
         for reserva in reservas:
             data.append({
-                'id_reserva_hotel': reserva.id_reserva_hotel,
-                'cliente': f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}",
-                'cliente_telefono': reserva.datos_cliente.telefono,
-                'habitacion': reserva.habitacion.numero,
-                'fecha_ini': reserva.fecha_ini,
-                'fecha_fin': reserva.fecha_fin,
-                'cant_personas': reserva.cant_personas,
-                'dias_desde_inicio': (fecha_hoy - reserva.fecha_ini).days
+                **_resumen_reserva(reserva),
+                'dias_desde_inicio': (fecha_hoy - reserva['fecha_ini']).days
             })
         
         return Response({
@@ -1259,41 +1453,37 @@ def reservas_pendientes_check_out(request):
     Ejemplo: GET /api/reservaHotel/pendientes-check-out/
     """
     try:
-        reservas = ReservaHotel.objects.select_related(
-            'datos_cliente',
-            'habitacion'
-        ).filter(
+        reservas = ReservaHotelListado.objects.filter(
             estado='A',
             check_in__isnull=False,
             check_out__isnull=True
-        ).order_by('check_in')
+        ).order_by('check_in').values(*COLUMNAS_RESUMEN_HOTEL, 'check_in')
         
         data = []
-        from django.utils import timezone
         ahora = timezone.now()
         
         for reserva in reservas:
-            tiempo_desde_check_in = ahora - reserva.check_in
+            tiempo_desde_check_in = ahora - reserva['check_in']
             dias_hospedaje = tiempo_desde_check_in.days
             horas_hospedaje = tiempo_desde_check_in.seconds // 3600
             
             data.append({
-                'id_reserva_hotel': reserva.id_reserva_hotel,
-                'cliente': f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}",
-                'cliente_telefono': reserva.datos_cliente.telefono,
-                'habitacion': reserva.habitacion.numero,
-                'fecha_ini': reserva.fecha_ini,  # ✅ AGREGAR ESTA LÍNEA
-                'fecha_fin': reserva.fecha_fin,  # ✅ AGREGAR ESTA LÍNEA
-                'check_in': reserva.check_in.strftime('%Y-%m-%d %H:%M:%S'),
-                'fecha_check_out_esperado': reserva.fecha_fin,
-                'cant_personas': reserva.cant_personas,
+                'id_reserva_hotel': reserva['id_reserva_hotel'],
+                'cliente': f"{reserva['cliente_nombre']} {reserva['cliente_app_paterno']}",
+                'cliente_telefono': reserva['cliente_telefono'],
+                'habitacion': reserva['habitacion_numero'],
+                'fecha_ini': reserva['fecha_ini'],
+                'fecha_fin': reserva['fecha_fin'],
+                'check_in': reserva['check_in'].strftime('%Y-%m-%d %H:%M:%S'),
+                'fecha_check_out_esperado': reserva['fecha_fin'],
+                'cant_personas': reserva['cant_personas'],
                 'tiempo_hospedado': {
                     'dias': dias_hospedaje,
                     'horas': horas_hospedaje,
                     'texto': f"{dias_hospedaje} días, {horas_hospedaje} horas"
                 
                 },
-                'sobrepaso_fecha': date.today() > reserva.fecha_fin
+                'sobrepaso_fecha': date.today() > reserva['fecha_fin']
             })
         
         return Response({
@@ -1314,18 +1504,15 @@ def reservas_finalizadas(request):
     Retorna reservas finalizadas (con salida registrada)
     """
     try:
-        reservas = ReservaHotel.objects.select_related(
-            'datos_cliente',
-            'habitacion'
-        ).filter(
+        reservas = ReservaHotelListado.objects.filter(
             estado='F'  # Reservas finalizadas
-        ).order_by('-check_out')
+        ).order_by('-check_out').values(*COLUMNAS_RESUMEN_HOTEL, 'check_in', 'check_out', 'estado')
         
         data = []
         for reserva in reservas:
             duracion = None
-            if reserva.check_in and reserva.check_out:
-                duracion_estadia = reserva.check_out - reserva.check_in
+            if reserva['check_in'] and reserva['check_out']:
+                duracion_estadia = reserva['check_out'] - reserva['check_in']
                 dias = duracion_estadia.days
                 horas = duracion_estadia.seconds // 3600
                 minutos = (duracion_estadia.seconds % 3600) // 60
@@ -1337,17 +1524,17 @@ def reservas_finalizadas(request):
                 }
             
             data.append({
-                'id_reserva_hotel': reserva.id_reserva_hotel,
-                'cliente': f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}",
-                'cliente_telefono': reserva.datos_cliente.telefono,
-                'habitacion': reserva.habitacion.numero,
-                'fecha_ini': reserva.fecha_ini,
-                'fecha_fin': reserva.fecha_fin,
-                'check_in': reserva.check_in.strftime('%Y-%m-%d %H:%M:%S') if reserva.check_in else None,
-                'check_out': reserva.check_out.strftime('%Y-%m-%d %H:%M:%S') if reserva.check_out else None,
-                'cant_personas': reserva.cant_personas,
+                'id_reserva_hotel': reserva['id_reserva_hotel'],
+                'cliente': f"{reserva['cliente_nombre']} {reserva['cliente_app_paterno']}",
+                'cliente_telefono': reserva['cliente_telefono'],
+                'habitacion': reserva['habitacion_numero'],
+                'fecha_ini': reserva['fecha_ini'],
+                'fecha_fin': reserva['fecha_fin'],
+                'check_in': reserva['check_in'].strftime('%Y-%m-%d %H:%M:%S') if reserva['check_in'] else None,
+                'check_out': reserva['check_out'].strftime('%Y-%m-%d %H:%M:%S') if reserva['check_out'] else None,
+                'cant_personas': reserva['cant_personas'],
                 'duracion_estadia': duracion,
-                'estado': reserva.estado,
+                'estado': reserva['estado'],
             })
         
         return Response({
@@ -1369,26 +1556,17 @@ def reservas_canceladas(request):
     Ejemplo: GET /api/reservaHotel/canceladas/
     """
     try:
-        reservas = ReservaHotel.objects.select_related(
-            'datos_cliente',
-            'habitacion'
-        ).filter(
+        reservas = ReservaHotelListado.objects.filter(
             estado='C'
-        ).order_by('-fecha_ini')
+        ).order_by('-fecha_ini').values(*COLUMNAS_RESUMEN_HOTEL, 'check_in', 'check_out', 'estado')
         
         data = []
         for reserva in reservas:
             data.append({
-                'id_reserva_hotel': reserva.id_reserva_hotel,
-                'cliente': f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}",
-                'cliente_telefono': reserva.datos_cliente.telefono,
-                'habitacion': reserva.habitacion.numero,
-                'fecha_ini': reserva.fecha_ini,
-                'fecha_fin': reserva.fecha_fin,
-                'cant_personas': reserva.cant_personas,
-                'check_in': reserva.check_in.strftime('%Y-%m-%d %H:%M:%S') if reserva.check_in else None,
-                'check_out': reserva.check_out.strftime('%Y-%m-%d %H:%M:%S') if reserva.check_out else None,
-                'estado': reserva.estado,
+                **_resumen_reserva(reserva),
+                'check_in': reserva['check_in'].strftime('%Y-%m-%d %H:%M:%S') if reserva['check_in'] else None,
+                'check_out': reserva['check_out'].strftime('%Y-%m-%d %H:%M:%S') if reserva['check_out'] else None,
+                'estado': reserva['estado'],
             })
         
         return Response({
@@ -1402,21 +1580,14 @@ def reservas_canceladas(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-import pytz
-from datetime import timedelta
-from django.utils import timezone
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
-from rest_framework.response import Response
-from rest_framework import status
-from .models import ReservaHotel
-
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@con_etag(DOMINIO_HOTEL)
 def obtener_notificaciones_hotel(request):
     """
     Endpoint para obtener notificaciones de reservas de hotel.
-    Flutter hará polling cada 30-60 segundos.
+    Para clientes que hacen polling (cada 30-60 segundos); los que pueden
+    mantener la conexión abierta usan notificaciones/stream/ (ver notificaciones.py).
     
     GET /api/reservaHotel/notificaciones/
     
@@ -1427,137 +1598,8 @@ def obtener_notificaciones_hotel(request):
     try:
         tz_bolivia = pytz.timezone('America/La_Paz')
         ahora = timezone.now().astimezone(tz_bolivia)
-        fecha_hoy = ahora.date()
-        
-        notificaciones = []
-        
-        # ==========================================
-        # 1️⃣ NOTIFICACIONES PRE-INICIO (Reservas que inician hoy)
-        # ==========================================
-        reservas_hoy = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_ini=fecha_hoy,
-            check_in__isnull=True
-        ).select_related('datos_cliente', 'habitacion')
-        
-        for reserva in reservas_hoy:
-            cliente = reserva.datos_cliente
-            
-            notificaciones.append({
-                'tipo': 'PRE_INICIO',
-                'prioridad': 'MEDIA',
-                'titulo': '⚠️ RESERVA DEBE INICIAR HOY',
-                'mensaje': f"La reserva de {cliente.nombre} debe iniciar hoy y aún no ha hecho ingreso",
-                'reserva_id': reserva.id_reserva_hotel,
-                'cliente_nombre': f"{cliente.nombre} {cliente.app_paterno}",
-                'cliente_telefono': str(cliente.telefono),
-                'cliente_email': cliente.email,
-                'habitacion': reserva.habitacion.numero,
-                'fecha_ini': str(reserva.fecha_ini),
-                'fecha_fin': str(reserva.fecha_fin),
-                'cant_personas': reserva.cant_personas,
-                'timestamp': ahora.isoformat()
-            })
-        
-        # ==========================================
-        # 2️⃣ NOTIFICACIONES DE RETRASO (Ya pasó la fecha de inicio)
-        # ==========================================
-        reservas_con_retraso = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_ini__lt=fecha_hoy,
-            fecha_fin__gte=fecha_hoy,
-            check_in__isnull=True
-        ).select_related('datos_cliente', 'habitacion')
-        
-        for reserva in reservas_con_retraso:
-            cliente = reserva.datos_cliente
-            
-            # Calcular días de retraso
-            dias_retraso = (fecha_hoy - reserva.fecha_ini).days
-            
-            notificaciones.append({
-                'tipo': 'RETRASO',
-                'prioridad': 'ALTA',
-                'titulo': '🚨 CLIENTE NO HA REGISTRADO INGRESO',
-                'mensaje': f"La reserva debió iniciar hace {dias_retraso} día(s) y el cliente aún no ha hecho ingreso",
-                'reserva_id': reserva.id_reserva_hotel,
-                'cliente_nombre': f"{cliente.nombre} {cliente.app_paterno}",
-                'cliente_telefono': str(cliente.telefono),
-                'cliente_email': cliente.email,
-                'habitacion': reserva.habitacion.numero,
-                'fecha_ini': str(reserva.fecha_ini),
-                'fecha_fin': str(reserva.fecha_fin),
-                'cant_personas': reserva.cant_personas,
-                'dias_retraso': dias_retraso,
-                'timestamp': ahora.isoformat()
-            })
-        
-        # ==========================================
-        # 3️⃣ RESERVAS PRÓXIMAS (próximos 7 días) - INFO
-        # ==========================================
-        fecha_limite = fecha_hoy + timedelta(days=7)
-        
-        reservas_proximas = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_ini__gt=fecha_hoy,
-            fecha_ini__lte=fecha_limite,
-            check_in__isnull=True
-        ).select_related('datos_cliente', 'habitacion').order_by('fecha_ini')[:10]
-        
-        proximas_reservas = []
-        for reserva in reservas_proximas:
-            dias_restantes = (reserva.fecha_ini - fecha_hoy).days
-            
-            proximas_reservas.append({
-                'id': reserva.id_reserva_hotel,
-                'cliente': f"{reserva.datos_cliente.nombre} {reserva.datos_cliente.app_paterno}",
-                'habitacion': reserva.habitacion.numero,
-                'fecha_ini': str(reserva.fecha_ini),
-                'fecha_fin': str(reserva.fecha_fin),
-                'cant_personas': reserva.cant_personas,
-                'dias_restantes': dias_restantes
-            })
         
-        # ==========================================
-        # 4️⃣ SALIDAS PENDIENTES (deben salir hoy o ya pasó la fecha)
-        # ==========================================
-        reservas_checkout_pendiente = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_fin__lte=fecha_hoy,
-            check_in__isnull=False,
-            check_out__isnull=True
-        ).select_related('datos_cliente', 'habitacion')
-        
-        for reserva in reservas_checkout_pendiente:
-            cliente = reserva.datos_cliente
-            dias_excedidos = (fecha_hoy - reserva.fecha_fin).days
-            
-            if dias_excedidos > 0:
-                prioridad = 'ALTA'
-                titulo = '🚨 SALIDA VENCIDA'
-                mensaje = f"La reserva venció hace {dias_excedidos} día(s) y el cliente no ha hecho salida"
-            else:
-                prioridad = 'MEDIA'
-                titulo = '⚠️ SALIDA PENDIENTE HOY'
-                mensaje = f"La reserva debe finalizar hoy y el cliente aún no ha hecho salida"
-            
-            notificaciones.append({
-                'tipo': 'CHECK_OUT_PENDIENTE',
-                'prioridad': prioridad,
-                'titulo': titulo,
-                'mensaje': mensaje,
-                'reserva_id': reserva.id_reserva_hotel,
-                'cliente_nombre': f"{cliente.nombre} {cliente.app_paterno}",
-                'cliente_telefono': str(cliente.telefono),
-                'cliente_email': cliente.email,
-                'habitacion': reserva.habitacion.numero,
-                'fecha_ini': str(reserva.fecha_ini),
-                'fecha_fin': str(reserva.fecha_fin),
-                'check_in': reserva.check_in.strftime('%Y-%m-%d %H:%M:%S'),
-                'cant_personas': reserva.cant_personas,
-                'dias_excedidos': dias_excedidos if dias_excedidos > 0 else 0,
-                'timestamp': ahora.isoformat()
-            })
+        notificaciones, proximas_reservas = construir_notificaciones_hotel(ahora)
         
         return Response({
             'notificaciones': notificaciones,
@@ -1575,8 +1617,96 @@ def obtener_notificaciones_hotel(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# 🔹 Campos de la próxima reserva (se leen en el mismo aggregate que los conteos)
+CAMPOS_PROXIMA_RESERVA = {
+    'id': 'id_reserva_hotel',
+    'nombre': 'datos_cliente__nombre',
+    'app_paterno': 'datos_cliente__app_paterno',
+    'habitacion': 'habitacion__numero',
+    'fecha_ini': 'fecha_ini',
+    'cant_personas': 'cant_personas',
+}
+
+
+def _calcular_tablero_hotel(fecha_hoy):
+    """Conteos del día y próxima reserva en una sola consulta"""
+    activa = Q(estado='A')
+    hospedado = activa & Q(check_in__isnull=False, check_out__isnull=True)
+    en_fechas = activa & Q(fecha_ini__lte=fecha_hoy, fecha_fin__gte=fecha_hoy)
+
+    # Próxima reserva que debe iniciar
+    proxima_reserva = ReservaHotel.objects.filter(
+        estado='A',
+        fecha_ini__gte=fecha_hoy,
+        check_in__isnull=True
+    ).order_by('fecha_ini')
+
+    resultado = ReservaHotel.objects.aggregate(
+        # Reservas que deben iniciar hoy
+        reservas_inicio_hoy=Count('pk', filter=Q(fecha_ini=fecha_hoy)),
+        # Reservas activas (con fecha de inicio <= hoy y fecha fin >= hoy)
+        reservas_activas=Count('pk', filter=en_fechas),
+        # Reservas con INGRESO (actualmente hospedados)
+        huespedes_actuales=Count('pk', filter=hospedado),
+        # Ingresos pendientes (deben iniciar hoy o antes y no tienen ingreso)
+        check_ins_pendientes=Count('pk', filter=en_fechas & Q(check_in__isnull=True)),
+        # Salidas esperadas hoy
+        check_outs_hoy=Count('pk', filter=hospedado & Q(fecha_fin=fecha_hoy)),
+        # Salidas vencidas (fecha fin < hoy y no tienen salida registrada)
+        check_outs_vencidos=Count('pk', filter=hospedado & Q(fecha_fin__lt=fecha_hoy)),
+        # Reservas finalizadas hoy
+        finalizadas_hoy=Count('pk', filter=Q(estado='F', check_out__date=fecha_hoy)),
+        **primera_fila(proxima_reserva, CAMPOS_PROXIMA_RESERVA, 'proxima_')
+    )
+
+    proxima = extraer_primera_fila(resultado, CAMPOS_PROXIMA_RESERVA, 'proxima_')
+    if proxima:
+        dias_restantes = (proxima['fecha_ini'] - fecha_hoy).days
+        proxima = {
+            'id': proxima['id'],
+            'cliente': f"{proxima['nombre']} {proxima['app_paterno']}",
+            'habitacion': proxima['habitacion'],
+            'fecha_ini': str(proxima['fecha_ini']),
+            'cant_personas': proxima['cant_personas'],
+            'dias_restantes': dias_restantes,
+            'es_hoy': dias_restantes == 0
+        }
+    resultado['proxima_reserva'] = proxima
+    return resultado
+
+
+@require_GET
+def stream_notificaciones_hotel(request):
+    """
+    Canal Server-Sent Events con los cambios de notificaciones de hotel.
+    
+    GET /api/reservaHotel/notificaciones/stream/
+    
+    Eventos: `snapshot` al conectar y `cambios` (nuevas/actualizadas/resueltas)
+    cuando cambian las reservas o la fecha. Reanuda con el header Last-Event-ID
+    (o ?ultimo_id=).
+    """
+    ultimo = request.headers.get('Last-Event-ID') or request.GET.get('ultimo_id')
+    try:
+        ultimo = int(ultimo) if ultimo else None
+    except ValueError:
+        ultimo = None
+
+    # Con ASGI el flujo es asíncrono; con WSGI ocupa el hilo del request
+    if isinstance(request, ASGIRequest):
+        flujo = canal_notificaciones_hotel.flujo_sse_asincrono(ultimo)
+    else:
+        flujo = canal_notificaciones_hotel.flujo_sse(ultimo)
+
+    respuesta = StreamingHttpResponse(flujo, content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'  # nginx: no acumular el flujo
+    return respuesta
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@con_etag(DOMINIO_HOTEL)
 def estadisticas_hotel_hoy(request):
     """
     Endpoint para obtener estadísticas de reservas de hotel del día.
@@ -1588,85 +1718,10 @@ def estadisticas_hotel_hoy(request):
         ahora = timezone.now().astimezone(tz_bolivia)
         fecha_hoy = ahora.date()
         
-        # Reservas que deben iniciar hoy
-        reservas_inicio_hoy = ReservaHotel.objects.filter(
-            fecha_ini=fecha_hoy
-        ).count()
-        
-        # Reservas activas (con fecha de inicio <= hoy y fecha fin >= hoy)
-        reservas_activas = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_ini__lte=fecha_hoy,
-            fecha_fin__gte=fecha_hoy
-        ).count()
-        
-        # Reservas con INGRESO (actualmente hospedados)
-        huespedes_actuales = ReservaHotel.objects.filter(
-            estado='A',
-            check_in__isnull=False,
-            check_out__isnull=True
-        ).count()
-        
-        # Ingresos pendientes (deben iniciar hoy o antes y no tienen ingreso)
-        check_ins_pendientes = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_ini__lte=fecha_hoy,
-            fecha_fin__gte=fecha_hoy,
-            check_in__isnull=True
-        ).count()
-        
-        # Salidas esperadas hoy
-        check_outs_hoy = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_fin=fecha_hoy,
-            check_in__isnull=False,
-            check_out__isnull=True
-        ).count()
-        
-        # Salidas vencidas (fecha fin < hoy y no tienen salida registrada)
-        check_outs_vencidos = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_fin__lt=fecha_hoy,
-            check_in__isnull=False,
-            check_out__isnull=True
-        ).count()
-        
-        # Reservas finalizadas hoy
-        finalizadas_hoy = ReservaHotel.objects.filter(
-            estado='F',
-            check_out__date=fecha_hoy
-        ).count()
-        
-        # Próxima reserva que debe iniciar
-        proxima_reserva = ReservaHotel.objects.filter(
-            estado='A',
-            fecha_ini__gte=fecha_hoy,
-            check_in__isnull=True
-        ).select_related('datos_cliente', 'habitacion').order_by('fecha_ini').first()
-        
-        proxima = None
-        if proxima_reserva:
-            dias_restantes = (proxima_reserva.fecha_ini - fecha_hoy).days
-            
-            proxima = {
-                'id': proxima_reserva.id_reserva_hotel,
-                'cliente': f"{proxima_reserva.datos_cliente.nombre} {proxima_reserva.datos_cliente.app_paterno}",
-                'habitacion': proxima_reserva.habitacion.numero,
-                'fecha_ini': str(proxima_reserva.fecha_ini),
-                'cant_personas': proxima_reserva.cant_personas,
-                'dias_restantes': dias_restantes,
-                'es_hoy': dias_restantes == 0
-            }
+        datos = obtener_tablero(DOMINIO_HOTEL, fecha_hoy, lambda: _calcular_tablero_hotel(fecha_hoy))
         
         return Response({
-            'reservas_inicio_hoy': reservas_inicio_hoy,
-            'reservas_activas': reservas_activas,
-            'huespedes_actuales': huespedes_actuales,
-            'check_ins_pendientes': check_ins_pendientes,
-            'check_outs_hoy': check_outs_hoy,
-            'check_outs_vencidos': check_outs_vencidos,
-            'finalizadas_hoy': finalizadas_hoy,
-            'proxima_reserva': proxima,
+            **datos,
             'fecha': str(fecha_hoy),
             'hora_actual': ahora.strftime('%H:%M:%S')
         }, status=status.HTTP_200_OK)
@@ -1674,4 +1729,142 @@ def estadisticas_hotel_hoy(request):
     except Exception as e:
         return Response({
             'error': f'Error: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# 🔹 Verificar el índice de disponibilidad contra la base de datos
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def verificar_indice_disponibilidad(request):
+    """
+    Compara el índice de disponibilidad en memoria con la BD.
+    Query param opcional: reparar=1 recarga el índice si hay diferencias.
+    
+    GET /api/reservaHotel/indice-disponibilidad/verificar/
+    """
+    try:
+        reparar = request.GET.get('reparar') in ('1', 'true', 'True')
+        resultado = indice_disponibilidad.verificar_consistencia(reparar=reparar)
+        resultado['estadisticas'] = indice_disponibilidad.obtener_estadisticas()
+        return Response(resultado, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': f'Error al verificar el índice: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# 🔹 Obtener estadísticas de la cola de reservas de hotel
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def obtener_estadisticas_cola(request):
+    """
+    Retorna estadísticas de la cola de prioridad de hotel,
+    incluyendo el tiempo de espera en cola de las últimas solicitudes.
+    
+    GET /api/reservaHotel/estadisticas-cola/
+    """
+    estadisticas = gestor_cola.obtener_estadisticas()
+    return Response(estadisticas, status=status.HTTP_200_OK)
+
+# 🔹 Calendario de ocupación habitación × día
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def calendario_ocupacion_hotel(request):
+    """
+    Matriz compacta de ocupación de todas las habitaciones para una ventana de días.
+    Query params opcionales:
+        fecha_desde (YYYY-MM-DD, por defecto hoy), dias (por defecto 30),
+        formato: 'bits' (un carácter por día, '1' = ocupada) o 'rangos' ([fecha_ini, fecha_fin) ocupados)
+    
+    GET /api/reservaHotel/calendario/?fecha_desde=2025-01-01&dias=90&formato=rangos
+    """
+    try:
+        fecha_desde = request.GET.get('fecha_desde')
+        if fecha_desde:
+            desde = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
+        else:
+            desde = timezone.now().astimezone(pytz.timezone('America/La_Paz')).date()
+        dias = int(request.GET.get('dias', 30))
+    except ValueError:
+        return Response({
+            'error': 'fecha_desde debe tener formato YYYY-MM-DD y dias debe ser un número entero'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    dias_max = getattr(settings, 'CALENDARIO_DIAS_MAX', 366)
+    if not 1 <= dias <= dias_max:
+        return Response({
+            'error': f'dias debe estar entre 1 y {dias_max}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    formato = request.GET.get('formato', 'bits')
+    if formato not in ('bits', 'rangos'):
+        return Response({
+            'error': "formato debe ser 'bits' o 'rangos'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        ocupacion = ocupacion_ventana(desde, dias)
+        habitaciones = []
+        for habitacion in cache_catalogos.obtener('habitaciones'):
+            bits = ocupacion.get(habitacion['id_habitacion'], 0)
+            habitaciones.append({
+                'id_habitacion': habitacion['id_habitacion'],
+                'numero': habitacion['numero'],
+                'piso': habitacion['piso'],
+                'tipo': habitacion['tipo'],
+                'estado': habitacion['estado'],
+                'noches_ocupadas': bin(bits).count('1'),
+                'ocupacion': bits_a_texto(bits, dias) if formato == 'bits' else bits_a_rangos(bits, desde)
+            })
+
+        return Response({
+            'desde': str(desde),
+            'hasta': str(desde + timedelta(days=dias)),
+            'dias': dias,
+            'formato': formato,
+            'habitaciones': habitaciones,
+            'ocupadas_por_dia': ocupadas_por_dia(ocupacion, dias)
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'error': f'Error al calcular el calendario: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# 🔹 Búsqueda de habitación con alternativas
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def buscar_habitacion_hotel(request):
+    """
+    Mejor habitación libre para la estadía o, si no hay, alternativas ordenadas
+    (otro tipo en las mismas fechas, fechas cercanas, estadía dividida) con precios.
+    Query params: fecha_ini, fecha_fin (YYYY-MM-DD), cant_personas,
+                  amoblado y baño_priv ('S'/'N', por defecto 'N'), limite (por defecto 3)
+    
+    GET /api/reservaHotel/buscar/?fecha_ini=2025-01-10&fecha_fin=2025-01-13&cant_personas=2&amoblado=S
+    """
+    amoblado = request.GET.get('amoblado', 'N').upper()
+    baño_priv = request.GET.get('baño_priv', request.GET.get('bano_priv', 'N')).upper()
+    try:
+        fecha_ini = datetime.strptime(request.GET.get('fecha_ini', ''), '%Y-%m-%d').date()
+        fecha_fin = datetime.strptime(request.GET.get('fecha_fin', ''), '%Y-%m-%d').date()
+        cant_personas = int(request.GET.get('cant_personas', 1))
+        limite = int(request.GET.get('limite', 3))
+    except ValueError:
+        return Response({
+            'error': 'fecha_ini y fecha_fin deben tener formato YYYY-MM-DD; cant_personas y limite deben ser números enteros'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if fecha_fin <= fecha_ini:
+        return Response({'error': 'La fecha de fin debe ser posterior a la fecha de inicio'}, status=status.HTTP_400_BAD_REQUEST)
+    if cant_personas < 1 or not 1 <= limite <= 20:
+        return Response({'error': 'cant_personas debe ser al menos 1 y limite estar entre 1 y 20'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        hoy = timezone.now().astimezone(pytz.timezone('America/La_Paz')).date()
+        resultado = buscar_habitacion(amoblado, baño_priv, fecha_ini, fecha_fin, cant_personas, hoy, limite)
+        return Response(resultado, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'error': f'Error al buscar habitaciones: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReservasEventoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reservas_evento'
+
+    def ready(self):
+        # Señales que mantienen el índice de servicios de eventos
+        from . import signals  # noqa: F401
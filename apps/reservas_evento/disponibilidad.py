@@ -0,0 +1,355 @@
+# ========================================
+# ARCHIVO: apps/reservas_evento/disponibilidad.py
+# Índice en memoria de horarios ocupados por servicio adicional y fecha
+# ========================================
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from django.utils import timezone
+
+from .models import ReservasEvento
+from apps.servicios_evento.models import ServiciosEvento
+
+
+def _a_fecha(valor):
+    """Normaliza str/datetime/date a datetime.date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(str(valor), '%Y-%m-%d').date()
+
+
+def _a_hora(valor):
+    """Normaliza str/datetime a datetime aware (igual que verificar_disponibilidad_servicio)"""
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    if timezone.is_naive(valor):
+        valor = timezone.make_aware(valor, timezone.get_current_timezone())
+    return valor
+
+
+class IntervalosServicio:
+    """Horarios [hora_ini, hora_fin) de un servicio en un día, ordenados por hora_ini"""
+    __slots__ = ('intervalos', '_fusionados')
+
+    def __init__(self):
+        self.intervalos = []  # [(hora_ini, hora_fin, id_reserva), ...]
+        self._fusionados = None
+
+    def agregar(self, id_reserva, hora_ini, hora_fin):
+        insort(self.intervalos, (hora_ini, hora_fin, id_reserva))
+        self._fusionados = None
+
+    def quitar(self, id_reserva):
+        self.intervalos = [i for i in self.intervalos if i[2] != id_reserva]
+        self._fusionados = None
+
+    def fusionados(self):
+        """Horarios ocupados con los solapados o contiguos unidos: [(hora_ini, hora_fin), ...]"""
+        if self._fusionados is None:
+            fusionados = []
+            for ini, fin, _ in self.intervalos:
+                if fusionados and ini <= fusionados[-1][1]:
+                    if fin > fusionados[-1][1]:
+                        fusionados[-1] = (fusionados[-1][0], fin)
+                else:
+                    fusionados.append((ini, fin))
+            self._fusionados = fusionados
+        return self._fusionados
+
+    def conflictos(self, hora_ini, hora_fin, excluir_reserva_id=None):
+        """Intervalos que se solapan con [hora_ini, hora_fin)"""
+        # Solo pueden solaparse los que inician antes de hora_fin
+        pos = bisect_left(self.intervalos, (hora_fin,))
+        return [
+            (ini, fin, id_reserva) for ini, fin, id_reserva in self.intervalos[:pos]
+            if fin > hora_ini and id_reserva != excluir_reserva_id
+        ]
+
+    def __len__(self):
+        return len(self.intervalos)
+
+
+class DiaEventos:
+    """Reservas activas de una fecha y sus servicios"""
+    __slots__ = ('servicios', 'reservas', 'cargado_en')
+
+    def __init__(self):
+        self.servicios = {}  # {servicio_id: IntervalosServicio}
+        self.reservas = {}   # {id_reserva: (hora_ini, hora_fin, {servicio_id, ...}, cant_personas)}
+        self.cargado_en = time.time()
+
+    def agregar_servicio(self, id_reserva, servicio_id):
+        hora_ini, hora_fin, servicios, _ = self.reservas[id_reserva]
+        if servicio_id not in servicios:
+            servicios.add(servicio_id)
+            self.servicios.setdefault(servicio_id, IntervalosServicio()).agregar(id_reserva, hora_ini, hora_fin)
+
+    def quitar_servicio(self, id_reserva, servicio_id):
+        servicios = self.reservas[id_reserva][2]
+        if servicio_id in servicios:
+            servicios.discard(servicio_id)
+            self.servicios[servicio_id].quitar(id_reserva)
+
+    def quitar_reserva(self, id_reserva):
+        _, _, servicios, _ = self.reservas.pop(id_reserva)
+        for servicio_id in servicios:
+            self.servicios[servicio_id].quitar(id_reserva)
+        return servicios
+
+
+class IndiceServiciosEvento:
+    """
+    Índice de horarios ocupados por (servicio, fecha), singleton por proceso.
+    Cada fecha se carga desde la BD la primera vez que se consulta (2 consultas,
+    o 2 para todo un rango de fechas) y se mantiene al día con señales de ReservasEvento y ServiciosEvento
+    (ver signals.py). La cola vuelve a verificar en BD antes de crear la reserva.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    # Estados que ocupan los servicios (igual que el registro de eventos)
+    ESTADOS_ACTIVOS = ('A', 'P')
+
+    # ⏱️ Recarga periódica de cada fecha para absorber escrituras de otros procesos (segundos)
+    TIEMPO_RECARGA = 300
+
+    # 📅 Fechas guardadas en memoria (se descartan las menos usadas)
+    MAX_FECHAS = 400
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._inicializar()
+        return cls._instance
+
+    def _inicializar(self):
+        self._datos_lock = threading.RLock()
+        self.dias = OrderedDict()     # {fecha: DiaEventos}, menos usada primero
+        self.generaciones = {}        # {fecha: int} cambia con cada escritura durante una carga
+        self.reserva_fecha = {}       # {id_reserva: fecha} de las fechas cargadas
+        self.cargas = 0
+        self.aciertos = 0
+
+    # ==============================================
+    # 🔹 CARGA POR FECHA
+    # ==============================================
+
+    def _leer_bd(self, fecha):
+        return self._leer_bd_rango([fecha])[fecha]
+
+    def _leer_bd_rango(self, fechas):
+        """{fecha: DiaEventos} de las fechas pedidas (también las vacías) con 2 consultas"""
+        dias = {fecha: DiaEventos() for fecha in fechas}
+        desde, hasta = min(fechas), max(fechas)
+        reservas = ReservasEvento.objects.filter(
+            fecha__range=(desde, hasta), estado__in=self.ESTADOS_ACTIVOS
+        ).values_list('id_reservas_evento', 'fecha', 'hora_ini', 'hora_fin', 'cant_personas')
+        fecha_reserva = {}
+        for id_reserva, fecha, hora_ini, hora_fin, cant_personas in reservas:
+            if fecha in dias:
+                dias[fecha].reservas[id_reserva] = (hora_ini, hora_fin, set(), cant_personas)
+                fecha_reserva[id_reserva] = fecha
+
+        servicios = ServiciosEvento.objects.filter(
+            reservas_evento__fecha__range=(desde, hasta),
+            reservas_evento__estado__in=self.ESTADOS_ACTIVOS
+        ).values_list('reservas_evento_id', 'servicios_adicionales_id')
+        for id_reserva, servicio_id in servicios:
+            fecha = fecha_reserva.get(id_reserva)
+            if fecha is not None:
+                dias[fecha].agregar_servicio(id_reserva, servicio_id)
+        return dias
+
+    def _vigente(self, dia):
+        return dia is not None and time.time() - dia.cargado_en <= self.TIEMPO_RECARGA
+
+    def _obtener_dia(self, fecha):
+        """Día cargado (desde memoria o BD)"""
+        with self._datos_lock:
+            dia = self.dias.get(fecha)
+            if self._vigente(dia):
+                self.dias.move_to_end(fecha)
+                self.aciertos += 1
+                return dia
+            generacion = self.generaciones.get(fecha, 0)
+
+        dia = self._leer_bd(fecha)
+
+        with self._datos_lock:
+            self.cargas += 1
+            self._guardar_dia(fecha, dia, generacion)
+        return dia
+
+    def _obtener_dias(self, desde, hasta):
+        """{fecha: DiaEventos} de [desde, hasta]; las fechas que faltan se leen juntas"""
+        fechas = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+        dias = {}
+        with self._datos_lock:
+            for fecha in fechas:
+                dia = self.dias.get(fecha)
+                if self._vigente(dia):
+                    self.dias.move_to_end(fecha)
+                    self.aciertos += 1
+                    dias[fecha] = dia
+            faltantes = {fecha: self.generaciones.get(fecha, 0) for fecha in fechas if fecha not in dias}
+
+        if faltantes:
+            leidos = self._leer_bd_rango(list(faltantes))
+            with self._datos_lock:
+                self.cargas += 1
+                for fecha, dia in leidos.items():
+                    self._guardar_dia(fecha, dia, faltantes[fecha])
+            dias.update(leidos)
+        return dias
+
+    def _guardar_dia(self, fecha, dia, generacion):
+        # Si hubo escrituras para esta fecha mientras se leía, no guardar (la próxima consulta recarga)
+        if self.generaciones.get(fecha, 0) == generacion:
+            self._descartar_dia(fecha)
+            self.dias[fecha] = dia
+            for id_reserva in dia.reservas:
+                self.reserva_fecha[id_reserva] = fecha
+            while len(self.dias) > self.MAX_FECHAS:
+                self._descartar_dia(next(iter(self.dias)))
+
+    def _descartar_dia(self, fecha):
+        dia = self.dias.pop(fecha, None)
+        if dia is not None:
+            for id_reserva in dia.reservas:
+                self.reserva_fecha.pop(id_reserva, None)
+
+    def invalidar_fecha(self, fecha):
+        """Fuerza recargar la fecha en la próxima consulta"""
+        with self._datos_lock:
+            self.generaciones[fecha] = self.generaciones.get(fecha, 0) + 1
+            self._descartar_dia(fecha)
+
+    # ==============================================
+    # 🔹 MANTENIMIENTO INCREMENTAL (desde señales)
+    # ==============================================
+
+    def aplicar_reserva(self, id_reserva, fecha, hora_ini, hora_fin, estado, creada, cant_personas=None):
+        """Alta/cambio de fecha u horario/cancelación/finalización de una reserva"""
+        fecha = _a_fecha(fecha)
+        with self._datos_lock:
+            self.generaciones[fecha] = self.generaciones.get(fecha, 0) + 1
+
+            # Quitar de la fecha anterior conservando sus servicios
+            servicios = set()
+            fecha_anterior = self.reserva_fecha.pop(id_reserva, None)
+            conocida = fecha_anterior is not None
+            if conocida:
+                self.generaciones[fecha_anterior] = self.generaciones.get(fecha_anterior, 0) + 1
+                servicios = self.dias[fecha_anterior].quitar_reserva(id_reserva)
+
+            dia = self.dias.get(fecha)
+            if dia is None or estado not in self.ESTADOS_ACTIVOS:
+                return
+            if not conocida and not creada:
+                # Reserva existente que no teníamos (reactivada o movida desde una fecha no cargada)
+                self._descartar_dia(fecha)
+                return
+
+            dia.reservas[id_reserva] = (_a_hora(hora_ini), _a_hora(hora_fin), set(), cant_personas)
+            self.reserva_fecha[id_reserva] = fecha
+            for servicio_id in servicios:
+                dia.agregar_servicio(id_reserva, servicio_id)
+
+    def quitar_reserva(self, id_reserva):
+        with self._datos_lock:
+            fecha = self.reserva_fecha.pop(id_reserva, None)
+            if fecha is not None:
+                self.generaciones[fecha] = self.generaciones.get(fecha, 0) + 1
+                self.dias[fecha].quitar_reserva(id_reserva)
+
+    def aplicar_servicio(self, id_reserva, servicio_id, fecha=None):
+        with self._datos_lock:
+            fecha_conocida = self.reserva_fecha.get(id_reserva)
+            if fecha_conocida is not None:
+                self.generaciones[fecha_conocida] = self.generaciones.get(fecha_conocida, 0) + 1
+                self.dias[fecha_conocida].agregar_servicio(id_reserva, servicio_id)
+            elif fecha is not None:
+                # Reserva aún no vista: si su fecha está cargando, descartar esa carga
+                fecha = _a_fecha(fecha)
+                self.generaciones[fecha] = self.generaciones.get(fecha, 0) + 1
+
+    def quitar_servicio(self, id_reserva, servicio_id):
+        with self._datos_lock:
+            fecha = self.reserva_fecha.get(id_reserva)
+            if fecha is not None:
+                self.generaciones[fecha] = self.generaciones.get(fecha, 0) + 1
+                self.dias[fecha].quitar_servicio(id_reserva, servicio_id)
+
+    # ==============================================
+    # 🔹 CONSULTAS
+    # ==============================================
+
+    def conflictos_servicios(self, servicios_ids, fecha, hora_ini, hora_fin, excluir_reserva_id=None):
+        """
+        Para una lista de servicios devuelve {servicio_id: [conflictos]} solo con los ocupados.
+        Cada conflicto tiene el mismo formato que verificar_disponibilidad_servicio.
+        """
+        fecha = _a_fecha(fecha)
+        hora_ini = _a_hora(hora_ini)
+        hora_fin = _a_hora(hora_fin)
+        if excluir_reserva_id is not None:
+            excluir_reserva_id = int(excluir_reserva_id)
+
+        dia = self._obtener_dia(fecha)
+        ocupados = {}
+        with self._datos_lock:
+            for servicio_id in servicios_ids:
+                intervalos = dia.servicios.get(int(servicio_id))
+                if not intervalos:
+                    continue
+                conflictos = intervalos.conflictos(hora_ini, hora_fin, excluir_reserva_id)
+                if conflictos:
+                    ocupados[servicio_id] = [{
+                        'id_reserva': id_reserva,
+                        'hora_ini': ini.isoformat(),
+                        'hora_fin': fin.isoformat(),
+                        'fecha': str(fecha)
+                    } for ini, fin, id_reserva in conflictos]
+        return ocupados
+
+    def horarios_ocupados(self, desde, hasta, servicio_id=None):
+        """
+        Línea de tiempo de [desde, hasta] (fechas incluidas), en orden de fecha y servicio:
+        [(fecha, servicio_id, [(hora_ini, hora_fin, id_reserva, cant_personas)], [(hora_ini, hora_fin) fusionados])]
+        """
+        dias = self._obtener_dias(_a_fecha(desde), _a_fecha(hasta))
+        linea = []
+        with self._datos_lock:
+            for fecha in sorted(dias):
+                dia = dias[fecha]
+                servicios = sorted(dia.servicios) if servicio_id is None else [int(servicio_id)]
+                for id_servicio in servicios:
+                    intervalos = dia.servicios.get(id_servicio)
+                    if intervalos:
+                        linea.append((fecha, id_servicio, [
+                            (ini, fin, id_reserva, dia.reservas[id_reserva][3])
+                            for ini, fin, id_reserva in intervalos.intervalos
+                        ], intervalos.fusionados()))
+        return linea
+
+    def obtener_estadisticas(self):
+        with self._datos_lock:
+            return {
+                'fechas_cargadas': len(self.dias),
+                'reservas_activas': len(self.reserva_fecha),
+                'cargas_bd': self.cargas,
+                'aciertos': self.aciertos,
+                'tiempo_recarga': self.TIEMPO_RECARGA,
+                'max_fechas': self.MAX_FECHAS,
+            }
+
+
+# Instancia global del índice de servicios de eventos
+indice_servicios_evento = IndiceServiciosEvento()
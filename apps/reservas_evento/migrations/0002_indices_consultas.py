@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos_cliente', '0001_initial'),
+        ('reservas_evento', '0001_initial'),
+        ('reservas_gen', '0004_tiene_pago'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservasevento',
+            index=models.Index(fields=['fecha', 'estado', 'hora_ini'], name='re_fecha_estado_hora_idx'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from apps.reservas_gen.models import ReservasGen
+from apps.reservas_gen.models import ReservasGen, ReservaConPagoDiferidoManager
 from apps.datos_cliente.models import DatosCliente
 
 class ReservasEvento(models.Model):
@@ -14,5 +14,11 @@ class ReservasEvento(models.Model):
     check_in = models.DateTimeField(null=True, blank=True)
     check_out = models.DateTimeField(null=True, blank=True)
 
+    objects = ReservaConPagoDiferidoManager()
+
     class Meta:
-        db_table = 'reservas_evento'
\ No newline at end of file
+        db_table = 'reservas_evento'
+        # Agenda del día y notificaciones: fecha = x AND estado = 'A' AND hora_ini ... (ver tests.py)
+        indexes = [
+            models.Index(fields=['fecha', 'estado', 'hora_ini'], name='re_fecha_estado_hora_idx'),
+        ]
\ No newline at end of file
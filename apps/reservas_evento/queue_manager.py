@@ -2,9 +2,11 @@
 # ARCHIVO: apps/reservas_evento/queue_manager.py
 # Sistema de Teoría de Colas con BATCHING para Reservas de Eventos
 # ========================================
+import logging
 import threading
 import queue
 import time
+import uuid
 from datetime import datetime
 from django.db import transaction, connection
 from django.db.utils import OperationalError
@@ -13,10 +15,18 @@ from .models import ReservasEvento
 from apps.servicios_evento.models import ServiciosEvento
 from apps.servicios_adicionales.models import ServiciosAdicionales
 from apps.reservas_gen.models import ReservasGen
+from apps.reservas_gen.arbitraje import obtener_backend_arbitraje
+from apps.reservas_gen.tickets import SolicitudConCallbacks
+from apps.reservas_gen.metricas import espera_cola, duracion_transaccion, registrar_indicador
+from .disponibilidad import indice_servicios_evento
 
-class EventoRequest:
+logger = logging.getLogger(__name__)
+
+class EventoRequest(SolicitudConCallbacks):
     """Clase que representa una solicitud de reserva de evento en la cola"""
     
+    COLA_METRICAS = 'eventos'
+    
     def __init__(self, datos_evento, datos_cliente, servicios_ids, empleado, administrador):
         self.datos_evento = datos_evento
         self.datos_cliente = datos_cliente
@@ -25,8 +35,11 @@ class EventoRequest:
         self.administrador = administrador
         self.prioridad = self.calcular_prioridad()
         self.timestamp = datetime.now()
+        self.token = uuid.uuid4().hex  # Identifica la solicitud en el arbitraje compartido
+        self.tiempo_encolado = time.time()
+        self.espera_cola = None  # segundos entre encolado e inicio de procesamiento
         self.resultado = None
-        self.evento = threading.Event()
+        self._inicializar_callbacks()  # evento + callbacks de finalización (modo asíncrono)
         
         # Convertir fechas/horas a datetime aware
         self.fecha = self._convertir_fecha(datos_evento['fecha'])
@@ -93,6 +106,14 @@ class EventoRequest:
         
         return False
     
+    def tiene_conflicto(self, otra_request):
+        """Interfaz común con hotel: conflicto de servicios y horarios"""
+        return self.tiene_conflicto_servicios(otra_request)
+    
+    def datos_arbitraje(self):
+        """(tipo, recurso, inicio, fin, servicios) para el backend de arbitraje compartido"""
+        return ('E', str(self.fecha), self.hora_ini, self.hora_fin, self.servicios_ids)
+    
     def __lt__(self, other):
         """Comparador: Mayor prioridad = se procesa primero"""
         if self.prioridad != other.prioridad:
@@ -123,10 +144,17 @@ class ColaReservasEvento:
         """Inicializa la cola y el worker thread"""
         self.cola = queue.PriorityQueue()
         self.procesando = {}  # {fecha: [lista de requests]}
+        # 🤝 Arbitraje entre procesos (MEMORIA por defecto = solo este proceso)
+        self.arbitraje = obtener_backend_arbitraje()
         self.worker_activo = True
         self.worker_thread = threading.Thread(target=self._procesar_cola, daemon=True)
         self.worker_thread.start()
-        print(f"🔄 Cola de reservas de eventos iniciada con batching de {self.TIEMPO_BATCHING}s")
+        # 📊 Pendientes por fecha, leído al exportar /api/metrics/
+        registrar_indicador(
+            'reservas_eventos_pendientes', 'Solicitudes de eventos pendientes por fecha',
+            ('fecha',), self._pendientes_por_fecha
+        )
+        logger.info("🔄 Cola de reservas de eventos iniciada con batching de %ss", self.TIEMPO_BATCHING)
     
     def agregar_reserva(self, datos_evento, datos_cliente, servicios_ids, empleado, administrador):
         """
@@ -137,17 +165,18 @@ class ColaReservasEvento:
         request = EventoRequest(datos_evento, datos_cliente, servicios_ids, empleado, administrador)
         
         # Agregar marca de tiempo de procesamiento (ahora + tiempo de batching)
-        request.tiempo_procesamiento = time.time() + self.TIEMPO_BATCHING
-        
-        self.cola.put(request)
+        request.tiempo_procesamiento = request.tiempo_encolado + self.TIEMPO_BATCHING
         
         fecha_key = str(request.fecha)
+        self.arbitraje.registrar(request)
         with self._lock:
             if fecha_key not in self.procesando:
                 self.procesando[fecha_key] = []
             self.procesando[fecha_key].append(request)
         
-        print(f"📥 Solicitud evento agregada - Fecha:{fecha_key}, Prioridad:{request.prioridad:.2f}, Procesamiento en {self.TIEMPO_BATCHING}s")
+        self.cola.put(request)
+        
+        logger.debug("📥 Solicitud evento agregada - Fecha:%s, Prioridad:%.2f, Procesamiento en %ss", fecha_key, request.prioridad, self.TIEMPO_BATCHING)
         
         return request
     
@@ -169,13 +198,22 @@ class ColaReservasEvento:
                 # Obtener la reserva de mayor prioridad
                 request = self.cola.get(timeout=2)
                 
+                # Ya resuelta (rechazada por otra solicitud ganadora): no repetir el trabajo
+                if request.resultado is not None:
+                    self._limpiar_request(str(request.fecha), request)
+                    self.cola.task_done()
+                    continue
+                
                 # ⏱️ ESPERAR hasta el tiempo de procesamiento (batching)
                 tiempo_actual = time.time()
                 if tiempo_actual < request.tiempo_procesamiento:
                     tiempo_espera = request.tiempo_procesamiento - tiempo_actual
-                    print(f"⏳ Esperando {tiempo_espera:.2f}s para procesar solicitud con prioridad {request.prioridad:.2f}")
+                    logger.debug("⏳ Esperando %.2fs para procesar solicitud con prioridad %.2f", tiempo_espera, request.prioridad)
                     time.sleep(tiempo_espera)
                 
+                request.espera_cola = time.time() - request.tiempo_encolado
+                espera_cola.observar(request.espera_cola, cola='eventos')
+                
                 # Procesar la reserva con análisis de conflictos
                 self._procesar_reserva_inteligente(request)
                 
@@ -184,9 +222,7 @@ class ColaReservasEvento:
             except queue.Empty:
                 continue
             except Exception as e:
-                print(f"❌ Error procesando reserva de evento: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Error procesando reserva de evento: %s", e)
             finally:
                 try:
                     connection.close()
@@ -209,28 +245,45 @@ class ColaReservasEvento:
                 if fecha_key in self.procesando:
                     for req in self.procesando[fecha_key]:
                         if req != request and req.resultado is None:
-                            if request.tiene_conflicto_servicios(req):
+                            if request.tiene_conflicto(req):
                                 solicitudes_conflictivas.append(req)
             
-            print(f"🔍 Procesando solicitud Prioridad:{request.prioridad:.2f} - {len(solicitudes_conflictivas)} conflictos encontrados")
+            # Incluir las de otros procesos si el arbitraje es compartido
+            if self.arbitraje.compartido:
+                solicitudes_conflictivas += self.arbitraje.competidores(
+                    request, excluir_tokens={req.token for req in solicitudes_conflictivas}
+                )
+            
+            logger.debug("🔍 Procesando solicitud Prioridad:%.2f - %s conflictos encontrados", request.prioridad, len(solicitudes_conflictivas))
             
             # 2️⃣ Verificar si es la de MAYOR prioridad
             es_mayor_prioridad = True
             solicitud_con_mayor_prioridad = None
             
             for req_conflictiva in solicitudes_conflictivas:
+                if getattr(req_conflictiva, 'aceptada', False):
+                    # Otro proceso ya la está creando: llegamos tarde
+                    es_mayor_prioridad = False
+                    solicitud_con_mayor_prioridad = req_conflictiva
+                    logger.debug("❌ Otro proceso ya aceptó una solicitud con prioridad %.2f", req_conflictiva.prioridad)
+                    break
                 if req_conflictiva.prioridad > request.prioridad:
                     es_mayor_prioridad = False
                     solicitud_con_mayor_prioridad = req_conflictiva
-                    print(f"❌ Encontrada mayor prioridad: {req_conflictiva.prioridad:.2f} > {request.prioridad:.2f}")
+                    logger.debug("❌ Encontrada mayor prioridad: %.2f > %.2f", req_conflictiva.prioridad, request.prioridad)
                     break
                 elif req_conflictiva.prioridad == request.prioridad:
                     if req_conflictiva.timestamp < request.timestamp:
                         es_mayor_prioridad = False
                         solicitud_con_mayor_prioridad = req_conflictiva
-                        print(f"⚖️ Misma prioridad, gana por timestamp (FIFO)")
+                        logger.debug("⚖️ Misma prioridad, gana por timestamp (FIFO)")
                         break
             
+            # Reclamar la victoria en el arbitraje compartido (otro proceso pudo habernos rechazado)
+            if es_mayor_prioridad and not self.arbitraje.aceptar(request):
+                es_mayor_prioridad = False
+                logger.debug("❌ Solicitud rechazada por un ganador de otro proceso")
+            
             # 3️⃣ Si NO es la de mayor prioridad, rechazar
             if not es_mayor_prioridad:
                 request.resultado = {
@@ -241,38 +294,26 @@ class ColaReservasEvento:
                         'solicitudes_conflictivas': len(solicitudes_conflictivas),
                         'tu_prioridad': request.prioridad,
                         'prioridad_ganadora': solicitud_con_mayor_prioridad.prioridad if solicitud_con_mayor_prioridad else None,
-                        'mensaje': f'Tu prioridad: {request.prioridad:.2f}. Otra solicitud tiene prioridad {solicitud_con_mayor_prioridad.prioridad:.2f if solicitud_con_mayor_prioridad else "N/A"}.'
+                        'mensaje': f'Tu prioridad: {request.prioridad:.2f}. Otra solicitud tiene prioridad {f"{solicitud_con_mayor_prioridad.prioridad:.2f}" if solicitud_con_mayor_prioridad else "N/A"}.'
                     }
                 }
-                print(f"🚫 Solicitud rechazada - Prioridad insuficiente")
-                request.evento.set()
+                logger.debug("🚫 Solicitud rechazada - Prioridad insuficiente")
+                request.notificar()
                 self._limpiar_request(fecha_key, request)
                 return
             
             # 4️⃣ Si ES la de mayor prioridad, verificar disponibilidad en BD
-            print(f"✅ Solicitud tiene mayor prioridad, verificando disponibilidad...")
+            logger.debug("✅ Solicitud tiene mayor prioridad, verificando disponibilidad...")
             
-            # Verificar disponibilidad de cada servicio en BD
-            servicios_no_disponibles = []
-            for servicio_id in request.servicios_ids:
-                conflictos_bd = ServiciosEvento.objects.filter(
-                    servicios_adicionales_id=servicio_id,
-                    reservas_evento__fecha=request.fecha,
-                    reservas_evento__estado__in=['A', 'P']
-                ).filter(
-                    reservas_evento__hora_ini__lt=request.hora_fin,
-                    reservas_evento__hora_fin__gt=request.hora_ini
-                ).exists()
-                
-                if conflictos_bd:
-                    try:
-                        servicio = ServiciosAdicionales.objects.get(pk=servicio_id)
-                        servicios_no_disponibles.append({
-                            'id_servicio': servicio_id,
-                            'nombre_servicio': servicio.nombre
-                        })
-                    except ServiciosAdicionales.DoesNotExist:
-                        pass
+            # La BD decide con UNA consulta para todos los servicios: el índice de este proceso
+            # puede estar atrasado en ambos sentidos (reservas o cancelaciones de otros procesos)
+            ocupados = set(self._servicios_ocupados_bd(request))
+            en_indice = indice_servicios_evento.conflictos_servicios(
+                request.servicios_ids, request.fecha, request.hora_ini, request.hora_fin
+            )
+            if ocupados != {int(servicio_id) for servicio_id in en_indice}:
+                indice_servicios_evento.invalidar_fecha(request.fecha)
+            servicios_no_disponibles = self._describir_servicios(request.servicios_ids, ocupados)
             
             if servicios_no_disponibles:
                 request.resultado = {
@@ -281,13 +322,13 @@ class ColaReservasEvento:
                     'codigo': 'SERVICIOS_NO_DISPONIBLES',
                     'servicios_no_disponibles': servicios_no_disponibles
                 }
-                print(f"⚠️ Conflicto con reservas existentes en BD")
-                request.evento.set()
+                logger.info("⚠️ Fecha %s: conflicto con reservas existentes en BD", fecha_key)
+                request.notificar()
                 self._limpiar_request(fecha_key, request)
                 return
             
             # 5️⃣ CREAR LA RESERVA
-            with transaction.atomic():
+            with duracion_transaccion.medir(cola='eventos'), transaction.atomic():
                 # Crear reserva general
                 reservas_gen = ReservasGen.objects.create(
                     tipo='E',
@@ -334,10 +375,11 @@ class ColaReservasEvento:
                     }
                 }
                 
-                print(f"🎉 Reserva de evento creada exitosamente - Prioridad: {request.prioridad:.2f}")
+                logger.debug("🎉 Reserva de evento creada exitosamente - Prioridad: %.2f", request.prioridad)
                 
-                # 6️⃣ Rechazar solicitudes conflictivas
+                # 6️⃣ Rechazar solicitudes conflictivas (locales y de otros procesos)
                 self._rechazar_solicitudes_conflictivas(fecha_key, request)
+                self.arbitraje.rechazar_competidores(request)
         
         except Exception as e:
             request.resultado = {
@@ -345,25 +387,46 @@ class ColaReservasEvento:
                 'error': f'El servicio no esta disponible en este horario.',
                 'codigo': 'ERROR_PROCESAMIENTO'
             }
-            print(f"El servicio no esta disponible en este horario.")
-            import traceback
-            traceback.print_exc()
+            logger.exception("💥 Error al procesar la reserva de evento del %s: %s", fecha_key, e)
         
         finally:
-            request.evento.set()
+            request.notificar()
             self._limpiar_request(fecha_key, request)
             try:
                 connection.close()
             except:
                 pass
     
+    def _servicios_ocupados_bd(self, request):
+        """IDs de los servicios de la solicitud ya reservados en ese horario (una consulta)"""
+        return ServiciosEvento.objects.filter(
+            servicios_adicionales_id__in=request.servicios_ids,
+            reservas_evento__fecha=request.fecha,
+            reservas_evento__estado__in=['A', 'P'],
+            reservas_evento__hora_ini__lt=request.hora_fin,
+            reservas_evento__hora_fin__gt=request.hora_ini
+        ).values_list('servicios_adicionales_id', flat=True).distinct()
+    
+    def _describir_servicios(self, servicios_ids, ocupados):
+        """[{id_servicio, nombre_servicio}] de los ocupados, con nombres en una sola consulta"""
+        if not ocupados:
+            return []
+        ocupados = {int(servicio_id) for servicio_id in ocupados}
+        nombres = dict(ServiciosAdicionales.objects.filter(
+            pk__in=ocupados
+        ).values_list('id_servicios_adicionales', 'nombre'))
+        return [{
+            'id_servicio': servicio_id,
+            'nombre_servicio': nombres[int(servicio_id)]
+        } for servicio_id in servicios_ids if int(servicio_id) in ocupados and int(servicio_id) in nombres]
+    
     def _rechazar_solicitudes_conflictivas(self, fecha_key, request_aceptado):
         """Rechaza solicitudes con conflicto de servicios/horarios"""
         with self._lock:
             if fecha_key in self.procesando:
                 for req in self.procesando[fecha_key]:
                     if req != request_aceptado and req.resultado is None:
-                        if request_aceptado.tiene_conflicto_servicios(req):
+                        if request_aceptado.tiene_conflicto(req):
                             req.resultado = {
                                 'success': False,
                                 'error': f'El servicio no esta disponible en este horario.',
@@ -374,17 +437,25 @@ class ColaReservasEvento:
                                     'diferencia_prioridad': request_aceptado.prioridad - req.prioridad
                                 }
                             }
-                            print(f"🚫 El servicio no esta disponible en este horario.")
-                            req.evento.set()
+                            logger.debug("🚫 Evento del %s rechazado por prioridad %.2f", fecha_key, request_aceptado.prioridad)
+                            req.notificar()
     
     def _limpiar_request(self, fecha_key, request):
-        """Limpia un request de la lista de procesamiento"""
+        """Limpia un request de la lista de procesamiento (y del arbitraje compartido)"""
         with self._lock:
             if fecha_key in self.procesando:
                 if request in self.procesando[fecha_key]:
                     self.procesando[fecha_key].remove(request)
                 if not self.procesando[fecha_key]:
                     del self.procesando[fecha_key]
+        try:
+            self.arbitraje.retirar(request)
+        except Exception as e:
+            logger.warning("⚠️ No se pudo retirar la solicitud del arbitraje: %s", e)
+    
+    def _pendientes_por_fecha(self):
+        with self._lock:
+            return {(fecha_key,): len(reqs) for fecha_key, reqs in self.procesando.items()}
     
     def detener(self):
         """Detiene el worker thread"""
@@ -399,7 +470,8 @@ class ColaReservasEvento:
                 'tamaño_cola': self.cola.qsize(),
                 'fechas_en_proceso': len(self.procesando),
                 'total_solicitudes_pendientes': sum(len(reqs) for reqs in self.procesando.values()),
-                'tiempo_batching': self.TIEMPO_BATCHING
+                'tiempo_batching': self.TIEMPO_BATCHING,
+                'arbitraje': self.arbitraje.nombre
             }
 
 
@@ -0,0 +1,56 @@
+# ========================================
+# ARCHIVO: apps/reservas_evento/signals.py
+# Mantiene al día el índice de servicios de eventos y la versión del dominio con cada escritura
+# ========================================
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ReservasEvento
+from .disponibilidad import indice_servicios_evento
+from apps.reservas_gen.versiones import DOMINIO_EVENTOS, incrementar_version
+from apps.servicios_evento.models import ServiciosEvento
+
+
+# 🔹 Reservas: creación, cambio de fecha/horario, cancelación y check-out pasan por save()
+@receiver(post_save, sender=ReservasEvento)
+def actualizar_indice_reserva_evento(sender, instance, created, **kwargs):
+    datos = (
+        instance.id_reservas_evento,
+        instance.fecha,
+        instance.hora_ini,
+        instance.hora_fin,
+        instance.estado,
+        created,
+        instance.cant_personas
+    )
+    # Solo se aplica si la transacción se confirma
+    transaction.on_commit(lambda: indice_servicios_evento.aplicar_reserva(*datos))
+
+
+@receiver(post_delete, sender=ReservasEvento)
+def quitar_reserva_evento_indice(sender, instance, **kwargs):
+    id_reserva = instance.id_reservas_evento
+    transaction.on_commit(lambda: indice_servicios_evento.quitar_reserva(id_reserva))
+
+
+# 🔹 Versión del dominio (tablero del día y ETag): creación, ingreso, salida y cancelación la incrementan
+@receiver(post_save, sender=ReservasEvento)
+@receiver(post_delete, sender=ReservasEvento)
+def incrementar_version_eventos(sender, instance, **kwargs):
+    transaction.on_commit(lambda: incrementar_version(DOMINIO_EVENTOS))
+
+
+# 🔹 Servicios de cada reserva
+@receiver(post_save, sender=ServiciosEvento)
+def actualizar_indice_servicio_evento(sender, instance, **kwargs):
+    # La fecha solo se usa si la reserva ya está en memoria (sin consulta extra)
+    fecha = instance.reservas_evento.fecha if ServiciosEvento.reservas_evento.is_cached(instance) else None
+    datos = (instance.reservas_evento_id, instance.servicios_adicionales_id, fecha)
+    transaction.on_commit(lambda: indice_servicios_evento.aplicar_servicio(*datos))
+
+
+@receiver(post_delete, sender=ServiciosEvento)
+def quitar_servicio_evento_indice(sender, instance, **kwargs):
+    datos = (instance.reservas_evento_id, instance.servicios_adicionales_id)
+    transaction.on_commit(lambda: indice_servicios_evento.quitar_servicio(*datos))
@@ -1,3 +1,217 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from apps.administrador.models import Administrador
+from apps.reservas_gen.catalogos import cache_catalogos
+from apps.datos_cliente.models import DatosCliente
+from apps.empleado.models import Empleado
+from apps.reservas_gen.models import ReservasGen
+from apps.servicios_adicionales.models import ServiciosAdicionales
+from apps.servicios_evento.models import ServiciosEvento
+from apps.usuario.models import Usuario
+from LesEtoiles.perfilador_sql import PresupuestoSQLMixin
+
+from .disponibilidad import indice_servicios_evento
+from .queue_manager import EventoRequest, gestor_cola_eventos
+from .models import ReservasEvento
+
+
+class IndicesConsultasEventoTest(TestCase):
+    """
+    Regresión de planes de consulta: la agenda del día (notificaciones y
+    estadísticas) debe usar re_fecha_estado_hora_idx y no recorrer la tabla.
+    """
+    DIAS = 400
+    EVENTOS_POR_DIA = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('indices', password='x')
+        usuario = Usuario.objects.create(
+            user=user, nombre='Test', ci=1, telefono=1, email='t@t.com',
+            password='x', estado='A', rol='administrador'
+        )
+        empleado = Empleado.objects.create(cod_empleado='E1', usuario=usuario)
+        administrador = Administrador.objects.create(cod_admi='A1', usuario=usuario)
+        cliente = DatosCliente.objects.create(nombre='Cliente', telefono=1, ci=1, email='c@c.com')
+
+        total = cls.DIAS * cls.EVENTOS_POR_DIA
+        ReservasGen.objects.bulk_create([
+            ReservasGen(tipo='E', administrador=administrador, empleado=empleado) for _ in range(total)
+        ])
+        generales = list(ReservasGen.objects.order_by('id_reservas_gen'))
+
+        inicio = date(2024, 1, 1)
+        eventos = []
+        for d in range(cls.DIAS):
+            fecha = inicio + timedelta(days=d)
+            for e in range(cls.EVENTOS_POR_DIA):
+                hora_ini = datetime.combine(fecha, time(8 + e * 2), tzinfo=dt_timezone.utc)
+                eventos.append(ReservasEvento(
+                    cant_personas=50, fecha=fecha,
+                    hora_ini=hora_ini, hora_fin=hora_ini + timedelta(hours=2),
+                    estado='A' if d >= cls.DIAS - 2 else 'F',
+                    reservas_gen=generales[len(eventos)], datos_cliente=cliente
+                ))
+        ReservasEvento.objects.bulk_create(eventos, batch_size=500)
+        cls.hoy = inicio + timedelta(days=cls.DIAS - 1)
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute('ANALYZE TABLE reservas_evento')
+                cursor.fetchall()
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan, f"La consulta no usa {indice}. Plan:\n{plan}")
+
+    def test_eventos_proximos(self):
+        # obtener_notificaciones_eventos: eventos de hoy que inician dentro de la ventana de alerta
+        ahora = datetime.combine(self.hoy, time(9), tzinfo=dt_timezone.utc)
+        queryset = ReservasEvento.objects.filter(
+            estado='A', fecha=self.hoy,
+            hora_ini__gte=ahora, hora_ini__lte=ahora + timedelta(hours=1),
+            check_in__isnull=True
+        )
+        self.assertUsaIndice(queryset, 're_fecha_estado_hora_idx')
+
+    def test_eventos_del_dia_por_estado(self):
+        # estadisticas_eventos_hoy: conteos por fecha y estado
+        queryset = ReservasEvento.objects.filter(fecha=self.hoy, estado='A')
+        self.assertUsaIndice(queryset, 're_fecha_estado_hora_idx')
+
+
+class PresupuestoConsultasEventoTest(PresupuestoSQLMixin, TestCase):
+    """Cantidad de consultas por vista: una regresión N+1 hace fallar el test"""
+    FECHA = date(2024, 3, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('presupuesto', password='x')
+        usuario = Usuario.objects.create(
+            user=user, nombre='Test', ci=1, telefono=1, email='t@t.com',
+            password='x', estado='A', rol='administrador'
+        )
+        empleado = Empleado.objects.create(cod_empleado='E1', usuario=usuario)
+        administrador = Administrador.objects.create(cod_admi='A1', usuario=usuario)
+        cliente = DatosCliente.objects.create(nombre='Cliente', telefono=1, ci=1, email='c@c.com')
+        cls.servicios = [
+            ServiciosAdicionales.objects.create(nombre=f'Servicio {i}', precio=10, tipo='E', estado='A')
+            for i in range(6)
+        ]
+        # Cada servicio ocupado por su propio evento de 10:00 a 12:00
+        hora_ini = datetime.combine(cls.FECHA, time(10), tzinfo=dt_timezone.utc)
+        for servicio in cls.servicios:
+            evento = ReservasEvento.objects.create(
+                cant_personas=20, fecha=cls.FECHA, hora_ini=hora_ini, hora_fin=hora_ini + timedelta(hours=2),
+                estado='A', datos_cliente=cliente,
+                reservas_gen=ReservasGen.objects.create(tipo='E', administrador=administrador, empleado=empleado)
+            )
+            ServiciosEvento.objects.create(reservas_evento=evento, servicios_adicionales=servicio)
+
+    def setUp(self):
+        indice_servicios_evento.invalidar_fecha(self.FECHA)
+
+    def test_verificar_disponibilidad(self):
+        # Carga del día en el índice (eventos + servicios) y nombres de los ocupados, sin importar cuántos servicios se pidan
+        with self.assertPresupuestoSQL(3):
+            respuesta = self.client.post('/api/reservaEvento/verificar-disponibilidad/', {
+                'servicios_ids': [servicio.id_servicios_adicionales for servicio in self.servicios],
+                'fecha': str(self.FECHA),
+                'hora_ini': f'{self.FECHA}T11:00:00+00:00',
+                'hora_fin': f'{self.FECHA}T13:00:00+00:00',
+            }, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()['servicios_no_disponibles']), len(self.servicios))
+
+    def test_horarios_ocupados(self):
+        cache_catalogos.invalidar()
+        url = '/api/reservaEvento/horarios-ocupados/?fecha_inicio=2024-02-28&fecha_fin=2024-03-02'
+        # Las 4 fechas se cargan juntas en el índice (eventos + servicios) + el catálogo de servicios
+        with self.assertPresupuestoSQL(3):
+            respuesta = self.client.get(url)
+        servicios = respuesta.json()['servicios']
+        self.assertEqual(len(servicios), len(self.servicios))
+        self.assertEqual(servicios[0]['horarios_ocupados'][0]['hora_ini'], '2024-03-01T10:00:00+00:00')
+
+        # Un evento solapado y otro contiguo en el mismo servicio se suman al índice al confirmar
+        servicio = self.servicios[0]
+        reserva = ReservasEvento.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            for hora_ini, hora_fin in ((time(11, 30), time(13)), (time(13), time(14))):
+                evento = ReservasEvento.objects.create(
+                    cant_personas=10, fecha=self.FECHA, estado='A', datos_cliente=reserva.datos_cliente,
+                    hora_ini=datetime.combine(self.FECHA, hora_ini, tzinfo=dt_timezone.utc),
+                    hora_fin=datetime.combine(self.FECHA, hora_fin, tzinfo=dt_timezone.utc),
+                    reservas_gen=reserva.reservas_gen
+                )
+                ServiciosEvento.objects.create(reservas_evento=evento, servicios_adicionales=servicio)
+
+        with self.assertPresupuestoSQL(0):
+            respuesta = self.client.get(url + f'&servicio_id={servicio.id_servicios_adicionales}&formato=intervalos')
+        self.assertEqual(respuesta.json()['servicios'][0]['horarios_ocupados'], [
+            {'fecha': '2024-03-01', 'hora_ini': '2024-03-01T10:00:00+00:00', 'hora_fin': '2024-03-01T14:00:00+00:00'}
+        ])
+
+        # Columnar: día desde fecha_inicio y minutos desde la medianoche de La Paz (UTC-4)
+        datos = self.client.get(url + '&formato=columnar').json()
+        self.assertEqual(len(datos['servicios']), len(self.servicios))
+        self.assertEqual((datos['dia'][0], datos['servicio'][0], datos['ini'][0], datos['fin'][0]), (2, 0, 360, 600))
+        self.assertEqual(self.client.get(url.replace('2024-03-02', '2025-03-02')).status_code, 400)
+
+
+class ConfirmacionBDEventoTest(TransactionTestCase):
+    """El índice de un proceso puede quedar atrasado: la BD decide antes de rechazar"""
+    FECHA = date(2024, 3, 1)
+
+    def setUp(self):
+        user = User.objects.create_user('confirmacion', password='x')
+        usuario = Usuario.objects.create(
+            user=user, nombre='Test', ci=1, telefono=1, email='t@t.com',
+            password='x', estado='A', rol='administrador'
+        )
+        self.empleado = Empleado.objects.create(cod_empleado='E1', usuario=usuario)
+        self.administrador = Administrador.objects.create(cod_admi='A1', usuario=usuario)
+        self.cliente = DatosCliente.objects.create(nombre='Cliente', telefono=1, ci=1, email='c@c.com')
+        self.servicio = ServiciosAdicionales.objects.create(nombre='Sonido', precio=10, tipo='E', estado='A')
+        hora_ini = datetime.combine(self.FECHA, time(10), tzinfo=dt_timezone.utc)
+        self.evento = ReservasEvento.objects.create(
+            cant_personas=20, fecha=self.FECHA, hora_ini=hora_ini, hora_fin=hora_ini + timedelta(hours=2),
+            estado='A', datos_cliente=self.cliente,
+            reservas_gen=ReservasGen.objects.create(tipo='E', administrador=self.administrador, empleado=self.empleado)
+        )
+        ServiciosEvento.objects.create(reservas_evento=self.evento, servicios_adicionales=self.servicio)
+        indice_servicios_evento.invalidar_fecha(self.FECHA)
+
+    def tearDown(self):
+        indice_servicios_evento.invalidar_fecha(self.FECHA)
+
+    def solicitud(self):
+        return EventoRequest({
+            'cant_personas': 10, 'fecha': str(self.FECHA),
+            'hora_ini': f'{self.FECHA}T11:00:00+00:00', 'hora_fin': f'{self.FECHA}T13:00:00+00:00',
+        }, self.cliente, [self.servicio.id_servicios_adicionales], self.empleado, self.administrador)
+
+    def test_indice_atrasado_no_rechaza(self):
+        ids = [self.servicio.id_servicios_adicionales]
+        self.assertTrue(indice_servicios_evento.conflictos_servicios(
+            ids, self.FECHA, self.evento.hora_ini, self.evento.hora_fin
+        ))
+        # Cancelación hecha por otro proceso: sin señales, el índice de este proceso no se entera
+        ReservasEvento.objects.filter(pk=self.evento.pk).update(estado='C')
+
+        request = self.solicitud()
+        gestor_cola_eventos._procesar_reserva_inteligente(request)
+        self.assertTrue(request.resultado['success'], request.resultado)
+        self.assertEqual(ReservasEvento.objects.filter(estado='A').count(), 1)
+
+    def test_conflicto_en_bd_rechaza(self):
+        request = self.solicitud()
+        gestor_cola_eventos._procesar_reserva_inteligente(request)
+        self.assertEqual(request.resultado['codigo'], 'SERVICIOS_NO_DISPONIBLES')
+        self.assertEqual(request.resultado['servicios_no_disponibles'][0]['nombre_servicio'], 'Sonido')
@@ -1,74 +1,39 @@
-from django.utils.decorators import method_decorator
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytz
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework import status
-from django.shortcuts import get_object_or_404
-from datetime import datetime, timedelta
-from django.db.models import Q
+
 from .models import ReservasEvento
-from apps.reservas_gen.models import ReservasGen
 from apps.datos_cliente.models import DatosCliente
 from apps.servicios_evento.models import ServiciosEvento
 from apps.servicios_adicionales.models import ServiciosAdicionales
 from apps.administrador.models import Administrador
 from apps.empleado.models import Empleado
-from .serializers import ReservasEventoSerializer, ServiciosAdicionalesSerializer
+from .serializers import ReservasEventoSerializer
 from .queue_manager import gestor_cola_eventos
-from django.utils import timezone
-
-from django.db import transaction
-from django.utils import timezone
-from apps.servicios_evento.models import ServiciosEvento
+from .disponibilidad import indice_servicios_evento
+from apps.reservas_gen.catalogos import cache_catalogos
+from apps.reservas_gen.tableros import obtener_tablero, primera_fila, extraer_primera_fila
+from apps.reservas_gen.versiones import DOMINIO_EVENTOS, con_etag
+from apps.reservas_gen.tickets import almacen_tickets, solicita_modo_asincrono, respuesta_ticket
+from apps.reservas_gen.metricas import timeouts_solicitudes
+from apps.reservas_gen.views import respuesta_subida_comprobante
 
 # 🔹 Función auxiliar para verificar si hay conflicto de horarios
 def verificar_disponibilidad_servicio(servicio_id, fecha, hora_ini, hora_fin, excluir_reserva_id=None):
-    # Convertir strings a datetime si es necesario
-    if isinstance(hora_ini, str):
-        hora_ini = datetime.fromisoformat(hora_ini.replace('Z', '+00:00'))
-    if isinstance(hora_fin, str):
-        hora_fin = datetime.fromisoformat(hora_fin.replace('Z', '+00:00'))
-    if isinstance(fecha, str):
-        fecha = datetime.strptime(fecha, '%Y-%m-%d').date()
-
-    # ⚡ Hacer aware si son naive
-    if timezone.is_naive(hora_ini):
-        hora_ini = timezone.make_aware(hora_ini, timezone.get_current_timezone())
-    if timezone.is_naive(hora_fin):
-        hora_fin = timezone.make_aware(hora_fin, timezone.get_current_timezone())
-
-    # Buscar todas las reservas de este servicio en la misma fecha
-    reservas_con_servicio = ServiciosEvento.objects.filter(
-        servicios_adicionales_id=servicio_id,
-        reservas_evento__fecha=fecha,
-        reservas_evento__estado__in=['A', 'P']
-    ).select_related('reservas_evento')
-
-    if excluir_reserva_id:
-        reservas_con_servicio = reservas_con_servicio.exclude(
-            reservas_evento__id_reservas_evento=excluir_reserva_id
-        )
-
-    conflictos = []
-
-    for servicio_evento in reservas_con_servicio:
-        reserva = servicio_evento.reservas_evento
-
-        # ⚡ Hacer aware de las horas de la BD si son naive (por si acaso)
-        if timezone.is_naive(reserva.hora_ini):
-            reserva.hora_ini = timezone.make_aware(reserva.hora_ini, timezone.get_current_timezone())
-        if timezone.is_naive(reserva.hora_fin):
-            reserva.hora_fin = timezone.make_aware(reserva.hora_fin, timezone.get_current_timezone())
-
-        # Verificar solapamiento
-        if hora_ini < reserva.hora_fin and hora_fin > reserva.hora_ini:
-            conflictos.append({
-                'id_reserva': reserva.id_reservas_evento,
-                'hora_ini': reserva.hora_ini.isoformat(),
-                'hora_fin': reserva.hora_fin.isoformat(),
-                'fecha': str(reserva.fecha)
-            })
+    conflictos = indice_servicios_evento.conflictos_servicios(
+        [servicio_id], fecha, hora_ini, hora_fin, excluir_reserva_id
+    ).get(servicio_id, [])
 
     return {
         'disponible': len(conflictos) == 0,
@@ -76,68 +41,141 @@ def verificar_disponibilidad_servicio(servicio_id, fecha, hora_ini, hora_fin, ex
     }
 
 
+# 🔹 Función auxiliar: servicios ocupados de una lista (una consulta al índice + una para nombres)
+def servicios_no_disponibles_en(servicios_ids, fecha, hora_ini, hora_fin, excluir_reserva_id=None, clave_id='id_servicio', clave_nombre='nombre_servicio'):
+    ocupados = indice_servicios_evento.conflictos_servicios(
+        servicios_ids, fecha, hora_ini, hora_fin, excluir_reserva_id
+    )
+    if not ocupados:
+        return []
+
+    nombres = dict(ServiciosAdicionales.objects.filter(
+        pk__in=list(ocupados)
+    ).values_list('id_servicios_adicionales', 'nombre'))
+
+    # Mismo orden que la lista recibida; se omiten servicios inexistentes
+    return [{
+        clave_id: servicio_id,
+        clave_nombre: nombres[int(servicio_id)],
+        'conflictos': ocupados[servicio_id]
+    } for servicio_id in servicios_ids if servicio_id in ocupados and int(servicio_id) in nombres]
+
+
 # 🔹 Obtener horarios ocupados de todos los servicios adicionales
+def _iso_utc(valor):
+    # Misma representación que devuelve la BD, aunque el índice se haya actualizado con otra zona
+    return valor.astimezone(dt_timezone.utc).isoformat()
+
+
+def _minutos_del_dia(valor, fecha, zona):
+    """Minutos desde la medianoche local de `fecha` (más de 1440 si termina al día siguiente)"""
+    local = valor.astimezone(zona)
+    return (local.date() - fecha).days * 1440 + local.hour * 60 + local.minute
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def obtener_horarios_ocupados(request):
     """
-    Retorna todos los horarios ocupados de cada servicio adicional.
+    Retorna los horarios ocupados de cada servicio adicional en una ventana de fechas,
+    desde el índice en memoria (2 consultas para las fechas que aún no están cargadas).
     
     Query params opcionales:
     - servicio_id: Filtrar por un servicio específico
-    - fecha_inicio: Filtrar desde una fecha (YYYY-MM-DD)
-    - fecha_fin: Filtrar hasta una fecha (YYYY-MM-DD)
+    - fecha_inicio: Desde una fecha (YYYY-MM-DD, por defecto hoy)
+    - fecha_fin: Hasta una fecha incluida (YYYY-MM-DD, por defecto HORARIOS_OCUPADOS_DIAS días)
+    - formato:
+        detalle (por defecto): un horario por reserva, como antes
+        intervalos: horarios solapados o contiguos unidos, por servicio
+        columnar: intervalos unidos en columnas paralelas (dia, servicio, ini, fin en
+                  minutos desde la medianoche local) para el calendario
     
-    Ejemplo: GET /api/horarios-ocupados/?servicio_id=1&fecha_inicio=2025-10-20
+    Ejemplo: GET /api/horarios-ocupados/?servicio_id=1&fecha_inicio=2025-10-20&formato=intervalos
     """
     servicio_id = request.GET.get('servicio_id')
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
+    formato = request.GET.get('formato', 'detalle')
+    zona = pytz.timezone('America/La_Paz')
     
-    # Construir filtros
-    filtros = Q(reservas_evento__estado__in=['A', 'P'])
-    
-    if servicio_id:
-        filtros &= Q(servicios_adicionales_id=servicio_id)
+    try:
+        if servicio_id:
+            servicio_id = int(servicio_id)
+        fecha_inicio = request.GET.get('fecha_inicio')
+        if fecha_inicio:
+            desde = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+        else:
+            desde = timezone.now().astimezone(zona).date()
+        fecha_fin = request.GET.get('fecha_fin')
+        if fecha_fin:
+            hasta = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+        else:
+            hasta = desde + timedelta(days=getattr(settings, 'HORARIOS_OCUPADOS_DIAS', 31) - 1)
+    except ValueError:
+        return Response({
+            'error': 'Las fechas deben tener formato YYYY-MM-DD y servicio_id debe ser un número'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    if fecha_inicio:
-        filtros &= Q(reservas_evento__fecha__gte=fecha_inicio)
+    dias_max = getattr(settings, 'HORARIOS_OCUPADOS_DIAS_MAX', 186)
+    if hasta < desde or (hasta - desde).days + 1 > dias_max:
+        return Response({
+            'error': f'fecha_fin debe ser posterior a fecha_inicio y la ventana de máximo {dias_max} días'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if formato not in ('detalle', 'intervalos', 'columnar'):
+        return Response({
+            'error': "formato debe ser 'detalle', 'intervalos' o 'columnar'"
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    if fecha_fin:
-        filtros &= Q(reservas_evento__fecha__lte=fecha_fin)
+    linea = indice_servicios_evento.horarios_ocupados(desde, hasta, servicio_id)
+    nombres = {
+        servicio['id_servicios_adicionales']: servicio['nombre']
+        for servicio in cache_catalogos.obtener('servicios')
+    }
+    ventana = {'fecha_inicio': str(desde), 'fecha_fin': str(hasta), 'formato': formato}
     
-    # Obtener todas las reservas con servicios adicionales
-    servicios_ocupados = ServiciosEvento.objects.filter(filtros).select_related(
-        'servicios_adicionales',
-        'reservas_evento'
-    ).order_by('reservas_evento__fecha', 'reservas_evento__hora_ini')
+    if formato == 'columnar':
+        servicios = sorted({id_servicio for _, id_servicio, _, _ in linea})
+        posicion = {id_servicio: i for i, id_servicio in enumerate(servicios)}
+        columnas = {'dia': [], 'servicio': [], 'ini': [], 'fin': []}
+        for fecha, id_servicio, _, fusionados in linea:
+            for ini, fin in fusionados:
+                columnas['dia'].append((fecha - desde).days)
+                columnas['servicio'].append(posicion[id_servicio])
+                columnas['ini'].append(_minutos_del_dia(ini, fecha, zona))
+                columnas['fin'].append(_minutos_del_dia(fin, fecha, zona))
+        return Response({
+            **ventana,
+            'zona_horaria': zona.zone,
+            'servicios': [
+                {'id_servicio': id_servicio, 'nombre_servicio': nombres.get(id_servicio)} for id_servicio in servicios
+            ],
+            **columnas
+        }, status=status.HTTP_200_OK)
     
     # Organizar datos por servicio
     resultado = {}
-    
-    for servicio_evento in servicios_ocupados:
-        servicio = servicio_evento.servicios_adicionales
-        reserva = servicio_evento.reservas_evento
-        
-        servicio_key = str(servicio.id_servicios_adicionales)
-        
-        if servicio_key not in resultado:
-            resultado[servicio_key] = {
-                'id_servicio': servicio.id_servicios_adicionales,
-                'nombre_servicio': servicio.nombre,
+    for fecha, id_servicio, horarios, fusionados in linea:
+        if id_servicio not in resultado:
+            resultado[id_servicio] = {
+                'id_servicio': id_servicio,
+                'nombre_servicio': nombres.get(id_servicio),
                 'horarios_ocupados': []
             }
-        
-        resultado[servicio_key]['horarios_ocupados'].append({
-            'id_reserva': reserva.id_reservas_evento,
-            'fecha': str(reserva.fecha),
-            'hora_ini': reserva.hora_ini.isoformat(),
-            'hora_fin': reserva.hora_fin.isoformat(),
-            'cant_personas': reserva.cant_personas
-        })
+        if formato == 'intervalos':
+            resultado[id_servicio]['horarios_ocupados'].extend(
+                {'fecha': str(fecha), 'hora_ini': _iso_utc(ini), 'hora_fin': _iso_utc(fin)}
+                for ini, fin in fusionados
+            )
+        else:
+            resultado[id_servicio]['horarios_ocupados'].extend({
+                'id_reserva': id_reserva,
+                'fecha': str(fecha),
+                'hora_ini': _iso_utc(ini),
+                'hora_fin': _iso_utc(fin),
+                'cant_personas': cant_personas
+            } for ini, fin, id_reserva, cant_personas in horarios)
     
     return Response({
-        'servicios': list(resultado.values())
+        **ventana,
+        'servicios': sorted(resultado.values(), key=lambda servicio: servicio['id_servicio'])
     }, status=status.HTTP_200_OK)
 
 
@@ -175,27 +213,8 @@ def verificar_disponibilidad(request):
             'mensaje': 'No se seleccionaron servicios adicionales'
         }, status=status.HTTP_200_OK)
     
-    # Verificar cada servicio
-    servicios_no_disponibles = []
-    
-    for servicio_id in servicios_ids:
-        resultado = verificar_disponibilidad_servicio(
-            servicio_id=servicio_id,
-            fecha=fecha,
-            hora_ini=hora_ini,
-            hora_fin=hora_fin
-        )
-        
-        if not resultado['disponible']:
-            try:
-                servicio = ServiciosAdicionales.objects.get(pk=servicio_id)
-                servicios_no_disponibles.append({
-                    'id_servicio': servicio_id,
-                    'nombre_servicio': servicio.nombre,
-                    'conflictos': resultado['conflictos']
-                })
-            except ServiciosAdicionales.DoesNotExist:
-                pass
+    # Verificar todos los servicios en una sola consulta al índice
+    servicios_no_disponibles = servicios_no_disponibles_en(servicios_ids, fecha, hora_ini, hora_fin)
     
     if servicios_no_disponibles:
         return Response({
@@ -223,7 +242,6 @@ def registrar_reserva_evento(request):
     - Duración del evento (mayor = más prioridad)
     - Cantidad de servicios adicionales (mayor = más prioridad)
     """
-    import json
     data = request.data
 
     # --- 1️⃣ Validar y obtener/crear datos del cliente
@@ -277,15 +295,10 @@ def registrar_reserva_evento(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
     # Validar formato de fechas
-    
-    import pytz
-
     try:
-        fecha_dt = datetime.strptime(fecha, '%Y-%m-%d').date()
-        
-        # Parsear las horas y convertir a zona horaria de Bolivia
-        tz_bolivia = pytz.timezone('America/La_Paz')
+        datetime.strptime(fecha, '%Y-%m-%d')
         
+        # Parsear las horas
         hora_ini_dt = datetime.fromisoformat(hora_ini.replace('Z', '+00:00'))
         hora_fin_dt = datetime.fromisoformat(hora_fin.replace('Z', '+00:00'))
         #
@@ -335,24 +348,42 @@ def registrar_reserva_evento(request):
         administrador=administrador
     )
     
-    # --- 6️⃣ Esperar el resultado (timeout de 10 segundos)
+    # --- 6️⃣ Modo asíncrono: devolver ticket sin bloquear el worker
+    if solicita_modo_asincrono(request):
+        ticket = almacen_tickets.crear('E')
+        request_reserva.agregar_callback(
+            lambda req: almacen_tickets.completar(ticket, *_respuesta_registro_evento(req))
+        )
+        return Response(respuesta_ticket(ticket, 'E'), status=status.HTTP_202_ACCEPTED)
+    
+    # --- 7️⃣ Esperar el resultado (timeout de 10 segundos)
     procesado = request_reserva.evento.wait(timeout=10)
     
     if not procesado:
+        timeouts_solicitudes.incrementar(cola='eventos')
         return Response({
             'error': 'Timeout procesando la reserva. Intente nuevamente.'
         }, status=status.HTTP_408_REQUEST_TIMEOUT)
     
-    # --- 7️⃣ Retornar el resultado
+    # --- 8️⃣ Retornar el resultado
+    datos, status_code = _respuesta_registro_evento(request_reserva)
+    return Response(datos, status=status_code)
+
+
+def _respuesta_registro_evento(request_reserva):
+    """
+    Arma (datos, status) a partir del resultado de la cola.
+    Lo usan el modo síncrono y el callback del modo asíncrono.
+    """
     resultado = request_reserva.resultado
     
     if resultado['success']:
         serializer = ReservasEventoSerializer(resultado['reserva'])
         
         # Calcular duración del evento
-        duracion_horas = (hora_fin_dt - hora_ini_dt).total_seconds() / 3600
+        duracion_horas = (request_reserva.hora_fin - request_reserva.hora_ini).total_seconds() / 3600
         
-        return Response({
+        return {
             'mensaje': 'Reserva de evento creada correctamente',
             'reserva': serializer.data,
             'cliente_id': resultado['datos_cliente'].id_datos_cliente,
@@ -360,20 +391,20 @@ def registrar_reserva_evento(request):
             'servicios_agregados': resultado['servicios_agregados'],
             'info_prioridad': {
                 'duracion_horas': duracion_horas,
-                'cant_personas': cant_personas,
-                'cant_servicios': len(servicios_ids),
+                'cant_personas': request_reserva.datos_evento['cant_personas'],
+                'cant_servicios': len(request_reserva.servicios_ids),
                 'prioridad_calculada': request_reserva.prioridad,
                 'mensaje_competencia': resultado.get('info_competencia', {}).get('mensaje', '')
             }
-        }, status=status.HTTP_201_CREATED)
-    else:
-        status_code = status.HTTP_409_CONFLICT if resultado['codigo'] == 'RECHAZADO_POR_PRIORIDAD' else status.HTTP_400_BAD_REQUEST
-        return Response({
-            'error': resultado['error'],
-            'codigo': resultado['codigo'],
-            'info_debug': resultado.get('info_debug', {}),
-            'detalle': resultado.get('detalle', {})
-        }, status=status_code)
+        }, status.HTTP_201_CREATED
+    
+    status_code = status.HTTP_409_CONFLICT if resultado['codigo'] == 'RECHAZADO_POR_PRIORIDAD' else status.HTTP_400_BAD_REQUEST
+    return {
+        'error': resultado['error'],
+        'codigo': resultado['codigo'],
+        'info_debug': resultado.get('info_debug', {}),
+        'detalle': resultado.get('detalle', {})
+    }, status_code
 
 
 # 🔹 Obtener estadísticas de la cola de eventos
@@ -397,13 +428,7 @@ def listar_servicios_adicionales_evento(request):
     Retorna todos los servicios adicionales activos (estado='A').
     Ejemplo: GET /api/servicios-adicionales/
     """
-    servicios = ServiciosAdicionales.objects.filter(estado='A').values(
-        'id_servicios_adicionales',
-        'nombre',
-        'descripcion',
-        'precio',
-        'tipo'
-    )
+    servicios = cache_catalogos.obtener('servicios_activos')
     
     if not servicios:
         return Response(
@@ -411,7 +436,7 @@ def listar_servicios_adicionales_evento(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    return Response(list(servicios), status=status.HTTP_200_OK)
+    return Response(servicios, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -419,25 +444,12 @@ def listar_servicios_adicionales_evento(request):
 @csrf_exempt
 def subir_comprobante(request, id_reserva_gen):
     """
-    Permite subir un comprobante de pago (archivo binario) asociado a una reserva general.
+    Permite subir un comprobante de pago asociado a una reserva general.
     Espera un campo 'pago' en el formulario (multipart/form-data).
+    El archivo se guarda en el storage de comprobantes (ver apps/reservas_gen/comprobantes.py);
+    se descarga en GET /api/reservas/<id_reserva_gen>/comprobante/
     """
-    try:
-        reserva_gen = ReservasGen.objects.get(pk=id_reserva_gen)
-    except ReservasGen.DoesNotExist:
-        return Response({'error': 'Reserva general no encontrada'}, status=status.HTTP_404_NOT_FOUND)
-    
-    archivo_pago = request.FILES.get('pago')
-    if not archivo_pago:
-        return Response({'error': 'No se envió ningún archivo'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    reserva_gen.pago = archivo_pago.read()
-    reserva_gen.save()
-    
-    return Response({
-        'mensaje': 'Comprobante de pago subido correctamente',
-        'reserva_gen_id': reserva_gen.id_reservas_gen
-    }, status=status.HTTP_200_OK)
+    return respuesta_subida_comprobante(request, id_reserva_gen)
 
 # 🔹 ACTUALIZAR UNA RESERVA DE EVENTO (PUT)
 @api_view(['PUT'])
@@ -557,11 +569,11 @@ def actualizar_reserva_evento(request, id_reserva):
                     
                     elif campo == 'fecha':
                         try:
-                            fecha_validada = datetime.strptime(data[campo], '%Y-%m-%d').date()
+                            datetime.strptime(data[campo], '%Y-%m-%d')
                             fecha_cambio = True
                         except ValueError:
                             return Response({
-                                'error': f'Formato de fecha inválido. Use YYYY-MM-DD',
+                                'error': 'Formato de fecha inválido. Use YYYY-MM-DD',
                                 'valor_recibido': data[campo]
                             }, status=400)
                     
@@ -617,27 +629,10 @@ def actualizar_reserva_evento(request, id_reserva):
                 hora_ini_verificar = data.get('hora_ini', reserva.hora_ini)
                 hora_fin_verificar = data.get('hora_fin', reserva.hora_fin)
                 
-                servicios_conflicto = []
-                
-                for servicio_id in servicios_actuales:
-                    disponibilidad = verificar_disponibilidad_servicio(
-                        servicio_id=servicio_id,
-                        fecha=fecha_verificar,
-                        hora_ini=hora_ini_verificar,
-                        hora_fin=hora_fin_verificar,
-                        excluir_reserva_id=id_reserva
-                    )
-                    
-                    if not disponibilidad['disponible']:
-                        try:
-                            servicio = ServiciosAdicionales.objects.get(pk=servicio_id)
-                            servicios_conflicto.append({
-                                'id': servicio_id,
-                                'nombre': servicio.nombre,
-                                'conflictos': disponibilidad['conflictos']
-                            })
-                        except ServiciosAdicionales.DoesNotExist:
-                            pass
+                servicios_conflicto = servicios_no_disponibles_en(
+                    list(servicios_actuales), fecha_verificar, hora_ini_verificar, hora_fin_verificar,
+                    excluir_reserva_id=id_reserva, clave_id='id', clave_nombre='nombre'
+                )
                 
                 if servicios_conflicto:
                     return Response({
@@ -648,7 +643,6 @@ def actualizar_reserva_evento(request, id_reserva):
             
             # --- 5️⃣ ACTUALIZAR SERVICIOS ADICIONALES
             if 'servicios_adicionales' in data:
-                import json
                 servicios_ids = data['servicios_adicionales']
                 
                 if isinstance(servicios_ids, str):
@@ -668,27 +662,10 @@ def actualizar_reserva_evento(request, id_reserva):
                 servicios_agregar = servicios_nuevos - servicios_actuales
                 
                 if servicios_agregar:
-                    servicios_no_disponibles = []
-                    
-                    for servicio_id in servicios_agregar:
-                        disponibilidad = verificar_disponibilidad_servicio(
-                            servicio_id=servicio_id,
-                            fecha=reserva.fecha,
-                            hora_ini=reserva.hora_ini,
-                            hora_fin=reserva.hora_fin,
-                            excluir_reserva_id=id_reserva
-                        )
-                        
-                        if not disponibilidad['disponible']:
-                            try:
-                                servicio = ServiciosAdicionales.objects.get(pk=servicio_id)
-                                servicios_no_disponibles.append({
-                                    'id': servicio_id,
-                                    'nombre': servicio.nombre,
-                                    'conflictos': disponibilidad['conflictos']
-                                })
-                            except ServiciosAdicionales.DoesNotExist:
-                                pass
+                    servicios_no_disponibles = servicios_no_disponibles_en(
+                        list(servicios_agregar), reserva.fecha, reserva.hora_ini, reserva.hora_fin,
+                        excluir_reserva_id=id_reserva, clave_id='id', clave_nombre='nombre'
+                    )
                     
                     if servicios_no_disponibles:
                         return Response({
@@ -857,10 +834,8 @@ def lista_reservas_evento(request):
                 'email': reserva.datos_cliente.email
             }
             
-            # Verificar si tiene pago (manejo correcto de BinaryField)
-            tiene_pago = False
-            if reserva.reservas_gen.pago is not None and len(reserva.reservas_gen.pago) > 0:
-                tiene_pago = True
+            # Verificar si tiene pago (bandera guardada, sin leer el comprobante)
+            tiene_pago = reserva.reservas_gen.tiene_pago
             
             # Datos de reserva general
             reserva_gen_data = {
@@ -941,9 +916,7 @@ def detalle_reserva_evento(request, id_reserva):
             'ci': reserva.datos_cliente.ci,
             'email': reserva.datos_cliente.email
         }
-        tiene_pago = False
-        if reserva.reservas_gen.pago is not None and len(reserva.reservas_gen.pago) > 0:
-            tiene_pago = True
+        tiene_pago = reserva.reservas_gen.tiene_pago
         # Datos de reserva general
         reserva_gen_data = {
             'id_reservas_gen': reserva.reservas_gen.id_reservas_gen,
@@ -1167,13 +1140,9 @@ def realizar_check_in_evento(request, id_reserva):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # 3. Verificar que la fecha actual esté dentro del rango de la reserva
-            from django.utils import timezone
-            import pytz
-            
             tz_bolivia = pytz.timezone('America/La_Paz')
             hora_bolivia = timezone.now().astimezone(tz_bolivia)
             fecha_actual = hora_bolivia.date()
-            hora_actual = hora_bolivia.time()
             
             # Verificar que sea el día del evento
             if fecha_actual != reserva.fecha:
@@ -1278,7 +1247,6 @@ def realizar_check_out_evento(request, id_reserva):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # --- REGISTRAR SALIDA ---
-            from django.utils import timezone
             reserva.check_out = timezone.now() 
             
             # Cambiar estado de la reserva a Finalizada
@@ -1386,9 +1354,6 @@ def reservas_evento_pendientes_check_in(request):
     Ejemplo: GET /api/eventos/reservas/pendientes-check-in/
     """
     try:
-        from django.utils import timezone
-        import pytz
-        
         tz_bolivia = pytz.timezone('America/La_Paz')
         fecha_hoy = timezone.now().astimezone(tz_bolivia).date()
         hora_actual = timezone.now().astimezone(tz_bolivia)
@@ -1453,8 +1418,6 @@ def reservas_evento_pendientes_check_out(request):
     Ejemplo: GET /api/reservaEvento/pendientes-check-out/
     """
     try:
-        from django.utils import timezone
-        
         reservas = ReservasEvento.objects.select_related(
             'datos_cliente'
         ).filter(
@@ -1521,8 +1484,6 @@ def eventos_finalizados(request):
     Ejemplo: GET /api/reservaEvento/finalizados/
     """
     try:
-        from django.utils import timezone
-        
         reservas = ReservasEvento.objects.select_related(
             'datos_cliente'
         ).filter(
@@ -1631,9 +1592,10 @@ def eventos_cancelados(request):
         return Response({
             'error': f'Error al obtener eventos cancelados: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-import pytz
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@con_etag(DOMINIO_EVENTOS)
 def obtener_notificaciones_eventos(request):
     """
     Endpoint para obtener notificaciones de eventos.
@@ -1822,8 +1784,56 @@ def obtener_notificaciones_eventos(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# 🔹 Campos del próximo evento (se leen en el mismo aggregate que los conteos)
+CAMPOS_PROXIMO_EVENTO = {
+    'id': 'id_reservas_evento',
+    'nombre': 'datos_cliente__nombre',
+    'app_paterno': 'datos_cliente__app_paterno',
+    'hora_ini': 'hora_ini',
+    'cant_personas': 'cant_personas',
+}
+
+
+def _calcular_tablero_eventos(fecha_hoy, ahora):
+    """Conteos del día y próximo evento en una sola consulta"""
+    activo = Q(estado='A')
+
+    # Próximo evento
+    proximo_evento = ReservasEvento.objects.filter(
+        fecha=fecha_hoy,
+        estado='A',
+        hora_ini__gte=ahora
+    ).order_by('hora_ini')
+
+    resultado = ReservasEvento.objects.filter(fecha=fecha_hoy).aggregate(
+        # Contar eventos por estado
+        total_eventos_hoy=Count('pk'),
+        eventos_activos=Count('pk', filter=activo),
+        eventos_finalizados=Count('pk', filter=Q(estado='F')),
+        eventos_cancelados=Count('pk', filter=Q(estado='C')),
+        # Eventos sin ingreso que ya deberían haber empezado
+        eventos_sin_checkin=Count('pk', filter=activo & Q(hora_ini__lt=ahora, check_in__isnull=True)),
+        # Eventos en curso (con ingreso, sin salida)
+        eventos_en_curso=Count('pk', filter=activo & Q(check_in__isnull=False, check_out__isnull=True)),
+        **primera_fila(proximo_evento, CAMPOS_PROXIMO_EVENTO, 'proximo_')
+    )
+
+    proximo = extraer_primera_fila(resultado, CAMPOS_PROXIMO_EVENTO, 'proximo_')
+    if proximo:
+        proximo = {
+            'id': proximo['id'],
+            'cliente': f"{proximo['nombre']} {proximo['app_paterno']}",
+            'hora_ini': proximo['hora_ini'].strftime('%H:%M'),
+            'cant_personas': proximo['cant_personas'],
+            'hora_ini_completa': proximo['hora_ini']
+        }
+    resultado['proximo_evento'] = proximo
+    return resultado
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@con_etag(DOMINIO_EVENTOS)
 def estadisticas_eventos_hoy(request):
     """
     Endpoint para obtener estadísticas de eventos del día.
@@ -1835,55 +1845,19 @@ def estadisticas_eventos_hoy(request):
         ahora = timezone.now().astimezone(tz_bolivia)
         fecha_hoy = ahora.date()
         
-        # Contar eventos por estado
-        total_eventos_hoy = ReservasEvento.objects.filter(fecha=fecha_hoy).count()
-        eventos_activos = ReservasEvento.objects.filter(fecha=fecha_hoy, estado='A').count()
-        eventos_finalizados = ReservasEvento.objects.filter(fecha=fecha_hoy, estado='F').count()
-        eventos_cancelados = ReservasEvento.objects.filter(fecha=fecha_hoy, estado='C').count()
+        datos = obtener_tablero(DOMINIO_EVENTOS, fecha_hoy, lambda: _calcular_tablero_eventos(fecha_hoy, ahora))
+        datos = dict(datos)
         
-        # Eventos sin ingreso que ya deberían haber empezado
-        eventos_sin_checkin = ReservasEvento.objects.filter(
-            fecha=fecha_hoy,
-            estado='A',
-            hora_ini__lt=ahora,
-            check_in__isnull=True
-        ).count()
-        
-        # Eventos en curso (con ingreso, sin salida)
-        eventos_en_curso = ReservasEvento.objects.filter(
-            fecha=fecha_hoy,
-            estado='A',
-            check_in__isnull=False,
-            check_out__isnull=True
-        ).count()
-        
-        # Próximo evento
-        proximo_evento = ReservasEvento.objects.filter(
-            fecha=fecha_hoy,
-            estado='A',
-            hora_ini__gte=ahora
-        ).select_related('datos_cliente').order_by('hora_ini').first()
-        
-        proximo = None
-        if proximo_evento:
-            hora_ini_aware = proximo_evento.hora_ini.astimezone(tz_bolivia) if timezone.is_aware(proximo_evento.hora_ini) else tz_bolivia.localize(proximo_evento.hora_ini)
-            minutos_restantes = int((hora_ini_aware - ahora).total_seconds() / 60)
-            
-            proximo = {
-                'id': proximo_evento.id_reservas_evento,
-                'cliente': f"{proximo_evento.datos_cliente.nombre} {proximo_evento.datos_cliente.app_paterno}",
-                'hora_ini': proximo_evento.hora_ini.strftime('%H:%M'),
-                'cant_personas': proximo_evento.cant_personas,
-                'minutos_restantes': minutos_restantes
-            }
+        # Los minutos restantes se calculan en cada request (el resto puede venir de caché)
+        proximo = datos.pop('proximo_evento')
+        if proximo:
+            proximo = dict(proximo)
+            hora_ini = proximo.pop('hora_ini_completa')
+            hora_ini_aware = hora_ini.astimezone(tz_bolivia) if timezone.is_aware(hora_ini) else tz_bolivia.localize(hora_ini)
+            proximo['minutos_restantes'] = int((hora_ini_aware - ahora).total_seconds() / 60)
         
         return Response({
-            'total_eventos_hoy': total_eventos_hoy,
-            'eventos_activos': eventos_activos,
-            'eventos_finalizados': eventos_finalizados,
-            'eventos_cancelados': eventos_cancelados,
-            'eventos_sin_checkin': eventos_sin_checkin,
-            'eventos_en_curso': eventos_en_curso,
+            **datos,
             'proximo_evento': proximo,
             'fecha': str(fecha_hoy),
             'hora_actual': ahora.strftime('%H:%M:%S')
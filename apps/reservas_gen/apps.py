@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ReservasGenConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reservas_gen'
+
+    def ready(self):
+        # Registrar señales que invalidan la caché de catálogos
+        from . import signals  # noqa: F401
+
+        # Sin DEBUG los comprobantes necesitan un storage remoto (ver comprobantes.py)
+        from .comprobantes import verificar_storage_comprobantes
+        verificar_storage_comprobantes()
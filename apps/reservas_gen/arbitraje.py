@@ -0,0 +1,287 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/arbitraje.py
+# Arbitraje de prioridad entre solicitudes concurrentes (hotel y eventos)
+# ========================================
+"""
+Las colas de hotel y eventos deciden quién gana cuando dos solicitudes compiten
+por el mismo recurso dentro de la ventana de batching. Por defecto lo hacen con
+su dict `procesando`, que solo ve las solicitudes del proceso actual.
+
+Con varios workers de gunicorn cada proceso tiene su propia cola, así que se
+agrega un backend compartido:
+
+- 'MEMORIA' (por defecto): no hace nada extra, el dict `procesando` decide.
+- 'BD': cada solicitud se registra en la tabla solicitud_reserva_pendiente y los
+  demás procesos la ven como competidora. Las filas de competidores se reclaman
+  con SELECT ... FOR UPDATE SKIP LOCKED para no bloquearse entre workers.
+
+Las filas vencen a los TIEMPO_EXPIRACION segundos (procesos caídos); mientras
+la solicitud sigue en la cola de su proceso, un hilo renueva `expira` cada
+INTERVALO_RENOVACION segundos, así una espera larga (cola saturada, modo
+asíncrono) no pierde la fila antes de aceptar().
+
+Configuración: RESERVAS_ARBITRAJE = 'MEMORIA' | 'BD'
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class SolicitudRemota:
+    """Competidora registrada por otro proceso (solo lo necesario para arbitrar)"""
+
+    def __init__(self, fila):
+        self.token = fila.token
+        self.prioridad = fila.prioridad
+        self.aceptada = fila.estado == 'A'
+        self.resultado = None
+        # Mismo reloj que ReservaRequest.timestamp (datetime.now() local) para el desempate FIFO
+        self.timestamp = datetime.fromtimestamp(fila.creado.timestamp())
+
+    def __repr__(self):
+        return f"<SolicitudRemota {self.token} prioridad={self.prioridad}>"
+
+
+class BackendArbitrajeMemoria:
+    """Arbitraje solo dentro del proceso: el dict `procesando` de cada cola es la fuente de verdad"""
+    nombre = 'MEMORIA'
+    compartido = False
+
+    def registrar(self, request):
+        pass
+
+    def competidores(self, request, excluir_tokens=()):
+        return []
+
+    def aceptar(self, request):
+        return True
+
+    def rechazar_competidores(self, request):
+        return 0
+
+    def retirar(self, request):
+        pass
+
+    def obtener_estadisticas(self):
+        return {'backend': self.nombre}
+
+
+class BackendArbitrajeBD:
+    """
+    Arbitraje compartido entre procesos usando la tabla solicitud_reserva_pendiente.
+
+    Cada solicitud debe exponer: token, prioridad, tiempo_encolado y
+    datos_arbitraje() -> (tipo, recurso, inicio, fin, servicios)
+    """
+    nombre = 'BD'
+    compartido = True
+
+    # Margen para purgar filas de procesos que murieron sin retirarlas
+    TIEMPO_EXPIRACION = 60  # segundos
+    INTERVALO_PURGA = 30  # segundos entre purgas por proceso
+    # Las filas de solicitudes aún en cola se renuevan antes de vencer
+    INTERVALO_RENOVACION = TIEMPO_EXPIRACION / 3  # segundos
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ultima_purga = 0
+        self._locales = set()  # tokens registrados por este proceso y aún no retirados
+        self._hilo = None
+        self._pid = None
+        self.rechazadas_remotas = 0
+        self.purgadas = 0
+        self.renovadas = 0
+
+    # 🔹 Helpers
+    def _modelo(self):
+        from .models import SolicitudReservaPendiente
+        return SolicitudReservaPendiente
+
+    @staticmethod
+    def _servicios_a_texto(servicios):
+        if not servicios:
+            return ''
+        return ',' + ','.join(str(s) for s in sorted(servicios)) + ','
+
+    @staticmethod
+    def _servicios_de_texto(texto):
+        return {int(s) for s in texto.split(',') if s}
+
+    def _conflictivas(self, request, excluir_tokens=(), estados=('P', 'A')):
+        """Filas de otras solicitudes del mismo recurso con horarios solapados"""
+        tipo, recurso, inicio, fin, servicios = request.datos_arbitraje()
+        filas = self._modelo().objects.filter(
+            tipo=tipo,
+            recurso=str(recurso),
+            estado__in=estados,
+            inicio__lt=fin,
+            fin__gt=inicio,
+            expira__gt=timezone.now(),
+        ).exclude(token=request.token)
+        if excluir_tokens:
+            filas = filas.exclude(token__in=list(excluir_tokens))
+        return filas, servicios
+
+    def _filtrar_servicios(self, filas, servicios):
+        """En eventos solo compiten si comparten algún servicio"""
+        if servicios is None:
+            return list(filas)
+        return [f for f in filas if self._servicios_de_texto(f.servicios) & set(servicios)]
+
+    # 🔹 Ciclo de vida de una solicitud
+    def registrar(self, request):
+        tipo, recurso, inicio, fin, servicios = request.datos_arbitraje()
+        ahora = timezone.now()
+        self._modelo().objects.create(
+            token=request.token,
+            tipo=tipo,
+            recurso=str(recurso),
+            prioridad=request.prioridad,
+            creado=datetime.fromtimestamp(request.tiempo_encolado, tz=dt_timezone.utc),
+            inicio=inicio,
+            fin=fin,
+            servicios=self._servicios_a_texto(servicios),
+            estado='P',
+            expira=ahora + timedelta(seconds=self.TIEMPO_EXPIRACION),
+        )
+        with self._lock:
+            self._locales.add(request.token)
+        self._asegurar_hilo()
+        self._purgar_si_corresponde()
+
+    def competidores(self, request, excluir_tokens=()):
+        """Competidoras de OTROS procesos (las locales se excluyen por token)"""
+        filas, servicios = self._conflictivas(request, excluir_tokens)
+        return [SolicitudRemota(f) for f in self._filtrar_servicios(filas, servicios)]
+
+    def aceptar(self, request):
+        """
+        Reclama la fila propia como ganadora. Falla si otro proceso la rechazó
+        o si ya hay una competidora aceptada para el mismo horario.
+        """
+        Modelo = self._modelo()
+        with transaction.atomic():
+            propia = Modelo.objects.select_for_update().filter(token=request.token).first()
+            if propia is None or propia.estado == 'R':
+                return False
+            filas, servicios = self._conflictivas(request, estados=('A',))
+            if self._filtrar_servicios(filas, servicios):
+                return False
+            propia.estado = 'A'
+            propia.save(update_fields=['estado'])
+        return True
+
+    def rechazar_competidores(self, request):
+        """
+        Marca como rechazadas las competidoras pendientes del ganador.
+        SKIP LOCKED: las filas que otro worker está reclamando en este momento
+        se resuelven solas en su aceptar() al ver esta fila aceptada.
+        """
+        Modelo = self._modelo()
+        with transaction.atomic():
+            filas, servicios = self._conflictivas(request, estados=('P',))
+            filas = filas.select_for_update(skip_locked=True)
+            tokens = [f.token for f in self._filtrar_servicios(filas, servicios)]
+            if tokens:
+                Modelo.objects.filter(token__in=tokens).update(estado='R')
+        with self._lock:
+            self.rechazadas_remotas += len(tokens)
+        return len(tokens)
+
+    def retirar(self, request):
+        with self._lock:
+            self._locales.discard(request.token)
+        self._modelo().objects.filter(token=request.token).delete()
+
+    # 🔹 Mantenimiento
+    def _asegurar_hilo(self):
+        """Arranca el hilo de renovación al primer registro (y de nuevo tras un fork de gunicorn)"""
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or self._pid != os.getpid() or not self._hilo.is_alive():
+                if self._pid is not None and self._pid != os.getpid():
+                    self._locales.clear()  # Las solicitudes del proceso padre no están en esta cola
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._renovar_periodicamente, name='arbitraje-renovacion', daemon=True)
+                self._hilo.start()
+
+    def _renovar_periodicamente(self):
+        while True:
+            time.sleep(self.INTERVALO_RENOVACION)
+            try:
+                self.renovar()
+            except Exception as e:
+                logger.warning("⚠️ No se pudieron renovar las solicitudes del arbitraje: %s", e)
+            finally:
+                connection.close()
+
+    def renovar(self):
+        """Extiende `expira` de las solicitudes de este proceso que siguen en cola"""
+        with self._lock:
+            tokens = list(self._locales)
+        if not tokens:
+            return 0
+        renovadas = self._modelo().objects.filter(token__in=tokens).update(
+            expira=timezone.now() + timedelta(seconds=self.TIEMPO_EXPIRACION)
+        )
+        with self._lock:
+            self.renovadas += renovadas
+        return renovadas
+
+    def _purgar_si_corresponde(self):
+        with self._lock:
+            if time.time() - self._ultima_purga < self.INTERVALO_PURGA:
+                return
+            self._ultima_purga = time.time()
+        self.purgar()
+
+    def purgar(self):
+        """Elimina filas vencidas (procesos caídos) sin esperar filas bloqueadas"""
+        Modelo = self._modelo()
+        with transaction.atomic():
+            vencidas = list(
+                Modelo.objects.select_for_update(skip_locked=True)
+                .filter(expira__lte=timezone.now())
+                .values_list('id', flat=True)
+            )
+            if vencidas:
+                Modelo.objects.filter(id__in=vencidas).delete()
+        with self._lock:
+            self.purgadas += len(vencidas)
+        return len(vencidas)
+
+    def obtener_estadisticas(self):
+        pendientes = self._modelo().objects.filter(estado='P').count()
+        with self._lock:
+            return {
+                'backend': self.nombre,
+                'pendientes_compartidas': pendientes,
+                'rechazadas_remotas': self.rechazadas_remotas,
+                'purgadas': self.purgadas,
+                'en_cola_local': len(self._locales),
+                'renovadas': self.renovadas,
+            }
+
+
+BACKENDS_ARBITRAJE = {
+    'MEMORIA': BackendArbitrajeMemoria,
+    'BD': BackendArbitrajeBD,
+}
+
+
+def obtener_backend_arbitraje():
+    """Crea el backend configurado en settings.RESERVAS_ARBITRAJE (por defecto MEMORIA)"""
+    nombre = str(getattr(settings, 'RESERVAS_ARBITRAJE', 'MEMORIA')).upper()
+    try:
+        return BACKENDS_ARBITRAJE[nombre]()
+    except KeyError:
+        raise ValueError(f"RESERVAS_ARBITRAJE inválido: {nombre}. Opciones: {', '.join(BACKENDS_ARBITRAJE)}")
@@ -0,0 +1,177 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/catalogos.py
+# Caché en memoria de los catálogos (tarifas, servicios adicionales, habitaciones)
+# ========================================
+"""
+Las tablas de catálogo son chicas y casi no cambian, pero se consultaban en
+cada request. Aquí se guarda, por proceso, la respuesta ya armada de cada
+listado "todos" (la misma estructura que devolvía la vista), así esas vistas
+responden sin consultar la BD.
+
+Invalidación:
+- signals.py incrementa la versión del modelo (versiones.py) al confirmar
+  cualquier save()/delete() de TarifaHotel, ServiciosAdicionales o Habitacion
+  (crear/actualizar servicio, crear/actualizar habitación, ingreso...). Cada
+  catálogo guarda las versiones de los modelos de los que depende y se
+  reconstruye si alguna cambió.
+- CATALOGOS_CACHE_TTL (segundos) acota lo que puede quedar desactualizado si la
+  caché de Django es local (LocMemCache) y escribe otro proceso, o si se
+  escribe con queryset.update() (no envía señales).
+
+Aciertos y fallos se publican en /api/metrics/ (catalogos_cache_total).
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from apps.habitacion.models import Habitacion
+from apps.servicios_adicionales.models import ServiciosAdicionales
+from apps.servicios_adicionales.serializers import ServiciosAdicionalesSerializer
+from apps.tarifa_hotel.models import TarifaHotel
+from .metricas import registro_metricas, Contador
+from .versiones import version_dominio
+
+
+# Dominios de versión por modelo (los incrementa signals.py)
+DOMINIO_TARIFAS = 'catalogo:tarifa_hotel'
+DOMINIO_SERVICIOS = 'catalogo:servicios_adicionales'
+DOMINIO_HABITACIONES = 'catalogo:habitacion'
+
+consultas_catalogos = registro_metricas.registrar(Contador(
+    'catalogos_cache_total',
+    'Lecturas de la caché de catálogos por resultado (acierto / fallo)',
+    ('catalogo', 'resultado')
+))
+
+
+# ==============================================
+# 🔹 CONSTRUCCIÓN DE CADA CATÁLOGO (misma respuesta que armaba la vista)
+# ==============================================
+
+def _tarifas():
+    return list(TarifaHotel.objects.all().values(
+        'id_tarifa_hotel',
+        'nombre',
+        'descripcion',
+        'amoblado',
+        'baño_priv',
+        'precio_persona'
+    ))
+
+
+def _servicios():
+    return ServiciosAdicionalesSerializer(ServiciosAdicionales.objects.all(), many=True).data
+
+
+def _servicios_activos():
+    return list(ServiciosAdicionales.objects.filter(estado='A').values(
+        'id_servicios_adicionales',
+        'nombre',
+        'descripcion',
+        'precio',
+        'tipo'
+    ))
+
+
+def _habitacion(h, tarifa):
+    return {
+        'id_habitacion': h.id_habitacion,
+        'numero': h.numero,
+        'piso': h.piso,
+        'tipo': h.tipo,
+        'amoblado': h.amoblado,
+        'baño_priv': h.baño_priv,
+        'estado': h.estado,
+        'tarifa_hotel': tarifa,
+    }
+
+
+def _habitaciones():
+    return [
+        _habitacion(h, {
+            'id_tarifa_hotel': h.tarifa_hotel.id_tarifa_hotel,
+            'nombre': h.tarifa_hotel.nombre,
+            'precio_persona': float(h.tarifa_hotel.precio_persona)
+        })
+        for h in Habitacion.objects.select_related('tarifa_hotel').all()
+    ]
+
+
+def _habitaciones_disponibles():
+    data = [
+        _habitacion(h, {
+            'id_tarifa_hotel': h.tarifa_hotel.id_tarifa_hotel,
+            'nombre': h.tarifa_hotel.nombre,
+            'descripcion': h.tarifa_hotel.descripcion,
+            'precio_persona': float(h.tarifa_hotel.precio_persona)
+        })
+        for h in Habitacion.objects.filter(estado='DISPONIBLE').select_related('tarifa_hotel')
+    ]
+    return {
+        'count': len(data),
+        'habitaciones': data
+    }
+
+
+# {catálogo: (construir, dominios de los que depende)}
+CATALOGOS = {
+    'tarifas': (_tarifas, (DOMINIO_TARIFAS,)),
+    'servicios': (_servicios, (DOMINIO_SERVICIOS,)),
+    'servicios_activos': (_servicios_activos, (DOMINIO_SERVICIOS,)),
+    'habitaciones': (_habitaciones, (DOMINIO_HABITACIONES, DOMINIO_TARIFAS)),
+    'habitaciones_disponibles': (_habitaciones_disponibles, (DOMINIO_HABITACIONES, DOMINIO_TARIFAS)),
+}
+
+
+class CacheCatalogos:
+    """Respuestas armadas de los catálogos, por proceso, con versión y vencimiento"""
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._inicializar()
+        return cls._instance
+
+    def _inicializar(self):
+        self.entradas = {}  # {catálogo: (versiones, creado, datos)}
+        # Una sola reconstrucción a la vez: los pedidos concurrentes esperan y usan el resultado
+        self._construccion = threading.Lock()
+
+    def _vigente(self, entrada, versiones):
+        ttl = getattr(settings, 'CATALOGOS_CACHE_TTL', 300)
+        return entrada is not None and entrada[0] == versiones and time.time() - entrada[1] < ttl
+
+    def obtener(self, nombre):
+        """Respuesta del catálogo (no modificarla: se comparte entre requests)"""
+        construir, dominios = CATALOGOS[nombre]
+        versiones = tuple(version_dominio(dominio) for dominio in dominios)
+
+        entrada = self.entradas.get(nombre)
+        if self._vigente(entrada, versiones):
+            consultas_catalogos.incrementar(catalogo=nombre, resultado='acierto')
+            return entrada[2]
+
+        with self._construccion:
+            entrada = self.entradas.get(nombre)
+            if self._vigente(entrada, versiones):
+                consultas_catalogos.incrementar(catalogo=nombre, resultado='acierto')
+                return entrada[2]
+            consultas_catalogos.incrementar(catalogo=nombre, resultado='fallo')
+            datos = construir()
+            self.entradas[nombre] = (versiones, time.time(), datos)
+            return datos
+
+    def invalidar(self, *nombres):
+        """Descarta catálogos de este proceso (todos si no se indican)"""
+        with self._construccion:
+            for nombre in nombres or list(self.entradas):
+                self.entradas.pop(nombre, None)
+
+
+# Instancia global
+cache_catalogos = CacheCatalogos()
@@ -0,0 +1,192 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/comprobantes.py
+# Comprobantes de pago en almacenamiento de archivos (fuera de la tabla reservas_gen)
+# ========================================
+"""
+El comprobante se guarda en un storage (por defecto carpeta privada
+COMPROBANTES_ROOT, no servida como media) y reservas_gen solo guarda la ruta,
+nombre, tamaño, tipo y SHA-256.
+
+- Subida: el archivo se copia al storage por bloques (UploadedFile.chunks())
+  calculando el SHA-256 en la misma pasada, sin cargarlo completo en memoria.
+- Descarga: GET /api/reservas/<id_reserva_gen>/comprobante/ lo sirve en
+  streaming con FileResponse.
+- Los comprobantes antiguos guardados en la columna BLOB `pago` se mueven con
+  `python manage.py migrar_comprobantes`; mientras tanto se siguen sirviendo.
+
+Para usar otro backend (p. ej. S3) basta con COMPROBANTES_STORAGE = 'ruta.a.Storage'.
+Con DEBUG desactivado es obligatorio: la carpeta local no persiste en una función
+serverless (Vercel), así que sin un storage remoto el proyecto no arranca.
+"""
+import hashlib
+import io
+import mimetypes
+import os
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# ==============================================
+# 🔹 STORAGE Y RUTAS (referenciados desde el modelo)
+# ==============================================
+
+_storage = None
+
+
+def storage_comprobantes():
+    """Storage configurado para comprobantes (se crea una sola vez)"""
+    global _storage
+    if _storage is None:
+        clase = getattr(settings, 'COMPROBANTES_STORAGE', '')
+        if clase:
+            _storage = import_string(clase)()
+        else:
+            _storage = FileSystemStorage(
+                location=getattr(settings, 'COMPROBANTES_ROOT', os.path.join(settings.BASE_DIR, 'comprobantes')),
+                base_url=None
+            )
+    return _storage
+
+
+def verificar_storage_comprobantes():
+    """Llamado al arrancar (apps.py): en producción la carpeta local no es un destino válido"""
+    if not settings.DEBUG and not getattr(settings, 'COMPROBANTES_STORAGE', ''):
+        raise ImproperlyConfigured(
+            "COMPROBANTES_STORAGE es obligatorio con DEBUG desactivado: el disco local de "
+            "la función serverless no persiste los comprobantes de pago"
+        )
+
+
+def ruta_comprobante(reserva_gen, nombre):
+    """comprobantes/<tipo>/<id_reserva_gen>/<uuid><ext>: nombres no adivinables"""
+    extension = os.path.splitext(nombre)[1].lower()[:10]
+    return f"{reserva_gen.tipo or 'X'}/{reserva_gen.id_reservas_gen}/{uuid.uuid4().hex}{extension}"
+
+
+# ==============================================
+# 🔹 GUARDAR
+# ==============================================
+
+class ComprobanteDemasiadoGrande(Exception):
+    pass
+
+
+class _ArchivoConResumen(File):
+    """File que calcula SHA-256 y tamaño mientras el storage lo lee por bloques"""
+
+    def __init__(self, archivo, tamano_max):
+        super().__init__(archivo, name=getattr(archivo, 'name', None))
+        self.resumen = hashlib.sha256()
+        self.leidos = 0
+        self.tamano_max = tamano_max
+
+    def chunks(self, chunk_size=None):
+        bloques = self.file.chunks(chunk_size) if hasattr(self.file, 'chunks') else super().chunks(chunk_size)
+        for bloque in bloques:
+            self.leidos += len(bloque)
+            if self.leidos > self.tamano_max:
+                raise ComprobanteDemasiadoGrande()
+            self.resumen.update(bloque)
+            yield bloque
+
+
+def tamano_maximo_comprobante():
+    return getattr(settings, 'COMPROBANTES_TAMANO_MAX', 10 * 1024 * 1024)
+
+
+def guardar_comprobante(reserva_gen, archivo, nombre=None, tipo_contenido=None):
+    """
+    Copia `archivo` (UploadedFile o file-like) al storage y actualiza la referencia
+    en reserva_gen. El comprobante anterior se borra cuando la transacción confirma.
+    Lanza ComprobanteDemasiadoGrande si supera COMPROBANTES_TAMANO_MAX.
+    """
+    nombre = nombre or os.path.basename(getattr(archivo, 'name', '') or 'comprobante')
+    tipo_contenido = tipo_contenido or getattr(archivo, 'content_type', None) \
+        or mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+    tamano_max = tamano_maximo_comprobante()
+    if getattr(archivo, 'size', None) and archivo.size > tamano_max:
+        raise ComprobanteDemasiadoGrande()
+
+    storage = storage_comprobantes()
+    contenido = _ArchivoConResumen(archivo, tamano_max)
+    destino = ruta_comprobante(reserva_gen, nombre)
+    try:
+        ruta = storage.save(destino, contenido)
+    except Exception:
+        # No dejar el archivo parcial (el nombre lleva uuid, así que es el nuestro)
+        if storage.exists(destino):
+            storage.delete(destino)
+        raise
+
+    anterior = reserva_gen.comprobante.name if reserva_gen.comprobante else None
+    reserva_gen.comprobante.name = ruta
+    reserva_gen.comprobante_nombre = nombre[:255]
+    reserva_gen.comprobante_tipo = tipo_contenido[:100]
+    reserva_gen.comprobante_tamano = contenido.leidos
+    reserva_gen.comprobante_sha256 = contenido.resumen.hexdigest()
+    reserva_gen.pago = None
+    reserva_gen.tiene_pago = True
+    reserva_gen.save(update_fields=[
+        'comprobante', 'comprobante_nombre', 'comprobante_tipo',
+        'comprobante_tamano', 'comprobante_sha256', 'pago', 'tiene_pago'
+    ])
+
+    if anterior and anterior != ruta:
+        transaction.on_commit(lambda: storage.delete(anterior))
+    return reserva_gen
+
+
+# ==============================================
+# 🔹 LEER
+# ==============================================
+
+def _detectar_tipo(contenido):
+    """Tipo MIME y extensión a partir de los primeros bytes (comprobantes antiguos sin nombre)"""
+    firmas = (
+        (b'%PDF', 'application/pdf', '.pdf'),
+        (b'\x89PNG', 'image/png', '.png'),
+        (b'\xff\xd8\xff', 'image/jpeg', '.jpg'),
+        (b'GIF8', 'image/gif', '.gif'),
+        (b'RIFF', 'image/webp', '.webp'),
+    )
+    for firma, tipo, extension in firmas:
+        if contenido.startswith(firma):
+            return tipo, extension
+    return 'application/octet-stream', '.bin'
+
+
+def abrir_comprobante(reserva_gen):
+    """
+    Retorna (archivo, nombre, tipo_contenido) o None si no hay comprobante.
+    Si aún está en la columna BLOB (no migrado) se sirve desde memoria
+    (pago está diferido: solo en ese caso se consulta).
+    """
+    if reserva_gen.comprobante:
+        archivo = storage_comprobantes().open(reserva_gen.comprobante.name, 'rb')
+        return archivo, reserva_gen.comprobante_nombre or os.path.basename(reserva_gen.comprobante.name), \
+            reserva_gen.comprobante_tipo or 'application/octet-stream'
+
+    contenido = bytes(reserva_gen.pago) if reserva_gen.pago else b''
+    if not contenido:
+        return None
+    tipo, extension = _detectar_tipo(contenido)
+    return io.BytesIO(contenido), f"comprobante_{reserva_gen.id_reservas_gen}{extension}", tipo
+
+
+def migrar_blob(reserva_gen):
+    """Mueve el BLOB `pago` de una reserva al storage; retorna los bytes movidos"""
+    contenido = bytes(reserva_gen.pago) if reserva_gen.pago else b''
+    if not contenido:
+        return 0
+    tipo, extension = _detectar_tipo(contenido)
+    archivo = File(io.BytesIO(contenido), name=f"comprobante_{reserva_gen.id_reservas_gen}{extension}")
+    archivo.size = len(contenido)
+    with transaction.atomic():
+        guardar_comprobante(reserva_gen, archivo, tipo_contenido=tipo)
+    return len(contenido)
@@ -0,0 +1,386 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/management/commands/benchmark_reservas.py
+# Benchmark de concurrencia de las colas de reservas (hotel y eventos)
+# ========================================
+"""
+Lanza ráfagas de solicitudes concurrentes contra ColaReservasHotel y
+ColaReservasEvento (un hilo por solicitud, todas liberadas a la vez) y mide:
+
+- throughput (solicitudes y aceptadas por segundo)
+- latencia p50/p95/p99 (desde el envío hasta la decisión de la cola)
+- espera en cola (ventana de batching + tiempo hasta que el worker la toma)
+- timeouts: solicitudes sin respuesta dentro de --timeout (el 408 de las vistas)
+
+Escenarios:
+- misma_habitacion: todas piden la misma habitación con fechas solapadas (gana una por ráfaga)
+- habitaciones_distintas: cada solicitud pide otra habitación (sin competencia)
+- eventos_solapados: eventos del mismo día con horarios solapados y un servicio en común
+
+Al final de cada escenario se verifica el invariante: ninguna pareja de reservas
+aceptadas se solapa (misma habitación / mismo servicio). El informe se escribe
+en JSON para comparar corridas.
+
+Crea sus propias habitaciones, servicios y cliente (y los borra al terminar
+salvo --conservar); pensado para SQLite o una copia local de MySQL.
+"""
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.administrador.models import Administrador
+from apps.datos_cliente.models import DatosCliente
+from apps.empleado.models import Empleado
+from apps.habitacion.models import Habitacion
+from apps.reserva_hotel.models import ReservaHotel
+from apps.reserva_hotel.queue_manager import gestor_cola
+from apps.reservas_evento.queue_manager import gestor_cola_eventos
+from apps.reservas_gen.models import ReservasGen
+from apps.servicios_adicionales.models import ServiciosAdicionales
+from apps.servicios_evento.models import ServiciosEvento
+from apps.tarifa_hotel.models import TarifaHotel
+
+
+ESCENARIOS = ('misma_habitacion', 'habitaciones_distintas', 'eventos_solapados')
+ESTADOS_ACTIVOS = ('A', 'P')
+
+# Fechas lejanas para no cruzarse con reservas reales
+FECHA_BASE = date(2090, 1, 1)
+
+
+def _percentil(valores, p):
+    """Mismo criterio que el resumen de esperas de la cola"""
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return round(valores[min(len(valores) - 1, int(p * len(valores)))], 1)
+
+
+def _resumen(valores):
+    if not valores:
+        return {'muestras': 0, 'promedio_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    return {
+        'muestras': len(valores),
+        'promedio_ms': round(sum(valores) / len(valores), 1),
+        'p50_ms': _percentil(valores, 0.50),
+        'p95_ms': _percentil(valores, 0.95),
+        'p99_ms': _percentil(valores, 0.99),
+        'max_ms': round(max(valores), 1),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Mide las colas de reservas con ráfagas de solicitudes concurrentes y escribe un informe JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenario', choices=ESCENARIOS + ('todos',), default='todos')
+        parser.add_argument('--solicitudes', type=int, default=20,
+                            help='Solicitudes concurrentes por ráfaga')
+        parser.add_argument('--rafagas', type=int, default=3,
+                            help='Ráfagas por escenario (cada una en fechas distintas)')
+        parser.add_argument('--timeout', type=float, default=10.0,
+                            help='Segundos de espera por solicitud antes de contarla como timeout (408)')
+        parser.add_argument('--salida', default='',
+                            help='Archivo JSON del informe (por defecto benchmark_reservas_<fecha>.json)')
+        parser.add_argument('--conservar', action='store_true',
+                            help='No borrar las habitaciones, servicios y reservas creados')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Ejecutar aunque DEBUG=False (crea y borra datos en la BD configurada)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['forzar']:
+            raise CommandError('DEBUG=False: use --forzar para correr el benchmark contra esta base de datos')
+        if options['solicitudes'] < 1 or options['rafagas'] < 1:
+            raise CommandError('--solicitudes y --rafagas deben ser mayores a 0')
+
+        self.empleado = Empleado.objects.first()
+        self.administrador = Administrador.objects.first()
+        if not self.empleado or not self.administrador:
+            raise CommandError('No existen registros de empleado o administrador')
+
+        escenarios = ESCENARIOS if options['escenario'] == 'todos' else (options['escenario'],)
+        inicio = timezone.now()
+        self._crear_datos(options['solicitudes'])
+
+        informe = {
+            'inicio': inicio.isoformat(),
+            'entorno': self._entorno(),
+            'parametros': {
+                'solicitudes_por_rafaga': options['solicitudes'],
+                'rafagas': options['rafagas'],
+                'timeout_s': options['timeout'],
+            },
+            'escenarios': {},
+        }
+        try:
+            for escenario in escenarios:
+                self.stdout.write(f"🏁 Escenario {escenario}...")
+                informe['escenarios'][escenario] = getattr(self, f'_escenario_{escenario}')(
+                    options['solicitudes'], options['rafagas'], options['timeout']
+                )
+        finally:
+            if not options['conservar']:
+                self._borrar_datos()
+
+        informe['duracion_s'] = round((timezone.now() - inicio).total_seconds(), 2)
+        salida = options['salida'] or f"benchmark_reservas_{inicio:%Y%m%d_%H%M%S}.json"
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump(informe, archivo, ensure_ascii=False, indent=2)
+
+        self._imprimir_resumen(informe)
+        self.stdout.write(self.style.SUCCESS(f"📄 Informe guardado en {salida}"))
+
+        if any(not datos['invariante']['ok'] for datos in informe['escenarios'].values()):
+            raise CommandError('❌ Invariante violado: hay reservas aceptadas que se solapan (ver informe)')
+
+    # ==============================================
+    # 🔹 DATOS DEL BENCHMARK
+    # ==============================================
+
+    def _crear_datos(self, cantidad):
+        sufijo = datetime.now().strftime('%H%M%S')
+        self.tarifa = TarifaHotel.objects.create(
+            nombre='BENCH', descripcion='Benchmark de reservas', amoblado='N', baño_priv='N', precio_persona=1
+        )
+        self.habitaciones = [
+            Habitacion.objects.create(
+                numero=f"B{i}-{sufijo}"[:10], piso=0, tipo='BENCH', amoblado='N', baño_priv='N',
+                tarifa_hotel=self.tarifa
+            )
+            for i in range(cantidad)
+        ]
+        self.servicios = [
+            ServiciosAdicionales.objects.create(nombre=f"BENCH {i} {sufijo}", precio=1, tipo='A', estado='A')
+            for i in range(2)
+        ]
+        self.cliente = DatosCliente.objects.create(
+            nombre='Benchmark', app_paterno='Reservas', telefono=0, ci=0, email='benchmark@localhost'
+        )
+
+    def _borrar_datos(self):
+        generales = set(ReservaHotel.objects.filter(
+            habitacion__in=self.habitaciones
+        ).values_list('reservas_gen_id', flat=True))
+        generales |= set(ServiciosEvento.objects.filter(
+            servicios_adicionales__in=self.servicios
+        ).values_list('reservas_evento__reservas_gen_id', flat=True))
+        ReservasGen.objects.filter(pk__in=generales).delete()
+        Habitacion.objects.filter(pk__in=[h.pk for h in self.habitaciones]).delete()
+        ServiciosAdicionales.objects.filter(pk__in=[s.pk for s in self.servicios]).delete()
+        self.tarifa.delete()
+        self.cliente.delete()
+        self.stdout.write("🧹 Datos del benchmark eliminados")
+
+    def _entorno(self):
+        return {
+            'bd': connection.vendor,
+            'motor': settings.DATABASES['default']['ENGINE'],
+            'arbitraje': gestor_cola.arbitraje.nombre,
+            'hotel': {
+                'modo_batching': gestor_cola.MODO_BATCHING,
+                'batching_s': gestor_cola.TIEMPO_BATCHING if gestor_cola.MODO_BATCHING == 'FIJO' else gestor_cola.TIEMPO_BATCHING_MAX,
+                'workers': gestor_cola.num_workers,
+                'profundidad_cola': gestor_cola.PROFUNDIDAD_COLA,
+            },
+            'eventos': {
+                'batching_s': gestor_cola_eventos.TIEMPO_BATCHING,
+            },
+        }
+
+    # ==============================================
+    # 🔹 ESCENARIOS
+    # ==============================================
+
+    def _escenario_misma_habitacion(self, cantidad, rafagas, timeout):
+        habitacion_id = self.habitaciones[0].id_habitacion
+
+        def solicitud(rafaga, i):
+            fecha_ini = FECHA_BASE + timedelta(days=rafaga * 30)
+            # Duraciones y personas distintas para que las prioridades compitan
+            return gestor_cola.agregar_reserva(
+                self._datos_hotel(fecha_ini, 1 + i % 5, 1 + i % 4),
+                self.cliente, habitacion_id, self.empleado, self.administrador
+            )
+
+        return self._medir(solicitud, cantidad, rafagas, timeout, self._verificar_hotel)
+
+    def _escenario_habitaciones_distintas(self, cantidad, rafagas, timeout):
+        def solicitud(rafaga, i):
+            fecha_ini = FECHA_BASE + timedelta(days=rafaga * 30)
+            return gestor_cola.agregar_reserva(
+                self._datos_hotel(fecha_ini, 3, 2),
+                self.cliente, self.habitaciones[i].id_habitacion, self.empleado, self.administrador
+            )
+
+        return self._medir(solicitud, cantidad, rafagas, timeout, self._verificar_hotel)
+
+    def _escenario_eventos_solapados(self, cantidad, rafagas, timeout):
+        comun, extra = (servicio.id_servicios_adicionales for servicio in self.servicios)
+
+        def solicitud(rafaga, i):
+            fecha = FECHA_BASE + timedelta(days=rafaga)
+            hora_ini = timezone.make_aware(
+                datetime.combine(fecha, datetime.min.time()) + timedelta(hours=10, minutes=30 * (i % 4))
+            )
+            datos_evento = {
+                'cant_personas': 10 + i,
+                'fecha': str(fecha),
+                'hora_ini': hora_ini.isoformat(),
+                'hora_fin': (hora_ini + timedelta(hours=2)).isoformat(),
+                'estado': 'A'
+            }
+            servicios = [comun, extra] if i % 2 else [comun]
+            return gestor_cola_eventos.agregar_reserva(
+                datos_evento, self.cliente, servicios, self.empleado, self.administrador
+            )
+
+        return self._medir(solicitud, cantidad, rafagas, timeout, self._verificar_eventos)
+
+    def _datos_hotel(self, fecha_ini, dias, personas):
+        return {
+            'cant_personas': personas,
+            'amoblado': 'N',
+            'baño_priv': 'N',
+            'fecha_ini': str(fecha_ini),
+            'fecha_fin': str(fecha_ini + timedelta(days=dias)),
+            'estado': 'A'
+        }
+
+    # ==============================================
+    # 🔹 MEDICIÓN
+    # ==============================================
+
+    def _rafaga(self, crear_solicitud, cantidad, timeout):
+        """Lanza `cantidad` solicitudes a la vez (un hilo por solicitud); retorna (mediciones, solicitudes, segundos)"""
+        barrera = threading.Barrier(cantidad)
+        mediciones = [None] * cantidad
+        solicitudes = [None] * cantidad
+
+        def cliente(i):
+            try:
+                barrera.wait()
+                inicio = time.perf_counter()
+                solicitudes[i] = crear_solicitud(i)
+                resuelta = solicitudes[i].evento.wait(timeout)
+                latencia = (time.perf_counter() - inicio) * 1000
+                if not resuelta:
+                    mediciones[i] = {'resultado': 'TIMEOUT', 'latencia_ms': latencia}
+                elif solicitudes[i].resultado['success']:
+                    mediciones[i] = {'resultado': 'ACEPTADA', 'latencia_ms': latencia}
+                else:
+                    mediciones[i] = {'resultado': solicitudes[i].resultado.get('codigo', 'ERROR'), 'latencia_ms': latencia}
+            except Exception as e:
+                mediciones[i] = {'resultado': 'ERROR_CLIENTE', 'latencia_ms': None, 'error': str(e)}
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=cliente, args=(i,), daemon=True) for i in range(cantidad)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return mediciones, solicitudes, time.perf_counter() - inicio
+
+    def _medir(self, crear_solicitud, cantidad, rafagas, timeout, verificar):
+        mediciones = []
+        resueltas_tarde = 0
+        duracion = 0.0
+        aceptadas_por_rafaga = []
+
+        for rafaga in range(rafagas):
+            datos, solicitudes, segundos = self._rafaga(lambda i: crear_solicitud(rafaga, i), cantidad, timeout)
+            duracion += segundos
+
+            # Las que dieron timeout siguen en la cola: esperarlas antes de verificar la BD
+            for medicion, solicitud in zip(datos, solicitudes):
+                if medicion['resultado'] == 'TIMEOUT' and solicitud is not None:
+                    if solicitud.evento.wait(timeout) and solicitud.resultado['success']:
+                        resueltas_tarde += 1
+                if solicitud is not None and solicitud.espera_cola is not None:
+                    medicion['espera_cola_ms'] = solicitud.espera_cola * 1000
+
+            aceptadas_por_rafaga.append(sum(1 for m in datos if m['resultado'] == 'ACEPTADA'))
+            mediciones.extend(datos)
+
+        resultados = {}
+        for medicion in mediciones:
+            resultados[medicion['resultado']] = resultados.get(medicion['resultado'], 0) + 1
+
+        total = len(mediciones)
+        aceptadas = resultados.get('ACEPTADA', 0)
+        return {
+            'solicitudes': total,
+            'aceptadas': aceptadas,
+            'aceptadas_por_rafaga': aceptadas_por_rafaga,
+            'resultados': resultados,
+            'timeouts_408': resultados.get('TIMEOUT', 0),
+            'timeouts_aceptadas_despues': resueltas_tarde,
+            'duracion_s': round(duracion, 3),
+            'throughput_solicitudes_s': round(total / duracion, 2) if duracion else None,
+            'throughput_aceptadas_s': round(aceptadas / duracion, 2) if duracion else None,
+            'latencia': _resumen([m['latencia_ms'] for m in mediciones if m.get('latencia_ms') is not None]),
+            'espera_cola': _resumen([m['espera_cola_ms'] for m in mediciones if 'espera_cola_ms' in m]),
+            'invariante': verificar(),
+        }
+
+    # ==============================================
+    # 🔹 INVARIANTE: reservas aceptadas sin solapamiento
+    # ==============================================
+
+    def _solapamientos(self, filas):
+        """filas: (recurso, inicio, fin, id) ordenadas por recurso e inicio → pares que se solapan"""
+        solapadas = []
+        recurso_actual = None
+        abiertas = []  # (fin, id) del recurso actual
+        for recurso, inicio, fin, id_reserva in filas:
+            if recurso != recurso_actual:
+                recurso_actual, abiertas = recurso, []
+            abiertas = [(f, i) for f, i in abiertas if f > inicio]
+            solapadas.extend({'recurso': recurso, 'reservas': [i, id_reserva]} for _, i in abiertas)
+            abiertas.append((fin, id_reserva))
+        return solapadas
+
+    def _verificar_hotel(self):
+        filas = ReservaHotel.objects.filter(
+            habitacion__in=self.habitaciones, estado__in=ESTADOS_ACTIVOS
+        ).order_by('habitacion_id', 'fecha_ini').values_list(
+            'habitacion_id', 'fecha_ini', 'fecha_fin', 'id_reserva_hotel'
+        )
+        solapadas = self._solapamientos(filas)
+        return {'ok': not solapadas, 'reservas_activas': len(filas), 'solapamientos': solapadas}
+
+    def _verificar_eventos(self):
+        filas = ServiciosEvento.objects.filter(
+            servicios_adicionales__in=self.servicios, reservas_evento__estado__in=ESTADOS_ACTIVOS
+        ).order_by('servicios_adicionales_id', 'reservas_evento__hora_ini').values_list(
+            'servicios_adicionales_id', 'reservas_evento__hora_ini', 'reservas_evento__hora_fin', 'reservas_evento_id'
+        )
+        solapadas = self._solapamientos(filas)
+        return {
+            'ok': not solapadas,
+            'reservas_activas': len({fila[3] for fila in filas}),
+            'solapamientos': solapadas
+        }
+
+    # ==============================================
+    # 🔹 SALIDA
+    # ==============================================
+
+    def _imprimir_resumen(self, informe):
+        self.stdout.write("")
+        self.stdout.write(f"{'escenario':<24}{'solic.':>8}{'acept.':>8}{'408':>6}{'sol/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'cola p95':>10}  invariante")
+        for nombre, datos in informe['escenarios'].items():
+            latencia = datos['latencia']
+            self.stdout.write(
+                f"{nombre:<24}{datos['solicitudes']:>8}{datos['aceptadas']:>8}{datos['timeouts_408']:>6}"
+                f"{datos['throughput_solicitudes_s'] or 0:>9}{latencia['p50_ms'] or 0:>9}{latencia['p95_ms'] or 0:>9}"
+                f"{latencia['p99_ms'] or 0:>9}{datos['espera_cola']['p95_ms'] or 0:>10}  "
+                f"{'✅' if datos['invariante']['ok'] else '❌'}"
+            )
+        self.stdout.write("")
@@ -0,0 +1,81 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/management/commands/migrar_comprobantes.py
+# Mueve los comprobantes guardados en la columna BLOB reservas_gen.pago al storage
+# ========================================
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.reservas_gen.models import ReservasGen
+from apps.reservas_gen.comprobantes import migrar_blob
+from apps.reserva_hotel.listado import sincronizar_listado
+
+
+class Command(BaseCommand):
+    help = 'Mueve los comprobantes de pago de la columna BLOB reservas_gen.pago al storage de comprobantes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50,
+                            help='IDs a leer por consulta (los BLOB se leen de a uno)')
+        parser.add_argument('--limite', type=int, default=0,
+                            help='Máximo de comprobantes a migrar (0 = todos)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo contar los comprobantes pendientes, sin mover nada')
+
+    def handle(self, *args, **options):
+        pendientes = ReservasGen.objects.filter(pago__isnull=False, comprobante='')
+
+        if options['dry_run']:
+            self.stdout.write(f"🔎 Comprobantes en BLOB pendientes de migrar: {pendientes.count()}")
+            return
+
+        migrados = vacios = errores = 0
+        bytes_movidos = 0
+        ultimo_id = 0
+        limite = options['limite']
+
+        while True:
+            # Solo IDs: el BLOB de cada reserva se lee recién al migrarla
+            ids = list(
+                pendientes.filter(id_reservas_gen__gt=ultimo_id)
+                .order_by('id_reservas_gen')
+                .values_list('id_reservas_gen', flat=True)[:options['lote']]
+            )
+            if not ids:
+                break
+
+            for id_reserva_gen in ids:
+                ultimo_id = id_reserva_gen
+                reserva_gen = ReservasGen.objects.con_pago().only(
+                    'id_reservas_gen', 'tipo', 'pago', 'comprobante'
+                ).get(pk=id_reserva_gen)
+                try:
+                    movidos = migrar_blob(reserva_gen)
+                except Exception as e:
+                    errores += 1
+                    self.stderr.write(f"❌ Reserva general {id_reserva_gen}: {str(e)}")
+                    continue
+
+                if movidos:
+                    migrados += 1
+                    bytes_movidos += movidos
+                else:
+                    # BLOB vacío: no hay comprobante real, se limpia la columna
+                    ReservasGen.objects.filter(pk=id_reserva_gen).update(pago=None, tiene_pago=False)
+                    if reserva_gen.tipo == 'H':
+                        # update() no envía señales: la proyección de listados se reescribe aquí
+                        sincronizar_listado(reservas_gen_id=id_reserva_gen)
+                    vacios += 1
+
+                if limite and migrados >= limite:
+                    break
+
+            self.stdout.write(f"📦 Migrados {migrados} comprobantes ({bytes_movidos / (1024 * 1024):.1f} MB) hasta ID {ultimo_id}")
+            connection.close()  # la conexión remota no queda abierta durante corridas largas
+
+            if limite and migrados >= limite:
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Migración terminada: {migrados} migrados, {vacios} vacíos limpiados, {errores} errores, "
+            f"{bytes_movidos / (1024 * 1024):.1f} MB movidos"
+        ))
@@ -0,0 +1,209 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/metricas.py
+# Métricas de las colas de reservas en formato de texto de Prometheus
+# ========================================
+"""
+Registro de métricas en memoria del proceso (sin dependencias externas):
+
+- Contador: solo aumenta (solicitudes resueltas por cola y código, timeouts).
+- Histograma: distribución en buckets acumulados (espera en cola, duración de
+  la transacción que crea la reserva).
+- Indicador: valor leído al momento de exportar (solicitudes pendientes por
+  habitación / fecha).
+
+Las colas registran aquí en lugar de imprimir por cada solicitud; la vista
+GET /api/metrics/ expone todo en el formato de texto que lee Prometheus.
+Cada proceso (worker de gunicorn) exporta sus propios valores.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Segundos: cubren desde el camino sin competencia (ms) hasta la ventana máxima de batching
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formato_etiquetas(nombres, valores, extra=()):
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    pares += [f'{nombre}="{valor}"' for nombre, valor in extra]
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _formato_numero(valor):
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas):
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    def _encabezado(self):
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores = {}
+
+    def incrementar(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def valor(self, **etiquetas):
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0)
+
+    def exportar(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return self._encabezado() + [
+            f"{self.nombre}{_formato_etiquetas(self.etiquetas, clave)} {_formato_numero(valor)}"
+            for clave, valor in valores
+        ]
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # {clave: [conteos por bucket..., suma, total]}
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """Observa la duración (segundos) del bloque, aunque termine con excepción"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def exportar(self):
+        with self._lock:
+            series = sorted((clave, list(serie)) for clave, serie in self._series.items())
+        lineas = self._encabezado()
+        for clave, serie in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, serie):
+                acumulado += conteo
+                etiquetas = _formato_etiquetas(self.etiquetas, clave, [('le', _formato_numero(limite))])
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            # +Inf incluye las observaciones mayores al último bucket
+            lineas.append(f"{self.nombre}_bucket{_formato_etiquetas(self.etiquetas, clave, [('le', '+Inf')])} {serie[-1]}")
+            lineas.append(f"{self.nombre}_sum{_formato_etiquetas(self.etiquetas, clave)} {_formato_numero(serie[-2])}")
+            lineas.append(f"{self.nombre}_count{_formato_etiquetas(self.etiquetas, clave)} {serie[-1]}")
+        return lineas
+
+
+class Indicador(_Metrica):
+    """Gauge calculado al exportar: leer() retorna {(valores de etiquetas): valor}"""
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, etiquetas, leer):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.leer = leer
+
+    def exportar(self):
+        return self._encabezado() + [
+            f"{self.nombre}{_formato_etiquetas(self.etiquetas, clave)} {_formato_numero(valor)}"
+            for clave, valor in sorted(self.leer().items())
+        ]
+
+
+class RegistroMetricas:
+    """Métricas del proceso, en el orden en que se registraron"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metrica):
+        with self._lock:
+            # Reemplaza la anterior con el mismo nombre (p. ej. al reiniciar una cola)
+            self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def exportar(self):
+        """Texto de exposición de Prometheus (versión 0.0.4)"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            try:
+                lineas.extend(metrica.exportar())
+            except Exception as e:
+                lineas.append(f"# ERROR {metrica.nombre}: {_escapar(e)}")
+        return '\n'.join(lineas) + '\n'
+
+
+registro_metricas = RegistroMetricas()
+
+
+# ==============================================
+# 🔹 MÉTRICAS DE LAS COLAS DE RESERVAS
+# ==============================================
+
+solicitudes_resueltas = registro_metricas.registrar(Contador(
+    'reservas_solicitudes_total',
+    'Solicitudes de reserva resueltas por la cola, por resultado (ACEPTADA o código de rechazo/error)',
+    ('cola', 'resultado')
+))
+timeouts_solicitudes = registro_metricas.registrar(Contador(
+    'reservas_timeouts_total',
+    'Solicitudes que la vista dejó de esperar (respuesta 408); la cola las resuelve después',
+    ('cola',)
+))
+espera_cola = registro_metricas.registrar(Histograma(
+    'reservas_espera_cola_segundos',
+    'Tiempo entre el encolado y el inicio del procesamiento (incluye la ventana de batching)',
+    ('cola',)
+))
+duracion_transaccion = registro_metricas.registrar(Histograma(
+    'reservas_transaccion_segundos',
+    'Duración de la transacción que verifica conflictos y crea la reserva',
+    ('cola',)
+))
+
+
+def registrar_resultado(solicitud):
+    """Cuenta una solicitud resuelta (llamado una sola vez por solicitud, al notificar)"""
+    resultado = solicitud.resultado or {}
+    codigo = 'ACEPTADA' if resultado.get('success') else resultado.get('codigo', 'ERROR')
+    solicitudes_resueltas.incrementar(cola=solicitud.COLA_METRICAS, resultado=codigo)
+
+
+def registrar_indicador(nombre, ayuda, etiquetas, leer):
+    return registro_metricas.registrar(Indicador(nombre, ayuda, etiquetas, leer))
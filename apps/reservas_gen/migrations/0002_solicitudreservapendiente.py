@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas_gen', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudReservaPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True)),
+                ('tipo', models.CharField(choices=[('H', 'Hotel'), ('E', 'Evento')], max_length=1)),
+                ('recurso', models.CharField(max_length=20)),
+                ('prioridad', models.FloatField()),
+                ('creado', models.DateTimeField()),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('servicios', models.CharField(blank=True, default='', max_length=255)),
+                ('estado', models.CharField(choices=[('P', 'Pendiente'), ('A', 'Aceptada'), ('R', 'Rechazada')], default='P', max_length=1)),
+                ('expira', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'solicitud_reserva_pendiente',
+                'indexes': [models.Index(fields=['tipo', 'recurso', 'estado'], name='solicitud_pend_recurso_idx'), models.Index(fields=['expira'], name='solicitud_pend_expira_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:49
+
+import apps.reservas_gen.comprobantes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas_gen', '0002_solicitudreservapendiente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservasgen',
+            name='comprobante',
+            field=models.FileField(blank=True, max_length=255, storage=apps.reservas_gen.comprobantes.storage_comprobantes, upload_to=apps.reservas_gen.comprobantes.ruta_comprobante),
+        ),
+        migrations.AddField(
+            model_name='reservasgen',
+            name='comprobante_nombre',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='reservasgen',
+            name='comprobante_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='reservasgen',
+            name='comprobante_tamano',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reservasgen',
+            name='comprobante_tipo',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='reservasgen',
+            name='pago',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
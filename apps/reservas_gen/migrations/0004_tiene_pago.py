@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+def marcar_reservas_con_pago(apps, schema_editor):
+    """tiene_pago = hay comprobante en storage o un BLOB no vacío en pago"""
+    ReservasGen = apps.get_model('reservas_gen', 'ReservasGen')
+    ReservasGen.objects.exclude(comprobante='').update(tiene_pago=True)
+    ReservasGen.objects.filter(pago__isnull=False).exclude(pago=b'').update(tiene_pago=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas_gen', '0003_comprobante_en_storage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='reservasgen',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AddField(
+            model_name='reservasgen',
+            name='tiene_pago',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(marcar_reservas_con_pago, migrations.RunPython.noop),
+    ]
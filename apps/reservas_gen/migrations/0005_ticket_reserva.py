@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas_gen', '0004_tiene_pago'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket', models.CharField(max_length=32, unique=True)),
+                ('tipo', models.CharField(choices=[('H', 'Hotel'), ('E', 'Evento')], max_length=1)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('COMPLETADO', 'Completado')], default='PENDIENTE', max_length=10)),
+                ('creado', models.DateTimeField()),
+                ('completado', models.DateTimeField(blank=True, null=True)),
+                ('http_status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('respuesta', models.TextField(blank=True, default='')),
+                ('expira', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'ticket_reserva',
+                'indexes': [models.Index(fields=['expira'], name='ticket_reserva_expira_idx')],
+            },
+        ),
+    ]
@@ -1,16 +1,124 @@
 from django.db import models
 from apps.administrador.models import Administrador
 from apps.empleado.models import Empleado
+from .comprobantes import ruta_comprobante, storage_comprobantes
+
+# ==============================================
+# 🔹 CARGA DIFERIDA DEL BLOB `pago`
+# ==============================================
+# La columna pago (comprobantes antiguos) puede pesar megas por fila: ninguna
+# consulta la trae salvo que se pida con .con_pago(). Para saber si hay
+# comprobante se usa el campo tiene_pago.
+
+class ReservasGenQuerySet(models.QuerySet):
+    def con_pago(self):
+        """Incluye la columna pago (solo para leer o migrar el comprobante antiguo)"""
+        return self.defer(None)
+
+
+class ReservasGenManager(models.Manager.from_queryset(ReservasGenQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().defer('pago')
+
+
+class ReservaConPagoDiferidoManager(models.Manager):
+    """Manager de ReservaHotel / ReservasEvento: select_related('reservas_gen') no trae el BLOB"""
+    def get_queryset(self):
+        return super().get_queryset().defer('reservas_gen__pago')
+
 
 class ReservasGen(models.Model):
     id_reservas_gen = models.AutoField(primary_key=True)
     tipo = models.CharField(max_length=1)
-    pago = models.BinaryField()
+    # ⚠️ Obsoleto: comprobantes antiguos en BLOB, se mueven con `manage.py migrar_comprobantes`
+    pago = models.BinaryField(null=True, blank=True)
     administrador = models.ForeignKey(Administrador, on_delete=models.CASCADE)
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
 
+    # 🧾 Comprobante de pago en storage (ver comprobantes.py): la tabla solo guarda la referencia
+    comprobante = models.FileField(
+        upload_to=ruta_comprobante, storage=storage_comprobantes,
+        max_length=255, blank=True
+    )
+    comprobante_nombre = models.CharField(max_length=255, blank=True, default='')
+    comprobante_tipo = models.CharField(max_length=100, blank=True, default='')
+    comprobante_tamano = models.PositiveBigIntegerField(null=True, blank=True)
+    comprobante_sha256 = models.CharField(max_length=64, blank=True, default='')
+    # Bandera guardada: listados y detalles la leen en vez de traer el comprobante
+    tiene_pago = models.BooleanField(default=False)
+
+    objects = ReservasGenManager()
+
 
     class Meta:
         db_table = 'reservas_gen'
+        # También para reserva.reservas_gen (acceso por FK sin select_related)
+        base_manager_name = 'objects'
     def __str__(self):
         return f"ReservaGen {self.id_reservas_gen} ({self.tipo})"
+
+
+class SolicitudReservaPendiente(models.Model):
+    """
+    Solicitud de reserva en espera de arbitraje, compartida entre procesos.
+    Solo se usa con RESERVAS_ARBITRAJE = 'BD' (ver apps/reservas_gen/arbitraje.py).
+    """
+    TIPOS = (
+        ('H', 'Hotel'),
+        ('E', 'Evento'),
+    )
+    ESTADOS = (
+        ('P', 'Pendiente'),
+        ('A', 'Aceptada'),
+        ('R', 'Rechazada'),
+    )
+
+    token = models.CharField(max_length=32, unique=True)
+    tipo = models.CharField(max_length=1, choices=TIPOS)
+    recurso = models.CharField(max_length=20)  # Hotel: id de habitación / Evento: fecha
+    prioridad = models.FloatField()
+    creado = models.DateTimeField()
+    inicio = models.DateTimeField()
+    fin = models.DateTimeField()
+    servicios = models.CharField(max_length=255, blank=True, default='')  # Evento: ",1,4,"
+    estado = models.CharField(max_length=1, choices=ESTADOS, default='P')
+    expira = models.DateTimeField()
+
+    class Meta:
+        db_table = 'solicitud_reserva_pendiente'
+        indexes = [
+            models.Index(fields=['tipo', 'recurso', 'estado'], name='solicitud_pend_recurso_idx'),
+            models.Index(fields=['expira'], name='solicitud_pend_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"Solicitud {self.tipo}:{self.recurso} ({self.estado}) prioridad {self.prioridad}"
+
+
+class TicketReserva(models.Model):
+    """
+    Resultado de una reserva asíncrona, compartido entre procesos.
+    Solo se usa con RESERVAS_TICKETS_ALMACEN = 'BD' (ver apps/reservas_gen/tickets.py).
+    """
+    ESTADOS = (
+        ('PENDIENTE', 'Pendiente'),
+        ('COMPLETADO', 'Completado'),
+    )
+
+    ticket = models.CharField(max_length=32, unique=True)
+    tipo = models.CharField(max_length=1, choices=SolicitudReservaPendiente.TIPOS)
+    estado = models.CharField(max_length=10, choices=ESTADOS, default='PENDIENTE')
+    creado = models.DateTimeField()
+    completado = models.DateTimeField(null=True, blank=True)
+    http_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    respuesta = models.TextField(blank=True, default='')  # JSON de la respuesta final
+    expira = models.DateTimeField()
+
+    class Meta:
+        db_table = 'ticket_reserva'
+        indexes = [
+            models.Index(fields=['expira'], name='ticket_reserva_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"Ticket {self.ticket} ({self.estado})"
@@ -0,0 +1,32 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/signals.py
+# Invalida la caché de catálogos con cada escritura de tarifas, servicios adicionales y habitaciones
+# ========================================
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.habitacion.models import Habitacion
+from apps.servicios_adicionales.models import ServiciosAdicionales
+from apps.tarifa_hotel.models import TarifaHotel
+from .catalogos import DOMINIO_HABITACIONES, DOMINIO_SERVICIOS, DOMINIO_TARIFAS
+from .versiones import incrementar_version
+
+
+# 🔹 Solo al confirmar la transacción: antes, el catálogo reconstruido aún no vería el cambio
+@receiver(post_save, sender=TarifaHotel)
+@receiver(post_delete, sender=TarifaHotel)
+def invalidar_catalogo_tarifas(sender, instance, **kwargs):
+    transaction.on_commit(lambda: incrementar_version(DOMINIO_TARIFAS))
+
+
+@receiver(post_save, sender=ServiciosAdicionales)
+@receiver(post_delete, sender=ServiciosAdicionales)
+def invalidar_catalogo_servicios(sender, instance, **kwargs):
+    transaction.on_commit(lambda: incrementar_version(DOMINIO_SERVICIOS))
+
+
+@receiver(post_save, sender=Habitacion)
+@receiver(post_delete, sender=Habitacion)
+def invalidar_catalogo_habitaciones(sender, instance, **kwargs):
+    transaction.on_commit(lambda: incrementar_version(DOMINIO_HABITACIONES))
@@ -0,0 +1,58 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/tableros.py
+# Caché corta de los tableros del día (estadisticas-hoy de hotel y eventos)
+# ========================================
+"""
+Los tableros de recepción consultan estadisticas-hoy cada pocos segundos.
+Cada tablero se calcula con un solo aggregate() (Count con filter=Q(...)) y el
+resultado se guarda en la caché de Django con clave (dominio, fecha, versión):
+
+- La versión del dominio (versiones.py) cambia con cualquier escritura de su
+  modelo (creación, ingreso, salida, cancelación...), así que el siguiente
+  request recalcula.
+- TABLEROS_CACHE_TTL (segundos) acota lo que puede quedar desactualizado por
+  el paso del tiempo o por escrituras de otros procesos cuando la caché es
+  local (LocMemCache). Con una caché compartida (Redis/Memcached) la versión
+  también es compartida entre procesos.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Subquery
+
+from .versiones import version_dominio
+
+
+# ==============================================
+# 🔹 LECTURA
+# ==============================================
+
+def obtener_tablero(dominio, fecha, calcular):
+    """Valor cacheado del tablero del dominio para `fecha` o el resultado de calcular() (que se guarda)"""
+    clave = f"tableros:{dominio}:{fecha}:{version_dominio(dominio)}"
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular()
+        cache.set(clave, datos, getattr(settings, 'TABLEROS_CACHE_TTL', 30))
+    return datos
+
+
+# ==============================================
+# 🔹 AGREGADOS
+# ==============================================
+
+def primera_fila(queryset, campos, prefijo):
+    """
+    Columnas de la primera fila de `queryset` como subconsultas escalares, para
+    sumarlas al mismo aggregate() que los conteos (una sola ida a la BD).
+    `campos` es {clave: campo}; el resultado se lee con extraer_primera_fila().
+    """
+    return {
+        f"{prefijo}{clave}": Max(Subquery(queryset.values(campo)[:1]))
+        for clave, campo in campos.items()
+    }
+
+
+def extraer_primera_fila(resultado, campos, prefijo):
+    """{clave: valor} de la fila pedida con primera_fila(), o None si no había filas"""
+    fila = {clave: resultado.pop(f"{prefijo}{clave}") for clave in campos}
+    return fila if fila.get('id') is not None else None
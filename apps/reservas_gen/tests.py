@@ -1,3 +1,450 @@
-from django.test import TestCase
+import hashlib
+import io
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.administrador.models import Administrador
+from apps.datos_cliente.models import DatosCliente
+from apps.empleado.models import Empleado
+from apps.habitacion.models import Habitacion
+from apps.reserva_hotel.models import ReservaHotel, ReservaHotelListado
+from apps.reserva_hotel.queue_manager import ReservaRequest
+from apps.tarifa_hotel.models import TarifaHotel
+from apps.usuario.models import Usuario
+
+from . import metricas
+from .arbitraje import BackendArbitrajeBD, BackendArbitrajeMemoria, obtener_backend_arbitraje
+from .catalogos import cache_catalogos
+from .comprobantes import guardar_comprobante, verificar_storage_comprobantes
+from .models import ReservasGen, SolicitudReservaPendiente, TicketReserva
+from .tickets import AlmacenResultadosBD, AlmacenResultadosMemoria, SolicitudConCallbacks
+
+
+def solicitud_hotel(habitacion_id, fecha_ini='2024-01-01', fecha_fin='2024-01-03', cant_personas=2):
+    return ReservaRequest(
+        {'cant_personas': cant_personas, 'amoblado': 'N', 'baño_priv': 'N',
+         'fecha_ini': fecha_ini, 'fecha_fin': fecha_fin},
+        None, habitacion_id, None, None
+    )
+
+
+class ArbitrajeTest(TestCase):
+    """Backends de arbitraje: las solicitudes de otro proceso se simulan con otra instancia del backend"""
+
+    def setUp(self):
+        # Sin hilo de renovación: renovar() se llama directamente
+        parche = mock.patch.object(BackendArbitrajeBD, '_asegurar_hilo')
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.proceso_a = BackendArbitrajeBD()
+        self.proceso_b = BackendArbitrajeBD()
+
+    def test_memoria_no_comparte(self):
+        backend = BackendArbitrajeMemoria()
+        request = solicitud_hotel(1)
+        backend.registrar(request)
+        self.assertFalse(backend.compartido)
+        self.assertEqual(backend.competidores(solicitud_hotel(1)), [])
+        self.assertTrue(backend.aceptar(request))
+        with self.settings(RESERVAS_ARBITRAJE='bd'):
+            self.assertIsInstance(obtener_backend_arbitraje(), BackendArbitrajeBD)
+        with self.settings(RESERVAS_ARBITRAJE='REDIS'):
+            self.assertRaises(ValueError, obtener_backend_arbitraje)
+
+    def test_bd_ganador_entre_procesos(self):
+        larga = solicitud_hotel(1, fecha_fin='2024-01-05')
+        corta = solicitud_hotel(1)
+        otra_habitacion = solicitud_hotel(2)
+        self.proceso_a.registrar(larga)
+        self.proceso_b.registrar(corta)
+        self.proceso_b.registrar(otra_habitacion)
+
+        competidores = self.proceso_b.competidores(corta)
+        self.assertEqual([c.token for c in competidores], [larga.token])
+        self.assertEqual(competidores[0].prioridad, larga.prioridad)
+        self.assertEqual(self.proceso_a.competidores(otra_habitacion), [])
+
+        # La ganadora reclama su fila y rechaza a las pendientes del otro proceso
+        self.assertTrue(self.proceso_a.aceptar(larga))
+        self.assertEqual(self.proceso_a.rechazar_competidores(larga), 1)
+        self.assertFalse(self.proceso_b.aceptar(corta))
+        self.assertTrue(self.proceso_b.aceptar(otra_habitacion))
+
+        self.proceso_a.retirar(larga)
+        self.assertFalse(SolicitudReservaPendiente.objects.filter(token=larga.token).exists())
+
+    def test_bd_vencimiento_y_renovacion(self):
+        caida = solicitud_hotel(1)
+        en_cola = solicitud_hotel(1, fecha_fin='2024-01-02')
+        self.proceso_a.registrar(caida)
+        self.proceso_b.registrar(en_cola)
+        pasado = timezone.now() - timedelta(seconds=1)
+        SolicitudReservaPendiente.objects.update(expira=pasado)
+
+        # El proceso b sigue teniendo su solicitud en cola y la renueva; la del proceso a (caído) vence
+        self.proceso_a._locales.clear()
+        self.assertEqual(self.proceso_b.renovar(), 1)
+        self.assertEqual([c.token for c in self.proceso_a.competidores(solicitud_hotel(1))], [en_cola.token])
+        self.assertEqual(self.proceso_a.purgar(), 1)
+        self.assertFalse(self.proceso_a.aceptar(caida))
+        self.assertTrue(self.proceso_b.aceptar(en_cola))
+
+        # Retirada, ya no se renueva
+        self.proceso_b.retirar(en_cola)
+        self.assertEqual(self.proceso_b.renovar(), 0)
+
+
+class SolicitudPrueba(SolicitudConCallbacks):
+    COLA_METRICAS = 'hotel'
+
+    def __init__(self):
+        self.resultado = None
+        self._inicializar_callbacks()
+
+
+class TicketsMemoriaTest(SimpleTestCase):
+    """Ciclo de vida de un ticket en memoria: pendiente, completado, long-polling y vencimiento"""
+
+    def test_ciclo_de_vida(self):
+        almacen = AlmacenResultadosMemoria(max_tickets=10, ttl=60)
+        ticket = almacen.crear('H')
+        self.assertEqual(almacen.obtener(ticket)['estado'], 'PENDIENTE')
+
+        # Long-polling: vence el plazo sin resultado
+        inicio = time.monotonic()
+        self.assertEqual(almacen.obtener(ticket, esperar=0.1)['estado'], 'PENDIENTE')
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.09)
+
+        # Long-polling: despierta apenas la cola completa el ticket
+        threading.Timer(0.05, almacen.completar, [ticket, {'mensaje': 'ok'}, 201]).start()
+        inicio = time.monotonic()
+        datos = almacen.obtener(ticket, esperar=5)
+        self.assertLess(time.monotonic() - inicio, 2)
+        self.assertEqual((datos['estado'], datos['http_status'], datos['respuesta']), ('COMPLETADO', 201, {'mensaje': 'ok'}))
+
+    def test_vencimiento_y_tope(self):
+        almacen = AlmacenResultadosMemoria(max_tickets=2, ttl=60)
+        tickets = [almacen.crear('E') for _ in range(3)]
+        # El más antiguo se descarta al superar el máximo
+        self.assertIsNone(almacen.obtener(tickets[0]))
+        self.assertFalse(almacen.completar(tickets[0], {}, 201))
+        self.assertEqual(almacen.obtener_estadisticas()['descartados'], 1)
+
+        almacen.ttl = 0
+        self.assertEqual(almacen.obtener_estadisticas()['tickets_en_memoria'], 0)
+
+    def test_ticket_de_otro_proceso(self):
+        almacen = AlmacenResultadosMemoria(max_tickets=10, ttl=60)
+        propio = almacen.crear('H')
+        self.assertFalse(almacen.de_otro_proceso(propio))
+        self.assertTrue(almacen.de_otro_proceso('0badcafe-' + propio.partition('-')[2]))
+        self.assertFalse(almacen.de_otro_proceso('sinprefijo'))
+
+        with mock.patch('apps.reservas_gen.views.almacen_tickets', almacen):
+            respuesta = self.client.get('/api/reservas/tickets/0badcafe-123/')
+            self.assertEqual(respuesta.status_code, 421)
+            self.assertEqual(respuesta.json()['codigo'], 'TICKET_EN_OTRO_PROCESO')
+            self.assertEqual(self.client.get('/api/reservas/tickets/sinprefijo/').status_code, 404)
+            self.assertEqual(self.client.get(f'/api/reservas/tickets/{propio}/').status_code, 202)
+            almacen.completar(propio, {'error': 'x', 'codigo': 'HABITACION_RESERVADA'}, 400)
+            datos = self.client.get(f'/api/reservas/tickets/{propio}/').json()
+            self.assertEqual((datos['estado'], datos['http_status']), ('COMPLETADO', 400))
+
+    def test_callbacks_de_finalizacion(self):
+        solicitud = SolicitudPrueba()
+        resultados = []
+        listo = threading.Event()
+        solicitud.agregar_callback(lambda s: 1 / 0)
+        solicitud.agregar_callback(lambda s: (resultados.append(s.resultado), listo.set()))
+        solicitud.resultado = {'success': True}
+        with self.assertLogs('apps.reservas_gen.tickets', 'ERROR'):
+            solicitud.notificar()
+            self.assertTrue(listo.wait(2))
+            solicitud.notificar()  # Una sola vez
+            time.sleep(0.05)
+        self.assertEqual(resultados, [{'success': True}])
+
+        # Registrado después de resolverse: se ejecuta igual
+        listo.clear()
+        solicitud.agregar_callback(lambda s: listo.set())
+        self.assertTrue(listo.wait(2))
+
+
+class TicketsBDTest(TestCase):
+    """Tickets en la tabla ticket_reserva (varios workers)"""
+
+    def test_ciclo_de_vida(self):
+        almacen = AlmacenResultadosBD(ttl=60)
+        ticket = almacen.crear('H')
+        self.assertEqual(almacen.obtener(ticket)['estado'], 'PENDIENTE')
+        inicio = time.monotonic()
+        self.assertEqual(almacen.obtener(ticket, esperar=0.2)['estado'], 'PENDIENTE')
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.19)
+
+        # Otro proceso lo completa: cualquier instancia lo lee, con la respuesta como JSON
+        otro_proceso = AlmacenResultadosBD(ttl=60)
+        self.assertTrue(otro_proceso.completar(ticket, {'fecha': date(2024, 1, 1)}, 201))
+        datos = almacen.obtener(ticket, esperar=5)
+        self.assertEqual((datos['estado'], datos['http_status'], datos['respuesta']), ('COMPLETADO', 201, {'fecha': '2024-01-01'}))
+        self.assertFalse(almacen.de_otro_proceso(ticket))
+
+    def test_vencimiento(self):
+        almacen = AlmacenResultadosBD(ttl=60)
+        ticket = almacen.crear('E')
+        TicketReserva.objects.update(expira=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(almacen.obtener(ticket, esperar=1))
+        self.assertFalse(almacen.completar(ticket, {}, 201))
+        self.assertEqual(almacen.purgar(), 1)
+        self.assertEqual(almacen.obtener_estadisticas()['pendientes'], 0)
+
+
+# Línea de muestra del formato de texto de Prometheus: nombre{etiqueta="valor",...} número
+MUESTRA_PROMETHEUS = re.compile(
+    r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\.)*"'
+    r'(,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\.)*")*\})? [-+]?(\d+(\.\d*)?([eE][-+]?\d+)?|\+Inf|NaN)$'
+)
+
+
+class MetricasTest(SimpleTestCase):
+
+    def setUp(self):
+        # Registro propio para no depender de lo que hayan contado otros tests
+        self.registro = metricas.RegistroMetricas()
+        parche = mock.patch('apps.reservas_gen.views.registro_metricas', self.registro)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+        contador = self.registro.registrar(metricas.Contador('prueba_total', 'Contador de prueba', ('cola',)))
+        contador.incrementar(cola='hotel')
+        contador.incrementar(2, cola='evento "B"\n')
+        histograma = self.registro.registrar(metricas.Histograma('prueba_segundos', 'Histograma', ('cola',), buckets=(0.1, 1)))
+        for valor in (0.05, 0.5, 3):
+            histograma.observar(valor, cola='hotel')
+        self.registro.registrar(metricas.Indicador('prueba_pendientes', 'Indicador', ('fecha',), lambda: {('2024-01-01',): 4}))
+
+    def test_formato_de_exposicion(self):
+        respuesta = self.client.get('/api/metrics/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = respuesta.content.decode()
+        self.assertTrue(texto.endswith('\n'))
+
+        tipos = {}
+        for linea in texto.splitlines():
+            if linea.startswith('# TYPE '):
+                _, _, nombre, tipo = linea.split(' ')
+                tipos[nombre] = tipo
+            elif not linea.startswith('# HELP '):
+                self.assertRegex(linea, MUESTRA_PROMETHEUS)
+        self.assertEqual(tipos, {'prueba_total': 'counter', 'prueba_segundos': 'histogram', 'prueba_pendientes': 'gauge'})
+
+        self.assertIn('prueba_total{cola="evento \\"B\\"\\n"} 2', texto)
+        # Buckets acumulados, +Inf igual al total
+        self.assertIn('prueba_segundos_bucket{cola="hotel",le="0.1"} 1', texto)
+        self.assertIn('prueba_segundos_bucket{cola="hotel",le="1"} 2', texto)
+        self.assertIn('prueba_segundos_bucket{cola="hotel",le="+Inf"} 3', texto)
+        self.assertIn('prueba_segundos_sum{cola="hotel"} 3.55', texto)
+        self.assertIn('prueba_segundos_count{cola="hotel"} 3', texto)
+        self.assertIn('prueba_pendientes{fecha="2024-01-01"} 4', texto)
+
+    def test_token(self):
+        with self.settings(METRICAS_TOKEN='secreto'):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer otro').status_code, 401)
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+
+
+def crear_reserva_gen(tipo='H', **campos):
+    n = Usuario.objects.count() + 1
+    user = User.objects.create_user(f'comprobante{n}', password='x')
+    usuario = Usuario.objects.create(
+        user=user, nombre='Test', ci=n, telefono=1, email='t@t.com',
+        password='x', estado='A', rol='administrador'
+    )
+    return ReservasGen.objects.create(
+        tipo=tipo, **campos,
+        empleado=Empleado.objects.create(cod_empleado=f'E{n}', usuario=usuario),
+        administrador=Administrador.objects.create(cod_admi=f'A{n}', usuario=usuario)
+    )
+
+
+def crear_reserva_hotel(reserva_gen):
+    tarifa = TarifaHotel.objects.create(nombre='Simple', descripcion='d', amoblado='N', baño_priv='N', precio_persona=10)
+    return ReservaHotel.objects.create(
+        cant_personas=2, amoblado='N', baño_priv='N',
+        fecha_ini=date(2024, 1, 1), fecha_fin=date(2024, 1, 3), estado='A', reservas_gen=reserva_gen,
+        datos_cliente=DatosCliente.objects.create(nombre='Cliente', telefono=1, ci=1, email='c@c.com'),
+        habitacion=Habitacion.objects.create(numero='1', piso=1, tipo='Simple', amoblado='N', baño_priv='N', tarifa_hotel=tarifa)
+    )
+
+
+class StorageTemporalMixin:
+    """Comprobantes en una carpeta temporal por test"""
+
+    def setUp(self):
+        super().setUp()
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        self.storage = FileSystemStorage(location=carpeta, base_url=None)
+        parche = mock.patch('apps.reservas_gen.comprobantes._storage', self.storage)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+
+class ComprobantesTest(StorageTemporalMixin, TestCase):
+
+    CONTENIDO = b'%PDF-1.4 comprobante de prueba'
+
+    def setUp(self):
+        super().setUp()
+        self.reserva_gen = crear_reserva_gen()
+
+    def subir(self, contenido=CONTENIDO, nombre='pago.pdf'):
+        archivo = SimpleUploadedFile(nombre, contenido, content_type='application/pdf')
+        return self.client.post(f'/api/reservaHotel/subir_comprobante/{self.reserva_gen.pk}/', {'pago': archivo})
+
+    def test_subida_guarda_resumen(self):
+        respuesta = self.subir()
+        self.assertEqual(respuesta.status_code, 200)
+        sha256 = hashlib.sha256(self.CONTENIDO).hexdigest()
+        self.assertEqual(respuesta.json()['comprobante'], {
+            'nombre': 'pago.pdf', 'tipo': 'application/pdf', 'tamano': len(self.CONTENIDO), 'sha256': sha256
+        })
+        self.reserva_gen.refresh_from_db()
+        self.assertTrue(self.reserva_gen.tiene_pago)
+        self.assertEqual(self.reserva_gen.comprobante_sha256, sha256)
+        with self.storage.open(self.reserva_gen.comprobante.name) as archivo:
+            self.assertEqual(archivo.read(), self.CONTENIDO)
+
+    def test_tamano_maximo(self):
+        with self.settings(COMPROBANTES_TAMANO_MAX=10):
+            self.assertEqual(self.subir().status_code, 413)
+        self.reserva_gen.refresh_from_db()
+        self.assertFalse(self.reserva_gen.tiene_pago)
+        self.assertEqual(self.storage.listdir('')[0], [])  # sin archivo parcial
+
+    def test_error_del_storage(self):
+        with mock.patch.object(self.storage, 'save', side_effect=OSError('sin espacio')), \
+                self.assertLogs('apps.reservas_gen.views', 'ERROR'):
+            respuesta = self.subir()
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertIn('almacenamiento', respuesta.json()['error'])
+        self.reserva_gen.refresh_from_db()
+        self.assertFalse(self.reserva_gen.tiene_pago)
+
+    def test_descarga_en_streaming(self):
+        self.subir()
+        respuesta = self.client.get(f'/api/reservas/{self.reserva_gen.pk}/comprobante/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(b''.join(respuesta.streaming_content), self.CONTENIDO)
+        self.assertEqual(respuesta['ETag'], f'"{hashlib.sha256(self.CONTENIDO).hexdigest()}"')
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+        self.assertIn('attachment', respuesta['Content-Disposition'])
+
+    def test_reemplazo_borra_el_anterior_al_confirmar(self):
+        guardar_comprobante(self.reserva_gen, io.BytesIO(b'primero'), nombre='a.pdf')
+        primero = self.reserva_gen.comprobante.name
+
+        # Si la transacción revierte, la fila sigue apuntando al anterior: no se borra
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                guardar_comprobante(self.reserva_gen, io.BytesIO(b'segundo'), nombre='b.pdf')
+                raise RuntimeError()
+        self.assertEqual(callbacks, [])
+        self.assertTrue(self.storage.exists(primero))
+
+        self.reserva_gen.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            guardar_comprobante(self.reserva_gen, io.BytesIO(b'tercero'), nombre='c.pdf')
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(self.storage.exists(primero))
+        self.assertTrue(self.storage.exists(self.reserva_gen.comprobante.name))
+
+
+class PagoDiferidoTest(StorageTemporalMixin, TestCase):
+    """La columna pago solo se lee con con_pago(); tiene_pago la reemplaza en listados y detalles"""
+
+    def setUp(self):
+        super().setUp()
+        self.reserva = crear_reserva_hotel(crear_reserva_gen(pago=b'%PDF antiguo', tiene_pago=True))
+
+    def test_pago_diferido(self):
+        pk = self.reserva.reservas_gen_id
+        self.assertIn('pago', ReservasGen.objects.get(pk=pk).get_deferred_fields())
+        self.assertNotIn('pago', ReservasGen.objects.con_pago().get(pk=pk).get_deferred_fields())
+
+        # Por select_related y por acceso a la FK (base manager)
+        reserva = ReservaHotel.objects.select_related('reservas_gen').get(pk=self.reserva.pk)
+        self.assertIn('pago', reserva.reservas_gen.get_deferred_fields())
+        reserva = ReservaHotel.objects.get(pk=self.reserva.pk)
+        self.assertIn('pago', reserva.reservas_gen.get_deferred_fields())
+
+    def test_tiene_pago_sigue_al_comprobante(self):
+        reserva_gen = ReservasGen.objects.get(pk=self.reserva.reservas_gen_id)
+        reserva_gen.tiene_pago = False
+        reserva_gen.save(update_fields=['tiene_pago'])
+        # La proyección de listados sigue a la reserva general (señal post_save)
+        self.assertFalse(ReservaHotelListado.objects.get(pk=self.reserva.pk).reservas_gen_tiene_pago)
+
+        guardar_comprobante(reserva_gen, io.BytesIO(b'nuevo'), nombre='nuevo.pdf')
+        reserva_gen = ReservasGen.objects.con_pago().get(pk=reserva_gen.pk)
+        self.assertEqual((reserva_gen.tiene_pago, reserva_gen.pago), (True, None))
+        self.assertTrue(ReservaHotelListado.objects.get(pk=self.reserva.pk).reservas_gen_tiene_pago)
+        # El listado llena el catálogo de habitaciones: sin commit no se invalida solo
+        self.addCleanup(cache_catalogos.invalidar)
+        reserva = self.client.get('/api/reservaHotel/reservas/').json()['reservas'][0]
+        self.assertTrue(reserva['reservas_gen']['tiene_pago'])
+
+
+class MigrarComprobantesTest(StorageTemporalMixin, TransactionTestCase):
+    """manage.py migrar_comprobantes (hace commit por reserva y cierra la conexión)"""
+
+    def test_migrar(self):
+        contenido = b'\x89PNG comprobante antiguo'
+        con_blob = crear_reserva_gen(pago=contenido, tiene_pago=True)
+        vacio = crear_reserva_gen(pago=b'', tiene_pago=True)
+        reserva = crear_reserva_hotel(vacio)
+        self.assertTrue(ReservaHotelListado.objects.get(pk=reserva.pk).reservas_gen_tiene_pago)
+
+        salida = io.StringIO()
+        call_command('migrar_comprobantes', '--dry-run', stdout=salida)
+        self.assertIn('pendientes de migrar: 2', salida.getvalue())
+
+        call_command('migrar_comprobantes', stdout=io.StringIO())
+        con_blob = ReservasGen.objects.con_pago().get(pk=con_blob.pk)
+        self.assertIsNone(con_blob.pago)
+        self.assertEqual((con_blob.comprobante_tipo, con_blob.comprobante_tamano), ('image/png', len(contenido)))
+        self.assertEqual(con_blob.comprobante_sha256, hashlib.sha256(contenido).hexdigest())
+        with self.storage.open(con_blob.comprobante.name) as archivo:
+            self.assertEqual(archivo.read(), contenido)
+
+        # BLOB vacío: se limpia sin crear archivo y la proyección deja de mostrar el pago
+        vacio = ReservasGen.objects.con_pago().get(pk=vacio.pk)
+        self.assertEqual((vacio.pago, vacio.tiene_pago, vacio.comprobante.name), (None, False, ''))
+        self.assertFalse(ReservaHotelListado.objects.get(pk=reserva.pk).reservas_gen_tiene_pago)
+
+
+class ConfiguracionComprobantesTest(SimpleTestCase):
+
+    def test_storage_obligatorio_sin_debug(self):
+        with override_settings(DEBUG=False, COMPROBANTES_STORAGE=''):
+            self.assertRaises(ImproperlyConfigured, verificar_storage_comprobantes)
+        with override_settings(DEBUG=False, COMPROBANTES_STORAGE='storages.backends.s3.S3Storage'):
+            verificar_storage_comprobantes()
+        with override_settings(DEBUG=True, COMPROBANTES_STORAGE=''):
+            verificar_storage_comprobantes()
@@ -0,0 +1,335 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/tickets.py
+# Reservas asíncronas: tickets con resultado diferido (hotel y eventos)
+# ========================================
+"""
+En modo asíncrono la vista de registro no bloquea el worker WSGI esperando a la
+cola: responde 202 con un ticket y el resultado se guarda aquí cuando la cola
+decide. El cliente lo consulta en GET /api/reservas/tickets/<ticket>/
+(opcionalmente con ?esperar=<segundos> para long-polling).
+
+Los tickets vencen a los RESERVAS_TICKETS_TTL segundos. Almacenes
+(RESERVAS_TICKETS_ALMACEN):
+
+- 'MEMORIA': en el proceso que creó el ticket, acotado por RESERVAS_TICKETS_MAX.
+  Con varios workers de gunicorn la consulta debe llegar al mismo worker
+  (sticky routing); si llega a otro responde 421 TICKET_EN_OTRO_PROCESO.
+- 'BD': tabla ticket_reserva, cualquier proceso completa y consulta el ticket
+  (el long-polling relee la fila cada INTERVALO_SONDEO segundos).
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metricas import registrar_resultado
+
+logger = logging.getLogger(__name__)
+
+
+class SolicitudConCallbacks:
+    """
+    Base de ReservaRequest / EventoRequest: permite registrar funciones que se
+    ejecutan cuando la cola resuelve la solicitud (además del threading.Event).
+    COLA_METRICAS identifica la cola en las métricas (ver metricas.py).
+    """
+
+    def _inicializar_callbacks(self):
+        self.evento = threading.Event()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+        self._notificada = False
+
+    def agregar_callback(self, callback):
+        """Registra callback(solicitud); si ya fue resuelta se ejecuta de inmediato"""
+        with self._callbacks_lock:
+            if not self._notificada:
+                self._callbacks.append(callback)
+                return
+        ejecutar_finalizacion(callback, self)
+
+    def notificar(self):
+        """Marca la solicitud como resuelta: despierta a quien espera y dispara los callbacks una sola vez"""
+        self.evento.set()
+        with self._callbacks_lock:
+            if self._notificada:
+                return
+            self._notificada = True
+            callbacks, self._callbacks = self._callbacks, []
+        registrar_resultado(self)
+        for callback in callbacks:
+            ejecutar_finalizacion(callback, self)
+
+
+# 🧵 Los callbacks (serializar, auditar) corren fuera de los workers de la cola
+_ejecutor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'RESERVAS_FINALIZACION_WORKERS', 2),
+    thread_name_prefix='reservas-finalizacion'
+)
+
+
+def _ejecutar_y_cerrar(callback, solicitud):
+    try:
+        callback(solicitud)
+    except Exception:
+        logger.exception("❌ Error finalizando solicitud asíncrona")
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def ejecutar_finalizacion(callback, solicitud):
+    _ejecutor.submit(_ejecutar_y_cerrar, callback, solicitud)
+
+
+class AlmacenResultadosMemoria:
+    """Tickets en memoria del proceso, acotados por cantidad y con vencimiento"""
+    nombre = 'MEMORIA'
+
+    MAX_ESPERA = 25  # segundos máximos de long-polling por consulta
+
+    def __init__(self, max_tickets, ttl):
+        self.max_tickets = max_tickets
+        self.ttl = ttl
+        self._tickets = OrderedDict()  # {ticket: dict}, más antiguo primero
+        self._lock = threading.Lock()
+        self._cambios = threading.Condition(self._lock)
+        self._pid = None
+        self._prefijo = None
+        self.creados = 0
+        self.completados = 0
+        self.descartados = 0
+
+    def _prefijo_proceso(self):
+        """Identifica a este proceso en sus tickets (se renueva tras un fork de gunicorn)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._prefijo = uuid.uuid4().hex[:8]
+        return self._prefijo
+
+    def de_otro_proceso(self, ticket):
+        """True si el ticket lo creó otro proceso (la consulta no llegó al worker que lo tiene)"""
+        prefijo, separador, _ = ticket.partition('-')
+        return bool(separador) and prefijo != self._prefijo_proceso()
+
+    def _purgar(self):
+        """Quita vencidos y, si se supera el máximo, los más antiguos (requiere el lock)"""
+        limite = time.time() - self.ttl
+        while self._tickets:
+            ticket, datos = next(iter(self._tickets.items()))
+            if datos['creado'] >= limite and len(self._tickets) <= self.max_tickets:
+                break
+            del self._tickets[ticket]
+            self.descartados += 1
+
+    def crear(self, tipo):
+        ticket = f"{self._prefijo_proceso()}-{uuid.uuid4().hex[:23]}"
+        with self._lock:
+            self._tickets[ticket] = {
+                'tipo': tipo,
+                'estado': 'PENDIENTE',
+                'creado': time.time(),
+                'completado': None,
+                'http_status': None,
+                'respuesta': None,
+            }
+            self.creados += 1
+            self._purgar()
+        return ticket
+
+    def completar(self, ticket, respuesta, http_status):
+        with self._cambios:
+            datos = self._tickets.get(ticket)
+            if datos is None:
+                return False  # Vencido o descartado: el cliente ya no lo puede consultar
+            datos.update({
+                'estado': 'COMPLETADO',
+                'completado': time.time(),
+                'http_status': http_status,
+                'respuesta': respuesta,
+            })
+            self.completados += 1
+            self._cambios.notify_all()
+        return True
+
+    def obtener(self, ticket, esperar=0):
+        """Copia del ticket (None si no existe); con esperar > 0 espera a que se complete"""
+        fin = time.time() + min(max(esperar, 0), self.MAX_ESPERA)
+        with self._cambios:
+            while True:
+                datos = self._tickets.get(ticket)
+                if datos is None:
+                    return None
+                restante = fin - time.time()
+                if datos['estado'] != 'PENDIENTE' or restante <= 0:
+                    return dict(datos)
+                self._cambios.wait(restante)
+
+    def obtener_estadisticas(self):
+        with self._lock:
+            self._purgar()
+            pendientes = sum(1 for d in self._tickets.values() if d['estado'] == 'PENDIENTE')
+            return {
+                'almacen': self.nombre,
+                'tickets_en_memoria': len(self._tickets),
+                'pendientes': pendientes,
+                'creados': self.creados,
+                'completados': self.completados,
+                'descartados': self.descartados,
+                'max_tickets': self.max_tickets,
+                'ttl_segundos': self.ttl,
+            }
+
+
+class AlmacenResultadosBD:
+    """Tickets en la tabla ticket_reserva: cualquier proceso los completa y los consulta"""
+    nombre = 'BD'
+
+    MAX_ESPERA = 25  # segundos máximos de long-polling por consulta
+    INTERVALO_SONDEO = 0.5  # segundos entre relecturas de la fila durante el long-polling
+    INTERVALO_PURGA = 60  # segundos entre purgas de tickets vencidos por proceso
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Los tickets completados en este proceso despiertan el long-polling antes del próximo sondeo
+        self._cambios = threading.Condition(self._lock)
+        self._ultima_purga = 0
+        self.creados = 0
+        self.completados = 0
+        self.descartados = 0
+
+    def _modelo(self):
+        from .models import TicketReserva
+        return TicketReserva
+
+    def _vigentes(self):
+        return self._modelo().objects.filter(expira__gt=timezone.now())
+
+    def de_otro_proceso(self, ticket):
+        return False
+
+    def crear(self, tipo):
+        ticket = uuid.uuid4().hex
+        ahora = timezone.now()
+        self._modelo().objects.create(
+            ticket=ticket,
+            tipo=tipo,
+            creado=ahora,
+            expira=ahora + timedelta(seconds=self.ttl),
+        )
+        with self._lock:
+            self.creados += 1
+        self._purgar_si_corresponde()
+        return ticket
+
+    def completar(self, ticket, respuesta, http_status):
+        actualizados = self._vigentes().filter(ticket=ticket).update(
+            estado='COMPLETADO',
+            completado=timezone.now(),
+            http_status=http_status,
+            # Mismo encoder que el JSONRenderer de DRF: la consulta devuelve lo que habría devuelto el registro
+            respuesta=json.dumps(respuesta, cls=JSONEncoder),
+        )
+        with self._cambios:
+            if actualizados:
+                self.completados += 1
+            self._cambios.notify_all()
+        return bool(actualizados)
+
+    def _leer(self, ticket):
+        datos = self._vigentes().filter(ticket=ticket).values(
+            'tipo', 'estado', 'creado', 'completado', 'http_status', 'respuesta'
+        ).first()
+        if datos is not None:
+            datos['respuesta'] = json.loads(datos['respuesta']) if datos['estado'] != 'PENDIENTE' else None
+        return datos
+
+    def obtener(self, ticket, esperar=0):
+        """Ticket (None si no existe o venció); con esperar > 0 relee la fila hasta que se complete"""
+        fin = time.time() + min(max(esperar, 0), self.MAX_ESPERA)
+        while True:
+            datos = self._leer(ticket)
+            restante = fin - time.time()
+            if datos is None or datos['estado'] != 'PENDIENTE' or restante <= 0:
+                return datos
+            with self._cambios:
+                self._cambios.wait(min(restante, self.INTERVALO_SONDEO))
+
+    def _purgar_si_corresponde(self):
+        with self._lock:
+            if time.time() - self._ultima_purga < self.INTERVALO_PURGA:
+                return
+            self._ultima_purga = time.time()
+        self.purgar()
+
+    def purgar(self):
+        """Elimina los tickets vencidos"""
+        borrados, _ = self._modelo().objects.filter(expira__lte=timezone.now()).delete()
+        with self._lock:
+            self.descartados += borrados
+        return borrados
+
+    def obtener_estadisticas(self):
+        pendientes = self._vigentes().filter(estado='PENDIENTE').count()
+        with self._lock:
+            return {
+                'almacen': self.nombre,
+                'pendientes': pendientes,
+                'creados': self.creados,
+                'completados': self.completados,
+                'descartados': self.descartados,
+                'ttl_segundos': self.ttl,
+            }
+
+
+def obtener_almacen_tickets():
+    """Crea el almacén configurado en settings.RESERVAS_TICKETS_ALMACEN (por defecto MEMORIA)"""
+    nombre = str(getattr(settings, 'RESERVAS_TICKETS_ALMACEN', 'MEMORIA')).upper()
+    ttl = getattr(settings, 'RESERVAS_TICKETS_TTL', 600)
+    if nombre == 'MEMORIA':
+        return AlmacenResultadosMemoria(max_tickets=getattr(settings, 'RESERVAS_TICKETS_MAX', 1000), ttl=ttl)
+    if nombre == 'BD':
+        return AlmacenResultadosBD(ttl=ttl)
+    raise ValueError(f"RESERVAS_TICKETS_ALMACEN inválido: {nombre}. Opciones: MEMORIA, BD")
+
+
+# Instancia global del almacén de tickets
+almacen_tickets = obtener_almacen_tickets()
+
+
+def solicita_modo_asincrono(request):
+    """
+    ¿El cliente pidió respuesta asíncrona?
+    - ?asincrono=1  o  header Prefer: respond-async
+    - o RESERVAS_MODO_ASINCRONO = True en settings (salvo ?asincrono=0)
+    """
+    valor = request.query_params.get('asincrono')
+    if valor is not None:
+        return valor.lower() in ('1', 'true', 'si', 'sí')
+    if 'respond-async' in request.headers.get('Prefer', ''):
+        return True
+    return bool(getattr(settings, 'RESERVAS_MODO_ASINCRONO', False))
+
+
+def respuesta_ticket(ticket, tipo):
+    """Cuerpo de la respuesta 202 al aceptar una solicitud asíncrona"""
+    return {
+        'mensaje': 'Solicitud de reserva recibida, se está procesando',
+        'ticket': ticket,
+        'tipo': tipo,
+        'estado': 'PENDIENTE',
+        'consultar': f'/api/reservas/tickets/{ticket}/',
+    }
@@ -0,0 +1,20 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # 🔹 Reservas asíncronas (hotel y eventos)
+    path('reservas/tickets/estadisticas/', views.estadisticas_tickets, name='estadisticas_tickets'),
+    path('reservas/tickets/<str:ticket>/', views.estado_ticket_reserva, name='estado_ticket_reserva'),
+
+    # 🔹 Pool de conexiones a la BD
+    path('reservas/estadisticas-bd/', views.estadisticas_pool_bd, name='estadisticas_pool_bd'),
+
+    # 🔹 Perfilador SQL por endpoint
+    path('reservas/perfilador-sql/', views.reporte_perfilador_sql, name='reporte_perfilador_sql'),
+
+    # 🔹 Métricas de las colas (Prometheus)
+    path('metrics/', views.metricas_prometheus, name='metricas_prometheus'),
+
+    # 🔹 Comprobantes de pago
+    path('reservas/<int:id_reserva_gen>/comprobante/', views.descargar_comprobante, name='descargar_comprobante'),
+]
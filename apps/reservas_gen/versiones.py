@@ -0,0 +1,83 @@
+# ========================================
+# ARCHIVO: apps/reservas_gen/versiones.py
+# Versión por dominio de reservas (hotel / eventos) y GET condicional con ETag
+# ========================================
+"""
+Cada escritura confirmada de ReservaHotel o ReservasEvento incrementa la versión
+de su dominio (ver signals.py de cada app). La versión se usa para:
+
+- Invalidar los tableros del día cacheados (tableros.py).
+- Construir un ETag fuerte para los endpoints de polling (notificaciones y
+  estadisticas-hoy): si el cliente envía If-None-Match con el ETag vigente se
+  responde 304 Not Modified sin ejecutar las consultas.
+
+La versión vive en la caché de Django. Con una caché compartida (Redis/Memcached)
+es la misma para todos los procesos; con LocMemCache cada proceso tiene la suya,
+por eso el ETag incluye además una ventana de RESERVAS_ETAG_VENTANA segundos que
+acota cuánto puede tardar un proceso en ver las escrituras de otro.
+"""
+import time
+from functools import wraps
+
+import pytz
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+DOMINIO_HOTEL = 'hotel'
+DOMINIO_EVENTOS = 'eventos'
+
+
+def _clave_version(dominio):
+    return f"reservas:version:{dominio}"
+
+
+def version_dominio(dominio):
+    # El valor inicial es un timestamp para no reutilizar versiones si la caché se vació
+    return cache.get_or_set(_clave_version(dominio), time.time_ns(), timeout=None)
+
+
+def incrementar_version(dominio):
+    """Marca un cambio en el dominio (llamado al confirmar una escritura)"""
+    try:
+        cache.incr(_clave_version(dominio))
+    except ValueError:
+        cache.set(_clave_version(dominio), time.time_ns(), timeout=None)
+
+
+# ==============================================
+# 🔹 GET CONDICIONAL
+# ==============================================
+
+def etag_dominio(dominio):
+    """ETag fuerte: versión del dominio + fecha local + ventana de tiempo"""
+    ventana = getattr(settings, 'RESERVAS_ETAG_VENTANA', 30)
+    fecha = timezone.now().astimezone(pytz.timezone('America/La_Paz')).date()
+    return f'"{dominio}-{version_dominio(dominio)}-{fecha:%Y%m%d}-{int(time.time() // ventana)}"'
+
+
+def con_etag(dominio):
+    """
+    Decorador para vistas GET de polling: responde 304 si If-None-Match coincide
+    con el ETag actual del dominio; si no, ejecuta la vista y agrega el ETag.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            etag = etag_dominio(dominio)
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                respuesta = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                respuesta = vista(request, *args, **kwargs)
+                if respuesta.status_code != status.HTTP_200_OK:
+                    return respuesta
+            respuesta['ETag'] = etag
+            # El cliente puede guardar la respuesta pero debe revalidar siempre
+            respuesta['Cache-Control'] = 'no-cache'
+            return respuesta
+        return envoltura
+    return decorador
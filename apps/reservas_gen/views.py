@@ -1,3 +1,190 @@
-from django.shortcuts import render
+import logging
 
-# Create your views here.
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework import status
+from django.http import FileResponse, HttpResponse
+from django.views.decorators.http import require_GET
+from django.db import transaction
+
+from django.conf import settings
+
+from LesEtoiles.db_pool.pool import obtener_estadisticas_pools
+from LesEtoiles.perfilador_sql import reporte_sql
+from .models import ReservasGen
+from .tickets import almacen_tickets
+from .metricas import registro_metricas
+from .comprobantes import guardar_comprobante, abrir_comprobante, ComprobanteDemasiadoGrande, tamano_maximo_comprobante
+
+logger = logging.getLogger(__name__)
+
+
+# 🔹 Consultar el estado de una reserva asíncrona (hotel o evento)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def estado_ticket_reserva(request, ticket):
+    """
+    Devuelve el estado de un ticket de reserva asíncrona.
+    - 202 mientras la cola no decide (estado PENDIENTE)
+    - 200 con la respuesta final (http_status = el código que habría devuelto el registro)
+    - 404 si el ticket no existe o ya venció
+    - 421 si lo creó otro worker y el almacén es MEMORIA (se requiere sticky routing o RESERVAS_TICKETS_ALMACEN=BD)
+    
+    Query param opcional: esperar=<segundos> (long-polling, máx 25)
+    
+    GET /api/reservas/tickets/<ticket>/?esperar=10
+    """
+    try:
+        esperar = float(request.GET.get('esperar', 0))
+    except ValueError:
+        return Response({'error': 'El parámetro esperar debe ser numérico'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    datos = almacen_tickets.obtener(ticket, esperar=esperar)
+    if datos is None:
+        if almacen_tickets.de_otro_proceso(ticket):
+            return Response({
+                'error': 'El ticket pertenece a otro proceso del servidor',
+                'codigo': 'TICKET_EN_OTRO_PROCESO',
+                'detalle': 'Con RESERVAS_TICKETS_ALMACEN=MEMORIA la consulta debe llegar al mismo worker; con varios workers use BD'
+            }, status=status.HTTP_421_MISDIRECTED_REQUEST)
+        return Response({'error': 'Ticket no encontrado o vencido'}, status=status.HTTP_404_NOT_FOUND)
+    
+    cuerpo = {
+        'ticket': ticket,
+        'tipo': datos['tipo'],
+        'estado': datos['estado'],
+    }
+    if datos['estado'] == 'PENDIENTE':
+        return Response(cuerpo, status=status.HTTP_202_ACCEPTED)
+    
+    cuerpo['http_status'] = datos['http_status']
+    cuerpo['resultado'] = datos['respuesta']
+    return Response(cuerpo, status=status.HTTP_200_OK)
+
+
+# 🔹 Estadísticas del almacén de tickets
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def estadisticas_tickets(request):
+    """
+    GET /api/reservas/tickets/estadisticas/
+    """
+    return Response(almacen_tickets.obtener_estadisticas(), status=status.HTTP_200_OK)
+
+
+# 🔹 Métricas del pool de conexiones a la BD
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def estadisticas_pool_bd(request):
+    """
+    Aciertos / fallos / esperas del pool de conexiones de este proceso.
+    GET /api/reservas/estadisticas-bd/
+    """
+    return Response({
+        'pool_activo': settings.DATABASES['default']['ENGINE'] == 'LesEtoiles.db_pool',
+        'pools': obtener_estadisticas_pools(),
+    }, status=status.HTTP_200_OK)
+
+
+# 🔹 Reporte del perfilador SQL por endpoint
+@api_view(['GET', 'DELETE'])
+@permission_classes([AllowAny])
+def reporte_perfilador_sql(request):
+    """
+    Consultas por endpoint de las últimas requests de este proceso (requiere PERFILADOR_SQL=True).
+    GET /api/reservas/perfilador-sql/
+    DELETE /api/reservas/perfilador-sql/ reinicia el reporte
+    """
+    if request.method == 'DELETE':
+        reporte_sql.reiniciar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response({
+        'perfilador_activo': getattr(settings, 'PERFILADOR_SQL', False),
+        'ventana': reporte_sql.ventana,
+        'endpoints': reporte_sql.obtener(),
+    }, status=status.HTTP_200_OK)
+
+
+# 🔹 Métricas de las colas en formato Prometheus
+@require_GET
+def metricas_prometheus(request):
+    """
+    Contadores, histogramas e indicadores de las colas de este proceso (ver metricas.py).
+    Vista de Django (no DRF) para responder texto plano sin negociación de contenido.
+    Si METRICAS_TOKEN está configurado se exige el header Authorization: Bearer <token>.
+    GET /api/metrics/
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if token and request.headers.get('Authorization', '') != f"Bearer {token}":
+        return HttpResponse('No autorizado\n', status=status.HTTP_401_UNAUTHORIZED, content_type='text/plain')
+    return HttpResponse(registro_metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ==============================================
+# 🔹 COMPROBANTES DE PAGO
+# ==============================================
+
+def respuesta_subida_comprobante(request, id_reserva_gen):
+    """
+    Lógica común de subir_comprobante (hotel y eventos): guarda el campo 'pago'
+    del multipart en el storage de comprobantes, por bloques.
+    Responde 413 si supera COMPROBANTES_TAMANO_MAX y 503 si el storage falla.
+    """
+    archivo_pago = request.FILES.get('pago')
+    if not archivo_pago:
+        return Response({'error': 'No se envió ningún archivo'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            reserva_gen = ReservasGen.objects.select_for_update().only(
+                'id_reservas_gen', 'tipo', 'comprobante'
+            ).get(pk=id_reserva_gen)
+            guardar_comprobante(reserva_gen, archivo_pago)
+    except ReservasGen.DoesNotExist:
+        return Response({'error': 'Reserva general no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    except ComprobanteDemasiadoGrande:
+        return Response({
+            'error': f'El comprobante supera el tamaño máximo de {tamano_maximo_comprobante() / (1024 * 1024):.1f} MB'
+        }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except OSError:
+        # Storage caído o sin permisos: la transacción ya revirtió, la referencia anterior sigue igual
+        logger.exception("❌ Error guardando el comprobante de la reserva general %s", id_reserva_gen)
+        return Response({
+            'error': 'No se pudo guardar el comprobante en el almacenamiento, intente nuevamente'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    return Response({
+        'mensaje': 'Comprobante de pago subido correctamente',
+        'reserva_gen_id': reserva_gen.id_reservas_gen,
+        'comprobante': {
+            'nombre': reserva_gen.comprobante_nombre,
+            'tipo': reserva_gen.comprobante_tipo,
+            'tamano': reserva_gen.comprobante_tamano,
+            'sha256': reserva_gen.comprobante_sha256,
+        }
+    }, status=status.HTTP_200_OK)
+
+
+# 🔹 Descargar el comprobante de pago de una reserva (hotel o evento)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def descargar_comprobante(request, id_reserva_gen):
+    """
+    Sirve el comprobante en streaming (no se carga completo en memoria).
+    GET /api/reservas/<id_reserva_gen>/comprobante/
+    """
+    try:
+        reserva_gen = ReservasGen.objects.get(pk=id_reserva_gen)
+    except ReservasGen.DoesNotExist:
+        return Response({'error': 'Reserva general no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+
+    comprobante = abrir_comprobante(reserva_gen)
+    if comprobante is None:
+        return Response({'error': 'La reserva no tiene comprobante de pago'}, status=status.HTTP_404_NOT_FOUND)
+
+    archivo, nombre, tipo_contenido = comprobante
+    respuesta = FileResponse(archivo, as_attachment=True, filename=nombre, content_type=tipo_contenido)
+    if reserva_gen.comprobante_sha256:
+        respuesta['ETag'] = f'"{reserva_gen.comprobante_sha256}"'
+    return respuesta
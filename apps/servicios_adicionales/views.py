@@ -8,6 +8,7 @@ from .models import ServiciosAdicionales
 from .serializers import ServiciosAdicionalesSerializer
 from apps.usuario.models import Usuario  # Para validar roles
 from apps.usuario.serializers import UsuarioSerializer
+from apps.reservas_gen.catalogos import cache_catalogos
 # 🔹 Perfil del usuario autenticado
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -50,9 +51,8 @@ def crear_servicio(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])  # Cualquiera puede ver los servicios
 def lista_servicios(request):
-    servicios = ServiciosAdicionales.objects.all()
-    serializer = ServiciosAdicionalesSerializer(servicios, many=True)
-    return Response(serializer.data)
+    # Respuesta armada en la caché de catálogos (se invalida al crear/actualizar servicios)
+    return Response(cache_catalogos.obtener('servicios'))
 
 
 # 🔹 Obtener servicio por ID